@@ -0,0 +1,33 @@
+"""Product image renditions
+
+Revision ID: a4d8e2c6f1b7
+Revises: f3b7d1a9c4e6
+Create Date: 2026-10-19 14:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d8e2c6f1b7'
+down_revision: Union[str, Sequence[str], None] = 'f3b7d1a9c4e6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('product_images', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('product_images', sa.Column('renditions', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+    op.create_index(op.f('ix_product_images_content_hash'), 'product_images', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_product_images_content_hash'), table_name='product_images')
+    op.drop_column('product_images', 'renditions')
+    op.drop_column('product_images', 'content_hash')
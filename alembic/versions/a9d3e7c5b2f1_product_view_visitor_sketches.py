@@ -0,0 +1,32 @@
+"""Product view visitor sketches
+
+Revision ID: a9d3e7c5b2f1
+Revises: f2c6a1d8e3b5
+Create Date: 2026-10-18 14:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9d3e7c5b2f1'
+down_revision: Union[str, Sequence[str], None] = 'f2c6a1d8e3b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('product_view_daily', sa.Column('visitor_sketch', sa.LargeBinary(), nullable=True))
+    # Les cumuls existants n'ont pas de sketch : repartir du repère 0 pour
+    # que la compaction les reconstruise entièrement depuis les vues brutes
+    op.execute("DELETE FROM product_view_daily")
+    op.execute("DELETE FROM analytics_watermarks WHERE name = 'product_views_daily'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('product_view_daily', 'visitor_sketch')
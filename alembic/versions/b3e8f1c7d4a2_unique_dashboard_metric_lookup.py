@@ -0,0 +1,45 @@
+"""Unique dashboard metric lookup
+
+Revision ID: b3e8f1c7d4a2
+Revises: a9d3e7c5b2f1
+Create Date: 2026-10-18 16:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e8f1c7d4a2'
+down_revision: Union[str, Sequence[str], None] = 'a9d3e7c5b2f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+LOOKUP_COLUMNS = ['entity_type', 'entity_id', 'metric_name', 'period', 'date']
+
+# Doublons éventuels (upsert SELECT puis INSERT non atomique) : garder le plus récent
+DEDUPLICATE_SQL = """
+DELETE FROM dashboard_metrics AS older
+USING dashboard_metrics AS newer
+WHERE older.entity_type = newer.entity_type
+  AND older.entity_id = newer.entity_id
+  AND older.metric_name = newer.metric_name
+  AND older.period = newer.period
+  AND older.date = newer.date
+  AND older.id < newer.id
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(DEDUPLICATE_SQL)
+    op.drop_index('idx_dashboard_metrics_lookup', table_name='dashboard_metrics')
+    op.create_index('idx_dashboard_metrics_lookup', 'dashboard_metrics', LOOKUP_COLUMNS, unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_dashboard_metrics_lookup', table_name='dashboard_metrics')
+    op.create_index('idx_dashboard_metrics_lookup', 'dashboard_metrics', LOOKUP_COLUMNS, unique=False)
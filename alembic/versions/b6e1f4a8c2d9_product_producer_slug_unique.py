@@ -0,0 +1,38 @@
+"""Unique product slug per producer
+
+Revision ID: b6e1f4a8c2d9
+Revises: a4d8e2c6f1b7
+Create Date: 2026-10-20 10:15:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e1f4a8c2d9'
+down_revision: Union[str, Sequence[str], None] = 'a4d8e2c6f1b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Doublons existants (l'unicité n'était vérifiée que par le service) :
+    # le plus ancien garde son slug, les suivants reçoivent le suffixe -<id>
+    op.execute("""
+        UPDATE products p
+        SET slug = left(p.slug, 255 - length(p.id::text) - 1) || '-' || p.id
+        FROM (
+            SELECT id, row_number() OVER (PARTITION BY producer_id, slug ORDER BY id) AS rank
+            FROM products
+        ) d
+        WHERE d.id = p.id AND d.rank > 1
+    """)
+    op.create_index('uq_products_producer_slug', 'products', ['producer_id', 'slug'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_products_producer_slug', table_name='products')
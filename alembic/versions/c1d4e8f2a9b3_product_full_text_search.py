@@ -0,0 +1,88 @@
+"""Product full-text search
+
+Revision ID: c1d4e8f2a9b3
+Revises: 384a403d59c8
+Create Date: 2026-10-17 20:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c1d4e8f2a9b3'
+down_revision: Union[str, Sequence[str], None] = '384a403d59c8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Configuration française insensible aux accents
+    op.execute("""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'french_unaccent') THEN
+                CREATE TEXT SEARCH CONFIGURATION french_unaccent (COPY = french);
+                ALTER TEXT SEARCH CONFIGURATION french_unaccent
+                    ALTER MAPPING FOR hword, hword_part, word WITH unaccent, french_stem;
+            END IF;
+        END
+        $$
+    """)
+
+    # unaccent() n'est pas IMMUTABLE : wrapper nécessaire pour l'utiliser dans un index
+    op.execute("""
+        CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text AS $$
+            SELECT public.unaccent('public.unaccent', $1)
+        $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    """)
+
+    op.add_column('products', sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION products_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('french_unaccent', coalesce(NEW.name, '')), 'A') ||
+                setweight(to_tsvector('french_unaccent', coalesce(NEW.description, '')), 'B');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("DROP TRIGGER IF EXISTS products_search_vector_trigger ON products")
+    op.execute("""
+        CREATE TRIGGER products_search_vector_trigger
+            BEFORE INSERT OR UPDATE OF name, description ON products
+            FOR EACH ROW EXECUTE FUNCTION products_search_vector_update()
+    """)
+
+    # Remplissage des produits existants
+    op.execute("""
+        UPDATE products SET search_vector =
+            setweight(to_tsvector('french_unaccent', coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('french_unaccent', coalesce(description, '')), 'B')
+    """)
+
+    op.create_index('ix_products_search_vector', 'products', ['search_vector'], unique=False, postgresql_using='gin')
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_products_name_trgm
+            ON products USING gin (immutable_unaccent(lower(name)) gin_trgm_ops)
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_products_name_trgm")
+    op.drop_index('ix_products_search_vector', table_name='products')
+    op.execute("DROP TRIGGER IF EXISTS products_search_vector_trigger ON products")
+    op.execute("DROP FUNCTION IF EXISTS products_search_vector_update()")
+    op.drop_column('products', 'search_vector')
+    op.execute("DROP FUNCTION IF EXISTS immutable_unaccent(text)")
+    op.execute("DROP TEXT SEARCH CONFIGURATION IF EXISTS french_unaccent")
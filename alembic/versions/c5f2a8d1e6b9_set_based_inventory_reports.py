@@ -0,0 +1,44 @@
+"""Set-based inventory reports
+
+Revision ID: c5f2a8d1e6b9
+Revises: b3e8f1c7d4a2
+Create Date: 2026-10-18 18:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5f2a8d1e6b9'
+down_revision: Union[str, Sequence[str], None] = 'b3e8f1c7d4a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Un seul rapport par produit et par jour : garder le premier généré
+DEDUPLICATE_SQL = """
+DELETE FROM inventory_reports AS later
+USING inventory_reports AS earlier
+WHERE later.product_id = earlier.product_id
+  AND later.report_date = earlier.report_date
+  AND later.id > earlier.id
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(DEDUPLICATE_SQL)
+    op.drop_index('idx_inventory_reports_product_date', table_name='inventory_reports')
+    op.create_index('idx_inventory_reports_product_date', 'inventory_reports', ['product_id', 'report_date'], unique=True)
+    op.create_index('ix_orders_created', 'orders', ['created_at'], unique=False)
+    op.create_index('ix_stock_movements_created', 'stock_movements', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_stock_movements_created', table_name='stock_movements')
+    op.drop_index('ix_orders_created', table_name='orders')
+    op.drop_index('idx_inventory_reports_product_date', table_name='inventory_reports')
+    op.create_index('idx_inventory_reports_product_date', 'inventory_reports', ['product_id', 'report_date'], unique=False)
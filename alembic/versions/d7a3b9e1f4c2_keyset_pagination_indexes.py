@@ -0,0 +1,42 @@
+"""Keyset pagination indexes
+
+Revision ID: d7a3b9e1f4c2
+Revises: c1d4e8f2a9b3
+Create Date: 2026-10-17 21:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a3b9e1f4c2'
+down_revision: Union[str, Sequence[str], None] = 'c1d4e8f2a9b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (nom, table, colonnes) : une clé de tri (created_at, id) par liste paginée
+KEYSET_INDEXES = [
+    ('ix_products_producer_created', 'products', ['producer_id', 'created_at', 'id']),
+    ('ix_products_active_created', 'products', ['is_active', 'created_at', 'id']),
+    ('ix_orders_user_created', 'orders', ['user_id', 'created_at', 'id']),
+    ('ix_orders_producer_created', 'orders', ['producer_id', 'created_at', 'id']),
+    ('ix_notifications_user_created', 'notifications', ['user_id', 'created_at', 'id']),
+    ('ix_events_triggered_id', 'events', ['triggered_at', 'id']),
+    ('ix_admin_actions_created_id', 'admin_actions', ['created_at', 'id']),
+    ('ix_admin_actions_admin_created', 'admin_actions', ['admin_id', 'created_at', 'id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in KEYSET_INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(KEYSET_INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,47 @@
+"""Payout run checkpoints
+
+Revision ID: d8a4c6e2f9b1
+Revises: c5f2a8d1e6b9
+Create Date: 2026-10-18 20:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8a4c6e2f9b1'
+down_revision: Union[str, Sequence[str], None] = 'c5f2a8d1e6b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'payout_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('period_start', sa.DateTime(), nullable=False),
+        sa.Column('period_end', sa.DateTime(), nullable=False),
+        sa.Column('status', sa.Enum('RUNNING', 'COMPLETED', name='payoutrunstatus'), nullable=False),
+        sa.Column('last_producer_id', sa.Integer(), nullable=False),
+        sa.Column('payouts_created', sa.Integer(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('period_start', 'period_end', name='uq_payout_runs_period')
+    )
+    op.create_index(op.f('ix_payout_runs_id'), 'payout_runs', ['id'], unique=False)
+    # Anti-jointure "versement déjà créé pour la période" du traitement groupé
+    op.create_index('ix_producer_payouts_period', 'producer_payouts', ['period_start', 'period_end', 'producer_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_producer_payouts_period', table_name='producer_payouts')
+    op.drop_index(op.f('ix_payout_runs_id'), table_name='payout_runs')
+    op.drop_table('payout_runs')
+    sa.Enum(name='payoutrunstatus').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,90 @@
+"""Document number sequences
+
+Revision ID: e4b8c2d9f1a6
+Revises: d7a3b9e1f4c2
+Create Date: 2026-10-17 23:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b8c2d9f1a6'
+down_revision: Union[str, Sequence[str], None] = 'd7a3b9e1f4c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Même définition que app/core/numbering.py (NEXT_DOCUMENT_NUMBER_DDL)
+NEXT_DOCUMENT_NUMBER_DDL = """
+CREATE OR REPLACE FUNCTION next_document_number(sequence_name text) RETURNS bigint AS $$
+BEGIN
+    IF to_regclass(sequence_name) IS NULL THEN
+        BEGIN
+            EXECUTE 'CREATE SEQUENCE ' || quote_ident(sequence_name);
+        EXCEPTION WHEN duplicate_table OR unique_violation THEN
+            NULL;
+        END;
+    END IF;
+    RETURN nextval(sequence_name::regclass);
+END
+$$ LANGUAGE plpgsql
+"""
+
+# (préfixe, table, colonne) : numéros existants au format PREFIXE-AAAA-NNNN
+NUMBERED_DOCUMENTS = [
+    ('CMD', 'orders', 'order_number'),
+    ('INV', 'invoices', 'invoice_number'),
+]
+
+# Une séquence par année déjà utilisée, repartant après le plus grand numéro existant
+SEED_SEQUENCES_SQL = """
+DO $$
+DECLARE
+    counter record;
+BEGIN
+    FOR counter IN
+        SELECT split_part({column}, '-', 2) AS year,
+               max(split_part({column}, '-', 3)::bigint) AS last_value
+        FROM {table}
+        WHERE {column} ~ '^{prefix}-[0-9]{{4}}-[0-9]+$'
+        GROUP BY 1
+    LOOP
+        EXECUTE 'CREATE SEQUENCE IF NOT EXISTS '
+            || quote_ident('document_number_{sequence_prefix}_' || counter.year)
+            || ' START WITH ' || (counter.last_value + 1);
+    END LOOP;
+END
+$$
+"""
+
+DROP_SEQUENCES_SQL = """
+DO $$
+DECLARE
+    sequence record;
+BEGIN
+    FOR sequence IN
+        SELECT sequencename FROM pg_sequences WHERE sequencename LIKE 'document\\_number\\_%'
+    LOOP
+        EXECUTE 'DROP SEQUENCE IF EXISTS ' || quote_ident(sequence.sequencename);
+    END LOOP;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(NEXT_DOCUMENT_NUMBER_DDL)
+    for prefix, table, column in NUMBERED_DOCUMENTS:
+        op.execute(SEED_SEQUENCES_SQL.format(
+            prefix=prefix, table=table, column=column, sequence_prefix=prefix.lower()
+        ))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(DROP_SEQUENCES_SQL)
+    op.execute("DROP FUNCTION IF EXISTS next_document_number(text)")
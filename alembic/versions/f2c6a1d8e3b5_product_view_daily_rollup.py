@@ -0,0 +1,45 @@
+"""Product view daily rollup
+
+Revision ID: f2c6a1d8e3b5
+Revises: e4b8c2d9f1a6
+Create Date: 2026-10-18 09:15:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c6a1d8e3b5'
+down_revision: Union[str, Sequence[str], None] = 'e4b8c2d9f1a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'product_view_daily',
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('view_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('product_id', 'day')
+    )
+    op.create_index('idx_product_view_daily_day', 'product_view_daily', ['day', 'product_id', 'view_count'], unique=False)
+    op.create_table(
+        'analytics_watermarks',
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('last_id', sa.BigInteger(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('analytics_watermarks')
+    op.drop_index('idx_product_view_daily_day', table_name='product_view_daily')
+    op.drop_table('product_view_daily')
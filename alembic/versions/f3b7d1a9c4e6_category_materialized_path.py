@@ -0,0 +1,95 @@
+"""Category materialized path
+
+Revision ID: f3b7d1a9c4e6
+Revises: e9c3f7a2b5d8
+Create Date: 2026-10-19 09:15:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b7d1a9c4e6'
+down_revision: Union[str, Sequence[str], None] = 'e9c3f7a2b5d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('categories', sa.Column('path', sa.Text(), nullable=True))
+
+    # Remplissage des catégories existantes (parcours récursif depuis les racines)
+    op.execute("""
+        WITH RECURSIVE tree AS (
+            SELECT id, '/' || id || '/' AS path
+            FROM categories
+            WHERE parent_id IS NULL
+            UNION ALL
+            SELECT c.id, tree.path || c.id || '/'
+            FROM categories AS c
+            JOIN tree ON c.parent_id = tree.id
+        )
+        UPDATE categories SET path = tree.path
+        FROM tree
+        WHERE categories.id = tree.id
+    """)
+    op.create_index(
+        'ix_categories_path', 'categories', ['path'], unique=False,
+        postgresql_ops={'path': 'text_pattern_ops'}
+    )
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION categories_path_update() RETURNS trigger AS $$
+        DECLARE
+            parent_path text;
+        BEGIN
+            IF NEW.parent_id IS NULL THEN
+                NEW.path := '/' || NEW.id || '/';
+            ELSE
+                SELECT path INTO parent_path FROM categories WHERE id = NEW.parent_id;
+                IF position('/' || NEW.id || '/' in parent_path) > 0 THEN
+                    RAISE EXCEPTION 'Cycle dans la hiérarchie des catégories';
+                END IF;
+                NEW.path := parent_path || NEW.id || '/';
+            END IF;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION categories_subtree_path_update() RETURNS trigger AS $$
+        BEGIN
+            UPDATE categories
+            SET path = NEW.path || substr(path, length(OLD.path) + 1)
+            WHERE starts_with(path, OLD.path) AND id <> NEW.id;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("DROP TRIGGER IF EXISTS categories_path_trigger ON categories")
+    op.execute("""
+        CREATE TRIGGER categories_path_trigger
+            BEFORE INSERT OR UPDATE OF parent_id ON categories
+            FOR EACH ROW EXECUTE FUNCTION categories_path_update()
+    """)
+    op.execute("DROP TRIGGER IF EXISTS categories_subtree_path_trigger ON categories")
+    op.execute("""
+        CREATE TRIGGER categories_subtree_path_trigger
+            AFTER UPDATE OF parent_id ON categories
+            FOR EACH ROW WHEN (OLD.path IS DISTINCT FROM NEW.path)
+            EXECUTE FUNCTION categories_subtree_path_update()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS categories_subtree_path_trigger ON categories")
+    op.execute("DROP TRIGGER IF EXISTS categories_path_trigger ON categories")
+    op.execute("DROP FUNCTION IF EXISTS categories_subtree_path_update()")
+    op.execute("DROP FUNCTION IF EXISTS categories_path_update()")
+    op.drop_index('ix_categories_path', table_name='categories')
+    op.drop_column('categories', 'path')
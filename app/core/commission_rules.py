@@ -0,0 +1,276 @@
+"""
+Règles de commission et de TVA résolues en mémoire.
+
+`CommissionRepository.get_active_for_producer` exécute jusqu'à quatre
+requêtes par résolution, `TaxRateRepository.get_active_for_country` jusqu'à
+deux. `CommissionRuleSet` et `TaxRuleSet` chargent en une requête toutes les
+règles actives avec leur période de validité et les indexent par
+(producteur, catégorie) et (pays, catégorie) : une résolution devient une
+recherche en dictionnaire, avec le même ordre de priorité que les
+repositories, à n'importe quelle date.
+
+`get_rule_cache()` garde les deux index pour le processus. L'invalidation
+est automatique : un commit qui crée, modifie ou supprime une `Commission`
+ou un `TaxRate` (CommissionService, TaxRateService, scripts) vide le cache.
+Les autres workers rechargent au plus tard après RULE_CACHE_TTL secondes.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.admin import Commission, TaxRate
+
+
+def _valid_on(valid_from: Optional[date], valid_until: Optional[date], on_date: date) -> bool:
+    return (valid_from is None or valid_from <= on_date) and (valid_until is None or valid_until >= on_date)
+
+
+@dataclass(frozen=True)
+class CommissionRule:
+    """Règle de commission détachée de la session (sérialisable)"""
+    id: int
+    producer_id: Optional[int]
+    category_id: Optional[int]
+    percentage: Optional[Decimal]
+    fixed_amount: Optional[Decimal]
+    min_transaction_amount: Optional[Decimal]
+    max_transaction_amount: Optional[Decimal]
+    valid_from: Optional[date] = None
+    valid_until: Optional[date] = None
+
+    @classmethod
+    def from_model(cls, commission: Commission) -> "CommissionRule":
+        return cls(
+            id=commission.id,
+            producer_id=commission.producer_id,
+            category_id=commission.category_id,
+            percentage=commission.percentage,
+            fixed_amount=commission.fixed_amount,
+            min_transaction_amount=commission.min_transaction_amount,
+            max_transaction_amount=commission.max_transaction_amount,
+            valid_from=commission.valid_from,
+            valid_until=commission.valid_until,
+        )
+
+    @property
+    def rate(self) -> Decimal:
+        """Taux en fraction (15.00 % -> 0.15)"""
+        return (self.percentage or Decimal("0")) / 100
+
+    def applies_on(self, on_date: date) -> bool:
+        return _valid_on(self.valid_from, self.valid_until, on_date)
+
+
+@dataclass(frozen=True)
+class TaxRule:
+    """Taux de TVA détaché de la session (sérialisable)"""
+    id: int
+    country: str
+    category_id: Optional[int]
+    rate: Decimal
+    name: Optional[str] = None
+    valid_from: Optional[date] = None
+    valid_until: Optional[date] = None
+
+    @classmethod
+    def from_model(cls, tax_rate: TaxRate) -> "TaxRule":
+        return cls(
+            id=tax_rate.id,
+            country=tax_rate.country.upper(),
+            category_id=tax_rate.category_id,
+            rate=tax_rate.rate,
+            name=tax_rate.name,
+            valid_from=tax_rate.valid_from,
+            valid_until=tax_rate.valid_until,
+        )
+
+    def applies_on(self, on_date: date) -> bool:
+        return _valid_on(self.valid_from, self.valid_until, on_date)
+
+
+class _RuleIndex:
+    """Règles groupées par clé, dans l'ordre de chargement (id croissant)"""
+
+    def __init__(self, rules: Iterable, key: Callable):
+        self._rules: Dict[Hashable, List] = {}
+        for rule in rules:
+            self._rules.setdefault(key(rule), []).append(rule)
+
+    def __len__(self) -> int:
+        return sum(len(rules) for rules in self._rules.values())
+
+    def first(self, keys: Iterable[Hashable], on_date: date):
+        """Première règle valide à `on_date` pour la première clé qui en a une"""
+        for key in keys:
+            for rule in self._rules.get(key, ()):
+                if rule.applies_on(on_date):
+                    return rule
+        return None
+
+
+class CommissionRuleSet:
+    """Règles de commission actives, indexées par (producteur, catégorie)"""
+
+    def __init__(self, rules: Iterable[CommissionRule]):
+        self._index = _RuleIndex(rules, lambda rule: (rule.producer_id, rule.category_id))
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @classmethod
+    def load(cls, db: Session) -> "CommissionRuleSet":
+        """Charge en une requête toutes les règles actives, toutes périodes confondues"""
+        commissions = db.query(Commission).filter(Commission.is_active).order_by(Commission.id).all()
+        return cls(CommissionRule.from_model(commission) for commission in commissions)
+
+    def resolve(
+        self,
+        producer_id: Optional[int],
+        category_id: Optional[int] = None,
+        on_date: Optional[date] = None
+    ) -> Optional[CommissionRule]:
+        """
+        Règle applicable à `on_date` (défaut : aujourd'hui), par priorité
+        décroissante : producteur + catégorie, producteur, catégorie, règle
+        par défaut.
+
+        `producer_id` est l'utilisateur du producteur (Commission.producer_id -> users.id).
+        """
+        keys = [(producer_id, category_id), (producer_id, None)]
+        if category_id:
+            keys.append((None, category_id))
+        keys.append((None, None))
+        return self._index.first(keys, on_date or date.today())
+
+    def resolve_many(
+        self,
+        pairs: Iterable[Tuple[Optional[int], Optional[int]]],
+        on_date: Optional[date] = None
+    ) -> Dict[Tuple[Optional[int], Optional[int]], Optional[CommissionRule]]:
+        """Règle applicable pour chaque couple (producteur, catégorie) distinct"""
+        on_date = on_date or date.today()
+        resolved = {}
+        for pair in pairs:
+            if pair not in resolved:
+                resolved[pair] = self.resolve(pair[0], pair[1], on_date)
+        return resolved
+
+
+class TaxRuleSet:
+    """Taux de TVA actifs, indexés par (pays, catégorie)"""
+
+    def __init__(self, rules: Iterable[TaxRule]):
+        self._index = _RuleIndex(rules, lambda rule: (rule.country, rule.category_id))
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @classmethod
+    def load(cls, db: Session) -> "TaxRuleSet":
+        """Charge en une requête tous les taux actifs, toutes périodes confondues"""
+        tax_rates = db.query(TaxRate).filter(TaxRate.is_active).order_by(TaxRate.id).all()
+        return cls(TaxRule.from_model(tax_rate) for tax_rate in tax_rates)
+
+    def resolve(
+        self,
+        country: str,
+        category_id: Optional[int] = None,
+        on_date: Optional[date] = None
+    ) -> Optional[TaxRule]:
+        """
+        Taux applicable à `on_date` (défaut : aujourd'hui) : taux du pays pour
+        la catégorie, sinon taux par défaut du pays.
+        """
+        country = country.upper()
+        keys = [(country, category_id), (country, None)] if category_id else [(country, None)]
+        return self._index.first(keys, on_date or date.today())
+
+    def resolve_many(
+        self,
+        pairs: Iterable[Tuple[str, Optional[int]]],
+        on_date: Optional[date] = None
+    ) -> Dict[Tuple[str, Optional[int]], Optional[TaxRule]]:
+        """Taux applicable pour chaque couple (pays, catégorie) distinct"""
+        on_date = on_date or date.today()
+        resolved = {}
+        for pair in pairs:
+            if pair not in resolved:
+                resolved[pair] = self.resolve(pair[0], pair[1], on_date)
+        return resolved
+
+
+class RuleCache:
+    """Index de règles du processus, rechargés après invalidation ou expiration"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[str, Tuple[float, object]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def commissions(self, db: Session) -> CommissionRuleSet:
+        return self._get("commissions", CommissionRuleSet.load, db)
+
+    def tax_rates(self, db: Session) -> TaxRuleSet:
+        return self._get("tax_rates", TaxRuleSet.load, db)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def _get(self, name: str, loader: Callable, db: Session):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+            generation = self._generation
+        rules = loader(db)
+        with self._lock:
+            # Une invalidation pendant le chargement rend ce résultat obsolète
+            if generation == self._generation:
+                self._entries[name] = (now + self.ttl, rules)
+        return rules
+
+
+_rule_cache = RuleCache(settings.RULE_CACHE_TTL)
+
+
+def get_rule_cache() -> RuleCache:
+    return _rule_cache
+
+
+def invalidate_rules() -> None:
+    """Vide les index de commissions et de TVA du processus"""
+    _rule_cache.invalidate()
+
+
+# ============= Invalidation automatique =============
+
+_PENDING_KEY = "rule_cache_invalidation"
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_rule_changes(session: Session, flush_context, instances) -> None:
+    if any(isinstance(obj, (Commission, TaxRate))
+           for changed in (session.new, session.dirty, session.deleted) for obj in changed):
+        session.info[_PENDING_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    if session.info.pop(_PENDING_KEY, False):
+        invalidate_rules()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_on_rollback(session: Session, previous_transaction) -> None:
+    session.info.pop(_PENDING_KEY, None)
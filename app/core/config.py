@@ -3,6 +3,17 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
+    # Pool du moteur asynchrone (asyncpg) des routes de lecture
+    ASYNC_DB_POOL_SIZE: int = 20
+    ASYNC_DB_MAX_OVERFLOW: int = 30
+    # Réplicas en lecture (URLs séparées par des virgules, vide = primaire seul)
+    DATABASE_REPLICA_URLS: str = ""
+    DATABASE_REPLICA_HEALTH_CHECK_INTERVAL: int = 30  # secondes
+    DATABASE_REPLICA_CONNECT_TIMEOUT: int = 3  # secondes
+    # Instrumentation SQL : /metrics (Prometheus) et journal des requêtes lentes
+    METRICS_ENABLED: bool = True
+    SLOW_QUERY_THRESHOLD_MS: float = 0  # 0 = journal désactivé
+    SLOW_QUERY_EXPLAIN: bool = True  # joindre le plan EXPLAIN des SELECT lents
     
     # Security
     # Cette valeur sera écrasée par celle du .env si elle existe
@@ -11,6 +22,28 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
     API_V1_PREFIX: str = "/api/v1"
+    # Cache des principaux authentifiés (memory, redis ou none)
+    PRINCIPAL_CACHE_BACKEND: str = "memory"
+    PRINCIPAL_CACHE_TTL: int = 60  # secondes
+    PRINCIPAL_CACHE_MAXSIZE: int = 10000
+    REDIS_URL: str = ""
+    # Index en mémoire des commissions et taux de TVA (rechargés après modification)
+    RULE_CACHE_TTL: int = 300  # secondes, délai max de propagation aux autres workers
+    # Paramètres système en mémoire : vérification du compteur de version
+    SETTINGS_CACHE_POLL_INTERVAL: float = 5.0  # secondes
+    # Corps des réponses publiques en cache (LRU par ETag), 0 = désactivé
+    HTTP_RESPONSE_CACHE_MAX_BYTES: int = 16 * 1024 * 1024
+    # Ingestion différée des vues produit (POST /analytics/views/track)
+    VIEW_BUFFER_MAX_SIZE: int = 50000  # au-delà, les vues sont rejetées (503)
+    VIEW_BUFFER_BATCH_SIZE: int = 1000  # vues par INSERT
+    VIEW_BUFFER_FLUSH_INTERVAL: float = 1.0  # secondes
+    PRODUCT_VIEW_COMPACTION_INTERVAL: int = 300  # secondes, 0 = job externe uniquement
+    # Images produit : taille max d'un upload et pool de rendu des déclinaisons
+    PRODUCT_IMAGE_MAX_BYTES: int = 10 * 1024 * 1024
+    IMAGE_WORKERS: int = 2  # processus, 0 = rendu dans le thread de la requête
+    # Import de catalogue en flux (POST /products/catalog/import)
+    CATALOG_IMPORT_CHUNK_SIZE: int = 500  # lignes par transaction
+    CATALOG_IMPORT_MAX_ERRORS: int = 1000  # erreurs détaillées dans le rapport
 
     # App
     APP_NAME: str = "Marketplace Agricole"
@@ -1,7 +1,20 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, DeclarativeBase
+from sqlalchemy.sql import CompoundSelect, Select
+from typing import List, Optional
 from app.core.config import settings
+from app.core.metrics import TimedAsyncAdaptedQueuePool, TimedQueuePool, instrument_engine
+import asyncio
+import itertools
+import logging
 import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
 
 # Désactiver echo pendant les tests
 is_testing = os.getenv("PYTEST_CURRENT_TEST") is not None
@@ -16,7 +29,8 @@ if "postgresql" in settings.DATABASE_URL:
         pool_size=10,
         max_overflow=20,
         pool_recycle=3600,  # Recycler les connexions après 1 heure
-        pool_timeout=30
+        pool_timeout=30,
+        poolclass=TimedQueuePool  # QueuePool mesurant l'attente de connexion
     )
 else:
     # Configuration pour SQLite (tests)
@@ -27,9 +41,205 @@ else:
         connect_args={"check_same_thread": False}
     )
 
+# Mesures SQL par requête HTTP (/metrics, journal des requêtes lentes)
+instrument_engine(engine)
+
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+# ============= Réplicas en lecture =============
+
+class ReplicaPool:
+    """
+    Réplicas en lecture servis à tour de rôle (round-robin).
+
+    Chaque réplica est vérifié par un `SELECT 1` au plus une fois par
+    `health_check_interval` secondes ; un réplica injoignable est écarté
+    jusqu'à la vérification suivante. `next_engine()` retourne None si aucun
+    réplica n'est disponible : l'appelant se replie alors sur le primaire.
+    """
+
+    def __init__(self, engines: List[Engine], health_check_interval: float = 30.0):
+        self.engines = list(engines)
+        self.health_check_interval = health_check_interval
+        self._healthy = {id(e): True for e in self.engines}
+        self._checked_at = {id(e): float("-inf") for e in self.engines}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        for replica_engine in self.engines:
+            event.listen(replica_engine, "handle_error", self._on_error)
+
+    def __len__(self) -> int:
+        return len(self.engines)
+
+    def next_engine(self) -> Optional[Engine]:
+        """Réplica suivant en bonne santé, ou None"""
+        for _ in range(len(self.engines)):
+            with self._lock:
+                replica_engine = self.engines[next(self._counter) % len(self.engines)]
+            if self.is_healthy(replica_engine):
+                return replica_engine
+        return None
+
+    def is_healthy(self, replica_engine: Engine) -> bool:
+        key = id(replica_engine)
+        now = time.monotonic()
+        if now - self._checked_at[key] >= self.health_check_interval:
+            self._checked_at[key] = now
+            self._healthy[key] = self._ping(replica_engine)
+        return self._healthy[key]
+
+    def mark_unhealthy(self, replica_engine: Engine) -> None:
+        key = id(replica_engine)
+        if self._healthy.get(key):
+            logger.warning("Réplica %s indisponible, repli sur le primaire", replica_engine.url.render_as_string())
+        self._healthy[key] = False
+        self._checked_at[key] = time.monotonic()
+
+    @staticmethod
+    def _ping(replica_engine: Engine) -> bool:
+        try:
+            with replica_engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            return True
+        # asyncpg (sync_engine des réplicas async) lève OSError / TimeoutError
+        # sans enveloppe DBAPIError lorsque le réplica est injoignable
+        except (DBAPIError, OSError, asyncio.TimeoutError) as exc:
+            logger.warning("Échec du health check du réplica %s : %s", replica_engine.url.render_as_string(), exc)
+            return False
+
+    def _on_error(self, context) -> None:
+        # Connexion perdue ou impossible : écarter le réplica jusqu'au prochain health check
+        if context.is_disconnect or context.connection is None:
+            self.mark_unhealthy(context.engine)
+
+
+class RoutingSession(Session):
+    """
+    Session qui envoie les SELECT vers un réplica et le reste vers le primaire.
+
+    - Les écritures (flush, INSERT/UPDATE/DELETE, SELECT ... FOR UPDATE, SQL
+      textuel) vont au primaire ; dès qu'une écriture a lieu, toutes les
+      lectures suivantes de la transaction restent sur le primaire.
+    - Un même réplica est utilisé pendant toute une transaction.
+    - Sans réplica configuré ou disponible, tout va au primaire (`bind`).
+    """
+
+    def __init__(self, *args, replicas: Optional[ReplicaPool] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+        self._primary_only = False
+        self._replica_bind = None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.replicas and not self._primary_only:
+            if self._flushing or not _is_read_only_statement(clause):
+                self._primary_only = True
+            else:
+                if self._replica_bind is None:
+                    self._replica_bind = self.replicas.next_engine()
+                if self._replica_bind is not None:
+                    return self._replica_bind
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+def _is_read_only_statement(clause) -> bool:
+    """SELECT sans verrou : seul cas routable vers un réplica"""
+    return isinstance(clause, (Select, CompoundSelect)) and clause._for_update_arg is None
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _reset_routing(session: RoutingSession, transaction) -> None:
+    # Fin de la transaction principale : la suivante pourra relire sur un réplica
+    if transaction.parent is None:
+        session._primary_only = False
+        session._replica_bind = None
+
+
+def parse_replica_urls(value: str) -> List[str]:
+    """DATABASE_REPLICA_URLS : URLs séparées par des virgules"""
+    return [url.strip() for url in value.split(",") if url.strip()]
+
+
+def _create_replica_engine(url: str) -> Engine:
+    options = {"pool_pre_ping": True, "echo": settings.DEBUG and not is_testing}
+    if url.startswith("postgresql"):
+        options.update(pool_size=10, max_overflow=20, pool_recycle=3600, pool_timeout=30,
+                       poolclass=TimedQueuePool,
+                       connect_args={"connect_timeout": settings.DATABASE_REPLICA_CONNECT_TIMEOUT})
+    return instrument_engine(create_engine(url, **options))
+
+
+replica_pool = ReplicaPool(
+    [_create_replica_engine(url) for url in parse_replica_urls(settings.DATABASE_REPLICA_URLS)],
+    health_check_interval=settings.DATABASE_REPLICA_HEALTH_CHECK_INTERVAL
+)
+
+# Sessions des dépendances en lecture seule (catalogue, analytics, avis, CMS)
+ReadSessionLocal = sessionmaker(
+    class_=RoutingSession, autocommit=False, autoflush=False, bind=engine, replicas=replica_pool
+)
+
+
+def get_async_database_url(database_url: str) -> str:
+    """Convertit l'URL PostgreSQL synchrone (psycopg2) en URL asyncpg"""
+    return make_url(database_url).set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+
+
+# Moteur asynchrone (asyncpg) pour les routes de lecture à forte concurrence.
+# Les services d'écriture restent sur le moteur synchrone pendant la migration.
+if "postgresql" in settings.DATABASE_URL:
+    async_engine = create_async_engine(
+        get_async_database_url(settings.DATABASE_URL),
+        pool_pre_ping=True,
+        echo=settings.DEBUG and not is_testing,
+        pool_size=settings.ASYNC_DB_POOL_SIZE,
+        max_overflow=settings.ASYNC_DB_MAX_OVERFLOW,
+        pool_recycle=3600,
+        pool_timeout=30,
+        poolclass=TimedAsyncAdaptedQueuePool
+    )
+    instrument_engine(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        class_=AsyncSession,
+        autoflush=False,
+        expire_on_commit=False
+    )
+
+    # Réplicas asyncpg : même routage, sur les sync_engine des moteurs async
+    async_replica_pool = ReplicaPool(
+        [
+            instrument_engine(create_async_engine(
+                get_async_database_url(url),
+                pool_pre_ping=True,
+                pool_size=settings.ASYNC_DB_POOL_SIZE,
+                max_overflow=settings.ASYNC_DB_MAX_OVERFLOW,
+                pool_recycle=3600,
+                pool_timeout=30,
+                poolclass=TimedAsyncAdaptedQueuePool,
+                connect_args={"timeout": settings.DATABASE_REPLICA_CONNECT_TIMEOUT}
+            ).sync_engine)
+            for url in parse_replica_urls(settings.DATABASE_REPLICA_URLS)
+            if url.startswith("postgresql")
+        ],
+        health_check_interval=settings.DATABASE_REPLICA_HEALTH_CHECK_INTERVAL
+    )
+    AsyncReadSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        autoflush=False,
+        expire_on_commit=False,
+        replicas=async_replica_pool
+    )
+else:
+    # asyncpg est propre à PostgreSQL : pas de chemin asynchrone pour SQLite
+    async_engine = None
+    AsyncSessionLocal = None
+    AsyncReadSessionLocal = None
+
 # Nouvelle syntaxe SQLAlchemy 2.0 pour la Base
 class Base(DeclarativeBase):
     """Classe de base pour tous les modèles de l'application"""
@@ -41,4 +251,41 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def get_read_db():
+    """
+    Dépendance pour les routes de lecture : SELECT servis par les réplicas
+    (DATABASE_REPLICA_URLS), écritures éventuelles sur le primaire.
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    """
+    Dépendance asynchrone : fournit une AsyncSession (asyncpg).
+
+    Les routes portées en async réutilisent les services synchrones via
+    `await db.run_sync(...)` : le code ORM s'exécute sur la connexion asyncpg
+    sans occuper le threadpool de Starlette. Les objets ORM doivent être
+    convertis en schémas Pydantic à l'intérieur de run_sync (pas de lazy
+    loading possible en dehors).
+    """
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Le moteur asynchrone nécessite une base PostgreSQL")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+
+async def get_async_read_db():
+    """Version asynchrone de get_read_db (réplicas asyncpg, repli sur le primaire)"""
+    if AsyncReadSessionLocal is None:
+        raise RuntimeError("Le moteur asynchrone nécessite une base PostgreSQL")
+    async with AsyncReadSessionLocal() as db:
+        yield db
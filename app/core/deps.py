@@ -1,11 +1,13 @@
+import time
 from app.core.database import SessionLocal
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from typing import Optional
-from app.models.auth import User
+from app.core.config import settings
+from app.core.principal_cache import Principal, get_principal_cache, token_fingerprint
 from app.core.security import decode_token
-from app.services.auth_service import AuthService
+from app.repositories.auth_repository import UserRepository
 
 security = HTTPBearer()
 security_optional = HTTPBearer(auto_error=False)
@@ -18,13 +20,15 @@ def get_db():
     finally:
         db.close()
 
-async def get_current_user(
-    auth: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Récupère l'utilisateur actuel à partir du token"""
-    token = auth.credentials
-    
+def resolve_principal(token: str, db: Session) -> Principal:
+    """
+    Résout un token d'accès en principal authentifié.
+
+    Le principal (compte actif, bannissement, rôles, profil producteur) est
+    mis en cache par (user_id, empreinte du token) pour au plus
+    PRINCIPAL_CACHE_TTL secondes et jamais au-delà de l'expiration du token ;
+    seule la première requête d'une session touche la base.
+    """
     # Décoder le token
     payload = decode_token(token)
     
@@ -44,33 +48,63 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Récupérer l'utilisateur via le service pour rester cohérent
-    user_id = payload.get("sub")
-    auth_service = AuthService(db)
-    user = auth_service.user_repo.get_by_id(user_id)
-    
-    if not user:
+    try:
+        user_id = int(payload.get("sub"))
+    except (TypeError, ValueError):
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Utilisateur non trouvé"
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token d'accès invalide - utilisateur manquant",
+            headers={"WWW-Authenticate": "Bearer"},
         )
     
-    if not user.is_active:
+    cache = get_principal_cache()
+    fingerprint = token_fingerprint(token)
+    principal = cache.get(user_id, fingerprint)
+    
+    if principal is None:
+        principal = UserRepository(db).get_principal(user_id)
+        
+        if not principal:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Utilisateur non trouvé"
+            )
+        
+        ttl = settings.PRINCIPAL_CACHE_TTL
+        if payload.get("exp"):
+            ttl = min(ttl, payload["exp"] - time.time())
+        if ttl > 0:
+            cache.set(principal, fingerprint, ttl)
+    
+    if not principal.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Compte désactivé"
         )
     
-    return user
+    if principal.is_banned:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Compte banni"
+        )
+    
+    return principal
+
+async def get_current_user(
+    auth: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> Principal:
+    """Récupère l'utilisateur actuel à partir du token"""
+    return resolve_principal(auth.credentials, db)
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+def get_current_active_user(current_user: Principal = Depends(get_current_user)) -> Principal:
     """Récupère l'utilisateur actuel actif"""
     return current_user
 
 async def get_current_user_optional(
     auth: Optional[HTTPAuthorizationCredentials] = Depends(security_optional),
     db: Session = Depends(get_db)
-) -> Optional[User]:
+) -> Optional[Principal]:
     """Récupère l'utilisateur actuel s'il est authentifié, sinon None"""
     if not auth:
         return None
@@ -79,7 +113,7 @@ async def get_current_user_optional(
     except HTTPException:
         return None
 
-def require_admin(current_user: User = Depends(get_current_active_user)) -> User:
+def require_admin(current_user: Principal = Depends(get_current_active_user)) -> Principal:
     """Vérifie que l'utilisateur est un administrateur"""
     if not current_user.has_role("admin") and not current_user.has_role("superadmin"):
         raise HTTPException(
@@ -88,7 +122,7 @@ def require_admin(current_user: User = Depends(get_current_active_user)) -> User
         )
     return current_user
 
-def require_producer(current_user: User = Depends(get_current_active_user)) -> User:
+def require_producer(current_user: Principal = Depends(get_current_active_user)) -> Principal:
     """Vérifie que l'utilisateur est un producteur"""
     # Support case-insensitive role checking
     user_roles = [role.name.lower() for role in current_user.roles]
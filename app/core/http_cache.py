@@ -0,0 +1,185 @@
+"""
+Cache HTTP des routes publiques (ETag, If-None-Match, Cache-Control).
+
+Les routes qui servent une représentation identifiable par une empreinte
+posent l'en-tête `ETag` ; un client qui renvoie cette empreinte dans
+`If-None-Match` reçoit un 304 sans corps.
+
+Pour le catalogue public, `cached_json_response` calcule un ETag fort à
+partir de l'URL et d'un marqueur de version peu coûteux, avant tout
+chargement ORM :
+- `table_versions(...)` : compteurs de `cache_versions`, incrémentés dans
+  la transaction de tout flush qui crée, modifie ou supprime une ligne
+  d'une table suivie (VERSIONED_TABLES) ;
+- un marqueur par ligne (ex. `updated_at` d'un profil producteur).
+
+Si l'ETag correspond, la route répond 304 ; sinon le corps JSON est servi
+depuis un cache LRU du processus borné en octets
+(HTTP_RESPONSE_CACHE_MAX_BYTES), ou calculé puis mis en cache. Les écritures
+par requête SQL directe (`query.update()`, scripts) ne passent pas par le
+flush et n'incrémentent pas les compteurs.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from fastapi import Request, Response, status
+from pydantic_core import to_json
+from sqlalchemy import event, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.admin import CacheVersion
+
+# Tables dont les écritures ORM incrémentent un compteur de version
+VERSIONED_TABLES = frozenset({"categories", "tags", "units", "pages", "testimonials"})
+
+# Politiques Cache-Control des routes publiques
+CATALOG_CACHE_CONTROL = "public, max-age=60, stale-while-revalidate=300"
+CONTENT_CACHE_CONTROL = "public, max-age=60, stale-while-revalidate=600"
+PROFILE_CACHE_CONTROL = "public, max-age=30, stale-while-revalidate=120"
+
+
+def compute_etag(payload: Any) -> str:
+    """ETag fort d'une représentation sérialisable en JSON"""
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return '"' + hashlib.sha256(body.encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Vrai si `If-None-Match` contient `etag` (comparaison faible, `*` accepté)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or any(
+        candidate.removeprefix("W/") == etag for candidate in candidates
+    )
+
+
+def not_modified(etag: str, cache_control: str = "no-cache") -> Response:
+    """Réponse 304 reprenant les en-têtes de validation"""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": cache_control}
+    )
+
+
+class ResponseCache:
+    """Corps de réponses indexés par ETag, LRU borné en octets"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, etag: str) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(etag)
+            if body is not None:
+                self._entries.move_to_end(etag)
+            return body
+
+    def set(self, etag: str, body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(etag, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[etag] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+_response_cache = ResponseCache(settings.HTTP_RESPONSE_CACHE_MAX_BYTES)
+
+
+def get_response_cache() -> ResponseCache:
+    return _response_cache
+
+
+def table_versions(*tables: str) -> Callable[[Session], Dict[str, int]]:
+    """Marqueur de version : compteurs des tables (une requête sur clé primaire)"""
+    unknown = set(tables) - VERSIONED_TABLES
+    if unknown:
+        raise ValueError(f"Tables sans compteur de version : {sorted(unknown)}")
+
+    def read(session: Session) -> Dict[str, int]:
+        rows = session.execute(
+            select(CacheVersion.name, CacheVersion.version).where(CacheVersion.name.in_(tables))
+        ).all()
+        versions = dict.fromkeys(tables, 0)
+        versions.update({name: version for name, version in rows})
+        return versions
+
+    return read
+
+
+def cached_json_response(
+    request: Request,
+    session: Session,
+    version: Callable[[Session], Any],
+    load: Callable[[Session], Any],
+    cache_control: str = CATALOG_CACHE_CONTROL
+) -> Response:
+    """
+    Sert `load(session)` en JSON avec ETag et Cache-Control.
+
+    L'ETag dépend du chemin, des paramètres de requête et de
+    `version(session)` : un 304 ne coûte que la lecture du marqueur.
+    """
+    marker = version(session)
+    etag = compute_etag([request.url.path, sorted(request.query_params.multi_items()), marker])
+    if etag_matches(request, etag):
+        return not_modified(etag, cache_control)
+    cache = get_response_cache()
+    body = cache.get(etag)
+    if body is None:
+        body = to_json(load(session))
+        cache.set(etag, body)
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": cache_control}
+    )
+
+
+# ============= Compteurs de version =============
+
+def _changed_tables(session: Session) -> Iterable[str]:
+    tables = set()
+    for obj in (*session.new, *session.deleted):
+        tables.add(type(obj).__table__.name)
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            tables.add(type(obj).__table__.name)
+    return sorted(tables & VERSIONED_TABLES)
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_table_versions(session: Session, flush_context) -> None:
+    tables = _changed_tables(session)
+    if not tables:
+        return
+    statement = pg_insert(CacheVersion).values(
+        [{"name": table, "version": 1} for table in tables]
+    ).on_conflict_do_update(
+        index_elements=[CacheVersion.name],
+        set_={"version": CacheVersion.version + 1, "updated_at": func.now()}
+    )
+    session.connection().execute(statement)
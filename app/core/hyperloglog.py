@@ -0,0 +1,144 @@
+"""
+HyperLogLog : estimation du nombre d'éléments distincts en mémoire constante.
+
+Chaque sketch compte m = 2**precision registres d'un octet. Un élément est
+haché sur 64 bits : les `precision` bits de poids faible choisissent le
+registre, qui retient le rang maximal (position du premier bit à 1) des bits
+restants. Deux sketches de même précision se fusionnent par maximum
+registre à registre : l'union de jours quelconques se calcule donc sans
+revenir aux vues brutes.
+
+Borne d'erreur : l'erreur type relative vaut 1,04 / sqrt(m), soit 1,63 %
+pour la précision par défaut (12, 4096 registres). Environ 95 % des
+estimations tombent à ±3,25 % du compte exact. L'estimateur d'Ertl garde
+cette borne sur toute la plage de cardinalités ; pour quelques centaines
+d'éléments, l'estimation est quasi exacte.
+
+Sérialisation : registres compressés (zlib), quelques dizaines d'octets pour
+un jour peu fréquenté et au plus ~4 Ko pour un sketch plein.
+"""
+import hashlib
+import math
+import zlib
+from functools import lru_cache
+from typing import Iterable, Optional
+
+DEFAULT_PRECISION = 12
+
+
+def hash_value(value: str) -> int:
+    """Empreinte 64 bits stable d'une valeur (indépendante du processus)"""
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "little")
+
+
+@lru_cache(maxsize=None)
+def _high_bits(size: int) -> int:
+    """Entier dont chaque octet vaut 0x80 (size octets)"""
+    return int.from_bytes(b"\x80" * size, "little")
+
+
+def _sigma(x: float) -> float:
+    if x == 1:
+        return math.inf
+    y, z = 1.0, x
+    while True:
+        x *= x
+        previous = z
+        z += x * y
+        y += y
+        if z == previous:
+            return z
+
+
+def _tau(x: float) -> float:
+    if x == 0 or x == 1:
+        return 0.0
+    y, z = 1.0, 1 - x
+    while True:
+        x = math.sqrt(x)
+        previous = z
+        y *= 0.5
+        z -= (1 - x) ** 2 * y
+        if z == previous:
+            return z / 3
+
+
+class HyperLogLog:
+    """Sketch HyperLogLog fusionnable"""
+
+    def __init__(self, precision: int = DEFAULT_PRECISION, registers: Optional[bytearray] = None):
+        if not 4 <= precision <= 16:
+            raise ValueError("La précision doit être comprise entre 4 et 16")
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = registers if registers is not None else bytearray(self.size)
+        if len(self.registers) != self.size:
+            raise ValueError("Nombre de registres incompatible avec la précision")
+
+    @property
+    def standard_error(self) -> float:
+        """Erreur type relative de l'estimation (1,04 / sqrt(m))"""
+        return 1.04 / math.sqrt(self.size)
+
+    def add(self, value: str) -> None:
+        self.add_hash(hash_value(value))
+
+    def add_hash(self, hashed: int) -> None:
+        index = hashed & (self.size - 1)
+        remaining = hashed >> self.precision
+        width = 64 - self.precision
+        rank = width - remaining.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values: Iterable[str]) -> "HyperLogLog":
+        for value in values:
+            self.add(value)
+        return self
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """
+        Union en place (maximum registre à registre).
+
+        Les registres (< 128) sont traités comme des octets d'un grand entier :
+        un seul calcul SWAR remplace une boucle Python sur m registres.
+        """
+        if other.precision != self.precision:
+            raise ValueError("Impossible de fusionner des sketches de précisions différentes")
+        high_bits = _high_bits(self.size)
+        mine = int.from_bytes(self.registers, "little")
+        theirs = int.from_bytes(other.registers, "little")
+        # 1 dans le bit de poids faible de chaque octet où mine >= theirs
+        mine_wins = (((mine | high_bits) - theirs) & high_bits) >> 7
+        mask = (mine_wins << 8) - mine_wins
+        merged = (mine & mask) | (theirs & ~mask)
+        self.registers = bytearray(merged.to_bytes(self.size, "little"))
+        return self
+
+    def cardinality(self) -> float:
+        """
+        Estimation du nombre d'éléments distincts.
+
+        Estimateur amélioré d'Ertl (2017) : calculé sur l'histogramme des
+        registres, sans biais sur toute la plage (pas de bascule vers le
+        comptage linéaire ni de table de correction empirique).
+        """
+        m = self.size
+        q = 64 - self.precision
+        registers = bytes(self.registers)
+        counts = [registers.count(value) for value in range(q + 2)]
+        z = m * _tau(1 - counts[q + 1] / m)
+        for k in range(q, 0, -1):
+            z = 0.5 * (z + counts[k])
+        z += m * _sigma(counts[0] / m)
+        return m * m / (2 * math.log(2) * z)
+
+    def __len__(self) -> int:
+        return int(round(self.cardinality()))
+
+    def to_bytes(self) -> bytes:
+        return bytes([self.precision]) + zlib.compress(bytes(self.registers))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        return cls(data[0], bytearray(zlib.decompress(data[1:])))
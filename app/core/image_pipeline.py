@@ -0,0 +1,189 @@
+"""
+Pipeline d'ingestion des images produit.
+
+1. `stream_to_file` copie le fichier reçu sur disque par blocs de CHUNK_SIZE
+   en calculant son SHA-256 au fil de l'eau ; au-delà de `max_bytes`, l'écriture
+   s'arrête et le fichier partiel est supprimé (ImageTooLarge). Le corps HTTP
+   lui-même est borné avant l'analyse multipart (app.core.upload_limits).
+2. Le condensat donne le répertoire de stockage (adressage par contenu) :
+   une image déjà reçue n'est ni réécrite ni retraitée.
+3. `generate_renditions` décode l'image et produit les déclinaisons
+   (RENDITIONS : thumb, card, full) en WebP et en JPEG, dans un pool de
+   processus (IMAGE_WORKERS) : le décodage et le redimensionnement, coûteux
+   en CPU, ne bloquent pas le GIL du serveur, et la route attend le résultat
+   sans occuper de thread.
+
+Chaque répertoire contient l'original, les déclinaisons et `manifest.json`,
+écrit en dernier : sa présence signifie que le traitement est complet.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Optional
+from uuid import uuid4
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from app.core.config import settings
+
+CHUNK_SIZE = 1024 * 1024
+MANIFEST_NAME = "manifest.json"
+
+# Déclinaisons : plus grand côté en pixels (jamais d'agrandissement)
+RENDITIONS = {"thumb": 200, "card": 600, "full": 1600}
+
+# Formats de sortie : extension et options d'encodage Pillow
+RENDITION_FORMATS = {
+    "webp": (".webp", "WEBP", {"quality": 80, "method": 4}),
+    "jpeg": (".jpg", "JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+# Formats acceptés en entrée (format détecté par Pillow -> extension de l'original)
+ACCEPTED_FORMATS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp", "GIF": ".gif", "MPO": ".jpg"}
+
+
+class ImageTooLarge(Exception):
+    """Upload plus volumineux que la limite autorisée"""
+
+
+class InvalidImage(Exception):
+    """Contenu illisible ou format non pris en charge"""
+
+
+@dataclass(frozen=True)
+class StoredUpload:
+    """Fichier reçu : chemin temporaire, SHA-256 et taille en octets"""
+    path: Path
+    digest: str
+    size: int
+
+
+def stream_to_file(source: BinaryIO, target: Path, max_bytes: int,
+                   chunk_size: int = CHUNK_SIZE) -> StoredUpload:
+    """Copie `source` dans `target` par blocs, en hachant et en bornant la taille"""
+    digest = hashlib.sha256()
+    size = 0
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        with target.open("wb") as output:
+            while chunk := source.read(chunk_size):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise ImageTooLarge(f"Image supérieure à {max_bytes} octets")
+                digest.update(chunk)
+                output.write(chunk)
+    except BaseException:
+        target.unlink(missing_ok=True)
+        raise
+    return StoredUpload(path=target, digest=digest.hexdigest(), size=size)
+
+
+def read_manifest(directory: Path) -> Optional[Dict[str, Any]]:
+    """Manifeste d'une image déjà traitée (None si absent ou incomplet)"""
+    try:
+        return json.loads((directory / MANIFEST_NAME).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _write_atomic(path: Path, write) -> None:
+    # Nom unique par appel : avec IMAGE_WORKERS = 0, plusieurs threads d'un même
+    # processus peuvent rendre le même contenu en parallèle
+    temporary = path.with_name(f".{path.name}.{os.getpid()}.{uuid4().hex}.tmp")
+    try:
+        write(temporary)
+        os.replace(temporary, path)
+    finally:
+        temporary.unlink(missing_ok=True)
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """RVB sans transparence (fond blanc), requis par JPEG"""
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        rgba = image.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def render_renditions(source: str, directory: str) -> Dict[str, Any]:
+    """
+    Décode `source`, écrit les déclinaisons dans `directory` puis y range
+    l'original ; retourne le manifeste. Exécuté dans un processus du pool.
+    """
+    target = Path(directory)
+    try:
+        with Image.open(source) as opened:
+            image_format = opened.format
+            if image_format not in ACCEPTED_FORMATS:
+                raise InvalidImage(f"Format d'image non pris en charge : {image_format}")
+            opened.load()
+            # Photos de téléphone : appliquer l'orientation EXIF avant de redimensionner
+            image = _flatten(ImageOps.exif_transpose(opened))
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as exc:
+        raise InvalidImage(f"Image illisible : {exc}") from exc
+
+    target.mkdir(parents=True, exist_ok=True)
+    renditions = {}
+    for name, edge in RENDITIONS.items():
+        rendition = image.copy()
+        rendition.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        files = {}
+        for key, (extension, pillow_format, options) in RENDITION_FORMATS.items():
+            filename = f"{name}{extension}"
+            _write_atomic(target / filename,
+                          lambda path: rendition.save(path, pillow_format, **options))
+            files[key] = filename
+        renditions[name] = {"width": rendition.width, "height": rendition.height, **files}
+
+    original = f"original{ACCEPTED_FORMATS[image_format]}"
+    os.replace(source, target / original)
+    manifest = {
+        "width": image.width,
+        "height": image.height,
+        "format": image_format,
+        "original": original,
+        "renditions": renditions,
+    }
+    _write_atomic(target / MANIFEST_NAME, lambda path: path.write_text(json.dumps(manifest)))
+    return manifest
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_image_pool() -> ProcessPoolExecutor:
+    """Pool de processus du rendu des déclinaisons (créé au premier usage)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS)
+        return _pool
+
+
+def shutdown_image_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+async def generate_renditions(source: Path, directory: Path) -> Dict[str, Any]:
+    """
+    Produit les déclinaisons de `source` dans `directory` et retourne le
+    manifeste. Le rendu est attendu sans bloquer la boucle d'événements ni un
+    thread du serveur ; avec IMAGE_WORKERS = 0, il se fait dans un thread.
+    """
+    # Chemins absolus : le répertoire courant des processus du pool peut différer
+    source, directory = str(source.resolve()), str(directory.resolve())
+    if settings.IMAGE_WORKERS <= 0:
+        return await asyncio.to_thread(render_renditions, source, directory)
+    return await asyncio.wrap_future(get_image_pool().submit(render_renditions, source, directory))
@@ -0,0 +1,311 @@
+"""
+Instrumentation des requêtes HTTP et SQL, exposée au format Prometheus.
+
+- `metrics_middleware` (app/main.py) mesure chaque requête HTTP et agrège,
+  par route (gabarit de chemin, ex. /products/{product_id}) : latence, nombre
+  de requêtes SQL, temps total passé en base et attente de connexion au pool.
+- `instrument_engine` branche les hooks `before_cursor_execute` /
+  `after_cursor_execute` sur un moteur SQLAlchemy ; les mesures sont
+  rattachées à la requête HTTP courante via une ContextVar.
+- `TimedQueuePool` / `TimedAsyncAdaptedQueuePool` mesurent l'attente d'une
+  connexion libre dans le pool.
+- Journal des requêtes lentes (SLOW_QUERY_THRESHOLD_MS > 0) : chaque SELECT
+  dépassant le seuil est journalisé avec son plan `EXPLAIN`.
+"""
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import settings
+
+slow_query_logger = logging.getLogger("app.slow_query")
+
+# Type MIME du format texte Prometheus
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+# ============= Primitives Prometheus =============
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Compteur Prometheus (monotone) avec étiquettes"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            yield f"{self.name}{_format_labels(self.label_names, label_values)} {_format_number(value)}"
+
+
+class Histogram:
+    """Histogramme Prometheus (buckets cumulés, somme et nombre d'observations)"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            # [compteurs par bucket..., somme, nombre]
+            series = self._series.setdefault(label_values, [0.0] * (len(self.buckets) + 2))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, *label_values: str) -> float:
+        series = self._series.get(label_values)
+        return series[-1] if series else 0
+
+    def sum(self, *label_values: str) -> float:
+        series = self._series.get(label_values)
+        return series[-2] if series else 0.0
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        names = self.label_names + ("le",)
+        for label_values, series in items:
+            for index, bound in enumerate(self.buckets):
+                labels = _format_labels(names, label_values + (_format_number(bound),))
+                yield f"{self.name}_bucket{labels} {_format_number(series[index])}"
+            labels = _format_labels(self.label_names, label_values)
+            yield f"{self.name}_sum{labels} {_format_number(series[-2])}"
+            yield f"{self.name}_count{labels} {_format_number(series[-1])}"
+
+
+class MetricsRegistry:
+    """Ensemble des métriques exposées sur /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests_total = registry.register(Counter(
+    "http_requests_total", "Requêtes HTTP traitées", ("method", "route", "status")
+))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "Latence des requêtes HTTP", ("method", "route")
+))
+db_queries_per_request = registry.register(Histogram(
+    "db_queries_per_request", "Requêtes SQL émises par requête HTTP", ("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS
+))
+db_time_per_request_seconds = registry.register(Histogram(
+    "db_time_per_request_seconds", "Temps passé en base par requête HTTP", ("method", "route")
+))
+db_pool_wait_per_request_seconds = registry.register(Histogram(
+    "db_pool_wait_per_request_seconds", "Attente de connexion au pool par requête HTTP", ("method", "route")
+))
+db_queries_total = registry.register(Counter(
+    "db_queries_total", "Requêtes SQL exécutées (toutes origines)"
+))
+db_slow_queries_total = registry.register(Counter(
+    "db_slow_queries_total", "Requêtes SQL au-delà de SLOW_QUERY_THRESHOLD_MS"
+))
+product_view_events_total = registry.register(Counter(
+    "product_view_events_total",
+    "Vues produit ingérées par issue (accepted, dropped, written, rejected, failed)",
+    ("outcome",)
+))
+
+
+# ============= Mesures par requête HTTP =============
+
+@dataclass
+class RequestStats:
+    """Mesures SQL accumulées pendant une requête HTTP"""
+    query_count: int = 0
+    db_time: float = 0.0
+    pool_wait: float = 0.0
+
+
+_current_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_db_stats", default=None)
+
+
+def start_request_stats() -> Tuple[RequestStats, object]:
+    """Ouvre la collecte pour la requête courante ; retourne (stats, jeton de reset)"""
+    stats = RequestStats()
+    return stats, _current_stats.set(stats)
+
+
+def stop_request_stats(token) -> None:
+    _current_stats.reset(token)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _current_stats.get()
+
+
+def record_request(method: str, route: str, status_code: int, duration: float, stats: RequestStats) -> None:
+    """Enregistre les métriques d'une requête HTTP terminée"""
+    http_requests_total.inc(method, route, str(status_code))
+    http_request_duration_seconds.observe(duration, method, route)
+    db_queries_per_request.observe(stats.query_count, method, route)
+    db_time_per_request_seconds.observe(stats.db_time, method, route)
+    db_pool_wait_per_request_seconds.observe(stats.pool_wait, method, route)
+
+
+def route_label(request) -> str:
+    """Gabarit de la route (cardinalité bornée) plutôt que le chemin brut"""
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+# ============= Hooks SQLAlchemy =============
+
+class _TimedPoolMixin:
+    """Mesure l'attente d'une connexion libre dans le pool"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            stats = _current_stats.get()
+            if stats is not None:
+                stats.pool_wait += time.perf_counter() - start
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_start_time
+    db_queries_total.inc()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.query_count += 1
+        stats.db_time += elapsed
+
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    if threshold and elapsed * 1000 >= threshold:
+        db_slow_queries_total.inc()
+        _log_slow_query(conn, statement, parameters, elapsed, executemany)
+
+
+def _explain(conn, statement: str, parameters) -> Optional[str]:
+    """
+    Plan d'exécution d'un SELECT (EXPLAIN sans ANALYZE : rien n'est réexécuté).
+
+    Passe par un curseur DBAPI distinct pour ne pas redéclencher les hooks,
+    sous un savepoint : un EXPLAIN en échec n'interrompt pas la transaction
+    de la requête.
+    """
+    if conn.dialect.name != "postgresql":
+        return None
+    if not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        return None
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            cursor.execute(f"EXPLAIN {statement}", parameters)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        except Exception:
+            cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            raise
+        cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        return plan
+    finally:
+        cursor.close()
+
+
+def _log_slow_query(conn, statement: str, parameters, elapsed: float, executemany: bool) -> None:
+    plan = None
+    if settings.SLOW_QUERY_EXPLAIN and not executemany:
+        try:
+            plan = _explain(conn, statement, parameters)
+        except Exception as exc:  # le journal ne doit jamais faire échouer la requête
+            plan = f"EXPLAIN indisponible : {exc}"
+    slow_query_logger.warning(
+        "Requête lente (%.1f ms) : %s%s",
+        elapsed * 1000,
+        statement,
+        f"\nPlan :\n{plan}" if plan else ""
+    )
+
+
+def instrument_engine(engine: Engine) -> Engine:
+    """Branche les hooks de mesure SQL sur un moteur (synchrone ou sync_engine d'un moteur async)"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    return engine
@@ -0,0 +1,83 @@
+"""
+Numérotation des documents (commandes, factures) par séquences PostgreSQL.
+
+Chaque couple (préfixe, année) dispose de sa propre séquence
+`document_number_<préfixe>_<année>`, créée à la première utilisation par la
+fonction SQL `next_document_number`. Un numéro coûte un seul `nextval` : ni
+balayage `LIKE ... ORDER BY`, ni verrou de ligne tenu jusqu'au commit, donc
+aucune sérialisation des checkouts concurrents.
+
+Les séquences ne sont pas transactionnelles : un numéro tiré par une
+transaction annulée est perdu. La numérotation tolère donc les trous mais
+garantit l'unicité, y compris sous forte concurrence.
+
+La séquence d'une nouvelle année est créée dans la transaction du premier
+tirage : les tirages concurrents de la même année attendent sa validation ;
+si elle est annulée, la séquence disparaît avec des numéros jamais validés.
+"""
+import re
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+ORDER_NUMBER_PREFIX = "CMD"
+ORDER_NUMBER_WIDTH = 6
+INVOICE_NUMBER_PREFIX = "INV"
+INVOICE_NUMBER_WIDTH = 4
+
+_PREFIX_PATTERN = re.compile(r"^[A-Z]{2,10}$")
+
+# Fonction créée avec la table orders (create_all) ; la migration e4b8c2d9f1a6
+# crée la même sur une base existante et amorce les séquences des années passées.
+# La séquence est créée à la volée si elle n'existe pas ; deux créations
+# concurrentes sont tolérées (la seconde réutilise la séquence de la première).
+NEXT_DOCUMENT_NUMBER_DDL = """
+CREATE OR REPLACE FUNCTION next_document_number(sequence_name text) RETURNS bigint AS $$
+BEGIN
+    IF to_regclass(sequence_name) IS NULL THEN
+        BEGIN
+            EXECUTE 'CREATE SEQUENCE ' || quote_ident(sequence_name);
+        EXCEPTION WHEN duplicate_table OR unique_violation THEN
+            NULL;
+        END;
+    END IF;
+    RETURN nextval(sequence_name::regclass);
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def document_sequence_name(prefix: str, year: int) -> str:
+    """Nom de la séquence d'un préfixe pour une année (ex. document_number_cmd_2026)"""
+    if not _PREFIX_PATTERN.match(prefix):
+        raise ValueError(f"Préfixe de document invalide : {prefix!r}")
+    return f"document_number_{prefix.lower()}_{int(year)}"
+
+
+class DocumentNumberGenerator:
+    """Distribue des numéros de documents uniques au format PREFIXE-AAAA-NNNN"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def next_value(self, prefix: str, year: int) -> int:
+        """Prochaine valeur de la séquence (préfixe, année)"""
+        return self.db.execute(
+            text("SELECT next_document_number(:sequence_name)"),
+            {"sequence_name": document_sequence_name(prefix, year)}
+        ).scalar_one()
+
+    def next_number(self, prefix: str, width: int, year: int) -> str:
+        return f"{prefix}-{year}-{self.next_value(prefix, year):0{width}d}"
+
+    def next_order_number(self, year: Optional[int] = None) -> str:
+        """Numéro de commande au format CMD-AAAA-NNNNNN"""
+        year = year or datetime.now().year
+        return self.next_number(ORDER_NUMBER_PREFIX, ORDER_NUMBER_WIDTH, year)
+
+    def next_invoice_number(self, year: Optional[int] = None) -> str:
+        """Numéro de facture au format INV-AAAA-NNNN"""
+        year = year or datetime.now(timezone.utc).year
+        return self.next_number(INVOICE_NUMBER_PREFIX, INVOICE_NUMBER_WIDTH, year)
@@ -0,0 +1,131 @@
+"""
+Pagination par curseur (keyset).
+
+Un curseur est un jeton opaque (JSON encodé en base64 URL-safe) contenant les
+valeurs de la clé de tri de la dernière ligne renvoyée : par exemple
+(created_at, id). La page suivante est obtenue par une comparaison de tuples
+`(created_at, id) < (:created_at, :id)` servie par un index composite, au lieu
+d'un OFFSET dont le coût croît avec la profondeur de la page.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, List, Optional, Sequence
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import asc, desc, tuple_
+from sqlalchemy.orm import Query
+
+# En-tête HTTP portant le curseur de la page suivante
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class CursorPage(list):
+    """
+    Liste de résultats enrichie du curseur de la page suivante.
+
+    Hérite de `list` pour rester compatible avec les appelants existants ;
+    `next_cursor` vaut None lorsqu'il n'y a plus de résultats (ou en mode offset).
+    """
+
+    def __init__(self, items: Sequence[Any] = (), next_cursor: Optional[str] = None):
+        super().__init__(items)
+        self.next_cursor = next_cursor
+
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Curseur de pagination invalide"
+    )
+
+
+def _serialize_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"dec": str(value)}
+    return value
+
+
+def _deserialize_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        if "dec" in value:
+            return Decimal(value["dec"])
+        raise ValueError("type de valeur inconnu")
+    return value
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode les valeurs de la clé de tri en jeton opaque"""
+    payload = json.dumps([_serialize_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """
+    Décode un jeton produit par encode_cursor.
+
+    Lève une HTTPException 400 si le jeton est illisible ou ne correspond pas
+    à une clé de `size` colonnes.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError("taille de clé incorrecte")
+        return [_deserialize_value(value) for value in values]
+    except (ValueError, TypeError, KeyError, InvalidOperation, binascii.Error, UnicodeDecodeError):
+        raise _invalid_cursor()
+
+
+def paginate_keyset(
+    query: Query,
+    keys: Sequence[Any],
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = True
+) -> CursorPage:
+    """
+    Applique la pagination par curseur à une requête ORM.
+
+    `keys` est la clé de tri (colonnes ou expressions), dont la dernière doit
+    être unique (généralement la clé primaire). Un curseur vide ("") désigne
+    la première page. La requête ne doit pas déjà être triée.
+    """
+    if cursor:
+        values = decode_cursor(cursor, len(keys))
+        if descending:
+            query = query.filter(tuple_(*keys) < tuple_(*values))
+        else:
+            query = query.filter(tuple_(*keys) > tuple_(*values))
+
+    direction = desc if descending else asc
+    labels = [key.label(f"cursor_key_{index}") for index, key in enumerate(keys)]
+    rows = (
+        query.add_columns(*labels)
+        .order_by(*[direction(key) for key in keys])
+        .limit(limit + 1)
+        .all()
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(list(rows[-1][1:]))
+    return CursorPage([row[0] for row in rows], next_cursor)
+
+
+def set_next_cursor_header(response: Response, items: Sequence[Any]) -> None:
+    """Expose le curseur de la page suivante dans l'en-tête X-Next-Cursor"""
+    next_cursor = getattr(items, "next_cursor", None)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
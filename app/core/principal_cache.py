@@ -0,0 +1,296 @@
+"""
+Cache des principaux authentifiés.
+
+`get_current_user` résout un token JWT en un `Principal` (id, compte actif,
+bannissement, rôles, profil producteur) au lieu de recharger l'utilisateur et
+ses rôles à chaque requête. Les entrées sont indexées par (user_id, empreinte
+du token) et expirent au plus tard avec le token.
+
+Deux backends :
+- `InMemoryPrincipalCache` : LRU + TTL propre au processus (défaut)
+- `RedisPrincipalCache` : partagé entre workers, pour que l'invalidation faite
+  par un worker soit vue par tous (PRINCIPAL_CACHE_BACKEND=redis, REDIS_URL)
+
+L'invalidation est automatique : les flush qui modifient `User.is_active`,
+`User.roles`, un `BannedUser` ou un `ProducerProfile` invalident, après commit,
+les entrées de l'utilisateur concerné.
+"""
+import hashlib
+from abc import ABC, abstractmethod
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Dict, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+
+class RoleRef(NamedTuple):
+    """Rôle réduit à son nom (compatible avec `role.name`)"""
+    name: str
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    Utilisateur authentifié tel que vu par les dépendances de sécurité.
+
+    Expose le sous-ensemble de `User` utilisé par les routes (`id`, `role`,
+    `roles`, `has_role`) sans requête supplémentaire.
+    """
+    id: int
+    is_active: bool
+    is_banned: bool = False
+    role_names: Tuple[str, ...] = ()
+    producer_profile_id: Optional[int] = None
+
+    @property
+    def roles(self) -> Tuple[RoleRef, ...]:
+        return tuple(RoleRef(name) for name in self.role_names)
+
+    @property
+    def role(self) -> str:
+        """Nom du premier rôle, ou 'Customer' par défaut (comme User.role)"""
+        return self.role_names[0] if self.role_names else "Customer"
+
+    def has_role(self, role_name: str) -> bool:
+        """Vérifie si l'utilisateur a un rôle spécifique (insensible à la casse)"""
+        if not role_name:
+            return False
+        expected = role_name.strip().lower()
+        return any((name or "").strip().lower() == expected for name in self.role_names)
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, value: str) -> "Principal":
+        data = json.loads(value)
+        data["role_names"] = tuple(data["role_names"])
+        return cls(**data)
+
+
+def token_fingerprint(token: str) -> str:
+    """Empreinte du token utilisée dans la clé de cache (le token n'est jamais stocké)"""
+    return hashlib.sha256(token.encode()).hexdigest()[:32]
+
+
+class PrincipalCacheBackend(ABC):
+    """Interface des backends de cache de principaux"""
+
+    @abstractmethod
+    def get(self, user_id: int, fingerprint: str) -> Optional[Principal]:
+        ...
+
+    @abstractmethod
+    def set(self, principal: Principal, fingerprint: str, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    def invalidate_user(self, user_id: int) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+
+class NullPrincipalCache(PrincipalCacheBackend):
+    """Cache désactivé (PRINCIPAL_CACHE_BACKEND=none)"""
+
+    def get(self, user_id, fingerprint):
+        return None
+
+    def set(self, principal, fingerprint, ttl):
+        pass
+
+    def invalidate_user(self, user_id):
+        pass
+
+    def clear(self):
+        pass
+
+
+class InMemoryPrincipalCache(PrincipalCacheBackend):
+    """LRU borné avec expiration, propre au processus"""
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[float, Principal]]" = OrderedDict()
+        self._keys_by_user: Dict[int, Set[Tuple[int, str]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, fingerprint: str) -> Optional[Principal]:
+        key = (user_id, fingerprint)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return principal
+
+    def set(self, principal: Principal, fingerprint: str, ttl: float) -> None:
+        key = (principal.id, fingerprint)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, principal)
+            self._entries.move_to_end(key)
+            self._keys_by_user.setdefault(principal.id, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for key in self._keys_by_user.pop(user_id, set()):
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _remove(self, key: Tuple[int, str]) -> None:
+        self._entries.pop(key, None)
+        user_keys = self._keys_by_user.get(key[0])
+        if user_keys is not None:
+            user_keys.discard(key)
+            if not user_keys:
+                del self._keys_by_user[key[0]]
+
+
+class RedisPrincipalCache(PrincipalCacheBackend):
+    """
+    Cache partagé entre workers.
+
+    Chaque entrée est une clé `<prefix>:<user_id>:<empreinte>` avec TTL ; un
+    set `<prefix>:user:<user_id>` référence les entrées d'un utilisateur pour
+    l'invalidation. Nécessite le paquet `redis` (ou un client compatible).
+    """
+
+    def __init__(self, client=None, url: str = "", prefix: str = "principal"):
+        if client is None:
+            try:
+                import redis
+            except ImportError as exc:
+                raise RuntimeError("PRINCIPAL_CACHE_BACKEND=redis nécessite le paquet 'redis'") from exc
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def _entry_key(self, user_id: int, fingerprint: str) -> str:
+        return f"{self.prefix}:{user_id}:{fingerprint}"
+
+    def _user_key(self, user_id: int) -> str:
+        return f"{self.prefix}:user:{user_id}"
+
+    def get(self, user_id: int, fingerprint: str) -> Optional[Principal]:
+        value = self.client.get(self._entry_key(user_id, fingerprint))
+        if value is None:
+            return None
+        return Principal.from_json(value.decode() if isinstance(value, bytes) else value)
+
+    def set(self, principal: Principal, fingerprint: str, ttl: float) -> None:
+        entry_key = self._entry_key(principal.id, fingerprint)
+        user_key = self._user_key(principal.id)
+        seconds = max(1, int(ttl))
+        pipeline = self.client.pipeline()
+        pipeline.setex(entry_key, seconds, principal.to_json())
+        pipeline.sadd(user_key, entry_key)
+        pipeline.expire(user_key, max(seconds, settings.PRINCIPAL_CACHE_TTL))
+        pipeline.execute()
+
+    def invalidate_user(self, user_id: int) -> None:
+        user_key = self._user_key(user_id)
+        entry_keys = self.client.smembers(user_key)
+        self.client.delete(user_key, *entry_keys)
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(f"{self.prefix}:*"):
+            self.client.delete(key)
+
+
+def _create_backend() -> PrincipalCacheBackend:
+    backend = settings.PRINCIPAL_CACHE_BACKEND.lower()
+    if backend == "none":
+        return NullPrincipalCache()
+    if backend == "redis":
+        return RedisPrincipalCache(url=settings.REDIS_URL)
+    return InMemoryPrincipalCache(maxsize=settings.PRINCIPAL_CACHE_MAXSIZE)
+
+
+_backend: Optional[PrincipalCacheBackend] = None
+
+
+def get_principal_cache() -> PrincipalCacheBackend:
+    """Backend courant (créé à la première utilisation selon la configuration)"""
+    global _backend
+    if _backend is None:
+        _backend = _create_backend()
+    return _backend
+
+
+def set_principal_cache(backend: PrincipalCacheBackend) -> None:
+    """Remplace le backend (backend partagé personnalisé, tests)"""
+    global _backend
+    _backend = backend
+
+
+def invalidate_principal(user_id: int) -> None:
+    """Invalide toutes les entrées en cache d'un utilisateur"""
+    get_principal_cache().invalidate_user(user_id)
+
+
+# ============= Invalidation automatique =============
+
+_PENDING_KEY = "principal_cache_invalidations"
+
+
+def _affected_user_ids(session: Session) -> Set[int]:
+    from app.models.admin import BannedUser
+    from app.models.auth import User
+    from app.models.profiles import ProducerProfile
+
+    user_ids = set()
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            user_ids.add(obj.id)
+        elif isinstance(obj, (BannedUser, ProducerProfile)):
+            user_ids.add(obj.user_id)
+    for obj in session.new:
+        if isinstance(obj, (BannedUser, ProducerProfile)):
+            user_ids.add(obj.user_id)
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            state = inspect(obj)
+            if state.attrs.is_active.history.has_changes() or state.attrs.roles.history.has_changes():
+                user_ids.add(obj.id)
+        elif isinstance(obj, (BannedUser, ProducerProfile)):
+            user_ids.add(obj.user_id)
+    user_ids.discard(None)
+    return user_ids
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_principal_changes(session: Session, flush_context, instances) -> None:
+    user_ids = _affected_user_ids(session)
+    if user_ids:
+        session.info.setdefault(_PENDING_KEY, set()).update(user_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        invalidate_principal(user_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_on_rollback(session: Session, previous_transaction) -> None:
+    session.info.pop(_PENDING_KEY, None)
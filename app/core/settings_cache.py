@@ -0,0 +1,132 @@
+"""
+Cache des paramètres système.
+
+`SystemSettingRepository.get_value` relit la ligne et reconvertit la valeur
+(JSON compris) à chaque appel. `SettingsCache` garde pour le processus un
+instantané de tous les paramètres, déjà convertis selon leur type, ainsi que
+la liste publique et son ETag. L'instantané est préchargé au démarrage puis
+rafraîchi à la demande :
+
+- chaque écriture de `SystemSettingRepository` incrémente, dans sa
+  transaction, le compteur "system_settings" de la table `cache_versions` ;
+- une lecture compare ce compteur à la version de l'instantané au plus
+  toutes les SETTINGS_CACHE_POLL_INTERVAL secondes (une requête sur clé
+  primaire) et recharge tout s'il a changé.
+
+Le worker qui écrit voit la modification immédiatement ; les autres workers
+au plus tard après l'intervalle de vérification.
+"""
+import copy
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.http_cache import compute_etag
+from app.models.admin import CacheVersion, SettingType, SystemSetting
+
+SETTINGS_VERSION_KEY = "system_settings"
+
+
+def parse_setting_value(setting_type: SettingType, value: str) -> Any:
+    """Convertit la valeur brute d'un paramètre selon son type"""
+    if setting_type == SettingType.BOOLEAN:
+        return value.lower() in ['true', '1', 'yes']
+    if setting_type == SettingType.INTEGER:
+        return int(value)
+    if setting_type == SettingType.FLOAT:
+        return float(value)
+    if setting_type == SettingType.JSON:
+        return json.loads(value)
+    return value
+
+
+@dataclass(frozen=True)
+class SettingsSnapshot:
+    """Paramètres lus à une version donnée du compteur"""
+    version: int
+    values: Dict[str, Any]
+    public: List[Dict[str, Any]]
+    etag: str
+
+
+def read_settings_version(db: Session) -> int:
+    version = db.query(CacheVersion.version).filter(CacheVersion.name == SETTINGS_VERSION_KEY).scalar()
+    return version or 0
+
+
+def load_settings_snapshot(db: Session, version: int) -> SettingsSnapshot:
+    """Charge tous les paramètres en une requête"""
+    rows = db.query(SystemSetting).order_by(SystemSetting.category, SystemSetting.key).all()
+    public = [
+        {
+            "key": setting.key,
+            "value": setting.value,
+            "type": setting.type.value,
+            "description": setting.description,
+            "category": setting.category,
+        }
+        for setting in rows if setting.is_public
+    ]
+    return SettingsSnapshot(
+        version=version,
+        values={setting.key: parse_setting_value(setting.type, setting.value) for setting in rows},
+        public=public,
+        etag=compute_etag(public),
+    )
+
+
+class SettingsCache:
+    """Instantané des paramètres du processus, revalidé par compteur de version"""
+
+    def __init__(self, poll_interval: float):
+        self.poll_interval = poll_interval
+        self._snapshot: Optional[SettingsSnapshot] = None
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def snapshot(self, db: Session) -> SettingsSnapshot:
+        now = time.monotonic()
+        with self._lock:
+            snapshot = self._snapshot
+            if (snapshot is not None and self._checked_at is not None
+                    and now - self._checked_at < self.poll_interval):
+                return snapshot
+        version = read_settings_version(db)
+        if snapshot is None or snapshot.version != version:
+            snapshot = load_settings_snapshot(db, version)
+        with self._lock:
+            self._snapshot = snapshot
+            self._checked_at = now
+        return snapshot
+
+    def preload(self, db: Session) -> SettingsSnapshot:
+        """Chargement au démarrage (évite le premier accès lent)"""
+        self.clear()
+        return self.snapshot(db)
+
+    def get_value(self, db: Session, key: str, default: Any = None) -> Any:
+        value = self.snapshot(db).values.get(key, default)
+        # Les valeurs JSON sont partagées : chaque appelant reçoit sa copie
+        return copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+
+    def invalidate(self) -> None:
+        """Force la vérification du compteur à la prochaine lecture"""
+        with self._lock:
+            self._checked_at = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshot = None
+            self._checked_at = None
+
+
+_settings_cache = SettingsCache(settings.SETTINGS_CACHE_POLL_INTERVAL)
+
+
+def get_settings_cache() -> SettingsCache:
+    return _settings_cache
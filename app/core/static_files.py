@@ -0,0 +1,252 @@
+"""
+Service des fichiers uploadés (/uploads) avec cache long.
+
+Les fichiers de /uploads ne sont jamais réécrits : images produit rangées
+sous leur SHA-256 (app.core.image_pipeline), autres uploads nommés
+horodatage + UUID. Une URL désigne donc toujours le même contenu, et
+`ImmutableStaticFiles` peut l'annoncer comme tel :
+- `Cache-Control: public, max-age=31536000, immutable` : ni le navigateur ni
+  le reverse proxy ne revalident pendant un an. Seulement sous les préfixes
+  publics (`immutable_prefixes`, en production `products/`) : les autres
+  sous-arbres (justificatifs KBIS, assurances et certifications des
+  producteurs, photos de profil) sont servis en `private, no-store`, pour
+  qu'aucun cache partagé ne les conserve ;
+- ETag fort dérivé du chemin, de la taille et de l'encodage (identique sur
+  tous les serveurs qui partagent le volume), 304 sur `If-None-Match` ;
+- requêtes partielles (`Range` à plage unique, `If-Range`) : 206 ou 416 ;
+- variantes précompressées : `fichier.br` ou `fichier.gz` posé à côté d'un
+  fichier texte (SVG, JSON...) est servi avec `Content-Encoding` si le client
+  l'accepte (`Vary: Accept-Encoding`) ;
+- envoi sans copie quand le serveur ASGI le propose : extension
+  `http.response.pathsend` (fichier entier) ou `http.response.zerocopy`
+  (sendfile, plages comprises). Sinon, lecture par blocs hors de la boucle
+  d'événements, comme StaticFiles. Uvicorn ne propose aucune des deux : en
+  production, le reverse proxy met en cache grâce aux en-têtes ci-dessus.
+"""
+import hashlib
+import os
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from mimetypes import guess_type
+from typing import Optional, Set, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Receive, Scope, Send
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+PRIVATE_CACHE_CONTROL = "private, no-store"
+CHUNK_SIZE = 256 * 1024
+
+# Variantes précompressées cherchées à côté du fichier, par ordre de préférence
+PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+COMPRESSIBLE_TYPES = (
+    "text/", "application/json", "application/javascript", "application/xml", "image/svg+xml",
+)
+
+
+class RangeNotSatisfiable(Exception):
+    """Plage demandée hors du fichier (416)"""
+
+
+def parse_byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    (début, fin incluse) d'un en-tête `Range: bytes=...` à plage unique.
+
+    Retourne None quand l'en-tête est absent, mal formé ou multi-plages :
+    la réponse est alors le fichier entier (autorisé par la RFC 9110).
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if not first:
+            suffix = int(last)
+            if suffix <= 0:
+                raise RangeNotSatisfiable(header)
+            return max(size - suffix, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(header)
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def accepted_encodings(header: Optional[str]) -> Set[str]:
+    """Encodages acceptés d'après `Accept-Encoding` (q=0 exclu)"""
+    encodings = set()
+    for item in (header or "").split(","):
+        name, _, params = item.strip().partition(";")
+        if name and params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            encodings.add(name.lower())
+    return encodings
+
+
+def strong_etag(relative_path: str, size: int, encoding: Optional[str]) -> str:
+    """ETag fort d'un fichier immuable : même valeur sur tous les serveurs"""
+    digest = hashlib.sha256(f"{relative_path}:{size}:{encoding or 'identity'}".encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+class ImmutableFileResponse(Response):
+    """Réponse fichier : 200, 206, 304 ou 416 selon les en-têtes conditionnels"""
+
+    def __init__(self, path: str, stat_result: os.stat_result, relative_path: str,
+                 cache_control: str = IMMUTABLE_CACHE_CONTROL, chunk_size: int = CHUNK_SIZE):
+        self.path = path
+        self.stat_result = stat_result
+        self.relative_path = relative_path
+        self.cache_control = cache_control
+        self.chunk_size = chunk_size
+        self.media_type = guess_type(path)[0] or "application/octet-stream"
+        self.status_code = 200
+        self.background = None
+
+    def _negotiate(self, request_headers: Headers) -> Tuple[str, os.stat_result, Optional[str], bool]:
+        """Fichier à servir (variante précompressée si acceptée) et besoin de Vary"""
+        accepted = accepted_encodings(request_headers.get("accept-encoding"))
+        selected = None
+        has_variants = False
+        for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+            try:
+                variant_stat = os.stat(self.path + suffix)
+            except OSError:
+                continue
+            if not stat.S_ISREG(variant_stat.st_mode):
+                continue
+            has_variants = True
+            if selected is None and encoding in accepted:
+                selected = (self.path + suffix, variant_stat, encoding)
+        if selected is None:
+            return self.path, self.stat_result, None, has_variants
+        return (*selected, True)
+
+    def _is_not_modified(self, request_headers: Headers, etag: str, mtime: float) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            candidates = [candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")]
+            return "*" in candidates or etag in candidates
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request_headers = Headers(scope=scope)
+        if self.media_type.startswith(COMPRESSIBLE_TYPES):
+            path, file_stat, encoding, vary = await anyio.to_thread.run_sync(self._negotiate, request_headers)
+        else:
+            path, file_stat, encoding, vary = self.path, self.stat_result, None, False
+        size = file_stat.st_size
+        etag = strong_etag(self.relative_path, size, encoding)
+        last_modified = formatdate(file_stat.st_mtime, usegmt=True)
+        headers = [
+            (b"etag", etag.encode()),
+            (b"cache-control", self.cache_control.encode()),
+            (b"last-modified", last_modified.encode()),
+        ]
+        if vary:
+            headers.append((b"vary", b"Accept-Encoding"))
+
+        if self._is_not_modified(request_headers, etag, file_stat.st_mtime):
+            await self._send_head(send, 304, headers)
+            return
+
+        content_type = self.media_type + ("; charset=utf-8" if self.media_type.startswith("text/") else "")
+        headers += [(b"content-type", content_type.encode()), (b"accept-ranges", b"bytes")]
+        if encoding:
+            headers.append((b"content-encoding", encoding.encode()))
+
+        byte_range = None
+        if_range = request_headers.get("if-range")
+        if if_range is None or if_range in (etag, last_modified):
+            try:
+                byte_range = parse_byte_range(request_headers.get("range"), size)
+            except RangeNotSatisfiable:
+                headers.append((b"content-range", f"bytes */{size}".encode()))
+                await self._send_head(send, 416, headers)
+                return
+
+        if byte_range is None:
+            status_code, start, length = 200, 0, size
+        else:
+            start, end = byte_range
+            status_code, length = 206, end - start + 1
+            headers.append((b"content-range", f"bytes {start}-{end}/{size}".encode()))
+        headers.append((b"content-length", str(length).encode()))
+
+        await send({"type": "http.response.start", "status": status_code, "headers": headers})
+        if scope["method"] == "HEAD" or length == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+        extensions = scope.get("extensions") or {}
+        if status_code == 200 and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": path})
+            return
+        await self._send_file(send, path, start, length, "http.response.zerocopy" in extensions)
+
+    async def _send_head(self, send: Send, status_code: int, headers) -> None:
+        await send({"type": "http.response.start", "status": status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def _send_file(self, send: Send, path: str, start: int, length: int, zerocopy: bool) -> None:
+        file = await anyio.to_thread.run_sync(open, path, "rb")
+        try:
+            if zerocopy:
+                await send({"type": "http.response.zerocopy", "file": file, "offset": start, "count": length})
+                return
+            if start:
+                await anyio.to_thread.run_sync(file.seek, start)
+            remaining = length
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(file.read, min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                # Fichier tronqué pendant l'envoi : terminer la réponse proprement
+                await send({"type": "http.response.body", "body": b""})
+        finally:
+            await anyio.to_thread.run_sync(file.close)
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """
+    StaticFiles pour des fichiers jamais réécrits (voir le module).
+
+    `cache_control` s'applique aux chemins commençant par l'un des
+    `immutable_prefixes` (tous les chemins si None), `private_cache_control`
+    aux autres.
+    """
+
+    def __init__(self, *, directory: str, cache_control: str = IMMUTABLE_CACHE_CONTROL,
+                 immutable_prefixes: Optional[Tuple[str, ...]] = None,
+                 private_cache_control: str = PRIVATE_CACHE_CONTROL, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.cache_control = cache_control
+        self.immutable_prefixes = immutable_prefixes
+        self.private_cache_control = private_cache_control
+
+    def cache_control_for(self, relative_path: str) -> str:
+        if self.immutable_prefixes is None:
+            return self.cache_control
+        if relative_path.replace(os.sep, "/").startswith(self.immutable_prefixes):
+            return self.cache_control
+        return self.private_cache_control
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope,
+                      status_code: int = 200) -> Response:
+        relative_path = self.get_path(scope)
+        return ImmutableFileResponse(
+            str(full_path), stat_result, relative_path, cache_control=self.cache_control_for(relative_path)
+        )
@@ -0,0 +1,66 @@
+"""
+Taille maximale du corps des routes d'upload, appliquée avant l'analyse multipart.
+
+Starlette lit tout le corps multipart (fichiers mis en fichier temporaire)
+avant d'appeler le handler : une limite vérifiée dans le handler n'intervient
+qu'une fois le corps entier reçu. `limited_body_route` produit une classe de
+route qui :
+- refuse (413) un `Content-Length` annoncé au-delà de la limite, sans rien lire ;
+- interrompt la lecture du flux (413) dès que la limite est dépassée
+  (corps chunked ou `Content-Length` absent ou erroné).
+"""
+from typing import AsyncGenerator, Callable, Type
+
+from fastapi import HTTPException, Request, status
+from fastapi.routing import APIRoute
+
+# Marge pour les délimiteurs multipart, les en-têtes de parties et les champs texte
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+def body_too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Fichier trop volumineux (maximum {max_bytes // (1024 * 1024)} Mo)"
+    )
+
+
+class LimitedBodyRequest(Request):
+    """Requête dont le flux du corps s'arrête au-delà de `max_body_bytes`"""
+
+    max_body_bytes: int
+    max_payload_bytes: int
+
+    async def stream(self) -> AsyncGenerator[bytes, None]:
+        received = 0
+        async for chunk in super().stream():
+            received += len(chunk)
+            if received > self.max_body_bytes:
+                raise body_too_large(self.max_payload_bytes)
+            yield chunk
+
+
+def limited_body_route(max_bytes: Callable[[], int]) -> Type[APIRoute]:
+    """
+    Classe de route bornant le corps à `max_bytes()` octets de fichier (plus la
+    marge multipart). `max_bytes` est lu à chaque requête (réglages modifiables).
+    """
+
+    class LimitedBodyRoute(APIRoute):
+        def get_route_handler(self):
+            handler = super().get_route_handler()
+
+            async def limited_handler(request: Request):
+                payload_bytes = max_bytes()
+                body_bytes = payload_bytes + MULTIPART_OVERHEAD_BYTES
+                content_length = request.headers.get("content-length")
+                if content_length and content_length.isdigit() and int(content_length) > body_bytes:
+                    raise body_too_large(payload_bytes)
+                limited = LimitedBodyRequest(request.scope, request.receive)
+                limited.max_body_bytes = body_bytes
+                limited.max_payload_bytes = payload_bytes
+                return await handler(limited)
+
+            return limited_handler
+
+    return LimitedBodyRoute
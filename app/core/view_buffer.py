@@ -0,0 +1,175 @@
+"""
+Ingestion différée (write-behind) des vues produit.
+
+`POST /analytics/views/track` dépose chaque vue dans un tampon mémoire borné
+et répond 202 immédiatement ; un thread d'écriture vide le tampon par lots
+(un INSERT multi-lignes par lot) dès que `VIEW_BUFFER_BATCH_SIZE` vues sont
+en attente ou toutes les `VIEW_BUFFER_FLUSH_INTERVAL` secondes.
+
+Contre-pression : quand le tampon atteint `VIEW_BUFFER_MAX_SIZE`, les vues
+supplémentaires sont refusées (la route répond 503 avec Retry-After) et
+comptées dans `product_view_events_total{outcome="dropped"}`.
+
+Le lifespan FastAPI démarre le thread (`start`) et vide le tampon à l'arrêt
+(`stop`). Les vues encore en mémoire lors d'un arrêt brutal sont perdues :
+c'est le compromis accepté pour une donnée statistique.
+"""
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import product_view_events_total
+
+logger = logging.getLogger(__name__)
+
+
+class ProductViewBuffer:
+    """Tampon borné de vues produit, écrit en base par lots"""
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], Session]] = None,
+        max_size: int = 50000,
+        batch_size: int = 1000,
+        flush_interval: float = 1.0
+    ):
+        if session_factory is None:
+            from app.core.database import SessionLocal
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._events: Deque[Dict] = deque()
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def submit(self, product_id: int, user_id: Optional[int] = None,
+               session_id: Optional[str] = None, referrer: Optional[str] = None) -> bool:
+        """
+        Dépose une vue sans attendre la base.
+
+        Retourne False si le tampon est plein (vue perdue et comptée).
+        """
+        event = {
+            "product_id": product_id,
+            "user_id": user_id,
+            "session_id": session_id,
+            "referrer": referrer,
+            "viewed_at": datetime.now(),
+        }
+        with self._condition:
+            if len(self._events) >= self.max_size:
+                product_view_events_total.inc("dropped")
+                return False
+            self._events.append(event)
+            if len(self._events) >= self.batch_size:
+                self._condition.notify()
+        product_view_events_total.inc("accepted")
+        return True
+
+    def flush(self, db: Optional[Session] = None) -> int:
+        """
+        Écrit un lot (au plus `batch_size` vues) et retourne le nombre de vues insérées.
+
+        Sans `db`, une session dédiée est ouverte puis fermée. En cas d'erreur,
+        le lot est perdu (compté comme `failed`) et l'exception propagée.
+        """
+        from app.repositories.analytics_repository import ProductViewRepository
+
+        with self._flush_lock:
+            batch = self._take_batch()
+            if not batch:
+                return 0
+            session = db if db is not None else self.session_factory()
+            try:
+                written = ProductViewRepository(session).bulk_create(batch)
+                session.commit()
+            except Exception:
+                session.rollback()
+                product_view_events_total.inc("failed", amount=len(batch))
+                raise
+            finally:
+                if db is None:
+                    session.close()
+        product_view_events_total.inc("written", amount=written)
+        if written < len(batch):
+            product_view_events_total.inc("rejected", amount=len(batch) - written)
+        return written
+
+    def drain(self, db: Optional[Session] = None) -> int:
+        """Vide entièrement le tampon ; retourne le nombre de vues insérées"""
+        written = 0
+        while self._events:
+            written += self.flush(db)
+        return written
+
+    def start(self) -> None:
+        """Démarre le thread d'écriture (idempotent)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="product-view-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Arrête le thread puis écrit les vues restantes"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        try:
+            self.drain()
+        except Exception:
+            logger.exception("Vues produit perdues à l'arrêt")
+
+    def _take_batch(self) -> List[Dict]:
+        with self._condition:
+            count = min(self.batch_size, len(self._events))
+            return [self._events.popleft() for _ in range(count)]
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if not self._stopping and len(self._events) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                if self._stopping:
+                    return
+            try:
+                # Un lot par tour tant que le seuil est atteint, sinon ce qui a attendu
+                self.flush()
+            except Exception:
+                logger.exception("Échec de l'écriture d'un lot de vues produit")
+
+
+_buffer: Optional[ProductViewBuffer] = None
+
+
+def get_product_view_buffer() -> ProductViewBuffer:
+    """Tampon courant (créé à la première utilisation selon la configuration)"""
+    global _buffer
+    if _buffer is None:
+        _buffer = ProductViewBuffer(
+            max_size=settings.VIEW_BUFFER_MAX_SIZE,
+            batch_size=settings.VIEW_BUFFER_BATCH_SIZE,
+            flush_interval=settings.VIEW_BUFFER_FLUSH_INTERVAL
+        )
+    return _buffer
+
+
+def set_product_view_buffer(buffer: Optional[ProductViewBuffer]) -> None:
+    """Remplace le tampon (tests, configuration personnalisée)"""
+    global _buffer
+    _buffer = buffer
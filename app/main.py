@@ -1,12 +1,19 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 import asyncio
+import logging
 import os
+import time
 
 from app.core.config import settings
 from app.core.database import SessionLocal
+from app.core import metrics
+from app.core.image_pipeline import shutdown_image_pool
+from app.core.settings_cache import get_settings_cache
+from app.core.static_files import ImmutableStaticFiles
+from app.core.view_buffer import get_product_view_buffer
+from app.services.analytics_service import ProductViewService
 from app.core.init_roles import init_roles
 from app.core.init_catalog import init_catalog
 
@@ -33,6 +40,26 @@ from app.routers import (
     cms as cms_router
 )
 
+logger = logging.getLogger(__name__)
+
+
+def compact_product_views() -> None:
+    """Replie les nouvelles vues brutes dans le cumul journalier (product_view_daily)"""
+    db = SessionLocal()
+    try:
+        ProductViewService(db).compact_views()
+    except Exception:
+        logger.exception("Échec de la compaction des vues produit")
+    finally:
+        db.close()
+
+
+async def compact_product_views_periodically(interval: int) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.to_thread(compact_product_views)
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Gère le démarrage et l'arrêt de l'application (Initialisation DB)."""
@@ -40,9 +67,22 @@ async def lifespan(app: FastAPI):
     try:
         init_roles(db)
         init_catalog(db)
+        get_settings_cache().preload(db)
     finally:
         db.close()
-    yield 
+    view_buffer = get_product_view_buffer()
+    view_buffer.start()
+    compaction = None
+    if settings.PRODUCT_VIEW_COMPACTION_INTERVAL > 0:
+        compaction = asyncio.create_task(
+            compact_product_views_periodically(settings.PRODUCT_VIEW_COMPACTION_INTERVAL)
+        )
+    yield
+    if compaction is not None:
+        compaction.cancel()
+    # Écrire les vues produit encore en mémoire avant l'arrêt
+    await asyncio.to_thread(view_buffer.stop)
+    await asyncio.to_thread(shutdown_image_pool)
 
 # Initialisation de l'API
 app = FastAPI(
@@ -63,6 +103,25 @@ async def timeout_middleware(request, call_next):
         from fastapi import HTTPException
         raise HTTPException(status_code=408, detail="Request timeout")
 
+# Mesures par route : latence, nombre de requêtes SQL, temps en base, attente du pool
+@app.middleware("http")
+async def metrics_middleware(request, call_next):
+    if not settings.METRICS_ENABLED:
+        return await call_next(request)
+    stats, token = metrics.start_request_stats()
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        metrics.record_request(
+            request.method, metrics.route_label(request), status_code,
+            time.perf_counter() - start, stats
+        )
+        metrics.stop_request_stats(token)
+
 # Affichage de debug utile pour les problèmes d'envoi d'emails (NE PAS afficher le mot de passe)
 print("[startup] SKIP_EMAIL_VERIFICATION=", settings.SKIP_EMAIL_VERIFICATION)
 print("[startup] MAIL_USERNAME=", settings.MAIL_USERNAME)
@@ -103,7 +162,14 @@ if not os.path.exists(UPLOADS_DIR):
     print(f"[startup] Dossier {UPLOADS_DIR} créé")
 
 # Monter le dossier uploads pour servir les fichiers statiques
-app.mount("/uploads", StaticFiles(directory=UPLOADS_DIR), name="uploads")
+# (ETag fort, requêtes partielles ; cache public d'un an pour les seules
+# images produit, adressées par contenu : documents et photos de profil en
+# private, no-store)
+app.mount(
+    "/uploads",
+    ImmutableStaticFiles(directory=UPLOADS_DIR, immutable_prefixes=("products/",)),
+    name="uploads"
+)
 print("[startup] Fichiers statiques montés sur /uploads")
 
 # --- INCLUSION DES ROUTERS ---
@@ -167,6 +233,13 @@ include_router_with_legacy_prefix(event.router, "/events", ["Events"])
 # CMS & Contenu
 include_router_with_legacy_prefix(cms_router.router, "/cms", ["CMS & Content"])
 
+@app.get("/metrics", tags=["System"], include_in_schema=False)
+def read_metrics():
+    """Métriques au format texte Prometheus"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return Response(content=metrics.registry.render(), media_type=metrics.PROMETHEUS_CONTENT_TYPE)
+
 @app.get("/", tags=["System"])
 def read_root():
     return {
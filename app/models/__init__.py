@@ -69,12 +69,14 @@ from .payments import (  # noqa: F401
     Refund,             # Remboursements
     Invoice,            # Factures
     ProducerPayout,     # Versements aux producteurs
+    PayoutRun,          # Points de reprise des versements groupés
     PaymentStatus,      # Enum des statuts de paiement
     PaymentMethodType,  # Enum des types de paiement
     PaymentProvider,    # Enum des fournisseurs (Stripe, PayPal)
     RefundStatus,       # Enum des statuts de remboursement
     InvoiceStatus,      # Enum des statuts de facture
-    PayoutStatus        # Enum des statuts de versement
+    PayoutStatus,       # Enum des statuts de versement
+    PayoutRunStatus     # Enum des statuts de traitement groupé
 )
 
 # ============= Modèles de livraison =============
@@ -1,6 +1,6 @@
 from sqlalchemy import (
-    Column, Integer, String, Boolean, DateTime, ForeignKey,
-    Text, Numeric, Date, UniqueConstraint, func, Enum as SQLEnum
+    Column, Integer, BigInteger, String, Boolean, DateTime, ForeignKey,
+    Text, Numeric, Date, UniqueConstraint, Index, func, Enum as SQLEnum
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.dialects.postgresql import JSONB
@@ -111,6 +111,12 @@ class AdminAction(Base):
     # Relations
     admin = relationship("User", back_populates="admin_actions")
     
+    # Index composites pour la pagination par curseur sur (created_at, id)
+    __table_args__ = (
+        Index('ix_admin_actions_created_id', 'created_at', 'id'),
+        Index('ix_admin_actions_admin_created', 'admin_id', 'created_at', 'id'),
+    )
+    
     def __repr__(self):
         return f"<AdminAction {self.action_type} by admin_id={self.admin_id}>"
 
@@ -295,6 +301,25 @@ class SystemSetting(Base):
         return f"<SystemSetting {self.key}={self.value}>"
 
 
+class CacheVersion(Base):
+    """
+    Compteur de version d'un cache applicatif.
+    
+    Une ligne par cache (ex. "system_settings"), incrémentée dans la
+    transaction de chaque écriture. Les workers comparent périodiquement
+    ce compteur à celui de leur copie en mémoire pour savoir s'ils doivent
+    la recharger.
+    """
+    __tablename__ = "cache_versions"
+    
+    name = Column(String(100), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<CacheVersion({self.name}={self.version})>"
+
+
 class Commission(Base):
     """
     Taux de commission prélevés sur les ventes.
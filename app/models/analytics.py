@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, Date, Enum as SQLEnum, Index
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Numeric, Date, LargeBinary, Enum as SQLEnum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -105,6 +105,58 @@ class ProductView(Base):
 Index('idx_product_views_product_date', ProductView.product_id, ProductView.viewed_at)
 
 
+# ============================================================================
+# MODÈLE PRODUCTVIEWDAILY : Cumuls journaliers des vues
+# ============================================================================
+
+class ProductViewDaily(Base):
+    """
+    Cumul journalier des vues d'un produit.
+    
+    Les lectures analytiques (vues d'un produit, top produits, évolution
+    jour par jour) lisent ce cumul pour les jours clos et ne parcourent la
+    table brute product_views que pour aujourd'hui et les vues pas encore
+    compactées. Le cumul est alimenté par la compaction incrémentale
+    (ProductViewRepository.compact_daily_views), qui replie les vues brutes
+    au-delà d'un repère (AnalyticsWatermark).
+    
+    visitor_sketch est un sketch HyperLogLog (app/core/hyperloglog.py) des
+    visiteurs du jour : les sketches de plusieurs jours se fusionnent pour
+    estimer les visiteurs uniques d'une période quelconque.
+    """
+    __tablename__ = "product_view_daily"
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    view_count = Column(Integer, nullable=False, default=0)
+    visitor_sketch = Column(LargeBinary, nullable=True)
+
+    def __repr__(self):
+        return f"<ProductViewDaily(product_id={self.product_id}, day={self.day}, views={self.view_count})>"
+
+
+# Top produits sur une période : parcours par jour, sans passer par le produit
+Index('idx_product_view_daily_day', ProductViewDaily.day, ProductViewDaily.product_id, ProductViewDaily.view_count)
+
+
+class AnalyticsWatermark(Base):
+    """
+    Repère de compaction : plus grand id de la table brute déjà replié.
+    
+    Une ligne par job de compaction (ex. "product_views_daily"). La ligne
+    est verrouillée pendant la compaction, ce qui sérialise les jobs
+    concurrents.
+    """
+    __tablename__ = "analytics_watermarks"
+
+    name = Column(String(100), primary_key=True)
+    last_id = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<AnalyticsWatermark({self.name}={self.last_id})>"
+
+
 # ============================================================================
 # MODÈLE SEARCHQUERY : Suivi des recherches effectuées
 # ============================================================================
@@ -204,9 +256,10 @@ class DashboardMetric(Base):
 
 
 # Index composites pour accès rapide aux métriques par entité et période
+# L'index de recherche est unique : cible de l'upsert INSERT ... ON CONFLICT
 Index('idx_dashboard_metrics_entity', DashboardMetric.entity_type, DashboardMetric.entity_id, DashboardMetric.date)
 Index('idx_dashboard_metrics_lookup', DashboardMetric.entity_type, DashboardMetric.entity_id, 
-      DashboardMetric.metric_name, DashboardMetric.period, DashboardMetric.date)
+      DashboardMetric.metric_name, DashboardMetric.period, DashboardMetric.date, unique=True)
 
 
 # ============================================================================
@@ -323,4 +376,5 @@ class InventoryReport(Base):
 # Index pour accès rapide aux rapports d'inventaire par producteur et date
 Index('idx_inventory_reports_producer_date', InventoryReport.producer_id, InventoryReport.report_date)
 # Index pour suivre l'historique d'un produit spécifique
-Index('idx_inventory_reports_product_date', InventoryReport.product_id, InventoryReport.report_date)
\ No newline at end of file
+# Unique : un rapport par produit et par jour (cible de ON CONFLICT DO NOTHING)
+Index('idx_inventory_reports_product_date', InventoryReport.product_id, InventoryReport.report_date, unique=True)
\ No newline at end of file
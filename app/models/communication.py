@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum as SQLEnum, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum as SQLEnum, JSON, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -120,6 +120,11 @@ class Notification(Base):
     # Relations
     user = relationship("User", backref="notifications")
 
+    # Index composite pour la pagination par curseur sur (created_at, id)
+    __table_args__ = (
+        Index('ix_notifications_user_created', 'user_id', 'created_at', 'id'),
+    )
+
     def __repr__(self):
         return f"<Notification(id={self.id}, type={self.type}, user_id={self.user_id}, read={self.is_read})>"
 
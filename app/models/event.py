@@ -186,6 +186,7 @@ class Event(Base):
     __table_args__ = (
         Index('ix_events_pending', 'processed', 'triggered_at'),
         Index('ix_events_entity', 'entity_type', 'entity_id'),
+        Index('ix_events_triggered_id', 'triggered_at', 'id'),
     )
     
     def __repr__(self):
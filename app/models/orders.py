@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Numeric, Enum as SQLEnum, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Numeric, Enum as SQLEnum, JSON, Index, DDL, event
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
+from app.core.numbering import NEXT_DOCUMENT_NUMBER_DDL
 import enum
 
 
@@ -125,10 +126,26 @@ class Order(Base):
     review = relationship("Review", back_populates="order", uselist=False, cascade="all, delete-orphan")
     producer_review = relationship("ProducerReview", back_populates="order", uselist=False, cascade="all, delete-orphan")
     delivery = relationship("Delivery", back_populates="order", uselist=False)
+
+    # Index composites pour la pagination par curseur sur (created_at, id)
+    # ix_orders_created : agrégats journaliers sur des plages [jour, jour + 1)
+    __table_args__ = (
+        Index('ix_orders_user_created', 'user_id', 'created_at', 'id'),
+        Index('ix_orders_producer_created', 'producer_id', 'created_at', 'id'),
+        Index('ix_orders_created', 'created_at'),
+    )
     
     def __repr__(self):
         return f"<Order(id={self.id}, order_number='{self.order_number}', status={self.status}, total={self.total_amount})>"
 
+
+# Numérotation des commandes et factures par séquences (voir app/core/numbering.py)
+event.listen(
+    Order.__table__,
+    "after_create",
+    DDL(NEXT_DOCUMENT_NUMBER_DDL).execute_if(dialect="postgresql")
+)
+
 class OrderItem(Base):
     """Article d'une commande"""
     __tablename__ = "order_items"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric, DateTime, Boolean, ForeignKey, Text, Enum as SQLEnum, JSON
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, Boolean, ForeignKey, Text, Enum as SQLEnum, JSON, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -73,6 +73,14 @@ class PayoutStatus(str, enum.Enum):
     COMPLETED = "completed"
 
 
+class PayoutRunStatus(str, enum.Enum):
+    """
+    Statuts d'un traitement groupé de versements.
+    """
+    RUNNING = "running"
+    COMPLETED = "completed"
+
+
 # ============================================================================
 # MODÈLE PAYMENT : Transaction de paiement
 # ============================================================================
@@ -267,4 +275,40 @@ class ProducerPayout(Base):
     paid_at = Column(DateTime, nullable=True)  # Date du versement effectif
     
     # Relations
-    producer = relationship("ProducerProfile", back_populates="payouts")
\ No newline at end of file
+    producer = relationship("ProducerProfile", back_populates="payouts")
+
+    # Anti-jointure "versement déjà créé pour la période" du traitement groupé
+    __table_args__ = (
+        Index('ix_producer_payouts_period', 'period_start', 'period_end', 'producer_id'),
+    )
+
+
+class PayoutRun(Base):
+    """
+    Point de reprise d'un traitement groupé de versements (une ligne par période).
+    
+    Les versements sont insérés par lots ; chaque lot avance
+    `last_producer_id` dans la même transaction. Après un arrêt brutal, le
+    traitement reprend après le dernier producteur validé.
+    """
+    __tablename__ = "payout_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    
+    # Période traitée
+    period_start = Column(DateTime, nullable=False)
+    period_end = Column(DateTime, nullable=False)
+    
+    # Avancement
+    status = Column(SQLEnum(PayoutRunStatus), default=PayoutRunStatus.RUNNING, nullable=False)
+    last_producer_id = Column(Integer, default=0, nullable=False)  # Producteurs <= traités
+    payouts_created = Column(Integer, default=0, nullable=False)
+    
+    # Horodatage
+    started_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    completed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint('period_start', 'period_end', name='uq_payout_runs_period'),
+    )
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Numeric, Date, Table, Enum as SQLEnum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Numeric, Date, Table, Index, DDL, FetchedValue, event, Enum as SQLEnum
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from app.core.database import Base
 import enum
 
@@ -53,6 +54,8 @@ class Category(Base):
     description = Column(Text, nullable=True)
     icon = Column(String(100), nullable=True)  # Nom de l'icône ou emoji
     parent_id = Column(Integer, ForeignKey('categories.id', ondelete='CASCADE'), nullable=True)
+    # Chemin matérialisé des ancêtres, ex. "/1/4/" (maintenu par trigger)
+    path = Column(Text, nullable=True, server_default=FetchedValue())
     position = Column(Integer, default=0, nullable=False)  # Ordre d'affichage
     is_active = Column(Boolean, default=True, nullable=False)
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
@@ -64,10 +67,71 @@ class Category(Base):
     commissions = relationship("Commission", back_populates="category")
     tax_rates = relationship("TaxRate", back_populates="category")
 
+    # text_pattern_ops : le préfixe `path LIKE '/1/4/%'` (sous-arbre) utilise l'index
+    __table_args__ = (
+        Index('ix_categories_path', 'path', postgresql_ops={'path': 'text_pattern_ops'}),
+    )
+
     def __repr__(self):
         return f"<Category(id={self.id}, name='{self.name}', parent_id={self.parent_id})>"
 
 
+# Maintien du chemin matérialisé : calculé à l'insertion et au changement de
+# parent (un cycle est refusé), puis propagé au sous-arbre en une requête.
+# La suppression d'une catégorie supprime son sous-arbre (ON DELETE CASCADE).
+# Ces mêmes objets sont créés par la migration Alembic f3b7d1a9c4e6 sur une base existante.
+CATEGORY_PATH_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION categories_path_update() RETURNS trigger AS $$
+    DECLARE
+        parent_path text;
+    BEGIN
+        IF NEW.parent_id IS NULL THEN
+            NEW.path := '/' || NEW.id || '/';
+        ELSE
+            SELECT path INTO parent_path FROM categories WHERE id = NEW.parent_id;
+            IF position('/' || NEW.id || '/' in parent_path) > 0 THEN
+                RAISE EXCEPTION 'Cycle dans la hiérarchie des catégories';
+            END IF;
+            NEW.path := parent_path || NEW.id || '/';
+        END IF;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION categories_subtree_path_update() RETURNS trigger AS $$
+    BEGIN
+        UPDATE categories
+        SET path = NEW.path || substr(path, length(OLD.path) + 1)
+        WHERE starts_with(path, OLD.path) AND id <> NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS categories_path_trigger ON categories",
+    """
+    CREATE TRIGGER categories_path_trigger
+        BEFORE INSERT OR UPDATE OF parent_id ON categories
+        FOR EACH ROW EXECUTE FUNCTION categories_path_update()
+    """,
+    "DROP TRIGGER IF EXISTS categories_subtree_path_trigger ON categories",
+    """
+    CREATE TRIGGER categories_subtree_path_trigger
+        AFTER UPDATE OF parent_id ON categories
+        FOR EACH ROW WHEN (OLD.path IS DISTINCT FROM NEW.path)
+        EXECUTE FUNCTION categories_subtree_path_update()
+    """,
+]
+
+for _statement in CATEGORY_PATH_DDL:
+    event.listen(
+        Category.__table__,
+        "after_create",
+        DDL(_statement).execute_if(dialect="postgresql")
+    )
+
+
 class Tag(Base):
     """Tags pour classifier les produits de manière transversale"""
     __tablename__ = "tags"
@@ -139,6 +203,10 @@ class Product(Base):
     created_at = Column(DateTime, server_default=func.now(), nullable=False)
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
 
+    # Recherche plein texte : maintenu par le trigger products_search_vector_update (voir plus bas)
+    # Chargement différé pour ne pas transférer le tsvector à chaque SELECT
+    search_vector = deferred(Column(TSVECTOR, nullable=True))
+
     # Relations
     producer = relationship("ProducerProfile", backref="products")
     category = relationship("Category", back_populates="products")
@@ -154,11 +222,78 @@ class Product(Base):
     wishlist_items = relationship("WishlistItem", back_populates="product", cascade="all, delete-orphan")
     followers = relationship("ProductFollow", back_populates="product", cascade="all, delete-orphan")
 
+    # Index GIN pour la recherche plein texte (@@)
+    # Index composites pour la pagination par curseur sur (created_at, id)
+    # Slug unique par producteur : cible de l'upsert de l'import de catalogue
+    __table_args__ = (
+        Index('ix_products_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('uq_products_producer_slug', 'producer_id', 'slug', unique=True),
+        Index('ix_products_producer_created', 'producer_id', 'created_at', 'id'),
+        Index('ix_products_active_created', 'is_active', 'created_at', 'id'),
+    )
 
     def __repr__(self):
         return f"<Product(id={self.id}, name='{self.name}', price={self.price})>"
 
 
+# ============= Full-text search (PostgreSQL) =============
+
+# Configuration de recherche française insensible aux accents ("tomate" == "tomâte")
+PRODUCT_SEARCH_CONFIG = "french_unaccent"
+
+# Objets PostgreSQL nécessaires à la recherche : extensions, configuration texte,
+# fonction unaccent IMMUTABLE (indexable), trigger de maintien du tsvector et
+# index trigramme pour les mots partiels ou mal orthographiés.
+# Ces mêmes objets sont créés par la migration Alembic c1d4e8f2a9b3 sur une base existante.
+PRODUCT_SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'french_unaccent') THEN
+            CREATE TEXT SEARCH CONFIGURATION french_unaccent (COPY = french);
+            ALTER TEXT SEARCH CONFIGURATION french_unaccent
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, french_stem;
+        END IF;
+    END
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text AS $$
+        SELECT public.unaccent('public.unaccent', $1)
+    $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    """,
+    """
+    CREATE OR REPLACE FUNCTION products_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('french_unaccent', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('french_unaccent', coalesce(NEW.description, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS products_search_vector_trigger ON products",
+    """
+    CREATE TRIGGER products_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF name, description ON products
+        FOR EACH ROW EXECUTE FUNCTION products_search_vector_update()
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_products_name_trgm
+        ON products USING gin (immutable_unaccent(lower(name)) gin_trgm_ops)
+    """,
+]
+
+for _statement in PRODUCT_SEARCH_DDL:
+    event.listen(
+        Product.__table__,
+        "after_create",
+        DDL(_statement).execute_if(dialect="postgresql")
+    )
+
+
 class ProductImage(Base):
     """Images de produits"""
     __tablename__ = "product_images"
@@ -169,11 +304,22 @@ class ProductImage(Base):
     alt_text = Column(String(255), nullable=True)
     position = Column(Integer, default=0, nullable=False)  # Ordre d'affichage
     is_primary = Column(Boolean, default=False, nullable=False)
+    # Images uploadées : SHA-256 du contenu et déclinaisons générées
+    # ({"thumb": {"width": ..., "height": ..., "webp": url, "jpeg": url}, ...})
+    content_hash = Column(String(64), nullable=True, index=True)
+    renditions = Column(JSONB, nullable=True)
     uploaded_at = Column(DateTime, server_default=func.now(), nullable=False)
 
     # Relations
     product = relationship("Product", back_populates="images")
 
+    @property
+    def thumbnail_url(self) -> str:
+        """Vignette WebP si l'image a des déclinaisons, sinon l'URL d'origine"""
+        if self.renditions and "thumb" in self.renditions:
+            return self.renditions["thumb"]["webp"]
+        return self.url
+
     def __repr__(self):
         return f"<ProductImage(id={self.id}, product_id={self.product_id}, is_primary={self.is_primary})>"
 
@@ -236,6 +382,11 @@ class StockMovement(Base):
     product = relationship("Product", back_populates="stock_movements")
     created_by_user = relationship("User", foreign_keys=[created_by])
 
+    # Agrégats journaliers (rapports d'inventaire) sur des plages [jour, jour + 1)
+    __table_args__ = (
+        Index('ix_stock_movements_created', 'created_at'),
+    )
+
     def __repr__(self):
         return f"<StockMovement(id={self.id}, product_id={self.product_id}, type={self.type}, quantity={self.quantity})>"
 
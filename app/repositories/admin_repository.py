@@ -2,9 +2,13 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime, date, timedelta, timezone
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
+from app.core.pagination import paginate_keyset
+from app.core.settings_cache import SETTINGS_VERSION_KEY, get_settings_cache, parse_setting_value
 from app.models.admin import (
     AdminAction,
+    CacheVersion,
     BannedUser,
     ContentModeration,
     SystemSetting,
@@ -44,15 +48,19 @@ class AdminActionRepository:
         db: Session,
         admin_id: int,
         limit: int = 100,
-        offset: int = 0
+        offset: int = 0,
+        cursor: Optional[str] = None
     ) -> List[AdminAction]:
         """
         Récupère toutes les actions effectuées par un administrateur spécifique.
         Utile pour auditer l'activité d'un admin ou générer des rapports.
+        Avec `cursor`, pagination par curseur sur (created_at, id).
         """
-        return db.query(AdminAction).filter(
-            AdminAction.admin_id == admin_id
-        ).order_by(
+        query = db.query(AdminAction).filter(AdminAction.admin_id == admin_id)
+        if cursor is not None:
+            return paginate_keyset(query, [AdminAction.created_at, AdminAction.id], cursor, limit)
+        
+        return query.order_by(
             AdminAction.created_at.desc()
         ).offset(offset).limit(limit).all()
     
@@ -120,11 +128,13 @@ class AdminActionRepository:
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
         limit: int = 100,
-        offset: int = 0
+        offset: int = 0,
+        cursor: Optional[str] = None
     ) -> List[AdminAction]:
         """
         Recherche avancée dans le journal d'audit avec plusieurs filtres combinables.
         Permet de construire des requêtes complexes pour l'analyse.
+        Avec `cursor`, pagination par curseur sur (created_at, id) au lieu de l'offset.
         """
         query = db.query(AdminAction)
         
@@ -143,6 +153,9 @@ class AdminActionRepository:
         if end_date:
             query = query.filter(AdminAction.created_at <= end_date)
         
+        if cursor is not None:
+            return paginate_keyset(query, [AdminAction.created_at, AdminAction.id], cursor, limit)
+        
         return query.order_by(
             AdminAction.created_at.desc()
         ).offset(offset).limit(limit).all()
@@ -467,10 +480,31 @@ class SystemSettingRepository:
     def create(db: Session, setting: SystemSetting) -> SystemSetting:
         """Crée un nouveau paramètre système"""
         db.add(setting)
-        db.commit()
+        SystemSettingRepository._commit_new_version(db)
         db.refresh(setting)
         return setting
     
+    @staticmethod
+    def bump_version(db: Session) -> int:
+        """
+        Incrémente le compteur de version des paramètres, sans valider :
+        le nouveau numéro devient visible avec l'écriture qui l'accompagne.
+        """
+        statement = pg_insert(CacheVersion).values(
+            name=SETTINGS_VERSION_KEY, version=1
+        ).on_conflict_do_update(
+            index_elements=[CacheVersion.name],
+            set_={"version": CacheVersion.version + 1, "updated_at": func.now()}
+        ).returning(CacheVersion.version)
+        return db.execute(statement).scalar_one()
+    
+    @staticmethod
+    def _commit_new_version(db: Session) -> None:
+        """Valide une écriture avec sa nouvelle version, puis revalide le cache local"""
+        SystemSettingRepository.bump_version(db)
+        db.commit()
+        get_settings_cache().invalidate()
+    
     @staticmethod
     def get_by_id(db: Session, setting_id: int) -> Optional[SystemSetting]:
         """Récupère un paramètre par son ID"""
@@ -495,18 +529,7 @@ class SystemSettingRepository:
         if not setting:
             return default
         
-        # Conversion selon le type
-        if setting.type == "boolean":
-            return setting.value.lower() in ['true', '1', 'yes']
-        elif setting.type == "integer":
-            return int(setting.value)
-        elif setting.type == "float":
-            return float(setting.value)
-        elif setting.type == "json":
-            import json
-            return json.loads(setting.value)
-        else:
-            return setting.value
+        return parse_setting_value(setting.type, setting.value)
     
     @staticmethod
     def get_all(db: Session) -> List[SystemSetting]:
@@ -536,7 +559,7 @@ class SystemSettingRepository:
     @staticmethod
     def update(db: Session, setting: SystemSetting) -> SystemSetting:
         """Met à jour un paramètre système"""
-        db.commit()
+        SystemSettingRepository._commit_new_version(db)
         db.refresh(setting)
         return setting
     
@@ -560,7 +583,7 @@ class SystemSettingRepository:
     def delete(db: Session, setting: SystemSetting) -> None:
         """Supprime un paramètre système"""
         db.delete(setting)
-        db.commit()
+        SystemSettingRepository._commit_new_version(db)
 
 
 class CommissionRepository:
@@ -1,11 +1,16 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func, desc
+from sqlalchemy import and_, case, true, func, desc, insert, select, update, cast, column, values, literal, text, tuple_, union, union_all, Integer, String, Date, DateTime
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from typing import List, Optional, Dict, Tuple
 from datetime import datetime, date, timedelta, timezone
 from decimal import Decimal
 
+from app.core.hyperloglog import HyperLogLog, hash_value
+from app.models.auth import User
+from app.models.products import Product, StockMovement, StockMovementType
+from app.models.orders import Order, OrderItem, OrderStatus
 from app.models.analytics import (
-    ProductView, SearchQuery, DashboardMetric, SalesReport, InventoryReport,
+    ProductView, ProductViewDaily, AnalyticsWatermark, SearchQuery, DashboardMetric, SalesReport, InventoryReport,
     EntityType, MetricName, MetricPeriod
 )
 
@@ -21,51 +26,238 @@ class ProductViewRepository:
     Ce repository permet de tracker chaque consultation de produit et
     d'extraire des statistiques utiles pour comprendre le comportement
     des utilisateurs et identifier les produits populaires.
+    
+    Les comptages lisent le cumul journalier (product_view_daily) pour les
+    jours clos et la table brute uniquement pour aujourd'hui et les vues
+    au-delà du repère de compaction : leur coût ne dépend pas de la taille
+    de l'historique brut.
     """
     
+    WATERMARK_NAME = "product_views_daily"
+    # Vues brutes repliées par transaction de compaction
+    COMPACTION_CHUNK_SIZE = 500_000
+    # Clés (product_id, day) par lecture des sketches existants
+    SKETCH_LOOKUP_SIZE = 5_000
+    
     def __init__(self, db: Session):
         self.db = db
     
-    def create(self, product_id: int, user_id: Optional[int] = None,
-               session_id: Optional[str] = None, referrer: Optional[str] = None) -> ProductView:
+    def bulk_create(self, views: List[Dict]) -> int:
         """
-        Enregistre une vue de produit.
-        
-        Cette méthode est appelée chaque fois qu'un utilisateur consulte
-        la page d'un produit. Elle permet de construire un historique
-        complet des consultations pour l'analyse future.
+        Insère un lot de vues en une seule requête INSERT ... SELECT FROM VALUES.
+
+        Les vues d'un produit inexistant sont écartées et un user_id inconnu
+        est remplacé par NULL, pour qu'une seule vue invalide ne fasse pas
+        échouer tout le lot. Ne commite pas ; retourne le nombre de lignes insérées.
         """
-        view = ProductView(
-            product_id=product_id,
-            user_id=user_id,
-            session_id=session_id,
-            referrer=referrer
+        if not views:
+            return 0
+        incoming = values(
+            column("product_id", Integer), column("user_id", Integer),
+            column("session_id", String), column("referrer", String), column("viewed_at", DateTime),
+            name="incoming_views"
+        ).data([
+            (view["product_id"], view.get("user_id"), view.get("session_id"),
+             view.get("referrer"), view["viewed_at"])
+            for view in views
+        ])
+        rows = (
+            select(incoming.c.product_id, User.id, incoming.c.session_id,
+                   incoming.c.referrer, incoming.c.viewed_at)
+            .join(Product, Product.id == incoming.c.product_id)
+            # VALUES ne type pas une colonne entièrement NULL (text par défaut)
+            .outerjoin(User, User.id == cast(incoming.c.user_id, Integer))
         )
-        self.db.add(view)
-        self.db.commit()
-        self.db.refresh(view)
-        return view
+        result = self.db.execute(
+            insert(ProductView).from_select(
+                ["product_id", "user_id", "session_id", "referrer", "viewed_at"], rows
+            )
+        )
+        return result.rowcount
     
-    def get_product_views_count(self, product_id: int, start_date: Optional[date] = None,
-                               end_date: Optional[date] = None) -> int:
+    def compact_daily_views(self, chunk_size: Optional[int] = None) -> int:
         """
-        Compte le nombre de vues d'un produit sur une période.
+        Replie les vues brutes non encore compactées dans product_view_daily.
         
-        Cette requête optimisée utilise COUNT pour éviter de charger
-        toutes les lignes en mémoire, ce qui est crucial quand il y a
-        des milliers de vues à compter.
+        Seules les vues d'id > repère sont lues. La borne haute est prise
+        sous un verrou SHARE (attente des insertions en cours) pour ne jamais
+        dépasser une ligne pas encore visible. Chaque tranche met à jour le
+        cumul et le repère dans la même transaction. Retourne le nombre de
+        vues repliées.
         """
-        query = self.db.query(func.count(ProductView.id)).filter(
-            ProductView.product_id == product_id
+        chunk_size = chunk_size or self.COMPACTION_CHUNK_SIZE
+        if self.db.get_bind().dialect.name == "postgresql":
+            # Bref : les écritures de vues sont différées (view_buffer)
+            self.db.execute(text("LOCK TABLE product_views IN SHARE MODE"))
+        upper_id = self.db.query(func.max(ProductView.id)).scalar() or 0
+        self.db.commit()
+        
+        folded = 0
+        while True:
+            watermark = self._lock_watermark()
+            if watermark.last_id >= upper_id:
+                self.db.commit()
+                return folded
+            chunk_end = min(watermark.last_id + chunk_size, upper_id)
+            counts = (
+                select(
+                    ProductView.product_id,
+                    cast(ProductView.viewed_at, Date).label("day"),
+                    func.count().label("view_count")
+                )
+                .where(ProductView.id > watermark.last_id, ProductView.id <= chunk_end)
+                .group_by(ProductView.product_id, cast(ProductView.viewed_at, Date))
+            )
+            statement = pg_insert(ProductViewDaily).from_select(["product_id", "day", "view_count"], counts)
+            self.db.execute(statement.on_conflict_do_update(
+                index_elements=[ProductViewDaily.product_id, ProductViewDaily.day],
+                set_={"view_count": ProductViewDaily.view_count + statement.excluded.view_count}
+            ))
+            folded += self.db.query(func.count(ProductView.id)).filter(
+                ProductView.id > watermark.last_id, ProductView.id <= chunk_end
+            ).scalar()
+            self._fold_visitor_sketches(watermark.last_id, chunk_end)
+            watermark.last_id = chunk_end
+            self.db.commit()
+    
+    def _fold_visitor_sketches(self, after_id: int, upto_id: int) -> None:
+        """Ajoute les visiteurs des vues (after_id, upto_id] aux sketches journaliers"""
+        visitor = self._visitor_key()
+        rows = self.db.execute(
+            select(ProductView.product_id, cast(ProductView.viewed_at, Date), visitor)
+            .where(ProductView.id > after_id, ProductView.id <= upto_id, visitor.isnot(None))
+            .distinct()
+            .execution_options(yield_per=50_000)
+        )
+        hashes: Dict[Tuple[int, date], List[int]] = {}
+        for product_id, day, visitor_key in rows:
+            hashes.setdefault((product_id, day), []).append(hash_value(visitor_key))
+        if not hashes:
+            return
+        
+        # Les nouveaux visiteurs s'ajoutent directement au sketch existant
+        sketches = {key: HyperLogLog() for key in hashes}
+        keys = list(hashes)
+        for offset in range(0, len(keys), self.SKETCH_LOOKUP_SIZE):
+            existing = self.db.execute(
+                select(ProductViewDaily.product_id, ProductViewDaily.day, ProductViewDaily.visitor_sketch)
+                .where(
+                    tuple_(ProductViewDaily.product_id, ProductViewDaily.day).in_(
+                        keys[offset:offset + self.SKETCH_LOOKUP_SIZE]
+                    ),
+                    ProductViewDaily.visitor_sketch.isnot(None)
+                )
+            )
+            for product_id, day, data in existing:
+                sketches[(product_id, day)] = HyperLogLog.from_bytes(data)
+        for key, sketch in sketches.items():
+            for hashed in hashes[key]:
+                sketch.add_hash(hashed)
+        self.db.execute(update(ProductViewDaily), [
+            {"product_id": product_id, "day": day, "visitor_sketch": sketch.to_bytes()}
+            for (product_id, day), sketch in sketches.items()
+        ])
+    
+    @staticmethod
+    def _visitor_key():
+        """Identifiant du visiteur : utilisateur connecté, sinon session anonyme"""
+        return func.coalesce(
+            literal("u:") + cast(ProductView.user_id, String),
+            literal("s:") + ProductView.session_id
         )
+    
+    def _watermark_id(self) -> int:
+        return self.db.query(AnalyticsWatermark.last_id).filter(
+            AnalyticsWatermark.name == self.WATERMARK_NAME
+        ).scalar() or 0
+    
+    def _watermark(self):
+        """Repère de compaction en sous-requête scalaire (0 avant la première compaction)"""
+        return select(func.coalesce(func.max(AnalyticsWatermark.last_id), 0)).where(
+            AnalyticsWatermark.name == self.WATERMARK_NAME
+        ).scalar_subquery()
+    
+    def _recent_view_filters(self, start_date: Optional[date], end_date: Optional[date],
+                             product_id: Optional[int] = None, watermark=None) -> Tuple[List, List]:
+        """
+        Conditions des deux branches brutes : traîne non compactée des jours
+        clos (id > repère) et vues d'aujourd'hui. Disjointes (pas de OR),
+        chacune peut utiliser son index.
         
+        Par défaut, le repère est lu par la requête même qui lit le cumul :
+        un seul instantané, si bien qu'une tranche de compaction validée
+        entre-temps (READ COMMITTED) ne peut pas être comptée deux fois.
+        """
+        today = date.today()
+        if watermark is None:
+            watermark = self._watermark()
+        tail = [ProductView.id > watermark, ProductView.viewed_at < today]
+        current = [ProductView.viewed_at >= today]
+        common = []
+        if product_id is not None:
+            common.append(ProductView.product_id == product_id)
         if start_date:
-            query = query.filter(ProductView.viewed_at >= start_date)
+            common.append(ProductView.viewed_at >= start_date)
         if end_date:
             # Ajouter 1 jour pour inclure toute la journée de end_date
-            query = query.filter(ProductView.viewed_at < end_date + timedelta(days=1))
+            common.append(ProductView.viewed_at < end_date + timedelta(days=1))
+        return tail + common, current + common
+    
+    def _rollup_filters(self, start_date: Optional[date], end_date: Optional[date],
+                        product_id: Optional[int] = None) -> List:
+        """Conditions sur le cumul : jours clos uniquement"""
+        conditions = [ProductViewDaily.day < date.today()]
+        if product_id is not None:
+            conditions.append(ProductViewDaily.product_id == product_id)
+        if start_date:
+            conditions.append(ProductViewDaily.day >= start_date)
+        if end_date:
+            conditions.append(ProductViewDaily.day <= end_date)
+        return conditions
+    
+    def _lock_watermark(self) -> AnalyticsWatermark:
+        """Repère de compaction verrouillé (créé à 0 au premier passage)"""
+        self.db.execute(
+            pg_insert(AnalyticsWatermark)
+            .values(name=self.WATERMARK_NAME, last_id=0)
+            .on_conflict_do_nothing(index_elements=[AnalyticsWatermark.name])
+        )
+        return self.db.query(AnalyticsWatermark).filter(
+            AnalyticsWatermark.name == self.WATERMARK_NAME
+        ).with_for_update().populate_existing().one()
+    
+    def _daily_counts(self, start_date: Optional[date], end_date: Optional[date],
+                      product_id: Optional[int] = None):
+        """
+        Sous-requête (product_id, day, view_count) couvrant [start_date, end_date].
         
-        return query.scalar() or 0
+        - jours clos : cumul product_view_daily
+        - aujourd'hui, et vues pas encore compactées (id > repère) : table brute
+        Les vues d'aujourd'hui déjà compactées sont ignorées côté cumul, si
+        bien qu'aucune vue n'est comptée deux fois.
+        """
+        rollup = select(
+            ProductViewDaily.product_id, ProductViewDaily.day, ProductViewDaily.view_count
+        ).where(*self._rollup_filters(start_date, end_date, product_id))
+        raw_day = cast(ProductView.viewed_at, Date)
+        raw = select(ProductView.product_id, raw_day.label("day"), func.count().label("view_count"))
+        tail, current = self._recent_view_filters(start_date, end_date, product_id)
+        
+        return union_all(
+            rollup,
+            raw.where(*tail).group_by(ProductView.product_id, raw_day),
+            raw.where(*current).group_by(ProductView.product_id, raw_day)
+        ).subquery("daily_counts")
+    
+    def get_product_views_count(self, product_id: int, start_date: Optional[date] = None,
+                               end_date: Optional[date] = None) -> int:
+        """
+        Compte le nombre de vues d'un produit sur une période.
+        
+        Somme du cumul journalier et des vues brutes récentes (voir _daily_counts).
+        """
+        counts = self._daily_counts(start_date, end_date, product_id)
+        return self.db.query(func.coalesce(func.sum(counts.c.view_count), 0)).scalar() or 0
     
     def get_top_viewed_products(self, limit: int = 10, start_date: Optional[date] = None,
                                end_date: Optional[date] = None) -> List[Tuple[int, int]]:
@@ -76,19 +268,20 @@ class ProductViewRepository:
         nombre de vues décroissant. Utile pour identifier les produits
         qui attirent le plus d'attention.
         """
-        query = self.db.query(
-            ProductView.product_id,
-            func.count(ProductView.id).label('view_count')
-        )
-        
-        if start_date:
-            query = query.filter(ProductView.viewed_at >= start_date)
-        if end_date:
-            query = query.filter(ProductView.viewed_at < end_date + timedelta(days=1))
-        
-        return query.group_by(ProductView.product_id).order_by(
-            desc('view_count')
-        ).limit(limit).all()
+        counts = self._daily_counts(start_date, end_date)
+        view_count = func.sum(counts.c.view_count).label("view_count")
+        rows = self.db.query(counts.c.product_id, view_count).group_by(
+            counts.c.product_id
+        ).order_by(desc("view_count"), counts.c.product_id).limit(limit).all()
+        return [(row.product_id, int(row.view_count)) for row in rows]
+    
+    def get_views_per_product(self, start_date: Optional[date] = None,
+                              end_date: Optional[date] = None):
+        """Sous-requête (product_id, view_count) : vues de chaque produit sur la période"""
+        counts = self._daily_counts(start_date, end_date)
+        return select(
+            counts.c.product_id, func.sum(counts.c.view_count).label("view_count")
+        ).group_by(counts.c.product_id).subquery("views_per_product")
     
     def get_views_by_date(self, product_id: int, start_date: date,
                          end_date: date) -> List[Tuple[date, int]]:
@@ -99,40 +292,55 @@ class ProductViewRepository:
         permet de visualiser l'évolution de l'intérêt pour un produit
         au fil du temps et de détecter les pics d'activité.
         """
+        counts = self._daily_counts(start_date, end_date, product_id)
         results = self.db.query(
-            func.date(ProductView.viewed_at).label('view_date'),
-            func.count(ProductView.id).label('view_count')
-        ).filter(
-            and_(
-                ProductView.product_id == product_id,
-                ProductView.viewed_at >= start_date,
-                ProductView.viewed_at < end_date + timedelta(days=1)
-            )
-        ).group_by('view_date').order_by('view_date').all()
+            counts.c.day.label("view_date"), func.sum(counts.c.view_count).label("view_count")
+        ).group_by(counts.c.day).order_by(counts.c.day).all()
         
-        return [(row.view_date, row.view_count) for row in results]
+        return [(row.view_date, int(row.view_count)) for row in results]
     
     def get_unique_viewers(self, product_id: int, start_date: Optional[date] = None,
-                          end_date: Optional[date] = None) -> int:
+                          end_date: Optional[date] = None, exact: bool = False) -> int:
         """
         Compte le nombre de visiteurs uniques d'un produit.
         
         Un visiteur unique est compté une seule fois, même s'il consulte
         le produit plusieurs fois. Cette métrique donne une meilleure
         idée de la portée réelle d'un produit.
+        
+        Par défaut, estimation HyperLogLog : fusion des sketches des jours
+        clos et des visiteurs des vues récentes (erreur type 1,63 %, voir
+        app/core/hyperloglog.py). `exact=True` compte sur la table brute.
         """
-        query = self.db.query(
-            func.count(func.distinct(
-                func.coalesce(ProductView.user_id, ProductView.session_id)
-            ))
-        ).filter(ProductView.product_id == product_id)
+        visitor = self._visitor_key()
+        if exact:
+            query = self.db.query(func.count(func.distinct(visitor))).filter(
+                ProductView.product_id == product_id
+            )
+            if start_date:
+                query = query.filter(ProductView.viewed_at >= start_date)
+            if end_date:
+                query = query.filter(ProductView.viewed_at < end_date + timedelta(days=1))
+            return query.scalar() or 0
         
-        if start_date:
-            query = query.filter(ProductView.viewed_at >= start_date)
-        if end_date:
-            query = query.filter(ProductView.viewed_at < end_date + timedelta(days=1))
+        # Repère lu avant les sketches : une compaction intercalée ne fait
+        # qu'ajouter à nouveau des visiteurs déjà présents (union idempotente)
+        watermark = self._watermark_id()
+        sketch = HyperLogLog()
+        sketches = self.db.query(ProductViewDaily.visitor_sketch).filter(
+            *self._rollup_filters(start_date, end_date, product_id),
+            ProductViewDaily.visitor_sketch.isnot(None)
+        )
+        for (data,) in sketches:
+            sketch.merge(HyperLogLog.from_bytes(data))
         
-        return query.scalar() or 0
+        tail, current = self._recent_view_filters(start_date, end_date, product_id, watermark)
+        recent_visitors = union(
+            select(visitor).where(*tail, visitor.isnot(None)),
+            select(visitor).where(*current, visitor.isnot(None))
+        )
+        sketch.update(self.db.execute(recent_visitors).scalars())
+        return len(sketch)
 
 
 # ============================================================================
@@ -317,6 +525,111 @@ class DashboardMetricRepository:
             self.db.refresh(metric)
             return metric
     
+    def get_entity_totals(self, entity_type: EntityType, start_date: date, end_date: date,
+                          entity_ids: Optional[List[int]] = None):
+        """
+        CTE (entity_id, views, sales, revenue) de toutes les entités d'un type.
+        
+        Deux agrégats groupés par produit (vues, ventes des commandes
+        terminées) puis regroupés par produit, producteur ou catégorie :
+        le coût ne dépend plus du nombre d'entités. Période [start_date, end_date].
+        """
+        views = ProductViewRepository(self.db).get_views_per_product(start_date, end_date)
+        sold = select(
+            OrderItem.product_id,
+            func.sum(OrderItem.quantity).label("sales"),
+            func.sum(OrderItem.subtotal).label("revenue")
+        ).join(Order, Order.id == OrderItem.order_id).where(
+            Order.status == OrderStatus.COMPLETED,
+            Order.created_at >= start_date,
+            Order.created_at < end_date + timedelta(days=1)
+        ).group_by(OrderItem.product_id).subquery("product_sales")
+        
+        entity_id = {
+            EntityType.PRODUCT: Product.id,
+            EntityType.PRODUCER: Product.producer_id,
+            EntityType.CATEGORY: Product.category_id,
+        }[entity_type]
+        query = select(
+            entity_id.label("entity_id"),
+            func.coalesce(func.sum(views.c.view_count), 0).label("views"),
+            func.coalesce(func.sum(sold.c.sales), 0).label("sales"),
+            func.coalesce(func.sum(sold.c.revenue), 0).label("revenue")
+        ).select_from(Product).outerjoin(
+            views, views.c.product_id == Product.id
+        ).outerjoin(
+            sold, sold.c.product_id == Product.id
+        ).where(entity_id.isnot(None)).group_by(entity_id)
+        if entity_ids is not None:
+            query = query.where(entity_id.in_(entity_ids))
+        return query.cte("entity_totals")
+    
+    def _upsert_totals_statement(self, entity_type: EntityType, totals, period: MetricPeriod,
+                                 metric_date: date):
+        """
+        INSERT ... SELECT ... ON CONFLICT DO UPDATE des métriques de `totals`.
+        
+        Sur l'index unique de recherche : vues, ventes, revenu et taux de
+        conversion (si des vues existent) de chaque entité.
+        """
+        def metric_rows(metric_name: MetricName, value, *conditions):
+            return select(
+                cast(literal(entity_type.name), DashboardMetric.entity_type.type),
+                totals.c.entity_id,
+                cast(literal(metric_name.name), DashboardMetric.metric_name.type),
+                cast(value, DashboardMetric.value.type),
+                cast(literal(period.name), DashboardMetric.period.type),
+                literal(metric_date, Date)
+            ).where(*conditions)
+        
+        rows = union_all(
+            metric_rows(MetricName.VIEWS, totals.c.views),
+            metric_rows(MetricName.SALES, totals.c.sales),
+            metric_rows(MetricName.REVENUE, totals.c.revenue),
+            metric_rows(MetricName.CONVERSION_RATE, totals.c.sales * 100.0 / totals.c.views,
+                        totals.c.views > 0)
+        )
+        statement = pg_insert(DashboardMetric).from_select(
+            ["entity_type", "entity_id", "metric_name", "value", "period", "date"], rows
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[
+                DashboardMetric.entity_type, DashboardMetric.entity_id, DashboardMetric.metric_name,
+                DashboardMetric.period, DashboardMetric.date
+            ],
+            set_={"value": statement.excluded.value, "calculated_at": func.now()}
+        )
+        return statement
+    
+    def upsert_totals(self, entity_type: EntityType, totals, period: MetricPeriod,
+                      metric_date: date) -> int:
+        """
+        Écrit les métriques de `totals` (voir get_entity_totals) en une requête.
+        
+        Retourne le nombre de métriques écrites.
+        """
+        statement = self._upsert_totals_statement(entity_type, totals, period, metric_date)
+        written = self.db.execute(statement).rowcount
+        self.db.commit()
+        return written
+    
+    def upsert_totals_returning(self, entity_type: EntityType, totals, period: MetricPeriod,
+                                metric_date: date) -> Dict[int, Dict[MetricName, Decimal]]:
+        """
+        Comme upsert_totals, mais renvoie les valeurs écrites (RETURNING) :
+        {entity_id: {métrique: valeur}}. Le CTE `totals` n'est évalué qu'une
+        fois ; à réserver à quelques entités, les lignes revenant au client.
+        """
+        statement = self._upsert_totals_statement(entity_type, totals, period, metric_date)
+        statement = statement.returning(
+            DashboardMetric.entity_id, DashboardMetric.metric_name, DashboardMetric.value
+        )
+        written: Dict[int, Dict[MetricName, Decimal]] = {}
+        for entity_id, metric_name, value in self.db.execute(statement):
+            written.setdefault(entity_id, {})[metric_name] = value
+        self.db.commit()
+        return written
+    
     def get_metric(self, entity_type: EntityType, entity_id: int, metric_name: MetricName,
                    period: MetricPeriod, metric_date: date) -> Optional[DashboardMetric]:
         """Récupère une métrique spécifique"""
@@ -415,6 +728,46 @@ class SalesReportRepository:
         self.db.refresh(report)
         return report
     
+    def get_sales_totals(self, start_date: date, end_date: date,
+                         producer_ids: Optional[List[int]] = None) -> List:
+        """
+        Totaux des commandes complétées par producteur sur [start_date, end_date].
+        
+        Une requête : nombre de commandes et chiffre d'affaires groupés sur
+        orders, quantités vendues groupées sur order_items, joints par
+        producteur. Tous les producteurs si `producer_ids` est omis.
+        """
+        conditions = [
+            Order.status == OrderStatus.COMPLETED,
+            Order.created_at >= start_date,
+            Order.created_at < end_date + timedelta(days=1)
+        ]
+        if producer_ids is not None:
+            conditions.append(Order.producer_id.in_(producer_ids))
+        else:
+            conditions.append(Order.producer_id.isnot(None))
+        
+        orders = select(
+            Order.producer_id,
+            func.count(Order.id).label("total_orders"),
+            func.sum(Order.total_amount).label("total_revenue")
+        ).where(*conditions).group_by(Order.producer_id).subquery("order_totals")
+        items = select(
+            Order.producer_id,
+            func.sum(OrderItem.quantity).label("total_products_sold")
+        ).join(OrderItem, OrderItem.order_id == Order.id).where(
+            *conditions
+        ).group_by(Order.producer_id).subquery("item_totals")
+        
+        return self.db.execute(
+            select(
+                orders.c.producer_id,
+                orders.c.total_orders,
+                orders.c.total_revenue,
+                func.coalesce(items.c.total_products_sold, 0).label("total_products_sold")
+            ).outerjoin(items, items.c.producer_id == orders.c.producer_id).order_by(orders.c.producer_id)
+        ).all()
+    
     def get_by_id(self, report_id: int) -> Optional[SalesReport]:
         """Récupère un rapport par son ID"""
         return self.db.query(SalesReport).filter(SalesReport.id == report_id).first()
@@ -498,6 +851,136 @@ class InventoryReportRepository:
         self.db.refresh(report)
         return report
     
+    def generate_reports(self, start_date: date, end_date: date,
+                         producer_id: Optional[int] = None) -> List[int]:
+        """
+        Génère en une requête les rapports de [start_date, end_date] (inclus).
+        
+        Un passage groupé sur order_items/orders et stock_movements (plages
+        horaires semi-ouvertes, qui profitent des index sur created_at) donne
+        les mouvements par (produit, jour) de tous les produits actifs, de tous
+        les producteurs sauf si `producer_id` est fourni. Le stock est ensuite
+        chaîné jour après jour par fonctions de fenêtre :
+        - départ : stock final du rapport de la veille de start_date (sinon 0)
+        - un rapport déjà présent dans la plage sert de nouveau point de départ
+          et n'est pas réécrit (ON CONFLICT DO NOTHING)
+        
+        Retourne les identifiants des rapports créés.
+        """
+        day_after = end_date + timedelta(days=1)
+        days = select(
+            cast(func.generate_series(start_date, end_date, timedelta(days=1)), Date).label("day")
+        ).subquery("days")
+        
+        order_day = cast(Order.created_at, Date)
+        sold = select(
+            OrderItem.product_id, order_day.label("day"), func.sum(OrderItem.quantity).label("sold")
+        ).join(Order, Order.id == OrderItem.order_id).where(
+            Order.status.in_([OrderStatus.COMPLETED, OrderStatus.READY]),
+            Order.created_at >= start_date,
+            Order.created_at < day_after
+        ).group_by(OrderItem.product_id, order_day).subquery("sold")
+        
+        movement_day = cast(StockMovement.created_at, Date)
+        movements = select(
+            StockMovement.product_id,
+            movement_day.label("day"),
+            func.sum(StockMovement.quantity).filter(
+                StockMovement.type == StockMovementType.IN
+            ).label("received"),
+            func.sum(StockMovement.quantity).filter(
+                StockMovement.type == StockMovementType.ADJUSTMENT
+            ).label("adjusted")
+        ).where(
+            StockMovement.type.in_([StockMovementType.IN, StockMovementType.ADJUSTMENT]),
+            StockMovement.created_at >= start_date,
+            StockMovement.created_at < day_after
+        ).group_by(StockMovement.product_id, movement_day).subquery("movements")
+        
+        existing = select(
+            InventoryReport.product_id, InventoryReport.report_date, InventoryReport.stock_end
+        ).where(
+            InventoryReport.report_date >= start_date - timedelta(days=1),
+            InventoryReport.report_date <= end_date
+        ).subquery("existing")
+        previous = existing.alias("previous")
+        
+        grid = select(
+            Product.id.label("product_id"),
+            Product.producer_id,
+            Product.price,
+            days.c.day,
+            func.coalesce(movements.c.received, 0).label("received"),
+            func.coalesce(sold.c.sold, 0).label("sold"),
+            func.coalesce(movements.c.adjusted, 0).label("adjusted"),
+            existing.c.stock_end.label("existing_end"),
+            previous.c.stock_end.label("previous_end")
+        ).select_from(Product).join(days, true()).outerjoin(
+            sold, and_(sold.c.product_id == Product.id, sold.c.day == days.c.day)
+        ).outerjoin(
+            movements, and_(movements.c.product_id == Product.id, movements.c.day == days.c.day)
+        ).outerjoin(
+            existing, and_(existing.c.product_id == Product.id, existing.c.report_date == days.c.day)
+        ).outerjoin(
+            previous, and_(
+                previous.c.product_id == Product.id,
+                previous.c.report_date == start_date - timedelta(days=1)
+            )
+        ).where(Product.is_active)
+        if producer_id is not None:
+            grid = grid.where(Product.producer_id == producer_id)
+        grid = grid.subquery("grid")
+        
+        # Segment : jours qui suivent le même rapport existant (segment 0 : la veille)
+        segmented = select(
+            grid,
+            func.count(grid.c.existing_end).over(
+                partition_by=grid.c.product_id, order_by=grid.c.day
+            ).label("segment")
+        ).subquery("segmented")
+        delta = segmented.c.received - segmented.c.sold + segmented.c.adjusted
+        segment = [segmented.c.product_id, segmented.c.segment]
+        stock_end = func.coalesce(
+            func.max(segmented.c.existing_end).over(partition_by=segment),
+            segmented.c.previous_end,
+            0
+        ) + func.sum(case((segmented.c.existing_end.is_(None), delta), else_=0)).over(
+            partition_by=segment, order_by=segmented.c.day
+        )
+        chained = select(
+            segmented.c.producer_id,
+            segmented.c.product_id,
+            segmented.c.day,
+            segmented.c.received,
+            segmented.c.sold,
+            segmented.c.adjusted,
+            segmented.c.existing_end,
+            (stock_end - delta).label("stock_start"),
+            stock_end.label("stock_end"),
+            (stock_end * segmented.c.price).label("stock_value")
+        ).subquery("chained")
+        
+        statement = pg_insert(InventoryReport).from_select(
+            ["producer_id", "product_id", "report_date", "stock_start", "stock_received",
+             "stock_sold", "stock_adjusted", "stock_end", "stock_value"],
+            select(
+                chained.c.producer_id, chained.c.product_id, chained.c.day, chained.c.stock_start,
+                chained.c.received, chained.c.sold, chained.c.adjusted, chained.c.stock_end,
+                chained.c.stock_value
+            ).where(chained.c.existing_end.is_(None))
+        ).on_conflict_do_nothing(
+            index_elements=[InventoryReport.product_id, InventoryReport.report_date]
+        ).returning(InventoryReport.id)
+        created = list(self.db.scalars(statement))
+        self.db.commit()
+        return created
+    
+    def get_by_ids(self, report_ids: List[int]) -> List[InventoryReport]:
+        """Récupère des rapports par leurs IDs"""
+        if not report_ids:
+            return []
+        return self.db.query(InventoryReport).filter(InventoryReport.id.in_(report_ids)).all()
+    
     def get_by_id(self, report_id: int) -> Optional[InventoryReport]:
         """Récupère un rapport par son ID"""
         return self.db.query(InventoryReport).filter(InventoryReport.id == report_id).first()
@@ -1,10 +1,14 @@
+from sqlalchemy import and_, exists, func, or_
 from sqlalchemy.orm import Session
 from typing import Optional, List
 from datetime import datetime, timezone
 from app.models.auth import (
     User, Role, RefreshToken, PasswordReset, 
-    EmailVerification, LoginHistory
+    EmailVerification, LoginHistory, user_roles
 )
+from app.models.admin import BannedUser
+from app.models.profiles import ProducerProfile
+from app.core.principal_cache import Principal
 
 
 class UserRepository:
@@ -29,6 +33,39 @@ class UserRepository:
         """Récupère un utilisateur par son ID"""
         return self.db.query(User).filter(User.id == user_id).first()
     
+    def get_principal(self, user_id: int) -> Optional[Principal]:
+        """
+        Charge en une seule requête ce dont les dépendances de sécurité ont
+        besoin : compte actif, bannissement actif, rôles et profil producteur
+        """
+        # Un bannissement temporaire expiré ne bloque plus, même avant le passage du job de nettoyage
+        is_banned = exists().where(
+            and_(
+                BannedUser.user_id == User.id,
+                BannedUser.is_active == True,
+                or_(BannedUser.banned_until.is_(None), BannedUser.banned_until > func.now())
+            )
+        )
+        rows = (
+            self.db.query(User.id, User.is_active, is_banned.label("is_banned"), Role.name, ProducerProfile.id)
+            .outerjoin(user_roles, user_roles.c.user_id == User.id)
+            .outerjoin(Role, Role.id == user_roles.c.role_id)
+            .outerjoin(ProducerProfile, ProducerProfile.user_id == User.id)
+            .filter(User.id == user_id)
+            .order_by(user_roles.c.assigned_at, Role.id)
+            .all()
+        )
+        if not rows:
+            return None
+        first = rows[0]
+        return Principal(
+            id=first[0],
+            is_active=first[1],
+            is_banned=bool(first[2]),
+            role_names=tuple(row[3] for row in rows if row[3] is not None),
+            producer_profile_id=first[4]
+        )
+    
     def get_by_email(self, email: str) -> Optional[User]:
         """Récupère un utilisateur par son email"""
         return self.db.query(User).filter(User.email == email).first()
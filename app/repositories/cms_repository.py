@@ -1,5 +1,5 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, desc
+from sqlalchemy import or_, desc, update, func
 from typing import Optional, List
 
 from app.models.cms import Page, FAQ, BlogPost, Testimonial, FAQCategory
@@ -189,13 +189,17 @@ class BlogPostRepository:
             .all()
     
     def increment_views(self, post_id: int) -> Optional[BlogPost]:
-        """Incrémente le compteur de vues"""
-        post = self.get_by_id(post_id)
-        if not post:
-            return None
-        
-        post.views = (post.views or 0) + 1
+        """Incrémente le compteur de vues (UPDATE atomique, sans lecture préalable)"""
+        result = self.db.execute(
+            update(BlogPost)
+            .where(BlogPost.id == post_id)
+            .values(views=func.coalesce(BlogPost.views, 0) + 1)
+            .execution_options(synchronize_session=False)
+        )
         self.db.commit()
+        if not result.rowcount:
+            return None
+        post = self.get_by_id(post_id)
         self.db.refresh(post)
         return post
     
@@ -1,8 +1,10 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func, desc
-from typing import List, Optional
+from sqlalchemy import and_, cast, func, desc
+from sqlalchemy.dialects.postgresql import JSONB
+from typing import Dict, List, Optional
 from datetime import datetime, timezone, timedelta
 
+from app.core.pagination import paginate_keyset
 from app.models.communication import (
     Notification, NotificationPreference, EmailTemplate, EmailLog,
     Conversation, Message, SupportTicket, TicketMessage,
@@ -40,13 +42,17 @@ class NotificationRepository:
         return self.db.query(Notification).filter(Notification.id == notification_id).first()
     
     def get_user_notifications(self, user_id: int, skip: int = 0, 
-                               limit: int = 50, unread_only: bool = False) -> List[Notification]:
-        """Récupère les notifications d'un utilisateur"""
+                               limit: int = 50, unread_only: bool = False,
+                               cursor: Optional[str] = None) -> List[Notification]:
+        """Récupère les notifications d'un utilisateur (curseur sur (created_at, id) si `cursor` est fourni)"""
         query = self.db.query(Notification).filter(Notification.user_id == user_id)
         
         if unread_only:
             query = query.filter(~Notification.is_read)
         
+        if cursor is not None:
+            return paginate_keyset(query, [Notification.created_at, Notification.id], cursor, limit)
+        
         return query.order_by(desc(Notification.created_at)).offset(skip).limit(limit).all()
     
     def count_user_notifications(self, user_id: int, unread_only: bool = False) -> int:
@@ -311,10 +317,9 @@ class ConversationRepository:
     def get_user_conversations(self, user_id: int, skip: int = 0, 
                               limit: int = 50) -> List[Conversation]:
         """Récupère les conversations d'un utilisateur"""
-        # Note: La recherche dans le champ JSON peut varier selon la BDD
-        # Pour SQLite, on utilise json_extract
+        # Le type JSON n'a pas d'opérateur de contenance : passer par JSONB (@>)
         return self.db.query(Conversation).filter(
-            Conversation.participants.contains([user_id])
+            cast(Conversation.participants, JSONB).contains([user_id])
         ).order_by(desc(Conversation.last_message_at)).offset(skip).limit(limit).all()
     
     def find_conversation(self, user1_id: int, user2_id: int) -> Optional[Conversation]:
@@ -389,6 +394,35 @@ class MessageRepository:
                 ~Message.is_read
             )
         ).scalar()
+    
+    def get_last_messages(self, conversation_ids: List[int]) -> Dict[int, Message]:
+        """Dernier message de chaque conversation, en une seule requête"""
+        if not conversation_ids:
+            return {}
+        position = func.row_number().over(
+            partition_by=Message.conversation_id,
+            order_by=(desc(Message.sent_at), desc(Message.id))
+        ).label("position")
+        ranked = self.db.query(Message.id, position).filter(
+            Message.conversation_id.in_(conversation_ids)
+        ).subquery()
+        messages = self.db.query(Message).join(ranked, ranked.c.id == Message.id).filter(
+            ranked.c.position == 1
+        ).all()
+        return {message.conversation_id: message for message in messages}
+    
+    def count_unread_by_conversation(self, conversation_ids: List[int], user_id: int) -> Dict[int, int]:
+        """Messages non lus par conversation pour un utilisateur, en une seule requête"""
+        if not conversation_ids:
+            return {}
+        rows = self.db.query(Message.conversation_id, func.count(Message.id)).filter(
+            and_(
+                Message.conversation_id.in_(conversation_ids),
+                Message.sender_id != user_id,
+                ~Message.is_read
+            )
+        ).group_by(Message.conversation_id).all()
+        return dict(rows)
 
 
 # ============================================================================
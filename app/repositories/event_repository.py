@@ -3,6 +3,7 @@ from datetime import datetime, timedelta, timezone
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, func
 
+from app.core.pagination import paginate_keyset
 from app.models.event import (
     Event,
     WebhookEndpoint,
@@ -40,17 +41,26 @@ class EventRepository:
         return db.query(Event).filter(Event.id == event_id).first()
     
     @staticmethod
-    def get_pending(db: Session, limit: int = 100) -> List[Event]:
+    def get_pending(
+        db: Session,
+        limit: int = 100,
+        cursor: Optional[str] = None
+    ) -> List[Event]:
         """
         Récupère les événements en attente de traitement.
         
         Ces événements n'ont pas encore été traités par les webhooks ou
         autres handlers. Ils sont triés du plus ancien au plus récent
-        pour assurer un traitement dans l'ordre.
+        pour assurer un traitement dans l'ordre. Avec `cursor` ("" pour la
+        première page), la liste se parcourt par curseur sur (triggered_at, id).
         """
-        return db.query(Event).filter(
-            ~Event.processed
-        ).order_by(Event.triggered_at).limit(limit).all()
+        query = db.query(Event).filter(~Event.processed)
+        if cursor is not None:
+            return paginate_keyset(
+                query, [Event.triggered_at, Event.id], cursor, limit, descending=False
+            )
+        
+        return query.order_by(Event.triggered_at).limit(limit).all()
     
     @staticmethod
     def get_by_type(
@@ -58,13 +68,16 @@ class EventRepository:
         event_type: EventType,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
-        limit: int = 100
+        limit: int = 100,
+        cursor: Optional[str] = None
     ) -> List[Event]:
         """
         Récupère tous les événements d'un type spécifique.
         
         Par exemple, tous les événements "order.created" pour analyser
         combien de commandes ont été créées dans une période donnée.
+        Avec `cursor` ("" pour la première page), la liste se parcourt par
+        curseur sur (triggered_at, id).
         """
         query = db.query(Event).filter(Event.type == event_type)
         
@@ -74,6 +87,9 @@ class EventRepository:
         if end_date:
             query = query.filter(Event.triggered_at <= end_date)
         
+        if cursor is not None:
+            return paginate_keyset(query, [Event.triggered_at, Event.id], cursor, limit)
+        
         return query.order_by(Event.triggered_at.desc()).limit(limit).all()
     
     @staticmethod
@@ -128,19 +144,23 @@ class EventRepository:
     def get_recent(
         db: Session,
         hours: int = 24,
-        limit: int = 100
+        limit: int = 100,
+        cursor: Optional[str] = None
     ) -> List[Event]:
         """
         Récupère les événements récents.
         
         Utile pour afficher un flux d'activité en temps réel sur
-        un tableau de bord administrateur.
+        un tableau de bord administrateur. Avec `cursor` ("" pour la première
+        page), le flux se parcourt par curseur sur (triggered_at, id).
         """
         since = datetime.now(timezone.utc) - timedelta(hours=hours)
         
-        return db.query(Event).filter(
-            Event.triggered_at >= since
-        ).order_by(Event.triggered_at.desc()).limit(limit).all()
+        query = db.query(Event).filter(Event.triggered_at >= since)
+        if cursor is not None:
+            return paginate_keyset(query, [Event.triggered_at, Event.id], cursor, limit)
+        
+        return query.order_by(Event.triggered_at.desc()).limit(limit).all()
     
     @staticmethod
     def count_by_type(
@@ -3,6 +3,8 @@ from sqlalchemy import desc
 from typing import Optional, List
 from datetime import datetime
 
+from app.core.numbering import DocumentNumberGenerator
+from app.core.pagination import paginate_keyset
 from app.models.orders import (
     Cart, CartItem, Order, OrderItem, OrderStatusHistory, OrderTracking
 )
@@ -207,12 +209,15 @@ class OrderRepository:
         user_id: int,
         skip: int = 0,
         limit: int = 100,
-        status: Optional[str] = None
+        status: Optional[str] = None,
+        cursor: Optional[str] = None
     ) -> List[Order]:
-        """Récupère les commandes d'un utilisateur"""
+        """Récupère les commandes d'un utilisateur (curseur sur (created_at, id) si `cursor` est fourni)"""
         query = self.db.query(Order).filter(Order.user_id == user_id)
         if status:
             query = query.filter(Order.status == status)
+        if cursor is not None:
+            return paginate_keyset(query, [Order.created_at, Order.id], cursor, limit)
         return query.order_by(desc(Order.created_at)).offset(skip).limit(limit).all()
     
     def get_producer_orders(
@@ -220,33 +225,20 @@ class OrderRepository:
         producer_id: int,
         skip: int = 0,
         limit: int = 100,
-        status: Optional[str] = None
+        status: Optional[str] = None,
+        cursor: Optional[str] = None
     ) -> List[Order]:
-        """Récupère les commandes d'un producteur"""
+        """Récupère les commandes d'un producteur (curseur sur (created_at, id) si `cursor` est fourni)"""
         query = self.db.query(Order).filter(Order.producer_id == producer_id)
         if status:
             query = query.filter(Order.status == status)
+        if cursor is not None:
+            return paginate_keyset(query, [Order.created_at, Order.id], cursor, limit)
         return query.order_by(desc(Order.created_at)).offset(skip).limit(limit).all()
     
     def generate_order_number(self) -> str:
-        """Génère un numéro de commande unique"""
-        # Format: CMD-YYYY-NNNNNN
-        current_year = datetime.now().year
-        
-        # Récupérer le dernier numéro de l'année
-        last_order = self.db.query(Order).filter(
-            Order.order_number.like(f"CMD-{current_year}-%")
-        ).order_by(desc(Order.id)).first()
-        
-        if last_order:
-            # Extraire le numéro et l'incrémenter
-            last_number = int(last_order.order_number.split('-')[-1])
-            new_number = last_number + 1
-        else:
-            # Premier numéro de l'année
-            new_number = 1
-        
-        return f"CMD-{current_year}-{new_number:06d}"
+        """Génère un numéro de commande unique (CMD-YYYY-NNNNNN, séquence annuelle)"""
+        return DocumentNumberGenerator(self.db).next_order_number()
     
     def update(self, order: Order) -> Order:
         """
@@ -1,13 +1,16 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from sqlalchemy import and_, func, insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from typing import List, Optional
 from datetime import datetime, timezone
 from decimal import Decimal
 
 from app.models.payments import (
-    Payment, PaymentMethod, Refund, Invoice, ProducerPayout,
-    PaymentStatus, InvoiceStatus, PayoutStatus, RefundStatus
+    Payment, PaymentMethod, Refund, Invoice, ProducerPayout, PayoutRun,
+    PaymentStatus, InvoiceStatus, PayoutStatus, PayoutRunStatus, RefundStatus
 )
+from app.models.orders import Order, OrderStatus, PaymentStatus as OrderPaymentStatus
+from app.models.profiles import ProducerProfile
 from app.schemas.payments import (
     PaymentCreate, PaymentUpdate,
     PaymentMethodCreate, PaymentMethodUpdate,
@@ -106,6 +109,32 @@ class PaymentRepository:
         
         return result if result else Decimal("0")
     
+    def get_payment_totals(self, start_date: datetime, end_date: datetime):
+        """
+        Agrège les paiements d'une période en une requête.
+        
+        Une ligne : nombre et montant total, montants par statut
+        (SUM ... FILTER (WHERE status = ...)) et nombre d'échecs.
+        """
+        def amount_with_status(payment_status: PaymentStatus):
+            return func.coalesce(
+                func.sum(Payment.amount).filter(Payment.status == payment_status), 0
+            )
+        
+        return self.db.query(
+            func.count(Payment.id).label("total_payments"),
+            func.coalesce(func.sum(Payment.amount), 0).label("total_amount"),
+            amount_with_status(PaymentStatus.COMPLETED).label("completed_amount"),
+            amount_with_status(PaymentStatus.PENDING).label("pending_amount"),
+            func.count(Payment.id).filter(Payment.status == PaymentStatus.FAILED).label("failed_count"),
+            amount_with_status(PaymentStatus.REFUNDED).label("refunded_amount")
+        ).filter(
+            and_(
+                Payment.created_at >= start_date,
+                Payment.created_at <= end_date
+            )
+        ).one()
+    
     # ========================================================================
     # OPÉRATIONS CRUD - PAYMENTMETHOD
     # ========================================================================
@@ -357,6 +386,104 @@ class PaymentRepository:
         self.db.refresh(payout)
         return payout
     
+    def get_payable_order_totals(
+        self,
+        period_start: datetime,
+        period_end: datetime,
+        producer_ids: Optional[List[int]] = None
+    ) -> List:
+        """
+        Nombre et montant des commandes éligibles au versement, par producteur.
+        
+        Commandes finalisées et payées de la période, agrégées en une requête
+        groupée (tous les producteurs si `producer_ids` est omis). Les
+        producteurs sans commande éligible n'ont pas de ligne.
+        """
+        query = self.db.query(
+            Order.producer_id,
+            func.count(Order.id).label("total_orders"),
+            func.sum(Order.total_amount).label("gross_amount")
+        ).filter(
+            and_(
+                Order.status == OrderStatus.COMPLETED,
+                Order.payment_status == OrderPaymentStatus.COMPLETED,
+                Order.created_at >= period_start,
+                Order.created_at <= period_end
+            )
+        )
+        if producer_ids is not None:
+            query = query.filter(Order.producer_id.in_(producer_ids))
+        else:
+            query = query.filter(Order.producer_id.isnot(None))
+        return query.group_by(Order.producer_id).order_by(Order.producer_id).all()
+    
+    def get_payout_candidates(
+        self,
+        period_start: datetime,
+        period_end: datetime,
+        after_producer_id: int = 0
+    ) -> List:
+        """
+        Producteurs vérifiés à payer pour la période, en une requête groupée.
+        
+        Retourne (producer_id, user_id, total_orders, gross_amount) pour les
+        producteurs d'id > after_producer_id ayant des commandes éligibles et
+        pas encore de versement sur la période (anti-jointure), triés par id.
+        """
+        already_paid = self.db.query(ProducerPayout.id).filter(
+            ProducerPayout.producer_id == Order.producer_id,
+            ProducerPayout.period_start == period_start,
+            ProducerPayout.period_end == period_end
+        ).exists()
+        return self.db.query(
+            Order.producer_id,
+            ProducerProfile.user_id,
+            func.count(Order.id).label("total_orders"),
+            func.sum(Order.total_amount).label("gross_amount")
+        ).join(
+            ProducerProfile, ProducerProfile.id == Order.producer_id
+        ).filter(
+            and_(
+                ProducerProfile.is_verified,
+                Order.producer_id > after_producer_id,
+                Order.status == OrderStatus.COMPLETED,
+                Order.payment_status == OrderPaymentStatus.COMPLETED,
+                Order.created_at >= period_start,
+                Order.created_at <= period_end,
+                ~already_paid
+            )
+        ).group_by(Order.producer_id, ProducerProfile.user_id).order_by(Order.producer_id).all()
+    
+    def insert_producer_payouts(self, payouts: List[dict]) -> List[int]:
+        """Insère un lot de versements (un INSERT multi-lignes) et retourne leurs IDs"""
+        if not payouts:
+            return []
+        return list(self.db.scalars(insert(ProducerPayout).returning(ProducerPayout.id), payouts))
+    
+    def get_payouts_by_ids(self, payout_ids: List[int]) -> List[ProducerPayout]:
+        """Récupère des versements par leurs IDs (ordre croissant)"""
+        if not payout_ids:
+            return []
+        return self.db.query(ProducerPayout).filter(
+            ProducerPayout.id.in_(payout_ids)
+        ).order_by(ProducerPayout.id).all()
+    
+    def lock_payout_run(self, period_start: datetime, period_end: datetime) -> PayoutRun:
+        """Point de reprise de la période, créé au besoin et verrouillé jusqu'au commit"""
+        self.db.execute(
+            pg_insert(PayoutRun).values(
+                period_start=period_start,
+                period_end=period_end,
+                status=PayoutRunStatus.RUNNING,
+                last_producer_id=0,
+                payouts_created=0
+            ).on_conflict_do_nothing(constraint="uq_payout_runs_period")
+        )
+        return self.db.query(PayoutRun).filter(
+            PayoutRun.period_start == period_start,
+            PayoutRun.period_end == period_end
+        ).with_for_update().populate_existing().one()
+    
     def check_payout_exists_for_period(
         self,
         producer_id: int,
@@ -1,14 +1,64 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import desc, or_
-from typing import Optional, List
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import desc, or_, func, case, distinct, tuple_, cast, Numeric, Integer, column, update, values, select, insert, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from typing import Optional, List, Dict, Any, Sequence, Tuple
 from datetime import datetime
+import re
 
+from app.core.pagination import paginate_keyset
 from app.models.products import (
     Category, Tag, Unit, Product, ProductImage, ProductVariant,
-    StockMovement, StockAlert
+    StockMovement, StockAlert, PRODUCT_SEARCH_CONFIG, product_tags
 )
 
 
+# Bornes des tranches de prix des facettes (FCFA) : [0-500[, [500-1000[, ..., [10000-∞[
+PRICE_FACET_BOUNDARIES = (500, 1000, 2500, 5000, 10000)
+
+
+def lock_stock_rows(db: Session, stock_column, ids: Sequence[int]) -> Dict[int, int]:
+    """
+    Verrouille (SELECT ... FOR UPDATE) les lignes de stock dans l'ordre des id.
+
+    Tous les checkouts verrouillent dans le même ordre (produits, variantes,
+    créneau ; id croissants) : deux réservations concurrentes s'attendent au
+    lieu de s'interbloquer. Retourne {id: stock courant}.
+    """
+    model = stock_column.class_
+    rows = (
+        db.query(model.id, stock_column)
+        .filter(model.id.in_(sorted(set(ids))))
+        .order_by(model.id)
+        .with_for_update()
+        .all()
+    )
+    return dict(rows)
+
+
+def adjust_stock_rows(db: Session, stock_column, deltas: Dict[int, int]) -> List[int]:
+    """
+    Applique des variations de stock en un seul UPDATE conditionnel.
+
+    `UPDATE ... SET stock = stock + d.delta FROM (VALUES ...) d WHERE id = d.id
+    AND stock + d.delta >= 0 RETURNING id` : une ligne dont le stock deviendrait
+    négatif n'est pas modifiée et n'apparaît pas dans les id retournés.
+    """
+    if not deltas:
+        return []
+    model = stock_column.class_
+    delta_rows = values(
+        column("id", Integer), column("delta", Integer), name="stock_deltas"
+    ).data(sorted(deltas.items()))
+    statement = (
+        update(model)
+        .where(model.id == delta_rows.c.id, stock_column + delta_rows.c.delta >= 0)
+        .values({stock_column: stock_column + delta_rows.c.delta})
+        .returning(model.id)
+    )
+    return list(db.execute(statement, execution_options={"synchronize_session": "fetch"}).scalars())
+
+
 # ============= Category Repository =============
 
 class CategoryRepository:
@@ -47,6 +97,31 @@ class CategoryRepository:
             query = query.filter(Category.is_active)
         return query.all()
     
+    def get_tree(self, active_only: bool = False) -> List[Category]:
+        """
+        Récupère l'arbre des catégories en une seule requête.
+
+        Les sous-catégories de chaque nœud sont rattachées en mémoire
+        (`subcategories` marqué comme chargé) : parcourir l'arbre ne déclenche
+        aucun chargement paresseux. Avec `active_only`, une catégorie inactive
+        masque tout son sous-arbre.
+        """
+        categories = self.get_all(active_only)
+        children: Dict[int, List[Category]] = {category.id: [] for category in categories}
+        roots = []
+        for category in categories:
+            if category.parent_id is None:
+                roots.append(category)
+            elif category.parent_id in children:
+                children[category.parent_id].append(category)
+        for category in categories:
+            set_committed_value(category, "subcategories", children[category.id])
+        return roots
+    
+    def is_in_subtree(self, category: Category, root: Category) -> bool:
+        """Vrai si `category` est `root` ou l'un de ses descendants"""
+        return category.path.startswith(root.path)
+    
     def get_subcategories(self, parent_id: int, active_only: bool = False) -> List[Category]:
         """Récupère les sous-catégories d'une catégorie"""
         query = self.db.query(Category).filter(Category.parent_id == parent_id).order_by(Category.position)
@@ -184,9 +259,12 @@ class ProductRepository:
             joinedload(Product.images),
         ).filter(Product.id == product_id).first()
     
-    def get_by_slug(self, slug: str) -> Optional[Product]:
-        """Récupère un produit par son slug"""
-        return self.db.query(Product).filter(Product.slug == slug).first()
+    def get_by_slug(self, slug: str, producer_id: Optional[int] = None) -> Optional[Product]:
+        """Récupère un produit par son slug (unique par producteur)"""
+        query = self.db.query(Product).filter(Product.slug == slug)
+        if producer_id is not None:
+            query = query.filter(Product.producer_id == producer_id)
+        return query.first()
     
     def get_complete(self, product_id: int) -> Optional[Product]:
         """Récupère un produit avec toutes ses relations"""
@@ -205,9 +283,15 @@ class ProductRepository:
         skip: int = 0,
         limit: int = 100,
         active_only: bool = False,
-        category_id: Optional[int] = None
+        category_id: Optional[int] = None,
+        cursor: Optional[str] = None
     ) -> List[Product]:
-        """Récupère les produits d'un producteur"""
+        """
+        Récupère les produits d'un producteur.
+
+        Si `cursor` est fourni ("" pour la première page), la pagination se fait
+        par curseur sur (created_at, id) et `skip` est ignoré.
+        """
         query = self.db.query(Product).options(
             joinedload(Product.category),
             joinedload(Product.unit),
@@ -218,6 +302,8 @@ class ProductRepository:
             query = query.filter(Product.is_active)
         if category_id:
             query = query.filter(Product.category_id == category_id)
+        if cursor is not None:
+            return paginate_keyset(query, [Product.created_at, Product.id], cursor, limit)
         return query.order_by(desc(Product.created_at)).offset(skip).limit(limit).all()
     
     def search_products(
@@ -231,17 +317,175 @@ class ProductRepository:
         in_stock: Optional[bool] = None,
         search_term: Optional[str] = None,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        include_descendants: bool = False
     ) -> List[Product]:
-        """Recherche de produits avec filtres"""
+        """
+        Recherche de produits avec filtres.
+
+        Si `cursor` est fourni ("" pour la première page), la pagination se fait
+        par curseur sur (pertinence, created_at, id) avec un terme de recherche,
+        (created_at, id) sinon ; `skip` est alors ignoré.
+        """
         query = self.db.query(Product).options(
             joinedload(Product.category),
             joinedload(Product.unit),
             joinedload(Product.tags),
             joinedload(Product.images),
-        ).filter(Product.is_active)
+        )
+        query, relevance = self._apply_search_filters(
+            query, category_id, producer_id, tag_ids, min_price, max_price,
+            is_featured, in_stock, search_term, include_descendants
+        )
         
-        if category_id:
+        if relevance is not None:
+            # Pertinence arrondie en numeric : valeur exacte et stable dans le curseur,
+            # et même ordre des ex aequo en pagination par offset ou par curseur
+            relevance = func.round(cast(relevance, Numeric), 6)
+
+        if cursor is not None:
+            keys = [Product.created_at, Product.id]
+            if relevance is not None:
+                keys.insert(0, relevance)
+            return paginate_keyset(query, keys, cursor, limit)
+
+        if relevance is not None:
+            query = query.order_by(desc(relevance), desc(Product.created_at), desc(Product.id))
+        else:
+            query = query.order_by(desc(Product.created_at))
+        
+        return query.offset(skip).limit(limit).all()
+
+    def get_search_facets(
+        self,
+        category_id: Optional[int] = None,
+        producer_id: Optional[int] = None,
+        tag_ids: Optional[List[int]] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        is_featured: Optional[bool] = None,
+        in_stock: Optional[bool] = None,
+        search_term: Optional[str] = None,
+        price_boundaries: Sequence[float] = PRICE_FACET_BOUNDARIES,
+        include_descendants: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Calcule les facettes (catégories, tags, tranches de prix, stock) de l'ensemble filtré.
+
+        Toutes les facettes sont obtenues en un seul passage grâce à GROUPING SETS :
+        l'ensemble filtré est parcouru une fois, au lieu d'une requête par facette.
+        """
+        query = self.db.query(Product.id)
+        query, _ = self._apply_search_filters(
+            query, category_id, producer_id, tag_ids, min_price, max_price,
+            is_featured, in_stock, search_term, include_descendants
+        )
+
+        price_bucket = case(
+            *[(Product.price < boundary, index) for index, boundary in enumerate(price_boundaries)],
+            else_=len(price_boundaries)
+        )
+        filtered = query.with_entities(
+            Product.id.label("id"),
+            Product.category_id.label("category_id"),
+            price_bucket.label("price_bucket"),
+            (Product.stock_quantity > 0).label("in_stock"),
+        ).distinct().subquery()
+
+        grouping = func.grouping(
+            filtered.c.category_id,
+            product_tags.c.tag_id,
+            filtered.c.price_bucket,
+            filtered.c.in_stock
+        )
+        rows = self.db.query(
+            grouping.label("grouping"),
+            filtered.c.category_id,
+            product_tags.c.tag_id,
+            filtered.c.price_bucket,
+            filtered.c.in_stock,
+            func.count(distinct(filtered.c.id)).label("count"),
+        ).select_from(filtered).outerjoin(
+            product_tags, product_tags.c.product_id == filtered.c.id
+        ).group_by(
+            func.grouping_sets(
+                tuple_(filtered.c.category_id),
+                tuple_(product_tags.c.tag_id),
+                tuple_(filtered.c.price_bucket),
+                tuple_(filtered.c.in_stock),
+                tuple_()
+            )
+        ).all()
+
+        facets = {
+            "total": 0,
+            "categories": [],
+            "tags": [],
+            "price_ranges": [],
+            "in_stock": 0,
+            "out_of_stock": 0,
+        }
+        bucket_counts = {}
+        # GROUPING() renvoie un bit par colonne agrégée (la plus à gauche = bit de poids fort)
+        for row in rows:
+            if row.grouping == 0b0111 and row.category_id is not None:
+                facets["categories"].append({"value": row.category_id, "count": row.count})
+            elif row.grouping == 0b1011 and row.tag_id is not None:
+                facets["tags"].append({"value": row.tag_id, "count": row.count})
+            elif row.grouping == 0b1101:
+                bucket_counts[row.price_bucket] = row.count
+            elif row.grouping == 0b1110:
+                facets["in_stock" if row.in_stock else "out_of_stock"] = row.count
+            elif row.grouping == 0b1111:
+                facets["total"] = row.count
+
+        bounds = [None, *price_boundaries, None]
+        for index in range(len(price_boundaries) + 1):
+            facets["price_ranges"].append({
+                "min_price": bounds[index] or 0,
+                "max_price": bounds[index + 1],
+                "count": bucket_counts.get(index, 0),
+            })
+
+        facets["categories"].sort(key=lambda facet: (-facet["count"], facet["value"]))
+        facets["tags"].sort(key=lambda facet: (-facet["count"], facet["value"]))
+        return facets
+
+    def _apply_search_filters(
+        self,
+        query,
+        category_id: Optional[int],
+        producer_id: Optional[int],
+        tag_ids: Optional[List[int]],
+        min_price: Optional[float],
+        max_price: Optional[float],
+        is_featured: Optional[bool],
+        in_stock: Optional[bool],
+        search_term: Optional[str],
+        include_descendants: bool = False
+    ):
+        """
+        Applique les filtres de recherche communs à la liste et aux facettes.
+
+        Avec `include_descendants`, le filtre de catégorie couvre tout le
+        sous-arbre : `category_id IN (SELECT id FROM categories WHERE path LIKE
+        '/1/4/%')`, préfixe constant servi par l'index ix_categories_path.
+
+        Retourne la requête filtrée et l'expression de pertinence
+        (None si aucune recherche plein texte n'est effectuée).
+        """
+        query = query.filter(Product.is_active)
+        relevance = None
+        
+        if category_id and include_descendants:
+            path = self.db.query(Category.path).filter(Category.id == category_id).scalar()
+            if path is None:
+                query = query.filter(Product.category_id == category_id)
+            else:
+                subtree = select(Category.id).where(Category.path.like(f"{path}%"))
+                query = query.filter(Product.category_id.in_(subtree))
+        elif category_id:
             query = query.filter(Product.category_id == category_id)
         
         if producer_id:
@@ -263,15 +507,59 @@ class ProductRepository:
             query = query.filter(Product.stock_quantity > 0)
         
         if search_term:
-            search_pattern = f"%{search_term}%"
-            query = query.filter(
-                or_(
-                    Product.name.ilike(search_pattern),
-                    Product.description.ilike(search_pattern)
+            if self._supports_full_text_search():
+                search_filter, relevance = self._full_text_criteria(search_term)
+                query = query.filter(search_filter)
+            else:
+                search_pattern = f"%{search_term}%"
+                query = query.filter(
+                    or_(
+                        Product.name.ilike(search_pattern),
+                        Product.description.ilike(search_pattern)
+                    )
                 )
-            )
         
-        return query.order_by(desc(Product.created_at)).offset(skip).limit(limit).all()
+        return query, relevance
+
+    def _supports_full_text_search(self) -> bool:
+        """La recherche plein texte (tsvector + trigrammes) n'existe que sous PostgreSQL"""
+        return self.db.get_bind().dialect.name == "postgresql"
+
+    @staticmethod
+    def _build_prefix_tsquery(search_term: str) -> Optional[str]:
+        """
+        Construit une tsquery préfixée ("tomat:* & bio:*") à partir de la saisie.
+
+        Seuls les mots sont conservés : la syntaxe tsquery de l'utilisateur
+        (&, |, !, parenthèses) ne peut donc pas provoquer d'erreur SQL.
+        """
+        words = re.findall(r"\w+", search_term)
+        if not words:
+            return None
+        return " & ".join(f"{word}:*" for word in words)
+
+    def _full_text_criteria(self, search_term: str):
+        """
+        Critère de recherche plein texte et expression de pertinence.
+
+        - Le tsvector (nom poids A, description poids B) est interrogé via l'index GIN
+        - Les mots partiels ou mal orthographiés sont rattrapés par similarité
+          trigramme sur le nom (index ix_products_name_trgm)
+        - La pertinence vaut max(rang plein texte, similarité)
+        """
+        normalized_term = func.immutable_unaccent(func.lower(search_term))
+        normalized_name = func.immutable_unaccent(func.lower(Product.name))
+        trigram_match = normalized_term.op("<%")(normalized_name)
+        similarity = func.word_similarity(normalized_term, normalized_name)
+
+        prefix_query = self._build_prefix_tsquery(search_term)
+        if not prefix_query:
+            return trigram_match, similarity
+
+        ts_query = func.to_tsquery(PRODUCT_SEARCH_CONFIG, prefix_query)
+        search_filter = or_(Product.search_vector.op("@@")(ts_query), trigram_match)
+        relevance = func.greatest(func.ts_rank_cd(Product.search_vector, ts_query), similarity)
+        return search_filter, relevance
     
     def add_tags(self, product: Product, tag_ids: List[int]) -> Product:
         """Ajoute des tags à un produit"""
@@ -290,6 +578,90 @@ class ProductRepository:
         # Pas besoin de refresh ici, l'objet est toujours dans la session
         return product
     
+    def lock_stock(self, product_ids: Sequence[int]) -> Dict[int, int]:
+        """Verrouille le stock des produits (ordre des id) ; retourne {id: stock}"""
+        return lock_stock_rows(self.db, Product.stock_quantity, product_ids)
+    
+    def adjust_stock(self, deltas: Dict[int, int]) -> List[int]:
+        """Variation atomique du stock de plusieurs produits ; retourne les id modifiés"""
+        return adjust_stock_rows(self.db, Product.stock_quantity, deltas)
+    
+    def get_producer_ids(self, product_ids: Sequence[int]) -> Dict[int, int]:
+        """Producteur de chaque produit existant ; retourne {product_id: producer_id}"""
+        if not product_ids:
+            return {}
+        rows = self.db.query(Product.id, Product.producer_id).filter(Product.id.in_(set(product_ids))).all()
+        return dict(rows)
+
+    # ============= Import / export de catalogue =============
+
+    def lock_by_slugs(self, producer_id: int, slugs: Sequence[str]) -> Dict[str, Tuple[int, int]]:
+        """Verrouille les produits existants du producteur ; retourne {slug: (id, stock)}"""
+        rows = (
+            self.db.query(Product.slug, Product.id, Product.stock_quantity)
+            .filter(Product.producer_id == producer_id, Product.slug.in_(set(slugs)))
+            .order_by(Product.id)
+            .with_for_update()
+            .all()
+        )
+        return {slug: (product_id, stock) for slug, product_id, stock in rows}
+
+    def upsert_products(self, rows: List[Dict[str, Any]],
+                        update_columns: Optional[Sequence[str]] = None) -> Dict[str, int]:
+        """
+        Crée ou met à jour un lot de produits en un seul
+        `INSERT ... ON CONFLICT (producer_id, slug) DO UPDATE` ; retourne {slug: id}.
+
+        Toutes les lignes ont les mêmes clés et des slugs distincts. Sur un
+        slug existant, seules les `update_columns` (par défaut toutes les clés)
+        sont réécrites ; les autres colonnes gardent leur valeur.
+        """
+        if not rows:
+            return {}
+        statement = pg_insert(Product).values(rows)
+        assignments = {
+            key: statement.excluded[key]
+            for key in (rows[0] if update_columns is None else update_columns)
+            if key not in ("producer_id", "slug")
+        }
+        assignments["updated_at"] = func.now()
+        statement = statement.on_conflict_do_update(
+            index_elements=[Product.producer_id, Product.slug], set_=assignments
+        ).returning(Product.slug, Product.id)
+        return dict(self.db.execute(statement).all())
+
+    def replace_tags_bulk(self, tag_ids_by_product: Dict[int, List[int]]) -> None:
+        """Remplace les tags de plusieurs produits (un DELETE et un INSERT multi-lignes)"""
+        if not tag_ids_by_product:
+            return
+        links = sorted({
+            (product_id, tag_id)
+            for product_id, tag_ids in tag_ids_by_product.items() for tag_id in tag_ids
+        })
+        self.db.execute(
+            delete(product_tags).where(
+                product_tags.c.product_id.in_(list(tag_ids_by_product)),
+                tuple_(product_tags.c.product_id, product_tags.c.tag_id).not_in(links)
+            )
+        )
+        if links:
+            self.db.execute(
+                pg_insert(product_tags)
+                .values([{"product_id": product_id, "tag_id": tag_id} for product_id, tag_id in links])
+                .on_conflict_do_nothing()
+            )
+
+    def get_catalog_page(self, producer_id: int, after_id: int, limit: int) -> List[Product]:
+        """Page du catalogue d'un producteur par clé (id croissant), variantes et tags compris"""
+        return (
+            self.db.query(Product)
+            .options(selectinload(Product.variants), selectinload(Product.tags))
+            .filter(Product.producer_id == producer_id, Product.id > after_id)
+            .order_by(Product.id)
+            .limit(limit)
+            .all()
+        )
+
     def update_stock(self, product: Product, quantity: int) -> Product:
         """Met à jour le stock d'un produit"""
         product.stock_quantity = quantity
@@ -389,6 +761,59 @@ class ProductVariantRepository:
             query = query.filter(ProductVariant.is_active)
         return query.all()
     
+    def lock_stock(self, variant_ids: Sequence[int]) -> Dict[int, int]:
+        """Verrouille le stock des variantes (ordre des id) ; retourne {id: stock}"""
+        return lock_stock_rows(self.db, ProductVariant.stock, variant_ids)
+    
+    def adjust_stock(self, deltas: Dict[int, int]) -> List[int]:
+        """Variation atomique du stock de plusieurs variantes ; retourne les id modifiés"""
+        return adjust_stock_rows(self.db, ProductVariant.stock, deltas)
+    
+    def get_product_ids(self, variant_ids: Sequence[int]) -> Dict[int, int]:
+        """Produit de chaque variante existante ; retourne {variant_id: product_id}"""
+        if not variant_ids:
+            return {}
+        rows = self.db.query(ProductVariant.id, ProductVariant.product_id).filter(
+            ProductVariant.id.in_(set(variant_ids))
+        ).all()
+        return dict(rows)
+
+    def get_sku_owners(self, skus: Sequence[str]) -> Dict[str, int]:
+        """Produit propriétaire de chaque SKU existant ; retourne {sku: product_id}"""
+        if not skus:
+            return {}
+        rows = self.db.query(ProductVariant.sku, ProductVariant.product_id).filter(
+            ProductVariant.sku.in_(set(skus))
+        ).all()
+        return dict(rows)
+
+    def upsert_by_sku(self, rows: List[Dict[str, Any]],
+                      update_columns: Optional[Sequence[str]] = None) -> Dict[str, int]:
+        """
+        Crée ou met à jour un lot de variantes en un seul
+        `INSERT ... ON CONFLICT (sku) DO UPDATE` ; retourne {sku: id}.
+
+        Un SKU déjà porté par un autre produit n'est pas modifié et n'apparaît
+        pas dans le résultat. Les SKU du lot sont distincts. Sur un SKU
+        existant, seules les `update_columns` (par défaut toutes les clés)
+        sont réécrites.
+        """
+        if not rows:
+            return {}
+        statement = pg_insert(ProductVariant).values(rows)
+        assignments = {
+            key: statement.excluded[key]
+            for key in (rows[0] if update_columns is None else update_columns)
+            if key not in ("product_id", "sku")
+        }
+        assignments["updated_at"] = func.now()
+        statement = statement.on_conflict_do_update(
+            index_elements=[ProductVariant.sku],
+            set_=assignments,
+            where=ProductVariant.product_id == statement.excluded.product_id
+        ).returning(ProductVariant.sku, ProductVariant.id)
+        return dict(self.db.execute(statement).all())
+
     def update(self, variant: ProductVariant) -> ProductVariant:
         """Met à jour une variante"""
         self.db.commit()
@@ -421,6 +846,12 @@ class StockMovementRepository:
         self.db.commit()
         self.db.refresh(movement)
         return movement
+
+    def create_bulk(self, movements: List[Dict[str, Any]]) -> List[int]:
+        """Insère un lot de mouvements (un INSERT multi-lignes, sans commit) ; retourne leurs IDs"""
+        if not movements:
+            return []
+        return list(self.db.scalars(insert(StockMovement).returning(StockMovement.id), movements))
     
     def get_product_movements(
         self,
@@ -461,6 +892,29 @@ class StockAlertRepository:
             Product.stock_quantity <= StockAlert.threshold
         ).all()
     
+    def mark_triggered(self, product_ids: Sequence[int]) -> List[StockAlert]:
+        """
+        Évalue les alertes actives de plusieurs produits en une requête :
+        `UPDATE stock_alerts SET notified_at = now() FROM products WHERE ...
+        stock_quantity <= threshold RETURNING ...` ; retourne les alertes déclenchées.
+        """
+        if not product_ids:
+            return []
+        statement = (
+            update(StockAlert)
+            .where(
+                StockAlert.product_id == Product.id,
+                Product.id.in_(sorted(set(product_ids))),
+                StockAlert.is_active,
+                Product.stock_quantity <= StockAlert.threshold
+            )
+            .values(notified_at=func.now())
+            .returning(StockAlert)
+        )
+        return list(self.db.scalars(
+            statement, execution_options={"synchronize_session": False, "populate_existing": True}
+        ))
+
     def mark_as_notified(self, alert: StockAlert) -> StockAlert:
         """Marque une alerte comme notifiée"""
         alert.notified_at = datetime.now()
@@ -1,3 +1,4 @@
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session, joinedload
 from typing import Optional, List
 from datetime import datetime
@@ -217,6 +218,12 @@ class ProducerProfileRepository:
         """Récupère le profil d'un utilisateur"""
         return self.db.query(ProducerProfile).filter(ProducerProfile.user_id == user_id).first()
     
+    def get_updated_at(self, profile_id: int) -> Optional[datetime]:
+        """Date de dernière modification d'un profil (marqueur de version, sans chargement ORM)"""
+        return self.db.execute(
+            select(ProducerProfile.updated_at).where(ProducerProfile.id == profile_id)
+        ).scalar()
+    
     def get_complete_profile(self, user_id: int) -> Optional[ProducerProfile]:
         """Récupère le profil complet avec tous les détails"""
         return self.db.query(ProducerProfile).options(
@@ -403,6 +410,34 @@ class PickupSlotRepository:
         """Récupère un créneau par son ID"""
         return self.db.query(PickupSlot).filter(PickupSlot.id == slot_id).first()
     
+    def get_for_update(self, slot_id: int) -> Optional[PickupSlot]:
+        """Récupère un créneau en verrouillant sa ligne (SELECT ... FOR UPDATE)"""
+        return self.db.query(PickupSlot).filter(
+            PickupSlot.id == slot_id
+        ).with_for_update().populate_existing().first()
+    
+    def adjust_orders(self, slot_id: int, delta: int) -> bool:
+        """
+        Variation atomique du nombre de commandes d'un créneau.
+        L'UPDATE est conditionnel (0 <= current_orders + delta <= max_orders,
+        créneau actif pour une réservation) ; retourne False s'il n'a rien modifié.
+        """
+        conditions = [
+            PickupSlot.id == slot_id,
+            PickupSlot.current_orders + delta >= 0,
+            PickupSlot.current_orders + delta <= PickupSlot.max_orders
+        ]
+        if delta > 0:
+            conditions.append(PickupSlot.is_active == True)
+        statement = (
+            update(PickupSlot)
+            .where(*conditions)
+            .values(current_orders=PickupSlot.current_orders + delta)
+            .returning(PickupSlot.id)
+        )
+        result = self.db.execute(statement, execution_options={"synchronize_session": "fetch"})
+        return result.first() is not None
+    
     def get_point_slots(self, pickup_point_id: int, active_only: bool = False) -> List[PickupSlot]:
         """Récupère tous les créneaux d'un point"""
         query = self.db.query(PickupSlot).filter(PickupSlot.pickup_point_id == pickup_point_id)
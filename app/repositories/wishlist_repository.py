@@ -1,6 +1,6 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_
+from sqlalchemy import and_, func
 
 from app.models.wishlist import (
     Wishlist,
@@ -102,6 +102,23 @@ class WishlistRepository:
                 Wishlist.is_public == True
             )
         ).count()
+    
+    @staticmethod
+    def get_user_wishlists_with_counts(db: Session, user_id: int) -> List[Tuple[Wishlist, int]]:
+        """
+        Listes d'un utilisateur avec leur nombre d'items, en une seule requête.
+        Même ordre que get_user_wishlists.
+        """
+        return db.query(
+            Wishlist,
+            func.count(WishlistItem.id).label("item_count")
+        ).outerjoin(
+            WishlistItem, WishlistItem.wishlist_id == Wishlist.id
+        ).filter(
+            Wishlist.user_id == user_id
+        ).group_by(
+            Wishlist.id
+        ).order_by(Wishlist.sort_order, Wishlist.created_at.desc()).all()
 
 
 class WishlistItemRepository:
@@ -1,8 +1,10 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session
 
 from app.core import deps
+from app.core.http_cache import etag_matches, not_modified
+from app.core.pagination import set_next_cursor_header
 from app.models.auth import User
 from app.schemas.admin import (
     # Admin Actions
@@ -27,6 +29,8 @@ from app.schemas.admin import (
     Commission,
     CommissionCreate,
     CommissionUpdate,
+    CommissionResolveRequest,
+    CommissionResolution,
     # Tax Rates
     TaxRate,
     TaxRateCreate,
@@ -66,12 +70,14 @@ def require_admin(current_user: User = Depends(deps.get_current_active_user)) ->
 @router.get("/actions", response_model=List[AdminAction])
 def get_admin_actions(
     *,
+    response: Response,
     db: Session = Depends(deps.get_db),
     admin_id: Optional[int] = Query(None, description="Filtrer par administrateur"),
     action_type: Optional[ActionTypeEnum] = Query(None, description="Filtrer par type d'action"),
     target_entity: Optional[str] = Query(None, description="Filtrer par type d'entité"),
     limit: int = Query(100, ge=1, le=500),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Curseur de pagination (vide pour la première page)"),
     current_user: User = Depends(require_admin)
 ):
     """
@@ -89,6 +95,8 @@ def get_admin_actions(
     - Auditer l'activité d'un administrateur suspect
     - Voir l'historique complet d'actions sur un utilisateur
     - Générer des rapports mensuels d'activité administrative
+    
+    **Pagination :** `offset` ou `cursor` (le curseur suivant est dans l'en-tête `X-Next-Cursor`).
     """
     actions, total = AdminActionService.search_actions(
         db,
@@ -96,8 +104,10 @@ def get_admin_actions(
         action_type=action_type,
         target_entity=target_entity,
         limit=limit,
-        offset=offset
+        offset=offset,
+        cursor=cursor
     )
+    set_next_cursor_header(response, actions)
     
     return actions
 
@@ -472,7 +482,9 @@ def get_all_settings(
 @router.get("/settings/public", response_model=List[SystemSettingPublic])
 def get_public_settings(
     *,
-    db: Session = Depends(deps.get_db)
+    db: Session = Depends(deps.get_db),
+    request: Request,
+    response: Response
 ):
     """
     Récupère les paramètres système publics.
@@ -490,8 +502,16 @@ def get_public_settings(
     - Clés API
     - Mots de passe
     - Paramètres de sécurité internes
+    
+    **Cache :** la réponse porte un `ETag` ; renvoyé dans `If-None-Match`,
+    il donne un 304 sans corps tant que les paramètres publics n'ont pas changé.
     """
-    return SystemSettingService.get_public_settings(db)
+    snapshot = SystemSettingService.get_public_settings_snapshot(db)
+    if etag_matches(request, snapshot.etag):
+        return not_modified(snapshot.etag)
+    response.headers["ETag"] = snapshot.etag
+    response.headers["Cache-Control"] = "no-cache"
+    return snapshot.public
 
 
 @router.get("/settings/{key}", response_model=SystemSetting)
@@ -617,6 +637,37 @@ def get_all_commissions(
     return CommissionService.get_all_active_commissions(db)
 
 
+@router.post("/commissions/resolve", response_model=List[CommissionResolution])
+def resolve_commissions(
+    *,
+    db: Session = Depends(deps.get_db),
+    resolve_data: CommissionResolveRequest,
+    current_user: User = Depends(require_admin)
+):
+    """
+    Résout la commission applicable à une liste de couples (producteur, catégorie).
+    
+    Jusqu'à 10 000 couples par appel, résolus en mémoire avec la même priorité
+    que le calcul d'une vente : producteur + catégorie, producteur, catégorie,
+    taux par défaut. Les réponses suivent l'ordre de la requête.
+    """
+    pairs = [(lookup.producer_id, lookup.category_id) for lookup in resolve_data.pairs]
+    rules = CommissionService.resolve_commissions(db, pairs, resolve_data.on_date)
+    resolutions = []
+    for producer_id, category_id in pairs:
+        rule = rules[(producer_id, category_id)]
+        resolutions.append(CommissionResolution(
+            producer_id=producer_id,
+            category_id=category_id,
+            commission_id=rule.id if rule else None,
+            percentage=rule.percentage if rule else None,
+            fixed_amount=rule.fixed_amount if rule else None,
+            min_transaction_amount=rule.min_transaction_amount if rule else None,
+            max_transaction_amount=rule.max_transaction_amount if rule else None
+        ))
+    return resolutions
+
+
 @router.get("/commissions/{commission_id}", response_model=Commission)
 def get_commission(
     *,
@@ -4,10 +4,12 @@ from typing import List, Optional
 from datetime import date, timedelta
 
 from app.core import deps
-from app.core.database import get_db
+from app.core.principal_cache import Principal
+from app.core.database import get_db, get_read_db
+from app.core.view_buffer import get_product_view_buffer
 from app.models.auth import User
 from app.schemas.analytics import (
-    ProductViewCreate, ProductViewResponse, SearchQueryCreate, SearchQueryResponse,
+    ProductViewCreate, ProductViewAccepted, SearchQueryCreate, SearchQueryResponse,
     PopularSearchTerm, DashboardMetricCreate, DashboardMetricResponse, MetricSummary,
     SalesReportCreate, SalesReportResponse,
     InventoryReportResponse
@@ -28,25 +30,18 @@ router = APIRouter(prefix="", tags=["analytics"])
 # Les dépendances d'authentification sont maintenant dans app.core.deps
 
 def get_current_producer_id(
-    current_user: User = Depends(deps.get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(deps.get_current_active_user)
 ) -> Optional[int]:
-    """Récupère l'ID du producteur depuis le profil utilisateur"""
-    from app.repositories.profile_repository import ProducerProfileRepository
-    repo = ProducerProfileRepository(db)
-    profile = repo.get_by_user_id(current_user.id)
-    return profile.id if profile else None
+    """ID du profil producteur, porté par le principal (aucune requête)"""
+    return current_user.producer_profile_id
 
 
 # ============================================================================
 # ROUTES PRODUCTVIEW - Tracking des vues de produits
 # ============================================================================
 
-@router.post("/views/track", response_model=ProductViewResponse, status_code=status.HTTP_201_CREATED)
-def track_product_view(
-    view_data: ProductViewCreate,
-    db: Session = Depends(get_db)
-):
+@router.post("/views/track", response_model=ProductViewAccepted, status_code=status.HTTP_202_ACCEPTED)
+async def track_product_view(view_data: ProductViewCreate):
     """
     Enregistre la vue d'un produit.
     
@@ -57,9 +52,25 @@ def track_product_view(
     Le tracking peut se faire pour un utilisateur connecté (user_id) ou
     un visiteur anonyme (session_id). Le referrer permet de savoir d'où
     vient le trafic (moteur de recherche, réseaux sociaux, etc.).
-    """
-    service = ProductViewService(db)
-    return service.track_view(view_data)
+    
+    La vue est mise en file et écrite en base par lots (voir
+    app/core/view_buffer.py) : la route répond 202 sans attendre la base.
+    Les vues d'un produit inexistant sont ignorées à l'écriture. Si la file
+    est pleine, la route répond 503 et le client peut réessayer plus tard.
+    """
+    accepted = get_product_view_buffer().submit(
+        product_id=view_data.product_id,
+        user_id=view_data.user_id,
+        session_id=view_data.session_id,
+        referrer=view_data.referrer
+    )
+    if not accepted:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="File d'enregistrement des vues saturée",
+            headers={"Retry-After": "1"}
+        )
+    return ProductViewAccepted(product_id=view_data.product_id)
 
 
 @router.get("/views/products/{product_id}")
@@ -67,7 +78,8 @@ def get_product_view_stats(
     product_id: int,
     start_date: Optional[date] = Query(None, description="Date de début (par défaut: 30 jours avant)"),
     end_date: Optional[date] = Query(None, description="Date de fin (par défaut: aujourd'hui)"),
-    db: Session = Depends(get_db)
+    exact: bool = Query(False, description="Compte exact des visiteurs uniques (plus coûteux)"),
+    db: Session = Depends(get_read_db)
 ):
     """
     Récupère les statistiques de vue d'un produit.
@@ -79,9 +91,12 @@ def get_product_view_stats(
     
     Ces données permettent de comprendre l'intérêt porté au produit et
     d'identifier les pics de trafic.
+    
+    Les visiteurs uniques sont estimés par HyperLogLog (erreur type 1,63 %) ;
+    `exact=true` force le comptage exact sur les vues brutes.
     """
     service = ProductViewService(db)
-    return service.get_product_stats(product_id, start_date, end_date)
+    return service.get_product_stats(product_id, start_date, end_date, exact)
 
 
 @router.get("/views/top-products")
@@ -89,7 +104,7 @@ def get_top_viewed_products(
     limit: int = Query(10, ge=1, le=50, description="Nombre de produits à retourner"),
     start_date: Optional[date] = Query(None, description="Date de début"),
     end_date: Optional[date] = Query(None, description="Date de fin"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Récupère les produits les plus consultés.
@@ -133,7 +148,7 @@ def track_search(
 def get_popular_searches(
     limit: int = Query(20, ge=1, le=100, description="Nombre de termes à retourner"),
     days: int = Query(30, ge=1, le=365, description="Période en jours"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Récupère les termes de recherche les plus populaires.
@@ -153,7 +168,7 @@ def get_popular_searches(
 def get_failed_searches(
     limit: int = Query(20, ge=1, le=100),
     days: int = Query(30, ge=1, le=365),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Récupère les recherches qui n'ont retourné aucun résultat.
@@ -171,7 +186,7 @@ def get_failed_searches(
 @router.get("/search/analytics")
 def get_search_analytics(
     days: int = Query(30, ge=1, le=365),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Récupère des statistiques générales sur les recherches.
@@ -219,7 +234,7 @@ def get_entity_metrics(
     entity_id: int,
     period: MetricPeriod = Query(MetricPeriod.DAY, description="Période d'agrégation"),
     days: int = Query(30, ge=1, le=365, description="Nombre de jours à inclure"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Récupère toutes les métriques d'une entité pour son dashboard.
@@ -238,6 +253,28 @@ def get_entity_metrics(
     return service.get_entity_dashboard(entity_type, entity_id, period, days)
 
 
+@router.post("/metrics/calculate")
+def refresh_metrics(
+    metric_date: date = Query(..., description="Date pour laquelle calculer les métriques"),
+    period: MetricPeriod = Query(MetricPeriod.DAY),
+    entity_type: Optional[EntityType] = Query(None, description="Limiter à un type d'entité"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(deps.require_admin)
+):
+    """
+    Recalcule les métriques de tout le catalogue pour une date.
+    
+    Vues, ventes, revenu et taux de conversion de tous les produits,
+    producteurs et catégories (ou du seul type demandé), calculés par
+    agrégats groupés et écrits en un upsert par type d'entité.
+    Retourne le nombre de métriques écrites par type.
+    
+    Réservé aux administrateurs et aux processus automatisés.
+    """
+    service = DashboardMetricService(db)
+    return service.refresh_metrics(metric_date, period, [entity_type] if entity_type else None)
+
+
 @router.post("/metrics/calculate/product/{product_id}")
 def calculate_product_metrics(
     product_id: int,
@@ -300,7 +337,7 @@ def generate_sales_report(
 @router.get("/reports/sales/{report_id}", response_model=SalesReportResponse)
 def get_sales_report(
     report_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(deps.get_current_active_user),
     current_producer_id: Optional[int] = Depends(get_current_producer_id)
 ):
@@ -321,7 +358,7 @@ def get_producer_sales_reports(
     producer_id: int,
     start_date: Optional[date] = Query(None, description="Date de début de la période"),
     end_date: Optional[date] = Query(None, description="Date de fin de la période"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_producer_id: Optional[int] = Depends(get_current_producer_id),
     current_user: User = Depends(deps.require_admin)
 ):
@@ -400,7 +437,7 @@ def get_product_inventory_history(
     product_id: int,
     start_date: Optional[date] = Query(None, description="Date de début"),
     end_date: Optional[date] = Query(None, description="Date de fin"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Récupère l'historique d'inventaire d'un produit.
@@ -423,7 +460,7 @@ def get_product_inventory_history(
 def get_low_stock_alerts(
     producer_id: int,
     threshold: int = Query(10, ge=0, le=1000, description="Seuil d'alerte de stock"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_producer_id: Optional[int] = Depends(get_current_producer_id),
     current_user: User = Depends(deps.require_admin)
 ):
@@ -471,7 +508,7 @@ def get_dashboard_overview(
     entity_type: EntityType = Query(..., description="Type d'entité (product, producer, category)"),
     entity_id: int = Query(..., description="ID de l'entité"),
     days: int = Query(30, ge=1, le=365, description="Nombre de jours à analyser"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Récupère une vue d'ensemble complète pour un tableau de bord.
@@ -3,8 +3,9 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
 from sqlalchemy.orm import Session
 
-from app.core.security import decode_token
 from app.core.config import settings
+from app.core.deps import resolve_principal
+from app.core.principal_cache import Principal
 from app.models.auth import User
 from app.core.database import get_db
 from app.services.auth_service import AuthService
@@ -27,7 +28,7 @@ def get_auth_service(db: Session = Depends(get_db)) -> AuthService:
 async def get_current_user(
     auth: Optional[HTTPAuthorizationCredentials] = Depends(security),
     db: Session = Depends(get_db)
-) -> User:
+) -> Principal:
     """Récupère l'utilisateur actuel à partir du token"""
     if auth is None or not auth.credentials:
         raise HTTPException(
@@ -36,45 +37,7 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    token = auth.credentials
-    
-    # Décoder le token
-    payload = decode_token(token)
-    
-    if not payload:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token d'accès invalide - décodage échoué",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    token_type = payload.get("type")
-    
-    if token_type != "access":
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=f"Token d'accès invalide - type incorrect: {token_type}",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    # Récupérer l'utilisateur via le service pour rester cohérent
-    user_id = payload.get("sub")
-    auth_service = AuthService(db)
-    user = auth_service.user_repo.get_by_id(user_id)
-    
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Utilisateur non trouvé"
-        )
-    
-    if not user.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Compte désactivé"
-        )
-    
-    return user
+    return resolve_principal(auth.credentials, db)
 
 
 @router.post(
@@ -186,11 +149,15 @@ def logout(
     response_model=UserResponse,
     summary="Obtenir le profil de l'utilisateur connecté"
 )
-def get_me(current_user: User = Depends(get_current_user)):
+def get_me(
+    current_user: Principal = Depends(get_current_user),
+    auth_service: AuthService = Depends(get_auth_service)
+):
     """
     Récupère les informations de l'utilisateur actuellement connecté.
     """
-    return UserResponse.model_validate(current_user)
+    user = auth_service.user_repo.get_by_id(current_user.id)
+    return UserResponse.model_validate(user)
 
 
 @router.put(
@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
 
-from app.core.database import get_db
+from app.core.database import get_db, get_async_db, get_async_read_db
 from app.core.deps import get_current_user, require_admin
+from app.core.http_cache import CONTENT_CACHE_CONTROL, cached_json_response, table_versions
 from app.models.auth import User
 from app.models.cms import FAQCategory
 from app.services.cms_service import PageService, FAQService, BlogPostService, TestimonialService
@@ -38,45 +40,64 @@ def create_page(
 
 
 @router.get("/pages", response_model=List[PageResponse])
-def get_all_pages(
+async def get_all_pages(
+    request: Request,
     published_only: bool = Query(False, description="Afficher uniquement les pages publiées"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère toutes les pages statiques.
     
     Route publique, mais peut filtrer par statut de publication.
     """
-    service = PageService(db)
-    return service.get_all_pages(published_only)
+    def load(session: Session) -> List[PageResponse]:
+        pages = PageService(session).get_all_pages(published_only)
+        return [PageResponse.model_validate(page) for page in pages]
+
+    return await db.run_sync(
+        lambda session: cached_json_response(request, session, table_versions("pages"), load,
+                                             CONTENT_CACHE_CONTROL)
+    )
 
 
 @router.get("/pages/{page_id}", response_model=PageResponse)
-def get_page(
+async def get_page(
+    request: Request,
     page_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère une page par son ID.
     
     Route publique.
     """
-    service = PageService(db)
-    return service.get_page(page_id, published_only=True)
+    def load(session: Session) -> PageResponse:
+        return PageResponse.model_validate(PageService(session).get_page(page_id, published_only=True))
+
+    return await db.run_sync(
+        lambda session: cached_json_response(request, session, table_versions("pages"), load,
+                                             CONTENT_CACHE_CONTROL)
+    )
 
 
 @router.get("/pages/slug/{slug}", response_model=PageResponse)
-def get_page_by_slug(
+async def get_page_by_slug(
+    request: Request,
     slug: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère une page par son slug.
     
     Route publique, utilisée pour afficher les pages statiques sur le frontend.
     """
-    service = PageService(db)
-    return service.get_page_by_slug(slug, published_only=True)
+    def load(session: Session) -> PageResponse:
+        return PageResponse.model_validate(PageService(session).get_page_by_slug(slug, published_only=True))
+
+    return await db.run_sync(
+        lambda session: cached_json_response(request, session, table_versions("pages"), load,
+                                             CONTENT_CACHE_CONTROL)
+    )
 
 
 @router.put("/pages/{page_id}", response_model=PageResponse)
@@ -130,47 +151,54 @@ def create_faq(
 
 
 @router.get("/faqs", response_model=List[FAQResponse])
-def get_all_faqs(
+async def get_all_faqs(
     category: Optional[FAQCategory] = Query(None, description="Filtrer par catégorie"),
     published_only: bool = Query(True, description="Afficher uniquement les FAQs publiées"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère toutes les questions fréquentes.
     
     Route publique avec filtres optionnels.
     """
-    service = FAQService(db)
-    return service.get_all_faqs(category, published_only)
+    def load(session: Session) -> List[FAQResponse]:
+        faqs = FAQService(session).get_all_faqs(category, published_only)
+        return [FAQResponse.model_validate(faq) for faq in faqs]
+
+    return await db.run_sync(load)
 
 
 @router.get("/faqs/category/{category}", response_model=List[FAQResponse])
-def get_faqs_by_category(
+async def get_faqs_by_category(
     category: FAQCategory,
     published_only: bool = Query(True),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère les FAQs d'une catégorie spécifique.
     
     Route publique, utilisée pour afficher les FAQs par section.
     """
-    service = FAQService(db)
-    return service.get_faqs_by_category(category, published_only)
+    def load(session: Session) -> List[FAQResponse]:
+        faqs = FAQService(session).get_faqs_by_category(category, published_only)
+        return [FAQResponse.model_validate(faq) for faq in faqs]
+
+    return await db.run_sync(load)
 
 
 @router.get("/faqs/{faq_id}", response_model=FAQResponse)
-def get_faq(
+async def get_faq(
     faq_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère une FAQ par son ID.
     
     Route publique.
     """
-    service = FAQService(db)
-    return service.get_faq(faq_id)
+    return await db.run_sync(
+        lambda session: FAQResponse.model_validate(FAQService(session).get_faq(faq_id))
+    )
 
 
 @router.put("/faqs/{faq_id}", response_model=FAQResponse)
@@ -224,77 +252,89 @@ def create_blog_post(
 
 
 @router.get("/blog", response_model=List[BlogPostResponse])
-def get_all_blog_posts(
+async def get_all_blog_posts(
     published_only: bool = Query(True),
     author_id: Optional[int] = Query(None, description="Filtrer par auteur"),
     limit: Optional[int] = Query(None, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère tous les articles de blog avec pagination.
     
     Route publique, affiche par défaut uniquement les articles publiés.
     """
-    service = BlogPostService(db)
-    return service.get_all_posts(published_only, author_id, limit, offset)
+    def load(session: Session) -> List[BlogPostResponse]:
+        posts = BlogPostService(session).get_all_posts(published_only, author_id, limit, offset)
+        return [BlogPostResponse.model_validate(post) for post in posts]
+
+    return await db.run_sync(load)
 
 
 @router.get("/blog/featured", response_model=List[BlogPostResponse])
-def get_featured_blog_posts(
+async def get_featured_blog_posts(
     limit: int = Query(5, ge=1, le=20),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère les articles de blog mis en avant.
     
     Route publique, utilisée pour la page d'accueil.
     """
-    service = BlogPostService(db)
-    return service.get_featured_posts(limit)
+    def load(session: Session) -> List[BlogPostResponse]:
+        posts = BlogPostService(session).get_featured_posts(limit)
+        return [BlogPostResponse.model_validate(post) for post in posts]
+
+    return await db.run_sync(load)
 
 
 @router.get("/blog/search", response_model=List[BlogPostResponse])
-def search_blog_posts(
+async def search_blog_posts(
     q: str = Query(..., min_length=3, description="Terme de recherche"),
     published_only: bool = Query(True),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Recherche dans les articles de blog.
     
     Route publique, recherche dans le titre, contenu et tags.
     """
-    service = BlogPostService(db)
-    return service.search_posts(q, published_only)
+    def load(session: Session) -> List[BlogPostResponse]:
+        posts = BlogPostService(session).search_posts(q, published_only)
+        return [BlogPostResponse.model_validate(post) for post in posts]
+
+    return await db.run_sync(load)
 
 
 @router.get("/blog/{post_id}", response_model=BlogPostResponse)
-def get_blog_post(
+async def get_blog_post(
     post_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère un article par son ID.
     
     Route publique.
     """
-    service = BlogPostService(db)
-    return service.get_post(post_id, published_only=True)
+    return await db.run_sync(
+        lambda session: BlogPostResponse.model_validate(BlogPostService(session).get_post(post_id, published_only=True))
+    )
 
 
 @router.get("/blog/slug/{slug}", response_model=BlogPostResponse)
-def get_blog_post_by_slug(
+async def get_blog_post_by_slug(
     slug: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Récupère un article par son slug et incrémente le compteur de vues.
     
-    Route publique, utilisée pour afficher l'article complet.
+    Route publique, utilisée pour afficher l'article complet. Elle écrit
+    (compteur de vues) : session du primaire, pas des réplicas.
     """
-    service = BlogPostService(db)
-    return service.get_post_by_slug(slug, published_only=True)
+    return await db.run_sync(
+        lambda session: BlogPostResponse.model_validate(BlogPostService(session).get_post_by_slug(slug, published_only=True))
+    )
 
 
 @router.put("/blog/{post_id}", response_model=BlogPostResponse)
@@ -367,33 +407,47 @@ def create_testimonial(
 
 
 @router.get("/testimonials", response_model=List[TestimonialResponse])
-def get_all_testimonials(
+async def get_all_testimonials(
+    request: Request,
     approved_only: bool = Query(True),
     featured_only: bool = Query(False),
     limit: Optional[int] = Query(None, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère tous les témoignages.
     
     Route publique, affiche par défaut uniquement les témoignages approuvés.
     """
-    service = TestimonialService(db)
-    return service.get_all_testimonials(approved_only, featured_only, None, limit)
+    def load(session: Session) -> List[TestimonialResponse]:
+        testimonials = TestimonialService(session).get_all_testimonials(approved_only, featured_only, None, limit)
+        return [TestimonialResponse.model_validate(testimonial) for testimonial in testimonials]
+
+    return await db.run_sync(
+        lambda session: cached_json_response(request, session, table_versions("testimonials"), load,
+                                             CONTENT_CACHE_CONTROL)
+    )
 
 
 @router.get("/testimonials/featured", response_model=List[TestimonialResponse])
-def get_featured_testimonials(
+async def get_featured_testimonials(
+    request: Request,
     limit: int = Query(10, ge=1, le=50),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère les témoignages mis en avant.
     
     Route publique, utilisée pour la page d'accueil.
     """
-    service = TestimonialService(db)
-    return service.get_featured_testimonials(limit)
+    def load(session: Session) -> List[TestimonialResponse]:
+        testimonials = TestimonialService(session).get_featured_testimonials(limit)
+        return [TestimonialResponse.model_validate(testimonial) for testimonial in testimonials]
+
+    return await db.run_sync(
+        lambda session: cached_json_response(request, session, table_versions("testimonials"), load,
+                                             CONTENT_CACHE_CONTROL)
+    )
 
 
 @router.get("/testimonials/my", response_model=List[TestimonialResponse])
@@ -411,25 +465,32 @@ def get_my_testimonials(
 
 
 @router.get("/testimonials/{testimonial_id}", response_model=TestimonialResponse)
-def get_testimonial(
+async def get_testimonial(
+    request: Request,
     testimonial_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère un témoignage par son ID.
     
     Route publique si approuvé.
     """
-    service = TestimonialService(db)
-    testimonial = service.get_testimonial(testimonial_id)
+    def load(session: Session) -> TestimonialResponse:
+        service = TestimonialService(session)
+        testimonial = service.get_testimonial(testimonial_id)
     
-    if not testimonial.is_approved:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Témoignage non trouvé"
-        )
+        if not testimonial.is_approved:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Témoignage non trouvé"
+            )
     
-    return testimonial
+        return TestimonialResponse.model_validate(testimonial)
+
+    return await db.run_sync(
+        lambda session: cached_json_response(request, session, table_versions("testimonials"), load,
+                                             CONTENT_CACHE_CONTROL)
+    )
 
 
 @router.put("/testimonials/{testimonial_id}", response_model=TestimonialResponse)
@@ -39,6 +39,7 @@ def get_my_notifications(
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
     unread_only: bool = Query(False),
+    cursor: Optional[str] = Query(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(deps.get_current_active_user)
 ):
@@ -49,9 +50,10 @@ def get_my_notifications(
     - skip : Nombre de notifications à ignorer (pagination)
     - limit : Nombre maximum de notifications à retourner
     - unread_only : Si True, ne retourne que les notifications non lues
+    - cursor : Pagination par curseur (vide pour la première page, puis `next_cursor`) ; remplace skip
     """
     service = NotificationService(db)
-    return service.get_user_notifications(current_user.id, skip, limit, unread_only)
+    return service.get_user_notifications(current_user.id, skip, limit, unread_only, cursor=cursor)
 
 
 @router.post("/notifications", response_model=NotificationResponse, status_code=status.HTTP_201_CREATED)
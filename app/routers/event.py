@@ -1,10 +1,11 @@
 
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta, timezone
 
 from app.core import deps
+from app.core.pagination import set_next_cursor_header
 from app.models.auth import User
 from app.schemas.event import (
     Event,
@@ -50,11 +51,13 @@ def require_admin(current_user: User = Depends(deps.get_current_active_user)) ->
 @router.get("/events", response_model=List[Event])
 def get_events(
     *,
+    response: Response,
     db: Session = Depends(deps.get_db),
     event_type: Optional[EventTypeEnum] = Query(None, description="Filtrer par type"),
     processed: Optional[bool] = Query(None, description="Filtrer par statut de traitement"),
     hours: Optional[int] = Query(24, ge=1, le=168, description="Nombre d'heures à remonter"),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="Curseur de pagination (vide pour la première page)"),
     current_user: User = Depends(require_admin)
 ):
     """
@@ -68,6 +71,10 @@ def get_events(
     - Voir tous les paiements réussis des dernières 24h
     - Trouver les événements non traités (webhooks en attente)
     - Analyser les tendances (combien de commandes par jour ?)
+    
+    Chaque liste (flux récent, par type, en attente) peut être parcourue par
+    curseur : le curseur de la page suivante est renvoyé dans l'en-tête
+    `X-Next-Cursor`.
     """
     if processed is not None:
         # Récupérer selon le statut de traitement
@@ -75,13 +82,16 @@ def get_events(
             # Cette route nécessiterait une méthode dans le repository
             raise HTTPException(status_code=501, detail="Filtrage par processed non implémenté")
         else:
-            return EventRepository.get_pending(db, limit)
-    
-    if event_type:
+            events = EventRepository.get_pending(db, limit, cursor=cursor)
+    elif event_type:
         start_date = datetime.now(timezone.utc) - timedelta(hours=hours)
-        return EventRepository.get_by_type(db, event_type, start_date=start_date, limit=limit)
-    
-    return EventRepository.get_recent(db, hours=hours, limit=limit)
+        events = EventRepository.get_by_type(
+            db, event_type, start_date=start_date, limit=limit, cursor=cursor
+        )
+    else:
+        events = EventRepository.get_recent(db, hours=hours, limit=limit, cursor=cursor)
+    set_next_cursor_header(response, events)
+    return events
 
 
 @router.get("/events/{event_id}", response_model=Event)
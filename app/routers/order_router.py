@@ -237,6 +237,7 @@ def get_my_orders(
     skip: int = 0,
     limit: int = 100,
     status_filter: Optional[str] = None,
+    cursor: Optional[str] = None,
     current_user = Depends(get_current_user),
     order_service: OrderService = Depends(get_order_service)
 ):
@@ -250,12 +251,16 @@ def get_my_orders(
     - ready : Prête pour retrait/livraison
     - completed : Terminée
     - cancelled : Annulée
+    
+    Pagination par offset (`skip`) ou par curseur : passer `cursor` (vide pour la
+    première page) puis la valeur `next_cursor` de la réponse précédente.
     """
     orders = order_service.get_my_orders(
         current_user.id,
         skip,
         limit,
-        status_filter
+        status_filter,
+        cursor=cursor
     )
     total = len(orders)  # TODO: Implement proper count
     
@@ -263,7 +268,8 @@ def get_my_orders(
         orders=[OrderResponse.model_validate(order) for order in orders],
         total=total,
         page=(skip // limit) + 1,
-        limit=limit
+        limit=limit,
+        next_cursor=getattr(orders, "next_cursor", None)
     )
 
 
@@ -276,19 +282,21 @@ def get_my_orders_alias(
     skip: int = 0,
     limit: int = 100,
     status_filter: Optional[str] = None,
+    cursor: Optional[str] = None,
     current_user = Depends(get_current_user),
     order_service: OrderService = Depends(get_order_service)
 ):
     """
     Alias de compatibilité vers /my-orders.
     """
-    orders = order_service.get_my_orders(current_user.id, skip, limit, status_filter)
+    orders = order_service.get_my_orders(current_user.id, skip, limit, status_filter, cursor=cursor)
     total = len(orders)
     return OrderListResponse(
         orders=[OrderResponse.model_validate(order) for order in orders],
         total=total,
         page=(skip // limit) + 1,
-        limit=limit
+        limit=limit,
+        next_cursor=getattr(orders, "next_cursor", None)
     )
 
 
@@ -301,6 +309,7 @@ def get_producer_orders(
     skip: int = 0,
     limit: int = 100,
     status_filter: Optional[str] = None,
+    cursor: Optional[str] = None,
     current_user = Depends(get_current_user),
     order_service: OrderService = Depends(get_order_service)
 ):
@@ -314,22 +323,21 @@ def get_producer_orders(
     - Filtrer par statut
     - Suivre les commandes en cours
     """
-    # Vérifier que l'utilisateur est un producteur
-    from app.repositories.profile_repository import ProducerProfileRepository
-    producer_repo = ProducerProfileRepository(order_service.db)
-    producer = producer_repo.get_by_user_id(current_user.id)
+    # Vérifier que l'utilisateur est un producteur (profil porté par le principal)
+    producer_id = current_user.producer_profile_id
     
-    if not producer:
+    if producer_id is None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Seuls les producteurs peuvent accéder à cette ressource"
         )
     
     orders = order_service.get_producer_orders(
-        producer.id,
+        producer_id,
         skip,
         limit,
-        status_filter
+        status_filter,
+        cursor=cursor
     )
     total = len(orders)  # TODO: Implement proper count
     
@@ -337,7 +345,8 @@ def get_producer_orders(
         orders=[OrderResponse.model_validate(order) for order in orders],
         total=total,
         page=(skip // limit) + 1,
-        limit=limit
+        limit=limit,
+        next_cursor=getattr(orders, "next_cursor", None)
     )
 
 
@@ -350,30 +359,29 @@ def get_producer_orders_alias(
     skip: int = 0,
     limit: int = 100,
     status_filter: Optional[str] = None,
+    cursor: Optional[str] = None,
     current_user = Depends(get_current_user),
     order_service: OrderService = Depends(get_order_service)
 ):
     """
     Alias de compatibilité vers /producer-orders.
     """
-    from app.repositories.profile_repository import ProducerProfileRepository
-
-    producer_repo = ProducerProfileRepository(order_service.db)
-    producer = producer_repo.get_by_user_id(current_user.id)
+    producer_id = current_user.producer_profile_id
 
-    if not producer:
+    if producer_id is None:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Seuls les producteurs peuvent accéder à cette ressource"
         )
 
-    orders = order_service.get_producer_orders(producer.id, skip, limit, status_filter)
+    orders = order_service.get_producer_orders(producer_id, skip, limit, status_filter, cursor=cursor)
     total = len(orders)
     return OrderListResponse(
         orders=[OrderResponse.model_validate(order) for order in orders],
         total=total,
         page=(skip // limit) + 1,
-        limit=limit
+        limit=limit,
+        next_cursor=getattr(orders, "next_cursor", None)
     )
 
 
@@ -7,6 +7,7 @@ from uuid import uuid4
 import shutil
 
 from app.core.database import get_db
+from app.core.http_cache import PROFILE_CACHE_CONTROL, cached_json_response
 from app.routers.auth_router import get_current_user
 from app.services.profile_service import ProducerProfileService, PickupPointService, ProducerScheduleService
 from app.services.auth_service import AuthService
@@ -649,11 +650,22 @@ def delete_pickup_slot(
     summary="Obtenir un profil producteur public"
 )
 def get_public_producer_profile(
+    request: Request,
     producer_id: int,
-    producer_service: ProducerProfileService = Depends(get_producer_service)
+    db: Session = Depends(get_db)
 ):
     """
     Récupère les informations publiques d'un profil producteur.
     Accessible sans authentification.
-    """
-    return producer_service.get_public_profile(producer_id)
+    
+    L'ETag suit la date de modification du profil : 304 si `If-None-Match`
+    correspond, sans charger le profil.
+    """
+    producer_service = ProducerProfileService(db)
+    return cached_json_response(
+        request,
+        db,
+        lambda session: producer_service.get_public_profile_version(producer_id),
+        lambda session: ProducerProfileResponse.model_validate(producer_service.get_public_profile(producer_id)),
+        PROFILE_CACHE_CONTROL
+    )
@@ -1,14 +1,23 @@
-from fastapi import APIRouter, Depends, status, Query, UploadFile, File, Form
+from fastapi import APIRouter, Depends, status, Query, UploadFile, File, Form, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
 from decimal import Decimal
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_db, get_async_db, get_async_read_db
 from app.services.product_service import (
-    CategoryService, TagService, UnitService, ProductService
+    CategoryService, TagService, UnitService, ProductService, add_image_file
+)
+from app.services.catalog_service import (
+    CATALOG_MEDIA_TYPES, export_catalog, get_export_producer_id, import_catalog
 )
 from app.routers.auth_router import get_current_user
 from app.core.deps import require_producer
+from app.core.http_cache import CATALOG_CACHE_CONTROL, cached_json_response, table_versions
+from app.core.pagination import set_next_cursor_header
+from app.core.upload_limits import limited_body_route
 from app.schemas.product_schema import (
     CategoryCreate, CategoryUpdate, CategoryResponse, CategoryTree,
     TagCreate, TagResponse,
@@ -17,7 +26,8 @@ from app.schemas.product_schema import (
     ProductImageCreate, ProductImageResponse,
     ProductVariantCreate, ProductVariantResponse,
     StockAlertCreate, StockAlertResponse,
-    ProductStockUpdate, ProductSearchFilters
+    ProductStockUpdate, ProductSearchFilters, ProductSearchResponse,
+    CatalogImportReport, BatchStockUpdate, BatchStockResponse
 )
 from app.schemas.auth_schema import MessageResponse
 
@@ -25,6 +35,9 @@ router = APIRouter(prefix="/products", tags=["Products & Catalog"])
 
 
 # ============= Dependencies =============
+# Les routes publiques de lecture utilisent la session asynchrone routée vers les
+# réplicas (get_async_read_db) ; les routes d'écriture restent synchrones et
+# passent par ces services.
 
 def get_category_service(db: Session = Depends(get_db)) -> CategoryService:
     return CategoryService(db)
@@ -72,17 +85,25 @@ def create_category(
     response_model=List[CategoryResponse],
     summary="Obtenir toutes les catégories"
 )
-def get_categories(
+async def get_categories(
+    request: Request,
     active_only: bool = Query(False, description="Ne retourner que les catégories actives"),
-    category_service: CategoryService = Depends(get_category_service)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère la liste de toutes les catégories.
     
     Cette route est publique et ne nécessite pas d'authentification.
+    Réponse en cache (ETag, 304 si `If-None-Match` correspond).
     """
-    categories = category_service.get_all_categories(active_only)
-    return [CategoryResponse.model_validate(cat) for cat in categories]
+    def load(session: Session) -> List[CategoryResponse]:
+        categories = CategoryService(session).get_all_categories(active_only)
+        return [CategoryResponse.model_validate(cat) for cat in categories]
+
+    return await db.run_sync(
+        lambda session: cached_json_response(request, session, table_versions("categories"), load,
+                                             CATALOG_CACHE_CONTROL)
+    )
 
 
 @router.get(
@@ -90,17 +111,25 @@ def get_categories(
     response_model=List[CategoryTree],
     summary="Obtenir l'arbre des catégories"
 )
-def get_category_tree(
+async def get_category_tree(
+    request: Request,
     active_only: bool = Query(False, description="Ne retourner que les catégories actives"),
-    category_service: CategoryService = Depends(get_category_service)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère l'arbre hiérarchique des catégories.
     
     Retourne les catégories racines avec leurs sous-catégories imbriquées.
+    Réponse en cache (ETag, 304 si `If-None-Match` correspond).
     """
-    tree = category_service.get_category_tree(active_only)
-    return [CategoryTree.model_validate(cat) for cat in tree]
+    def load(session: Session) -> List[CategoryTree]:
+        tree = CategoryService(session).get_category_tree(active_only)
+        return [CategoryTree.model_validate(cat) for cat in tree]
+
+    return await db.run_sync(
+        lambda session: cached_json_response(request, session, table_versions("categories"), load,
+                                             CATALOG_CACHE_CONTROL)
+    )
 
 
 @router.get(
@@ -108,13 +137,19 @@ def get_category_tree(
     response_model=CategoryResponse,
     summary="Obtenir une catégorie"
 )
-def get_category(
+async def get_category(
+    request: Request,
     category_id: int,
-    category_service: CategoryService = Depends(get_category_service)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Récupère une catégorie spécifique par son ID."""
-    category = category_service.get_category(category_id)
-    return CategoryResponse.model_validate(category)
+    def load(session: Session) -> CategoryResponse:
+        return CategoryResponse.model_validate(CategoryService(session).get_category(category_id))
+
+    return await db.run_sync(
+        lambda session: cached_json_response(request, session, table_versions("categories"), load,
+                                             CATALOG_CACHE_CONTROL)
+    )
 
 
 @router.put(
@@ -181,18 +216,26 @@ def create_tag(
     response_model=List[TagResponse],
     summary="Obtenir tous les tags"
 )
-def get_tags(
+async def get_tags(
+    request: Request,
     type: Optional[str] = Query(None, description="Filtrer par type de tag"),
     active_only: bool = Query(False, description="Ne retourner que les tags actifs"),
-    tag_service: TagService = Depends(get_tag_service)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère la liste de tous les tags.
     
     Cette route est publique et ne nécessite pas d'authentification.
+    Réponse en cache (ETag, 304 si `If-None-Match` correspond).
     """
-    tags = tag_service.get_all_tags(type, active_only)
-    return [TagResponse.model_validate(tag) for tag in tags]
+    def load(session: Session) -> List[TagResponse]:
+        tags = TagService(session).get_all_tags(type, active_only)
+        return [TagResponse.model_validate(tag) for tag in tags]
+
+    return await db.run_sync(
+        lambda session: cached_json_response(request, session, table_versions("tags"), load,
+                                             CATALOG_CACHE_CONTROL)
+    )
 
 
 # ============= Unit Endpoints =============
@@ -227,18 +270,26 @@ def create_unit(
     response_model=List[UnitResponse],
     summary="Obtenir toutes les unités"
 )
-def get_units(
+async def get_units(
+    request: Request,
     unit_type: Optional[str] = Query(None, description="Filtrer par type d'unité"),
     active_only: bool = Query(False, description="Ne retourner que les unités actives"),
-    unit_service: UnitService = Depends(get_unit_service)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère la liste de toutes les unités de mesure.
     
     Cette route est publique et ne nécessite pas d'authentification.
+    Réponse en cache (ETag, 304 si `If-None-Match` correspond).
     """
-    units = unit_service.get_all_units(unit_type, active_only)
-    return [UnitResponse.model_validate(unit) for unit in units]
+    def load(session: Session) -> List[UnitResponse]:
+        units = UnitService(session).get_all_units(unit_type, active_only)
+        return [UnitResponse.model_validate(unit) for unit in units]
+
+    return await db.run_sync(
+        lambda session: cached_json_response(request, session, table_versions("units"), load,
+                                             CATALOG_CACHE_CONTROL)
+    )
 
 
 # ============= Product Endpoints =============
@@ -281,11 +332,13 @@ def create_product(
 
 @router.get(
     "/",
-    response_model=List[ProductResponse],
+    response_model=Union[List[ProductResponse], ProductSearchResponse],
     summary="Rechercher des produits"
 )
-def search_products(
+async def search_products(
+    response: Response,
     category_id: Optional[int] = Query(None, description="Filtrer par catégorie"),
+    include_descendants: bool = Query(False, description="Inclure les sous-catégories de la catégorie filtrée"),
     producer_id: Optional[int] = Query(None, description="Filtrer par producteur"),
     tag_ids: Optional[List[int]] = Query(None, description="Filtrer par tags"),
     min_price: Optional[Decimal] = Query(None, description="Prix minimum"),
@@ -295,16 +348,30 @@ def search_products(
     search_term: Optional[str] = Query(None, description="Recherche textuelle"),
     skip: int = Query(0, ge=0, description="Nombre d'éléments à ignorer"),
     limit: int = Query(100, ge=1, le=100, description="Nombre d'éléments à retourner"),
-    product_service: ProductService = Depends(get_product_service)
+    include_facets: bool = Query(False, description="Inclure les facettes (catégories, tags, prix, stock)"),
+    cursor: Optional[str] = Query(None, description="Curseur de pagination (vide pour la première page)"),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Recherche de produits avec filtres multiples.
     
     Cette route est publique et ne retourne que les produits actifs.
     Tous les filtres sont optionnels et peuvent être combinés.
+    
+    Avec **include_descendants=true**, **category_id** couvre aussi toutes
+    les sous-catégories (à n'importe quelle profondeur).
+    
+    Avec **include_facets=true**, la réponse devient `{"products": [...], "facets": {...}}` :
+    les compteurs par catégorie, tag, tranche de prix et disponibilité sont calculés
+    sur l'ensemble filtré en une seule requête agrégée.
+    
+    Avec **cursor** (vide pour la première page), la pagination se fait par curseur :
+    le curseur de la page suivante est renvoyé dans l'en-tête `X-Next-Cursor`
+    et `skip` est ignoré.
     """
     filters = ProductSearchFilters(
         category_id=category_id,
+        include_descendants=include_descendants,
         producer_id=producer_id,
         tag_ids=tag_ids,
         min_price=min_price,
@@ -313,8 +380,22 @@ def search_products(
         in_stock=in_stock,
         search_term=search_term
     )
-    products = product_service.search_products(filters, skip, limit)
-    return [ProductResponse.model_validate(p) for p in products]
+    def load(session: Session):
+        product_service = ProductService(session)
+        if include_facets:
+            result = product_service.search_products(filters, skip, limit, include_facets=True, cursor=cursor)
+            set_next_cursor_header(response, result["products"])
+            return ProductSearchResponse(
+                products=[ProductResponse.model_validate(p) for p in result["products"]],
+                facets=result["facets"],
+                next_cursor=getattr(result["products"], "next_cursor", None)
+            )
+
+        products = product_service.search_products(filters, skip, limit, cursor=cursor)
+        set_next_cursor_header(response, products)
+        return [ProductResponse.model_validate(p) for p in products]
+
+    return await db.run_sync(load)
 
 
 @router.get(
@@ -323,41 +404,103 @@ def search_products(
     summary="Obtenir mes produits"
 )
 def get_my_products(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     active_only: bool = Query(False, description="Ne retourner que les produits actifs"),
     category_id: Optional[int] = Query(None, description="Filtrer par catégorie"),
     is_active: Optional[bool] = Query(None, description="Filtrer par statut actif"),
+    cursor: Optional[str] = Query(None, description="Curseur de pagination (vide pour la première page)"),
     current_user=Depends(get_current_user),
     product_service: ProductService = Depends(get_product_service)
 ):
     """
     Récupère tous les produits du producteur connecté.
     
-    **Réservé aux producteurs.**
+    **Réservé aux producteurs.** Pagination par offset (`skip`) ou par curseur
+    (`cursor`, page suivante dans l'en-tête `X-Next-Cursor`).
     """
     # Utiliser is_active si fourni, sinon active_only
     filter_active = is_active if is_active is not None else active_only
-    products = product_service.get_my_products(current_user.id, skip, limit, filter_active, category_id)
+    products = product_service.get_my_products(
+        current_user.id, skip, limit, filter_active, category_id, cursor=cursor
+    )
+    set_next_cursor_header(response, products)
     return [ProductResponse.model_validate(p) for p in products]
 
 
+@router.post(
+    "/catalog/import",
+    response_model=CatalogImportReport,
+    summary="Importer un catalogue (CSV ou NDJSON)"
+)
+async def import_product_catalog(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="Format du corps : csv ou ndjson"),
+    current_user=Depends(require_producer),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Crée ou met à jour les produits du producteur connecté depuis le corps de
+    la requête, lu en flux.
+
+    **Réservé aux producteurs.**
+
+    - Un produit est identifié par son **slug** : un slug existant est mis à
+      jour, un nouveau slug crée le produit.
+    - **CSV** : en-tête obligatoire (slug, name, price au minimum) ; tags par
+      slugs séparés par `|` ; une variante par ligne dans les colonnes
+      `variant_sku`, `variant_name`, `variant_price_modifier`,
+      `variant_stock`, `variant_is_active` (lignes consécutives de même slug).
+    - **NDJSON** : un objet par ligne, `tags` (slugs) et `variants` en listes.
+
+    Les lignes sont écrites par lots (une transaction par lot) ; le rapport
+    indique les produits créés et mis à jour, et les lignes rejetées avec leur
+    numéro et leurs erreurs.
+    """
+    return await import_catalog(db, current_user.id, request.stream(), format)
+
+
+@router.get(
+    "/catalog/export",
+    summary="Exporter mon catalogue (CSV ou NDJSON)"
+)
+async def export_product_catalog(
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="Format : csv ou ndjson"),
+    current_user=Depends(require_producer)
+):
+    """
+    Exporte le catalogue du producteur connecté dans le format de l'import,
+    en flux (page par page, sans charger tout le catalogue en mémoire).
+
+    **Réservé aux producteurs.** Lu sur les réplicas : un produit modifié à
+    l'instant peut apparaître avec un léger retard.
+    """
+    producer_id = await get_export_producer_id(current_user.id)
+    return StreamingResponse(
+        export_catalog(producer_id, format),
+        media_type=CATALOG_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="catalogue.{format}"'}
+    )
+
+
 @router.get(
     "/{product_id}",
     response_model=ProductResponse,
     summary="Obtenir un produit"
 )
-def get_product(
+async def get_product(
     product_id: int,
-    product_service: ProductService = Depends(get_product_service)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère un produit spécifique par son ID.
     
     Cette route est publique.
     """
-    product = product_service.get_product(product_id)
-    return ProductResponse.model_validate(product)
+    return await db.run_sync(
+        lambda session: ProductResponse.model_validate(ProductService(session).get_product(product_id))
+    )
 
 
 @router.get(
@@ -365,9 +508,9 @@ def get_product(
     response_model=ProductComplete,
     summary="Obtenir un produit complet"
 )
-def get_complete_product(
+async def get_complete_product(
     product_id: int,
-    product_service: ProductService = Depends(get_product_service)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère un produit avec toutes ses informations :
@@ -379,8 +522,9 @@ def get_complete_product(
     
     Cette route est publique.
     """
-    product = product_service.get_complete_product(product_id)
-    return ProductComplete.model_validate(product)
+    return await db.run_sync(
+        lambda session: ProductComplete.model_validate(ProductService(session).get_complete_product(product_id))
+    )
 
 
 @router.put(
@@ -404,6 +548,31 @@ def update_product(
     return ProductResponse.model_validate(product)
 
 
+@router.post(
+    "/stock/batch",
+    response_model=BatchStockResponse,
+    summary="Mettre à jour le stock de plusieurs produits"
+)
+def update_stock_batch(
+    batch: BatchStockUpdate,
+    current_user=Depends(get_current_user),
+    product_service: ProductService = Depends(get_product_service)
+):
+    """
+    Applique plusieurs mouvements de stock en une seule transaction.
+
+    Chaque mouvement porte sur un produit, ou sur une de ses variantes si
+    **variant_id** est fourni, avec les mêmes types que la route unitaire
+    (**in**, **out**, **adjustment**). Les mouvements sont appliqués dans
+    l'ordre ; si l'un d'eux échoue (produit d'un autre producteur, stock
+    négatif), aucun n'est enregistré.
+
+    La réponse donne le stock final de chaque ligne touchée et les alertes de
+    stock déclenchées.
+    """
+    return product_service.update_stock_batch(current_user.id, batch.adjustments)
+
+
 @router.post(
     "/{product_id}/stock",
     response_model=ProductResponse,
@@ -479,27 +648,26 @@ def add_product_image(
     return ProductImageResponse.model_validate(image)
 
 
-@router.post(
-    "/{product_id}/images/upload",
-    response_model=ProductImageResponse,
-    status_code=status.HTTP_201_CREATED,
-    summary="Uploader un fichier image"
-)
-def upload_product_image(
+async def upload_product_image(
     product_id: int,
     file: UploadFile = File(...),
     alt_text: Optional[str] = Form(None),
     position: int = Form(0),
     is_primary: bool = Form(False),
     current_user=Depends(get_current_user),
-    product_service: ProductService = Depends(get_product_service)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Upload un fichier image et enregistre son URL dans la base.
     
     Seul le producteur propriétaire du produit peut uploader l'image.
+    Taille limitée à PRODUCT_IMAGE_MAX_BYTES : 413 sur un Content-Length
+    trop grand, avant toute lecture, ou dès que le corps reçu dépasse la
+    limite. Les déclinaisons thumb, card et full (WebP et JPEG) sont
+    renvoyées dans `renditions` ; `url` pointe vers la déclinaison full en JPEG.
     """
-    image = product_service.add_image_file(
+    return await add_image_file(
+        db,
         product_id=product_id,
         user_id=current_user.id,
         image_file=file,
@@ -507,7 +675,19 @@ def upload_product_image(
         position=position,
         is_primary=is_primary
     )
-    return ProductImageResponse.model_validate(image)
+
+
+# Déclarée via add_api_route : le décorateur ne permet pas de choisir la classe
+# de route, nécessaire pour borner le corps avant l'analyse multipart
+router.add_api_route(
+    "/{product_id}/images/upload",
+    upload_product_image,
+    methods=["POST"],
+    response_model=ProductImageResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Uploader un fichier image",
+    route_class_override=limited_body_route(lambda: settings.PRODUCT_IMAGE_MAX_BYTES)
+)
 
 
 @router.get(
@@ -515,17 +695,20 @@ def upload_product_image(
     response_model=List[ProductImageResponse],
     summary="Obtenir les images d'un produit"
 )
-def get_product_images(
+async def get_product_images(
     product_id: int,
-    product_service: ProductService = Depends(get_product_service)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère toutes les images d'un produit.
     
     Cette route est publique.
     """
-    images = product_service.get_product_images(product_id)
-    return [ProductImageResponse.model_validate(img) for img in images]
+    def load(session: Session) -> List[ProductImageResponse]:
+        images = ProductService(session).get_product_images(product_id)
+        return [ProductImageResponse.model_validate(img) for img in images]
+
+    return await db.run_sync(load)
 
 
 # ============= Product Variants =============
@@ -559,18 +742,21 @@ def add_product_variant(
     response_model=List[ProductVariantResponse],
     summary="Obtenir les variantes d'un produit"
 )
-def get_product_variants(
+async def get_product_variants(
     product_id: int,
     active_only: bool = Query(False, description="Ne retourner que les variantes actives"),
-    product_service: ProductService = Depends(get_product_service)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère toutes les variantes d'un produit.
     
     Cette route est publique.
     """
-    variants = product_service.get_product_variants(product_id, active_only)
-    return [ProductVariantResponse.model_validate(v) for v in variants]
+    def load(session: Session) -> List[ProductVariantResponse]:
+        variants = ProductService(session).get_product_variants(product_id, active_only)
+        return [ProductVariantResponse.model_validate(v) for v in variants]
+
+    return await db.run_sync(load)
 
 
 # ============= Stock Alerts =============
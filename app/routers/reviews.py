@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, Query, status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from app.core.database import get_db
+from app.core.database import get_db, get_async_read_db
 from app.services.review_service import ReviewService
 from app.schemas.reviews import (
     ReviewCreate, ReviewUpdate, ReviewResponse,
@@ -51,22 +52,21 @@ def create_product_review(
 
 
 @router.get("/products/{review_id}", response_model=ReviewResponse)
-def get_product_review(
+async def get_product_review(
     review_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Récupère les détails d'un avis produit spécifique."""
-    service = ReviewService(db)
-    return service.get_review(review_id)
+    return await db.run_sync(lambda session: ReviewService(session).get_review(review_id))
 
 
 @router.get("/products/product/{product_id}", response_model=List[ReviewResponse])
-def get_product_reviews(
+async def get_product_reviews(
     product_id: int,
     approved_only: bool = Query(True, description="Afficher uniquement les avis approuvés"),
     skip: int = Query(0, ge=0, description="Nombre d'éléments à sauter (pagination)"),
     limit: int = Query(100, ge=1, le=100, description="Nombre maximum d'éléments"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère tous les avis d'un produit spécifique.
@@ -77,16 +77,17 @@ def get_product_reviews(
     
     Les avis sont triés du plus récent au plus ancien.
     """
-    service = ReviewService(db)
-    return service.get_product_reviews(product_id, approved_only, skip, limit)
+    return await db.run_sync(
+        lambda session: ReviewService(session).get_product_reviews(product_id, approved_only, skip, limit)
+    )
 
 
 @router.get("/products/user/{user_id}", response_model=List[ReviewResponse])
-def get_user_reviews(
+async def get_user_reviews(
     user_id: int,
     skip: int = Query(0, ge=0, description="Nombre d'éléments à sauter"),
     limit: int = Query(100, ge=1, le=100, description="Nombre maximum d'éléments"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère tous les avis laissés par un utilisateur spécifique.
@@ -94,8 +95,9 @@ def get_user_reviews(
     Utile pour afficher l'historique complet des évaluations d'un client
     sur sa page de profil.
     """
-    service = ReviewService(db)
-    return service.get_user_reviews(user_id, skip, limit)
+    return await db.run_sync(
+        lambda session: ReviewService(session).get_user_reviews(user_id, skip, limit)
+    )
 
 
 @router.patch("/products/{review_id}", response_model=ReviewResponse)
@@ -135,9 +137,9 @@ def delete_product_review(
 
 
 @router.get("/products/product/{product_id}/stats", response_model=ProductRatingStats)
-def get_product_statistics(
+async def get_product_statistics(
     product_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère les statistiques complètes d'un produit.
@@ -151,8 +153,7 @@ def get_product_statistics(
     Ces statistiques sont essentielles pour afficher sur la fiche produit
     des informations claires qui aident les clients à prendre des décisions.
     """
-    service = ReviewService(db)
-    return service.get_product_stats(product_id)
+    return await db.run_sync(lambda session: ReviewService(session).get_product_stats(product_id))
 
 
 # ============================================================================
@@ -180,11 +181,11 @@ def create_producer_review(
 
 
 @router.get("/producers/producer/{producer_id}", response_model=List[ProducerReviewResponseModel])
-def get_producer_reviews(
+async def get_producer_reviews(
     producer_id: int,
     skip: int = Query(0, ge=0, description="Nombre d'éléments à sauter"),
     limit: int = Query(100, ge=1, le=100, description="Nombre maximum d'éléments"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère tous les avis d'un producteur.
@@ -192,8 +193,9 @@ def get_producer_reviews(
     Les avis sont triés du plus récent au plus ancien.
     Inclut les éventuelles réponses du producteur.
     """
-    service = ReviewService(db)
-    return service.get_producer_reviews(producer_id, skip, limit)
+    return await db.run_sync(
+        lambda session: ReviewService(session).get_producer_reviews(producer_id, skip, limit)
+    )
 
 
 @router.post("/producers/{review_id}/respond", response_model=ProducerReviewResponseModel)
@@ -221,9 +223,9 @@ def respond_to_producer_review(
 
 
 @router.get("/producers/producer/{producer_id}/stats", response_model=ProducerRatingStats)
-def get_producer_statistics(
+async def get_producer_statistics(
     producer_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère les statistiques d'un producteur.
@@ -236,8 +238,7 @@ def get_producer_statistics(
     Le taux de réponse est un indicateur clé du niveau d'engagement
     et de professionnalisme du producteur.
     """
-    service = ReviewService(db)
-    return service.get_producer_stats(producer_id)
+    return await db.run_sync(lambda session: ReviewService(session).get_producer_stats(producer_id))
 
 
 # ============================================================================
@@ -315,10 +316,10 @@ def report_review(
 
 
 @router.get("/reports/pending", response_model=List[ReviewReportResponse])
-def get_pending_reports(
+async def get_pending_reports(
     skip: int = Query(0, ge=0, description="Nombre d'éléments à sauter"),
     limit: int = Query(100, ge=1, le=100, description="Nombre maximum d'éléments"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère tous les signalements en attente de modération.
@@ -329,8 +330,9 @@ def get_pending_reports(
     triés du plus récent au plus ancien. Les modérateurs peuvent ensuite
     examiner chaque signalement et décider de l'action appropriée.
     """
-    service = ReviewService(db)
-    return service.get_pending_reports(skip, limit)
+    return await db.run_sync(
+        lambda session: ReviewService(session).get_pending_reports(skip, limit)
+    )
 
 
 @router.patch("/reports/{report_id}", response_model=ReviewReportResponse)
@@ -357,9 +359,9 @@ def moderate_report(
 
 
 @router.get("/reports/review/{review_id}", response_model=List[ReviewReportResponse])
-def get_review_reports(
+async def get_review_reports(
     review_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Récupère tous les signalements d'un avis spécifique.
@@ -370,5 +372,4 @@ def get_review_reports(
     pourquoi un avis a été désapprouvé. Permet aussi d'identifier les avis
     qui ont reçu plusieurs signalements et nécessitent une attention particulière.
     """
-    service = ReviewService(db)
-    return service.get_review_reports(review_id)
\ No newline at end of file
+    return await db.run_sync(lambda session: ReviewService(session).get_review_reports(review_id))
\ No newline at end of file
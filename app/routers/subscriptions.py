@@ -4,6 +4,7 @@ from typing import List, Optional
 from datetime import date
 
 from app.core import deps
+from app.core.principal_cache import Principal
 from app.core.database import get_db
 from app.models.auth import User
 from app.schemas.subscriptions import (
@@ -26,14 +27,10 @@ router = APIRouter(prefix="/subscriptions", tags=["subscriptions"])
 # Les dépendances d'authentification sont maintenant dans app.core.deps
 
 def get_current_producer_id(
-    current_user: User = Depends(deps.get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(deps.get_current_active_user)
 ) -> Optional[int]:
-    """Récupère l'ID du producteur depuis le profil utilisateur"""
-    from app.repositories.profile_repository import ProducerProfileRepository
-    repo = ProducerProfileRepository(db)
-    profile = repo.get_by_user_id(current_user.id)
-    return profile.id if profile else None
+    """ID du profil producteur, porté par le principal (aucune requête)"""
+    return current_user.producer_profile_id
 
 
 # ============================================================================
@@ -77,14 +77,13 @@ def get_my_wishlists(
     Retourne les listes triées par ordre personnalisé (sort_order) puis par date de création.
     Chaque liste inclut le nombre d'items qu'elle contient.
     """
-    wishlists = WishlistService.get_user_wishlists(db, current_user.id)
+    wishlists = WishlistService.get_user_wishlists_with_counts(db, current_user.id)
     
-    # Enrichir avec le nombre d'items
+    # Enrichir avec le nombre d'items (compté par la même requête)
     result = []
-    for wishlist in wishlists:
-        items_count = WishlistItemService.get_wishlist_items(db, wishlist.id, load_products=False)
+    for wishlist, items_count in wishlists:
         wishlist_dict = wishlist.__dict__.copy()
-        wishlist_dict['items_count'] = len(items_count)
+        wishlist_dict['items_count'] = items_count
         result.append(wishlist_dict)
     
     return result
@@ -340,6 +340,29 @@ class CommissionWithDetails(Commission):
     category: Optional[Dict[str, Any]] = Field(None, description="Détails de la catégorie")
 
 
+class CommissionLookup(BaseModel):
+    """Couple (producteur, catégorie) dont on cherche la commission"""
+    producer_id: Optional[int] = Field(None, description="ID utilisateur du producteur")
+    category_id: Optional[int] = Field(None, description="ID de la catégorie")
+
+
+class CommissionResolveRequest(BaseModel):
+    """Résolution groupée des commissions"""
+    pairs: List[CommissionLookup] = Field(..., min_length=1, max_length=10000)
+    on_date: Optional[date] = Field(None, description="Date d'application (défaut : aujourd'hui)")
+
+
+class CommissionResolution(BaseModel):
+    """Règle retenue pour un couple (producteur, catégorie)"""
+    producer_id: Optional[int] = None
+    category_id: Optional[int] = None
+    commission_id: Optional[int] = Field(None, description="Règle appliquée (NULL = aucune)")
+    percentage: Optional[Decimal] = None
+    fixed_amount: Optional[Decimal] = None
+    min_transaction_amount: Optional[Decimal] = None
+    max_transaction_amount: Optional[Decimal] = None
+
+
 # ============ TAX RATE SCHEMAS ============
 
 class TaxRateBase(BaseModel):
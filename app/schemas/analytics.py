@@ -55,6 +55,11 @@ class ProductViewResponse(ProductViewBase):
     
     model_config = ConfigDict(from_attributes=True, populate_by_name=True)
 
+class ProductViewAccepted(BaseModel):
+    """Accusé de réception d'une vue mise en file (écrite en base par lots)"""
+    product_id: int
+    status: str = "accepted"
+
 # ============================================================================
 # SCHÉMAS SEARCHQUERY
 # ============================================================================
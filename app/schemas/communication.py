@@ -45,6 +45,7 @@ class NotificationListResponse(BaseModel):
     notifications: List[NotificationResponse]
     total: int
     unread_count: int
+    next_cursor: Optional[str] = None
 
 
 # ============================================================================
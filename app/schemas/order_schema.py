@@ -280,6 +280,7 @@ class OrderListResponse(BaseModel):
     total: int
     page: int
     limit: int
+    next_cursor: Optional[str] = None  # Renseigné en pagination par curseur
 
 class MessageResponse(BaseModel):
     message: str
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator, ConfigDict
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime, date
 from decimal import Decimal
 from enum import Enum
@@ -69,6 +69,7 @@ class CategoryUpdate(BaseModel):
 class CategoryResponse(CategoryBase):
     """Schéma de réponse pour une catégorie"""
     id: int
+    path: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
@@ -253,10 +254,20 @@ class ProductImageUpdate(BaseModel):
     is_primary: Optional[bool] = None
 
 
+class ImageRendition(BaseModel):
+    """Déclinaison d'une image uploadée, en WebP et en JPEG"""
+    width: int
+    height: int
+    webp: str
+    jpeg: str
+
+
 class ProductImageResponse(ProductImageBase):
     """Schéma de réponse pour une image"""
     id: int
     product_id: int
+    thumbnail_url: str
+    renditions: Optional[Dict[str, ImageRendition]] = None
     uploaded_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
@@ -412,6 +423,38 @@ class ProductComplete(ProductResponse):
     model_config = ConfigDict(from_attributes=True)
 
 
+# ============= Catalog Import / Export Schemas =============
+
+class CatalogVariantRow(ProductVariantBase):
+    """Variante d'une ligne d'import : le SKU est la clé de l'upsert"""
+    sku: str = Field(..., min_length=1, max_length=50)
+
+
+class CatalogImportRow(ProductBase):
+    """Ligne d'import de catalogue : produit identifié par son slug chez le producteur"""
+    price: Decimal = Field(..., gt=0)
+    tags: Optional[List[str]] = None  # slugs de tags ; None = tags inchangés
+    variants: List[CatalogVariantRow] = []
+
+
+class CatalogImportError(BaseModel):
+    """Ligne rejetée par l'import (numéro de ligne du fichier)"""
+    line: int
+    slug: Optional[str] = None
+    errors: List[str]
+
+
+class CatalogImportReport(BaseModel):
+    """Bilan d'un import de catalogue"""
+    processed: int = 0
+    created: int = 0
+    updated: int = 0
+    variants: int = 0
+    failed: int = 0
+    errors: List[CatalogImportError] = []
+    errors_truncated: bool = False
+
+
 # ============= Utility Schemas =============
 
 class ProductStockUpdate(BaseModel):
@@ -421,9 +464,37 @@ class ProductStockUpdate(BaseModel):
     reason: Optional[str] = None
 
 
+class StockAdjustment(ProductStockUpdate):
+    """Mouvement d'un lot : stock d'un produit, ou d'une de ses variantes si variant_id"""
+    product_id: int
+    variant_id: Optional[int] = None
+    quantity: int = Field(..., ge=0)
+    reason: Optional[str] = Field(None, max_length=255)
+
+
+class BatchStockUpdate(BaseModel):
+    """Mouvements de stock appliqués ensemble (tout ou rien)"""
+    adjustments: List[StockAdjustment] = Field(..., min_length=1, max_length=1000)
+
+
+class StockLevel(BaseModel):
+    """Stock après le lot"""
+    product_id: int
+    variant_id: Optional[int] = None
+    stock: int
+
+
+class BatchStockResponse(BaseModel):
+    """Résultat d'une mise à jour de stock groupée"""
+    levels: List[StockLevel]
+    movements: int
+    triggered_alerts: List[StockAlertResponse] = []
+
+
 class ProductSearchFilters(BaseModel):
     """Filtres de recherche pour les produits"""
     category_id: Optional[int] = None
+    include_descendants: bool = False
     producer_id: Optional[int] = None
     tag_ids: Optional[List[int]] = None
     min_price: Optional[Decimal] = None
@@ -433,6 +504,36 @@ class ProductSearchFilters(BaseModel):
     search_term: Optional[str] = None
 
 
+class FacetCount(BaseModel):
+    """Nombre de produits pour une valeur de facette (catégorie ou tag)"""
+    value: int
+    count: int
+
+
+class PriceRangeFacet(BaseModel):
+    """Nombre de produits dans une tranche de prix [min_price, max_price["""
+    min_price: Decimal
+    max_price: Optional[Decimal] = None
+    count: int
+
+
+class ProductFacets(BaseModel):
+    """Facettes de la recherche, calculées sur l'ensemble filtré"""
+    total: int
+    categories: List[FacetCount] = []
+    tags: List[FacetCount] = []
+    price_ranges: List[PriceRangeFacet] = []
+    in_stock: int = 0
+    out_of_stock: int = 0
+
+
+class ProductSearchResponse(BaseModel):
+    """Résultats de recherche accompagnés des facettes"""
+    products: List[ProductResponse]
+    facets: ProductFacets
+    next_cursor: Optional[str] = None
+
+
 # Mise à jour de la référence circulaire
 CategoryTree.model_rebuild()
 ProductResponse.model_rebuild()
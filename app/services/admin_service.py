@@ -1,9 +1,11 @@
-from typing import List, Optional, Dict, Any, Tuple
-from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Dict, Any, Iterable, Tuple
+from datetime import date, datetime, timedelta, timezone
 from sqlalchemy.orm import Session
 from decimal import Decimal
 import json
 
+from app.core.commission_rules import CommissionRule, TaxRule, get_rule_cache
+from app.core.settings_cache import SettingsSnapshot, get_settings_cache
 from app.models.admin import (
     AdminAction,
     BannedUser,
@@ -122,7 +124,8 @@ class AdminActionService:
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
         limit: int = 100,
-        offset: int = 0
+        offset: int = 0,
+        cursor: Optional[str] = None
     ) -> Tuple[List[AdminAction], int]:
         """
         Recherche avancée dans le journal d'audit.
@@ -132,6 +135,7 @@ class AdminActionService:
         entre janvier et mars 2024".
         
         Retourne les résultats paginés et le nombre total pour la pagination frontend.
+        Avec `cursor`, la liste retournée porte aussi `next_cursor`.
         """
         actions = AdminActionRepository.search(
             db,
@@ -141,7 +145,8 @@ class AdminActionService:
             start_date=start_date,
             end_date=end_date,
             limit=limit,
-            offset=offset
+            offset=offset,
+            cursor=cursor
         )
         
         # Pour la pagination, on devrait aussi compter le total
@@ -561,8 +566,11 @@ class SystemSettingService:
         """
         Récupère directement la valeur d'un paramètre, convertie selon son type.
         La valeur est automatiquement convertie en boolean, integer, ou autre selon le type.
+        
+        Lue depuis le cache du processus : pas de requête tant que le compteur
+        de version des paramètres n'a pas changé.
         """
-        return SystemSettingRepository.get_value(db, key, default)
+        return get_settings_cache().get_value(db, key, default)
     
     @staticmethod
     def update_setting(
@@ -627,6 +635,14 @@ class SystemSettingService:
         """
         return SystemSettingRepository.get_public(db)
     
+    @staticmethod
+    def get_public_settings_snapshot(db: Session) -> SettingsSnapshot:
+        """
+        Paramètres publics servis depuis le cache du processus, avec l'ETag
+        de leur représentation (`snapshot.public`, `snapshot.etag`).
+        """
+        return get_settings_cache().snapshot(db)
+    
     @staticmethod
     def get_settings_by_category(db: Session, category: str) -> List[SystemSetting]:
         """
@@ -746,13 +762,14 @@ class CommissionService:
         producer_id: int,
         category_id: Optional[int],
         transaction_amount: Decimal
-    ) -> Tuple[Decimal, Optional[Commission]]:
+    ) -> Tuple[Decimal, Optional[CommissionRule]]:
         """
         Calcule la commission applicable pour une vente.
         
         Cette méthode est appelée lors du traitement d'une commande pour déterminer
         combien la plateforme va prélever. Elle trouve la règle de commission la plus
-        spécifique applicable et calcule le montant exact.
+        spécifique applicable (index en mémoire, sans requête une fois chargé) et
+        calcule le montant exact.
         
         Retourne un tuple (montant de la commission, règle utilisée).
         
@@ -768,11 +785,7 @@ class CommissionService:
         ```
         """
         # Trouver la règle de commission applicable
-        commission_rule = CommissionRepository.get_active_for_producer(
-            db,
-            producer_id,
-            category_id
-        )
+        commission_rule = get_rule_cache().commissions(db).resolve(producer_id, category_id)
         
         if not commission_rule:
             # Pas de commission définie
@@ -802,6 +815,21 @@ class CommissionService:
         
         return commission_amount, commission_rule
     
+    @staticmethod
+    def resolve_commissions(
+        db: Session,
+        pairs: Iterable[Tuple[Optional[int], Optional[int]]],
+        on_date: Optional[date] = None
+    ) -> Dict[Tuple[Optional[int], Optional[int]], Optional[CommissionRule]]:
+        """
+        Résout en une fois la règle applicable à des milliers de couples
+        (producteur, catégorie), à `on_date` (défaut : aujourd'hui).
+        
+        `producer_id` est l'ID utilisateur du producteur. Aucune requête
+        tant que l'index en mémoire est à jour.
+        """
+        return get_rule_cache().commissions(db).resolve_many(pairs, on_date)
+    
     @staticmethod
     def update_commission(
         db: Session,
@@ -873,7 +901,7 @@ class TaxRateService:
         country: str,
         category_id: Optional[int],
         amount: Decimal
-    ) -> Tuple[Decimal, Optional[TaxRate]]:
+    ) -> Tuple[Decimal, Optional[TaxRule]]:
         """
         Calcule le montant de TVA applicable.
         
@@ -895,7 +923,7 @@ class TaxRateService:
         ```
         """
         # Trouver le taux de TVA applicable
-        tax_rate = TaxRateRepository.get_active_for_country(db, country, category_id)
+        tax_rate = get_rule_cache().tax_rates(db).resolve(country, category_id)
         
         if not tax_rate:
             # Pas de TVA définie pour ce pays/catégorie
@@ -909,6 +937,18 @@ class TaxRateService:
         
         return tax_amount, tax_rate
     
+    @staticmethod
+    def resolve_tax_rates(
+        db: Session,
+        pairs: Iterable[Tuple[str, Optional[int]]],
+        on_date: Optional[date] = None
+    ) -> Dict[Tuple[str, Optional[int]], Optional[TaxRule]]:
+        """
+        Résout en une fois le taux applicable à de nombreux couples
+        (pays, catégorie), à `on_date` (défaut : aujourd'hui).
+        """
+        return get_rule_cache().tax_rates(db).resolve_many(pairs, on_date)
+    
     @staticmethod
     def get_country_tax_rates(db: Session, country: str) -> List[TaxRate]:
         """
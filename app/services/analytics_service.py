@@ -1,7 +1,6 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from fastapi import HTTPException, status
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple
 from datetime import date, timedelta
 from decimal import Decimal
 
@@ -10,12 +9,10 @@ from app.repositories.analytics_repository import (
     SalesReportRepository, InventoryReportRepository
 )
 from app.schemas.analytics import (
-    ProductViewCreate, SearchQueryCreate, DashboardMetricCreate,
-    SalesReportCreate
+    SearchQueryCreate, DashboardMetricCreate, SalesReportCreate
 )
 from app.models.analytics import EntityType, MetricName, MetricPeriod
-from app.models.orders import Order, OrderStatus, OrderItem
-from app.models.products import Product, StockMovement
+from app.models.products import Product
 
 
 # ============================================================================
@@ -26,45 +23,34 @@ class ProductViewService:
     """
     Service pour gérer le tracking des vues de produits.
     
-    Ce service enregistre chaque consultation de produit et fournit des
-    analyses sur les produits les plus consultés, l'évolution du trafic, etc.
+    Les vues sont enregistrées par lots via le tampon de app.core.view_buffer ;
+    ce service les compacte et fournit des analyses sur les produits les plus
+    consultés, l'évolution du trafic, etc.
     """
     
     def __init__(self, db: Session):
         self.repository = ProductViewRepository(db)
         self.db = db
     
-    def track_view(self, view_data: ProductViewCreate):
+    def compact_views(self) -> int:
         """
-        Enregistre une vue de produit.
+        Replie les nouvelles vues brutes dans le cumul journalier.
         
-        Cette méthode est appelée chaque fois qu'un utilisateur consulte
-        la page d'un produit. Elle permet de construire des statistiques
-        précises sur l'intérêt porté à chaque produit.
+        Appelée périodiquement (lifespan, PRODUCT_VIEW_COMPACTION_INTERVAL)
+        ou par scripts/compact_product_views.py ; retourne le nombre de vues repliées.
         """
-        # Vérifier que le produit existe
-        product = self.db.query(Product).filter(Product.id == view_data.product_id).first()
-        if not product:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Produit non trouvé"
-            )
-        
-        return self.repository.create(
-            product_id=view_data.product_id,
-            user_id=view_data.user_id,
-            session_id=view_data.session_id,
-            referrer=view_data.referrer
-        )
+        return self.repository.compact_daily_views()
     
     def get_product_stats(self, product_id: int, start_date: Optional[date] = None,
-                         end_date: Optional[date] = None):
+                         end_date: Optional[date] = None, exact: bool = False):
         """
         Récupère les statistiques de vue d'un produit.
         
         Cette méthode agrège différentes métriques pour donner une vue
         complète de la popularité d'un produit : nombre total de vues,
         visiteurs uniques, évolution dans le temps.
+        
+        Les visiteurs uniques sont estimés (HyperLogLog) sauf si `exact` est vrai.
         """
         if not end_date:
             end_date = date.today()
@@ -76,7 +62,7 @@ class ProductViewService:
         )
         
         unique_viewers = self.repository.get_unique_viewers(
-            product_id, start_date, end_date
+            product_id, start_date, end_date, exact=exact
         )
         
         views_by_date = self.repository.get_views_by_date(
@@ -87,6 +73,7 @@ class ProductViewService:
             "product_id": product_id,
             "total_views": total_views,
             "unique_viewers": unique_viewers,
+            "unique_viewers_exact": exact,
             "views_by_date": views_by_date,
             "period": {"start_date": start_date, "end_date": end_date}
         }
@@ -266,6 +253,40 @@ class DashboardMetricService:
             "metrics": metrics_dict
         }
     
+    @staticmethod
+    def period_bounds(metric_date: date, period: MetricPeriod) -> Tuple[date, date]:
+        """Premier et dernier jour (inclus) de la période contenant metric_date"""
+        if period == MetricPeriod.DAY:
+            return metric_date, metric_date
+        if period == MetricPeriod.WEEK:
+            start = metric_date - timedelta(days=metric_date.weekday())
+            return start, start + timedelta(days=6)
+        if period == MetricPeriod.MONTH:
+            start = metric_date.replace(day=1)
+            next_month = (start + timedelta(days=32)).replace(day=1)
+            return start, next_month - timedelta(days=1)
+        # YEAR
+        return metric_date.replace(month=1, day=1), metric_date.replace(month=12, day=31)
+    
+    def refresh_metrics(self, metric_date: date, period: MetricPeriod = MetricPeriod.DAY,
+                        entity_types: Optional[List[EntityType]] = None) -> Dict[str, int]:
+        """
+        Recalcule les métriques de tous les produits, producteurs et catégories.
+        
+        Pour chaque type d'entité : une requête d'agrégats groupés et un seul
+        upsert, quel que soit le nombre d'entités. Destinée au job planifié
+        (scripts/refresh_dashboard_metrics.py). Retourne le nombre de
+        métriques écrites par type d'entité.
+        """
+        start, end = self.period_bounds(metric_date, period)
+        written = {}
+        for entity_type in entity_types or list(EntityType):
+            totals = self.repository.get_entity_totals(entity_type, start, end)
+            written[entity_type.value] = self.repository.upsert_totals(
+                entity_type, totals, period, metric_date
+            )
+        return written
+    
     def calculate_product_metrics(self, product_id: int, metric_date: date,
                                  period: MetricPeriod = MetricPeriod.DAY):
         """
@@ -273,76 +294,22 @@ class DashboardMetricService:
         
         Cette méthode analyse les données brutes (vues, commandes) et
         calcule les métriques agrégées qui seront stockées pour affichage
-        rapide dans les dashboards.
+        rapide dans les dashboards. Même calcul que refresh_metrics,
+        restreint au produit.
         """
-        # Calculer les dates de début et fin selon la période
-        if period == MetricPeriod.DAY:
-            start = metric_date
-            end = metric_date
-        elif period == MetricPeriod.WEEK:
-            start = metric_date - timedelta(days=metric_date.weekday())
-            end = start + timedelta(days=6)
-        elif period == MetricPeriod.MONTH:
-            start = metric_date.replace(day=1)
-            if metric_date.month == 12:
-                end = metric_date.replace(day=31)
-            else:
-                end = (metric_date.replace(month=metric_date.month + 1, day=1) - timedelta(days=1))
-        else:  # YEAR
-            start = metric_date.replace(month=1, day=1)
-            end = metric_date.replace(month=12, day=31)
-        
-        # Calculer les vues
-        view_repo = ProductViewRepository(self.db)
-        total_views = view_repo.get_product_views_count(product_id, start, end)
-        
-        # Calculer les ventes
-        total_sales = self.db.query(func.sum(OrderItem.quantity)).join(Order).filter(
-            OrderItem.product_id == product_id,
-            Order.status.in_([OrderStatus.COMPLETED]),
-            Order.created_at >= start,
-            Order.created_at <= end + timedelta(days=1)
-        ).scalar() or 0
-        
-        # Calculer le revenu
-        total_revenue = self.db.query(func.sum(OrderItem.subtotal)).join(Order).filter(
-            OrderItem.product_id == product_id,
-            Order.status.in_([OrderStatus.COMPLETED]),
-            Order.created_at >= start,
-            Order.created_at <= end + timedelta(days=1)
-        ).scalar() or Decimal(0)
-        
-        # Créer ou mettre à jour les métriques
-        self.repository.create(
-            EntityType.PRODUCT, product_id, MetricName.VIEWS,
-            Decimal(total_views), period, metric_date
-        )
-        
-        self.repository.create(
-            EntityType.PRODUCT, product_id, MetricName.SALES,
-            Decimal(total_sales), period, metric_date
-        )
-        
-        self.repository.create(
-            EntityType.PRODUCT, product_id, MetricName.REVENUE,
-            total_revenue, period, metric_date
-        )
-        
-        # Calculer le taux de conversion si il y a des vues
-        if total_views > 0:
-            conversion_rate = (Decimal(total_sales) / Decimal(total_views)) * 100
-            self.repository.create(
-                EntityType.PRODUCT, product_id, MetricName.CONVERSION_RATE,
-                conversion_rate, period, metric_date
-            )
+        start, end = self.period_bounds(metric_date, period)
+        totals = self.repository.get_entity_totals(EntityType.PRODUCT, start, end, entity_ids=[product_id])
+        written = self.repository.upsert_totals_returning(
+            EntityType.PRODUCT, totals, period, metric_date
+        ).get(product_id, {})
         
         return {
             "product_id": product_id,
             "date": metric_date,
             "period": period,
-            "views": total_views,
-            "sales": total_sales,
-            "revenue": float(total_revenue)
+            "views": int(written.get(MetricName.VIEWS, 0)),
+            "sales": int(written.get(MetricName.SALES, 0)),
+            "revenue": float(written.get(MetricName.REVENUE, 0))
         }
 
 
@@ -402,34 +369,34 @@ class SalesReportService:
         """
         Calcule les statistiques de vente pour un producteur sur une période.
         
-        Cette méthode privée effectue les calculs complexes nécessaires
-        pour générer un rapport complet. Elle analyse toutes les commandes
-        complétées et agrège les données pertinentes.
+        Cette méthode privée effectue les calculs nécessaires pour générer
+        un rapport complet à partir des commandes complétées, agrégées en
+        SQL (voir calculate_all_sales_stats).
         """
-        # Récupérer toutes les commandes complétées du producteur
-        orders = self.db.query(Order).filter(
-            Order.producer_id == producer_id,
-            Order.status == OrderStatus.COMPLETED,
-            Order.created_at >= start_date,
-            Order.created_at <= end_date + timedelta(days=1)
-        ).all()
-        
-        total_orders = len(orders)
-        total_revenue = sum(order.total_amount for order in orders)
+        stats = self.calculate_all_sales_stats(start_date, end_date, producer_ids=[producer_id])
+        return stats.get(producer_id) or self._sales_stats(0, Decimal(0), 0)
+    
+    def calculate_all_sales_stats(self, start_date: date, end_date: date,
+                                  producer_ids: Optional[List[int]] = None) -> Dict[int, Dict]:
+        """
+        Calcule les statistiques de vente de tous les producteurs en une requête.
         
+        Retourne {producer_id: statistiques} pour les producteurs ayant au
+        moins une commande complétée sur la période. Les jobs de fin de mois
+        l'utilisent au lieu de charger les commandes producteur par producteur.
+        """
+        return {
+            row.producer_id: self._sales_stats(row.total_orders, row.total_revenue, row.total_products_sold)
+            for row in self.repository.get_sales_totals(start_date, end_date, producer_ids)
+        }
+    
+    @staticmethod
+    def _sales_stats(total_orders: int, total_revenue: Decimal, total_products_sold: int) -> Dict:
         # Calculer la commission (supposons 15% de commission)
         commission_rate = Decimal('0.15')
         total_commission = total_revenue * commission_rate
         net_revenue = total_revenue - total_commission
         
-        # Compter le nombre total de produits vendus
-        total_products_sold = self.db.query(func.sum(OrderItem.quantity)).join(Order).filter(
-            Order.producer_id == producer_id,
-            Order.status == OrderStatus.COMPLETED,
-            Order.created_at >= start_date,
-            Order.created_at <= end_date + timedelta(days=1)
-        ).scalar() or 0
-        
         # Calculer le panier moyen
         average_order_value = total_revenue / total_orders if total_orders > 0 else Decimal(0)
         
@@ -500,84 +467,27 @@ class InventoryReportService:
         
         Cette méthode est typiquement exécutée par un job automatisé à la
         fin de chaque journée. Elle analyse les mouvements de stock de la
-        journée et génère un rapport pour chaque produit.
-        """
-        # Récupérer tous les produits actifs du producteur
-        products = self.db.query(Product).filter(
-            Product.producer_id == producer_id,
-            Product.is_active
-        ).all()
-        
-        reports = []
-        for product in products:
-            # Vérifier si un rapport existe déjà pour cette date
-            existing = self.repository.get_report_for_date(product.id, report_date)
-            if existing:
-                continue
-            
-            # Calculer les mouvements de stock de la journée
-            stats = self._calculate_inventory_stats(product.id, report_date)
-            
-            # Créer le rapport
-            report = self.repository.create(
-                producer_id=producer_id,
-                product_id=product.id,
-                report_date=report_date,
-                **stats
-            )
-            reports.append(report)
-        
-        return reports
+        journée et génère un rapport pour chaque produit actif qui n'en a
+        pas encore. Retourne les rapports créés.
+        """
+        report_ids = self.repository.generate_reports(report_date, report_date, producer_id)
+        return self.repository.get_by_ids(report_ids)
     
-    def _calculate_inventory_stats(self, product_id: int, report_date: date) -> Dict:
+    def generate_reports(self, start_date: date, end_date: Optional[date] = None) -> int:
         """
-        Calcule les statistiques d'inventaire pour un produit sur une journée.
+        Génère les rapports de tous les producteurs, pour un jour ou une plage.
         
-        Cette méthode analyse les mouvements de stock (ventes, réceptions,
-        ajustements) pour calculer l'évolution du stock durant la journée.
+        Le job planifié (scripts/generate_inventory_reports.py) l'appelle pour
+        la veille ; une plage sert au rattrapage (backfill) : une seule requête
+        chaîne le stock sur toute la plage. Retourne le nombre de rapports créés.
         """
-        # Récupérer le stock du jour précédent
-        previous_report = self.repository.get_report_for_date(
-            product_id, report_date - timedelta(days=1)
-        )
-        stock_start = previous_report.stock_end if previous_report else 0
-        
-        # Calculer les ventes de la journée
-        stock_sold = self.db.query(func.sum(OrderItem.quantity)).join(Order).filter(
-            OrderItem.product_id == product_id,
-            func.date(Order.created_at) == report_date,
-            Order.status.in_([OrderStatus.COMPLETED, OrderStatus.READY])
-        ).scalar() or 0
-        
-        # Calculer les réceptions (mouvements de type IN)
-        stock_received = self.db.query(func.sum(StockMovement.quantity)).filter(
-            StockMovement.product_id == product_id,
-            func.date(StockMovement.created_at) == report_date,
-            StockMovement.type == 'in'
-        ).scalar() or 0
-        
-        # Calculer les ajustements (mouvements de type ADJUSTMENT)
-        stock_adjusted = self.db.query(func.sum(StockMovement.quantity)).filter(
-            StockMovement.product_id == product_id,
-            func.date(StockMovement.created_at) == report_date,
-            StockMovement.type == 'adjustment'
-        ).scalar() or 0
-        
-        # Calculer le stock final
-        stock_end = stock_start + stock_received - stock_sold + stock_adjusted
-        
-        # Récupérer le prix du produit pour calculer la valeur du stock
-        product = self.db.query(Product).filter(Product.id == product_id).first()
-        stock_value = stock_end * product.price if product else None
-        
-        return {
-            "stock_start": int(stock_start),
-            "stock_received": int(stock_received),
-            "stock_sold": int(stock_sold),
-            "stock_adjusted": int(stock_adjusted),
-            "stock_end": int(stock_end),
-            "stock_value": stock_value
-        }
+        end_date = end_date or start_date
+        if end_date < start_date:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="La date de fin doit être postérieure à la date de début"
+            )
+        return len(self.repository.generate_reports(start_date, end_date))
     
     def get_product_inventory_history(self, product_id: int,
                                      start_date: Optional[date] = None,
@@ -0,0 +1,501 @@
+"""
+Import et export du catalogue d'un producteur en flux (CSV ou NDJSON).
+
+Import (`import_catalog`) :
+1. le corps de la requête est lu par blocs et découpé en enregistrements au
+   fil de l'eau (`CatalogStreamParser`) : seuls la ligne en cours et le lot
+   en attente restent en mémoire ;
+2. chaque enregistrement est validé dès sa lecture (CatalogImportRow,
+   catégories, unités et tags chargés une seule fois) ; une ligne invalide
+   est rapportée avec son numéro et n'interrompt pas l'import ;
+3. les lignes valides sont écrites par lots de CATALOG_IMPORT_CHUNK_SIZE,
+   chaque lot dans sa propre transaction : un `INSERT ... ON CONFLICT`
+   multi-lignes pour les produits (clé : producteur + slug), un pour les
+   variantes (clé : SKU), un pour les tags, un pour les mouvements de stock.
+
+Un slug nouveau crée le produit, les champs absents prenant leur valeur
+par défaut ; pour un slug (ou un SKU de variante) existant, seuls les champs
+présents dans la ligne sont modifiés : une ré-importation partielle (prix
+seul, par exemple) ne remet pas le stock à zéro. En CSV, une cellule vide
+vaut champ absent. Les tags sont séparés par `|` et une variante
+occupe les colonnes `variant_*` ; les lignes consécutives de même slug
+ajoutent chacune une variante au produit (format de l'export).
+
+Export (`export_catalog`) : pages de EXPORT_PAGE_SIZE produits lues par clé
+(id croissant) sur les réplicas, une session par page, sérialisées puis
+envoyées ; la connexion est rendue au pool entre deux pages.
+"""
+import codecs
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import AsyncReadSessionLocal
+from app.models.products import Product, StockMovementType
+from app.repositories.product_repository import (
+    CategoryRepository, TagRepository, UnitRepository,
+    ProductRepository, ProductVariantRepository, StockMovementRepository
+)
+from app.repositories.profile_repository import ProducerProfileRepository
+from app.schemas.product_schema import CatalogImportError, CatalogImportReport, CatalogImportRow
+from app.services.product_service import ProductService
+
+CATALOG_MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+EXPORT_PAGE_SIZE = 200
+
+# Colonnes CSV (import et export)
+PRODUCT_COLUMNS = (
+    "slug", "name", "description", "category_id", "unit_id", "price", "stock_quantity",
+    "min_order", "max_order", "is_active", "is_featured", "origin", "harvest_date",
+)
+VARIANT_FIELDS = ("sku", "name", "price_modifier", "stock", "is_active")
+VARIANT_COLUMNS = tuple(f"variant_{name}" for name in VARIANT_FIELDS)
+CSV_COLUMNS = PRODUCT_COLUMNS + ("tags",) + VARIANT_COLUMNS
+REQUIRED_COLUMNS = ("slug", "name", "price")
+TAG_SEPARATOR = "|"
+
+
+class CatalogFormatError(ValueError):
+    """Flux illisible (encodage, en-tête CSV) : l'import s'arrête à cette ligne"""
+
+    def __init__(self, line: int, message: str):
+        super().__init__(message)
+        self.line = line
+
+
+class ParsedRecord(NamedTuple):
+    """Enregistrement lu : numéro de sa première ligne, données ou erreur"""
+    line: int
+    data: Optional[Dict[str, Any]]
+    error: Optional[str] = None
+
+
+class CatalogStreamParser:
+    """Découpe un flux d'octets UTF-8 (CSV ou NDJSON) en enregistrements"""
+
+    def __init__(self, fmt: str):
+        self.format = fmt
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._tail = ""
+        self._line_number = 0
+        self._header: Optional[List[str]] = None
+        # CSV : lignes d'un enregistrement dont un champ entre guillemets est ouvert
+        self._pending: List[str] = []
+        self._pending_line = 0
+        self._pending_quotes = 0
+        # CSV : dernier produit lu, complété par les lignes suivantes de même slug
+        self._previous: Optional[ParsedRecord] = None
+
+    def feed(self, data: bytes) -> List[ParsedRecord]:
+        try:
+            text = self._tail + self._decoder.decode(data)
+        except UnicodeDecodeError:
+            raise CatalogFormatError(self._line_number + 1, "Encodage invalide (UTF-8 attendu)")
+        lines = text.split("\n")
+        self._tail = lines.pop()
+        return self._parse_lines(lines)
+
+    def close(self) -> List[ParsedRecord]:
+        try:
+            text = self._tail + self._decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            raise CatalogFormatError(self._line_number + 1, "Encodage invalide (UTF-8 attendu)")
+        self._tail = ""
+        records = self._parse_lines([text] if text else [])
+        if self._pending:
+            records.append(ParsedRecord(self._pending_line, None, "Champ entre guillemets non terminé"))
+            self._pending = []
+        if self._previous is not None:
+            records.append(self._previous)
+            self._previous = None
+        return records
+
+    def _parse_lines(self, lines: List[str]) -> List[ParsedRecord]:
+        records: List[ParsedRecord] = []
+        for raw in lines:
+            self._line_number += 1
+            raw = raw.removesuffix("\r")
+            if self.format == "ndjson":
+                if raw.strip():
+                    records.append(self._parse_json(raw))
+                continue
+            if not self._pending:
+                if not raw.strip():
+                    continue
+                self._pending_line = self._line_number
+            self._pending.append(raw)
+            self._pending_quotes += raw.count('"')
+            if self._pending_quotes % 2:
+                continue
+            fields = next(csv.reader(["\n".join(self._pending)]))
+            self._pending, self._pending_quotes = [], 0
+            self._add_csv_record(fields, records)
+        return records
+
+    def _parse_json(self, raw: str) -> ParsedRecord:
+        try:
+            data = json.loads(raw)
+        except ValueError as exc:
+            return ParsedRecord(self._line_number, None, f"JSON invalide : {exc}")
+        if not isinstance(data, dict):
+            return ParsedRecord(self._line_number, None, "Un objet JSON par ligne est attendu")
+        return ParsedRecord(self._line_number, data)
+
+    def _add_csv_record(self, fields: List[str], records: List[ParsedRecord]) -> None:
+        if self._header is None:
+            header = [name.strip().lower() for name in fields]
+            unknown = sorted(set(header) - set(CSV_COLUMNS))
+            missing = [name for name in REQUIRED_COLUMNS if name not in header]
+            if unknown or missing:
+                raise CatalogFormatError(
+                    self._pending_line,
+                    f"En-tête CSV invalide (inconnues : {unknown}, manquantes : {missing})"
+                )
+            self._header = header
+            return
+        if len(fields) != len(self._header):
+            records.append(ParsedRecord(
+                self._pending_line, None, f"{len(self._header)} colonnes attendues, {len(fields)} reçues"
+            ))
+            return
+
+        values = {name: value.strip() for name, value in zip(self._header, fields)}
+        data: Dict[str, Any] = {name: values[name] for name in PRODUCT_COLUMNS if values.get(name)}
+        if "tags" in values:
+            data["tags"] = [tag.strip() for tag in values["tags"].split(TAG_SEPARATOR) if tag.strip()]
+        variants = []
+        if values.get("variant_sku"):
+            variants.append({
+                name: values[column]
+                for name, column in zip(VARIANT_FIELDS, VARIANT_COLUMNS) if values.get(column)
+            })
+        data["variants"] = variants
+
+        previous = self._previous
+        if previous is not None and previous.data is not None and previous.data.get("slug") == data.get("slug"):
+            previous.data["variants"].extend(variants)
+            return
+        if previous is not None:
+            records.append(previous)
+        self._previous = ParsedRecord(self._pending_line, data)
+
+
+@dataclass
+class CatalogReferences:
+    """Données de référence d'un import, chargées une seule fois"""
+    producer_id: int
+    user_id: int
+    category_ids: Set[int] = field(default_factory=set)
+    unit_ids: Set[int] = field(default_factory=set)
+    tag_ids: Dict[str, int] = field(default_factory=dict)
+
+    def validate(self, data: Dict[str, Any]) -> Tuple[Optional[CatalogImportRow], List[str]]:
+        """Ligne validée, ou liste des erreurs (`champ : message`)"""
+        try:
+            row = CatalogImportRow.model_validate(data)
+        except ValidationError as exc:
+            return None, [
+                f"{'.'.join(str(part) for part in error['loc']) or 'ligne'} : {error['msg']}"
+                for error in exc.errors()
+            ]
+        errors = []
+        if row.category_id is not None and row.category_id not in self.category_ids:
+            errors.append(f"category_id : catégorie {row.category_id} inconnue")
+        if row.unit_id is not None and row.unit_id not in self.unit_ids:
+            errors.append(f"unit_id : unité {row.unit_id} inconnue")
+        unknown_tags = [tag for tag in row.tags or [] if tag not in self.tag_ids]
+        if unknown_tags:
+            errors.append(f"tags : tags inconnus {unknown_tags}")
+        skus = [variant.sku for variant in row.variants]
+        if len(skus) != len(set(skus)):
+            errors.append("variants : SKU en double pour ce produit")
+        return (None, errors) if errors else (row, [])
+
+
+def group_by_fields(models: List[BaseModel], exclude: Set[str] = frozenset()
+                    ) -> List[Tuple[Tuple[str, ...], List[BaseModel]]]:
+    """Modèles regroupés par champs effectivement fournis (model_fields_set), dans l'ordre"""
+    groups: Dict[Tuple[str, ...], List[BaseModel]] = {}
+    for model in models:
+        groups.setdefault(tuple(sorted(model.model_fields_set - exclude)), []).append(model)
+    return list(groups.items())
+
+
+def add_import_error(report: CatalogImportReport, line: int, slug: Optional[str],
+                     errors: List[str]) -> None:
+    """Compte une ligne rejetée ; le détail est borné à CATALOG_IMPORT_MAX_ERRORS"""
+    report.failed += 1
+    if len(report.errors) < settings.CATALOG_IMPORT_MAX_ERRORS:
+        report.errors.append(CatalogImportError(line=line, slug=slug, errors=errors))
+    else:
+        report.errors_truncated = True
+
+
+class CatalogService:
+    """Écritures et lectures groupées du catalogue d'un producteur"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.product_repo = ProductRepository(db)
+        self.variant_repo = ProductVariantRepository(db)
+        self.stock_movement_repo = StockMovementRepository(db)
+
+    def load_references(self, user_id: int) -> CatalogReferences:
+        """Producteur autorisé (403 sinon), catégories, unités et tags"""
+        producer = ProductService(self.db).get_publishing_producer(user_id)
+        references = CatalogReferences(
+            producer_id=producer.id,
+            user_id=user_id,
+            category_ids={category.id for category in CategoryRepository(self.db).get_all()},
+            unit_ids={unit.id for unit in UnitRepository(self.db).get_all()},
+            tag_ids={tag.slug: tag.id for tag in TagRepository(self.db).get_all()}
+        )
+        self.db.commit()
+        return references
+
+    def write_batch(self, references: CatalogReferences, batch: List[Tuple[int, CatalogImportRow]],
+                    report: CatalogImportReport) -> None:
+        """Écrit un lot de lignes validées dans une transaction et complète le rapport"""
+        # Un slug présent plusieurs fois dans le lot : la dernière ligne l'emporte
+        rows: Dict[str, Tuple[int, CatalogImportRow]] = {}
+        for line, row in batch:
+            rows[row.slug] = (line, row)
+        # Bilan du lot, reporté dans le rapport une fois la transaction validée
+        outcome = CatalogImportReport()
+        try:
+            self._write_rows(references, rows, outcome)
+            self.db.commit()
+        except SQLAlchemyError as exc:
+            self.db.rollback()
+            for slug, (line, _row) in rows.items():
+                add_import_error(report, line, slug, [f"Lot non enregistré : {exc.__class__.__name__}"])
+            return
+        report.created += outcome.created
+        report.updated += outcome.updated
+        report.variants += outcome.variants
+        for error in outcome.errors:
+            add_import_error(report, error.line, error.slug, error.errors)
+
+    def _write_rows(self, references: CatalogReferences, rows: Dict[str, Tuple[int, CatalogImportRow]],
+                    report: CatalogImportReport) -> None:
+        existing = self.product_repo.lock_by_slugs(references.producer_id, list(rows))
+
+        # Un SKU appartient à un seul produit : rejeter la ligne avant toute écriture
+        owners = self.variant_repo.get_sku_owners(
+            [variant.sku for _line, row in rows.values() for variant in row.variants]
+        )
+        claimed: Dict[str, str] = {}
+        for slug, (line, row) in list(rows.items()):
+            product_id = existing.get(slug, (None, 0))[0]
+            conflicts = [
+                variant.sku for variant in row.variants
+                if owners.get(variant.sku, product_id) != product_id or claimed.get(variant.sku, slug) != slug
+            ]
+            if conflicts:
+                add_import_error(report, line, slug, [f"variants : SKU déjà utilisés par un autre produit {conflicts}"])
+                del rows[slug]
+                continue
+            claimed.update((variant.sku, slug) for variant in row.variants)
+        if not rows:
+            return
+
+        # Un upsert par ensemble de champs fournis : seuls ceux-là sont réécrits
+        product_ids: Dict[str, int] = {}
+        for fields, group in group_by_fields([row for _line, row in rows.values()], exclude={"tags", "variants"}):
+            product_ids.update(self.product_repo.upsert_products(
+                [{**row.model_dump(exclude={"tags", "variants"}), "producer_id": references.producer_id}
+                 for row in group],
+                update_columns=fields
+            ))
+        self.product_repo.replace_tags_bulk({
+            product_ids[slug]: [references.tag_ids[tag] for tag in row.tags]
+            for slug, (_line, row) in rows.items() if row.tags is not None
+        })
+        product_of = {variant.sku: product_ids[slug] for slug, (_line, row) in rows.items() for variant in row.variants}
+        written: Dict[str, int] = {}
+        for fields, group in group_by_fields([variant for _line, row in rows.values() for variant in row.variants]):
+            written.update(self.variant_repo.upsert_by_sku(
+                [{**variant.model_dump(), "product_id": product_of[variant.sku]} for variant in group],
+                update_columns=fields
+            ))
+        report.variants += len(written)
+        for slug, (line, row) in rows.items():
+            # SKU attribué entre-temps à un autre produit (import concurrent)
+            lost = [variant.sku for variant in row.variants if variant.sku not in written]
+            if lost:
+                add_import_error(report, line, slug, [f"variants : SKU déjà utilisés par un autre produit {lost}"])
+
+        movements = []
+        for slug, (_line, row) in rows.items():
+            previous = existing.get(slug)
+            if previous is None:
+                report.created += 1
+                if row.stock_quantity > 0:
+                    movements.append(self._movement(product_ids[slug], references.user_id,
+                                                    StockMovementType.IN, row.stock_quantity, "Stock initial"))
+            else:
+                report.updated += 1
+                if "stock_quantity" in row.model_fields_set and row.stock_quantity != previous[1]:
+                    movements.append(self._movement(product_ids[slug], references.user_id,
+                                                    StockMovementType.ADJUSTMENT, row.stock_quantity,
+                                                    "Import de catalogue"))
+        self.stock_movement_repo.create_bulk(movements)
+
+    @staticmethod
+    def _movement(product_id: int, user_id: int, movement_type: StockMovementType,
+                  quantity: int, reason: str) -> Dict[str, Any]:
+        return {
+            "product_id": product_id,
+            "created_by": user_id,
+            "type": movement_type,
+            "quantity": quantity,
+            "reason": reason,
+        }
+
+    # ============= Export =============
+
+    def get_export_producer_id(self, user_id: int) -> int:
+        """Producteur dont le catalogue est exporté (403 sans profil producteur)"""
+        producer = ProducerProfileRepository(self.db).get_by_user_id(user_id)
+        if not producer:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Seuls les producteurs peuvent exporter leur catalogue"
+            )
+        return producer.id
+
+    def export_page(self, producer_id: int, after_id: int, fmt: str,
+                    limit: int = EXPORT_PAGE_SIZE) -> Tuple[Optional[int], str]:
+        """Page suivante sérialisée : (dernier id, texte), ou (None, "") en fin de catalogue"""
+        products = self.product_repo.get_catalog_page(producer_id, after_id, limit)
+        if not products:
+            return None, ""
+        if fmt == "ndjson":
+            text = "".join(
+                json.dumps(export_record(product), ensure_ascii=False, default=str) + "\n"
+                for product in products
+            )
+        else:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer, lineterminator="\n")
+            for product in products:
+                writer.writerows(export_csv_rows(product))
+            text = buffer.getvalue()
+        return products[-1].id, text
+
+
+def export_record(product: Product) -> Dict[str, Any]:
+    """Enregistrement NDJSON d'un produit (format accepté par l'import)"""
+    record = {name: getattr(product, name) for name in PRODUCT_COLUMNS}
+    record["tags"] = sorted(tag.slug for tag in product.tags)
+    record["variants"] = [
+        {name: getattr(variant, name) for name in VARIANT_FIELDS}
+        for variant in sorted(product.variants, key=lambda variant: variant.id)
+    ]
+    return record
+
+
+def _csv_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def export_csv_rows(product: Product) -> List[List[str]]:
+    """Lignes CSV d'un produit : une par variante (au moins une)"""
+    record = export_record(product)
+    base = [_csv_value(record[name]) for name in PRODUCT_COLUMNS] + [TAG_SEPARATOR.join(record["tags"])]
+    variants = record["variants"] or [dict.fromkeys(VARIANT_FIELDS)]
+    return [base + [_csv_value(variant[name]) for name in VARIANT_FIELDS] for variant in variants]
+
+
+async def import_catalog(db, user_id: int, stream: AsyncIterator[bytes], fmt: str,
+                         chunk_size: Optional[int] = None) -> CatalogImportReport:
+    """
+    Importe le flux `stream` (blocs d'octets) pour le producteur de `user_id`.
+
+    `db` est une AsyncSession : chaque lot est écrit via `run_sync` dans sa
+    propre transaction ; les lots déjà validés restent acquis si la suite du
+    flux est illisible.
+    """
+    chunk_size = chunk_size or settings.CATALOG_IMPORT_CHUNK_SIZE
+    references = await db.run_sync(lambda session: CatalogService(session).load_references(user_id))
+    parser = CatalogStreamParser(fmt)
+    report = CatalogImportReport()
+    batch: List[Tuple[int, CatalogImportRow]] = []
+
+    def accept(records: List[ParsedRecord]) -> None:
+        for record in records:
+            report.processed += 1
+            if record.error:
+                add_import_error(report, record.line, None, [record.error])
+                continue
+            row, errors = references.validate(record.data)
+            if errors:
+                slug = record.data.get("slug")
+                add_import_error(report, record.line, slug if isinstance(slug, str) else None, errors)
+            else:
+                batch.append((record.line, row))
+
+    async def write(rows: List[Tuple[int, CatalogImportRow]]) -> None:
+        await db.run_sync(lambda session: CatalogService(session).write_batch(references, rows, report))
+
+    try:
+        async for data in stream:
+            accept(parser.feed(data))
+            while len(batch) >= chunk_size:
+                rows, batch[:] = batch[:chunk_size], batch[chunk_size:]
+                await write(rows)
+        accept(parser.close())
+    except CatalogFormatError as exc:
+        add_import_error(report, exc.line, None, [str(exc)])
+    if batch:
+        await write(list(batch))
+    return report
+
+
+def _read_session():
+    """
+    Session de lecture propre à l'export. La session d'une dépendance `yield`
+    est fermée avant l'envoi du corps d'une StreamingResponse : l'export ouvre
+    les siennes (réplicas), une par page, pour rendre la connexion au pool
+    pendant que le client lit.
+    """
+    if AsyncReadSessionLocal is None:
+        raise RuntimeError("Le moteur asynchrone nécessite une base PostgreSQL")
+    return AsyncReadSessionLocal()
+
+
+async def get_export_producer_id(user_id: int) -> int:
+    """Producteur dont le catalogue est exporté (403 sans profil producteur)"""
+    async with _read_session() as db:
+        return await db.run_sync(lambda session: CatalogService(session).get_export_producer_id(user_id))
+
+
+async def export_catalog(producer_id: int, fmt: str, page_size: Optional[int] = None) -> AsyncIterator[str]:
+    """Catalogue du producteur page par page (en-tête compris pour le CSV)"""
+    page_size = page_size or EXPORT_PAGE_SIZE
+    if fmt == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerow(CSV_COLUMNS)
+        yield buffer.getvalue()
+    after_id = 0
+    while True:
+        async with _read_session() as db:
+            last_id, text = await db.run_sync(
+                lambda session: CatalogService(session).export_page(producer_id, after_id, fmt, page_size)
+            )
+        if last_id is None:
+            return
+        yield text
+        after_id = last_id
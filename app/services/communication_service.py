@@ -54,10 +54,11 @@ class NotificationService:
         return notifications
     
     def get_user_notifications(self, user_id: int, skip: int = 0, 
-                              limit: int = 50, unread_only: bool = False):
-        """Récupère les notifications d'un utilisateur avec pagination"""
+                              limit: int = 50, unread_only: bool = False,
+                              cursor: Optional[str] = None):
+        """Récupère les notifications d'un utilisateur avec pagination (offset ou curseur)"""
         notifications = self.repository.get_user_notifications(
-            user_id, skip, limit, unread_only
+            user_id, skip, limit, unread_only, cursor=cursor
         )
         total = self.repository.count_user_notifications(user_id, unread_only=False)
         unread_count = self.repository.count_user_notifications(user_id, unread_only=True)
@@ -65,7 +66,8 @@ class NotificationService:
         return {
             "notifications": notifications,
             "total": total,
-            "unread_count": unread_count
+            "unread_count": unread_count,
+            "next_cursor": getattr(notifications, "next_cursor", None)
         }
     
     def mark_notification_as_read(self, notification_id: int, user_id: int):
@@ -339,11 +341,14 @@ class ConversationService:
         """Récupère les conversations d'un utilisateur"""
         conversations = self.conversation_repo.get_user_conversations(user_id, skip, limit)
         
-        # Ajouter des informations supplémentaires pour chaque conversation
+        # Dernier message et non lus de toutes les conversations en deux requêtes
+        conversation_ids = [conv.id for conv in conversations]
+        last_messages = self.message_repo.get_last_messages(conversation_ids)
+        unread_counts = self.message_repo.count_unread_by_conversation(conversation_ids, user_id)
+        
         result = []
         for conv in conversations:
-            messages = self.message_repo.get_conversation_messages(conv.id, limit=1)
-            unread = self.message_repo.count_unread_messages(conv.id, user_id)
+            last_message = last_messages.get(conv.id)
             
             result.append({
                 "id": conv.id,
@@ -351,8 +356,8 @@ class ConversationService:
                 "subject": conv.subject,
                 "last_message_at": conv.last_message_at,
                 "created_at": conv.created_at,
-                "last_message": messages[0].content if messages else None,
-                "unread_count": unread
+                "last_message": last_message.content if last_message else None,
+                "unread_count": unread_counts.get(conv.id, 0)
             })
         
         return result
@@ -1,3 +1,4 @@
+from collections import defaultdict
 from sqlalchemy.orm import Session
 from typing import Optional, List, Tuple
 from fastapi import HTTPException, status
@@ -320,76 +321,98 @@ class OrderService:
                 detail=f"Transition invalide: {current_status} -> {next_status}"
             )
 
-    def _decrement_stock_for_order(self, order: Order) -> None:
-        for item in order.items:
+    def _reserve_stock_for_cart_items(
+        self,
+        cart_items: List[CartItem],
+        pickup_slot_id: Optional[int] = None
+    ) -> None:
+        """
+        Réserve atomiquement le stock du panier et la place du créneau de retrait.
+
+        1. Verrouillage des lignes dans un ordre fixe (produits, variantes,
+           créneau ; id croissants) : pas d'interblocage entre checkouts.
+        2. Contrôle des quantités sur les valeurs verrouillées : rien n'est
+           écrit si un article est insuffisant.
+        3. Un UPDATE conditionnel set-based par table (stock >= quantité).
+        """
+        product_quantities = defaultdict(int)
+        variant_quantities = defaultdict(int)
+        for item in cart_items:
             if item.variant_id:
-                if not item.variant:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="Variante introuvable pour un article de commande"
-                    )
-                if item.variant.stock < item.quantity:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Stock insuffisant pour la variante {item.variant.name}"
-                    )
-                item.variant.stock -= item.quantity
+                variant_quantities[item.variant_id] += item.quantity
             else:
-                if not item.product:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="Produit introuvable pour un article de commande"
-                    )
-                if item.product.stock_quantity < item.quantity:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Stock insuffisant pour {item.product.name}"
-                    )
-                item.product.stock_quantity -= item.quantity
+                product_quantities[item.product_id] += item.quantity
+
+        product_stock = self.product_repo.lock_stock(list(product_quantities))
+        variant_stock = self.variant_repo.lock_stock(list(variant_quantities))
+        pickup_slot = self.pickup_slot_repo.get_for_update(pickup_slot_id) if pickup_slot_id else None
 
-    def _decrement_stock_for_cart_items(self, cart_items: List[CartItem]) -> None:
-        """Décrémente le stock à la création de commande (au checkout)."""
         for item in cart_items:
             if item.variant_id:
-                variant = item.variant or self.variant_repo.get_by_id(item.variant_id)
-                if not variant:
+                if item.variant_id not in variant_stock:
                     raise HTTPException(
                         status_code=status.HTTP_400_BAD_REQUEST,
                         detail="Variante introuvable pour un article du panier"
                     )
-                if variant.stock < item.quantity:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Stock insuffisant pour la variante {variant.name}"
-                    )
-                variant.stock -= item.quantity
+                available_stock = variant_stock[item.variant_id]
+                required = variant_quantities[item.variant_id]
             else:
-                product = item.product or self.product_repo.get_by_id(item.product_id)
-                if not product:
+                if item.product_id not in product_stock:
                     raise HTTPException(
                         status_code=status.HTTP_400_BAD_REQUEST,
                         detail="Produit introuvable pour un article du panier"
                     )
-                if product.stock_quantity < item.quantity:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Stock insuffisant pour {product.name}"
-                    )
-                product.stock_quantity -= item.quantity
+                available_stock = product_stock[item.product_id]
+                required = product_quantities[item.product_id]
+            if available_stock < required:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Stock insuffisant pour {item.product.name}. Disponible: {available_stock}"
+                )
+
+        if pickup_slot_id and (
+            not pickup_slot or not pickup_slot.is_active
+            or pickup_slot.current_orders >= pickup_slot.max_orders
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Créneau de retrait indisponible"
+            )
+
+        # Les lignes sont verrouillées : les UPDATE conditionnels ne peuvent plus échouer,
+        # la vérification des id retournés reste une garde contre toute survente.
+        reserved_products = self.product_repo.adjust_stock(
+            {product_id: -quantity for product_id, quantity in product_quantities.items()}
+        )
+        reserved_variants = self.variant_repo.adjust_stock(
+            {variant_id: -quantity for variant_id, quantity in variant_quantities.items()}
+        )
+        reserved_slot = self.pickup_slot_repo.adjust_orders(pickup_slot_id, 1) if pickup_slot_id else True
+        if (
+            len(reserved_products) != len(product_quantities)
+            or len(reserved_variants) != len(variant_quantities)
+            or not reserved_slot
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Stock modifié pendant la commande, veuillez réessayer"
+            )
 
     def _restore_stock_for_order(self, order: Order) -> None:
+        product_quantities = defaultdict(int)
+        variant_quantities = defaultdict(int)
         for item in order.items:
-            if item.variant_id and item.variant:
-                item.variant.stock += item.quantity
-            elif item.product:
-                item.product.stock_quantity += item.quantity
+            if item.variant_id:
+                variant_quantities[item.variant_id] += item.quantity
+            elif item.product_id:
+                product_quantities[item.product_id] += item.quantity
+        self.product_repo.adjust_stock(dict(product_quantities))
+        self.variant_repo.adjust_stock(dict(variant_quantities))
 
     def _release_pickup_slot(self, order: Order) -> None:
         if not order.pickup_slot_id:
             return
-        slot = self.pickup_slot_repo.get_by_id(order.pickup_slot_id)
-        if slot and slot.current_orders > 0:
-            slot.current_orders -= 1
+        self.pickup_slot_repo.adjust_orders(order.pickup_slot_id, -1)
     
     def create_order_from_cart(
         self,
@@ -419,21 +442,6 @@ class OrderService:
         
         producer_id = producer_ids.pop()
         
-        # Vérifier les stocks
-        for item in cart.items:
-            product = item.product
-            available_stock = product.stock_quantity
-            
-            if item.variant_id:
-                variant = item.variant
-                available_stock = variant.stock if variant else 0
-            
-            if available_stock < item.quantity:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Stock insuffisant pour {product.name}. Disponible: {available_stock}"
-                )
-        
         # Valider les informations de livraison
         pickup_slot = None
         if checkout_request.delivery_type == "pickup":
@@ -454,11 +462,7 @@ class OrderService:
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Créneau de retrait invalide"
                 )
-            if not pickup_slot.is_active or pickup_slot.current_orders >= pickup_slot.max_orders:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Créneau de retrait indisponible"
-                )
+            # La capacité du créneau est contrôlée sous verrou à la réservation
         else:
             if not checkout_request.delivery_address_id:
                 raise HTTPException(
@@ -473,6 +477,13 @@ class OrderService:
                     detail="Adresse invalide"
                 )
         
+        # Réserver stock et créneau avant toute écriture : en cas de stock
+        # insuffisant, rien n'a encore été modifié
+        self._reserve_stock_for_cart_items(
+            cart.items,
+            pickup_slot.id if pickup_slot else None
+        )
+        
         # Calculer les montants
         subtotal = sum(item.subtotal for item in cart.items)
         tax_amount = subtotal * Decimal("0.055")  # TVA 5.5%
@@ -504,9 +515,6 @@ class OrderService:
         
         # Créer les OrderItems à partir des CartItems (utilise flush())
         self.order_item_repo.create_from_cart(order.id, cart.items)
-
-        # Déduire immédiatement le stock à la création de commande.
-        self._decrement_stock_for_cart_items(cart.items)
         
         # Créer l'entrée d'historique initiale (utilise flush())
         self.status_history_repo.create(
@@ -517,10 +525,6 @@ class OrderService:
             changed_by=user_id
         )
 
-        # Réserver la capacité du créneau de retrait dès la création de commande.
-        if pickup_slot:
-            pickup_slot.current_orders += 1
-        
         # Vider le panier (utilise flush())
         self.cart_repo.delete(cart)
         
@@ -554,20 +558,22 @@ class OrderService:
         user_id: int,
         skip: int = 0,
         limit: int = 100,
-        status_filter: Optional[str] = None
+        status_filter: Optional[str] = None,
+        cursor: Optional[str] = None
     ) -> List[Order]:
-        """Récupère les commandes d'un client"""
-        return self.order_repo.get_user_orders(user_id, skip, limit, status_filter)
+        """Récupère les commandes d'un client (offset ou curseur)"""
+        return self.order_repo.get_user_orders(user_id, skip, limit, status_filter, cursor=cursor)
     
     def get_producer_orders(
         self,
         producer_id: int,
         skip: int = 0,
         limit: int = 100,
-        status_filter: Optional[str] = None
+        status_filter: Optional[str] = None,
+        cursor: Optional[str] = None
     ) -> List[Order]:
-        """Récupère les commandes reçues par un producteur"""
-        return self.order_repo.get_producer_orders(producer_id, skip, limit, status_filter)
+        """Récupère les commandes reçues par un producteur (offset ou curseur)"""
+        return self.order_repo.get_producer_orders(producer_id, skip, limit, status_filter, cursor=cursor)
     
     def update_order_status(
         self,
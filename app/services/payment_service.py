@@ -1,14 +1,14 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
 from typing import List, Optional
 from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 from fastapi import HTTPException, status
 
-from app.models.profiles import ProducerProfile
+from app.core.numbering import DocumentNumberGenerator
 from app.repositories.payment_repository import PaymentRepository
+from app.services.payout_batch_service import PayoutBatchService
 from app.models.payments import (
-    Payment, Invoice, PaymentStatus, RefundStatus, InvoiceStatus, PayoutStatus
+    PaymentStatus, RefundStatus, InvoiceStatus, PayoutStatus
 )
 from app.models.orders import Order, OrderStatus, PaymentStatus as OrderPaymentStatus
 from app.schemas.payments import (
@@ -167,35 +167,18 @@ class PaymentService:
     def get_payment_statistics(self, start_date: datetime, end_date: datetime) -> PaymentStats:
         """
         Calcule des statistiques sur les paiements pour une période donnée.
-        """
-        payments = self.db.query(Payment).filter(
-            and_(
-                Payment.created_at >= start_date,
-                Payment.created_at <= end_date
-            )
-        ).all()
         
-        total_amount = sum(p.amount for p in payments)
-        completed_amount = sum(
-            p.amount for p in payments if p.status == PaymentStatus.COMPLETED
-        )
-        pending_amount = sum(
-            p.amount for p in payments if p.status == PaymentStatus.PENDING
-        )
-        failed_count = sum(
-            1 for p in payments if p.status == PaymentStatus.FAILED
-        )
-        refunded_amount = sum(
-            p.amount for p in payments if p.status == PaymentStatus.REFUNDED
-        )
+        Agrégats calculés en SQL (une requête), sans charger les paiements.
+        """
+        totals = self.repository.get_payment_totals(start_date, end_date)
         
         return PaymentStats(
-            total_payments=len(payments),
-            total_amount=Decimal(str(total_amount)),
-            completed_amount=Decimal(str(completed_amount)),
-            pending_amount=Decimal(str(pending_amount)),
-            failed_count=failed_count,
-            refunded_amount=Decimal(str(refunded_amount))
+            total_payments=totals.total_payments,
+            total_amount=Decimal(totals.total_amount),
+            completed_amount=Decimal(totals.completed_amount),
+            pending_amount=Decimal(totals.pending_amount),
+            failed_count=totals.failed_count,
+            refunded_amount=Decimal(totals.refunded_amount)
         )
     
     # ========================================================================
@@ -497,24 +480,9 @@ class PaymentService:
         """
         Génère un numéro de facture unique au format INV-YYYY-NNNN.
         
-        Méthode privée qui trouve le prochain numéro disponible pour l'année en cours.
+        Le numéro provient de la séquence annuelle des factures (un seul nextval).
         """
-        current_year = datetime.now(timezone.utc).year
-        prefix = f"INV-{current_year}-"
-        
-        # Trouver le dernier numéro de l'année
-        last_invoice = self.db.query(Invoice).filter(
-            Invoice.invoice_number.like(f"{prefix}%")
-        ).order_by(Invoice.invoice_number.desc()).first()
-        
-        if last_invoice:
-            # Extraire le numéro et incrémenter
-            last_number = int(last_invoice.invoice_number.split("-")[-1])
-            next_number = last_number + 1
-        else:
-            next_number = 1
-        
-        return f"{prefix}{next_number:04d}"
+        return DocumentNumberGenerator(self.db).next_invoice_number()
     
     def get_invoice(self, invoice_id: int) -> InvoiceResponse:
         """Récupère une facture par son ID"""
@@ -584,23 +552,47 @@ class PaymentService:
         
         Seules les commandes producteur finalisées et payées sont éligibles.
         """
-        # Récupérer les commandes éligibles sur la période.
-        orders = self.db.query(Order).filter(
-            and_(
-                Order.producer_id == producer_id,
-                Order.status == OrderStatus.COMPLETED,
-                Order.payment_status == OrderPaymentStatus.COMPLETED,
-                Order.created_at >= period_start,
-                Order.created_at <= period_end
-            )
-        ).all()
-
-        # Montant brut: somme des totaux de commandes éligibles.
-        gross_amount = sum(
-            (Decimal(str(order.total_amount)) for order in orders),
-            Decimal("0")
+        calculations = self.calculate_producer_payouts(
+            period_start, period_end, commission_rate, producer_ids=[producer_id]
+        )
+        if calculations:
+            return calculations[0]
+        return self._payout_calculation(
+            producer_id, period_start, period_end, 0, Decimal("0"), commission_rate
         )
+    
+    def calculate_producer_payouts(
+        self,
+        period_start: datetime,
+        period_end: datetime,
+        commission_rate: Decimal = Decimal("0.15"),
+        producer_ids: Optional[List[int]] = None
+    ) -> List[ProducerPayoutCalculation]:
+        """
+        Calcule les versements de tous les producteurs d'une période en une requête.
         
+        Variante groupée de calculate_producer_payout pour les traitements de
+        fin de mois : les commandes ne sont pas chargées, seuls les totaux par
+        producteur remontent. Seuls les producteurs ayant des commandes
+        éligibles figurent dans le résultat.
+        """
+        return [
+            self._payout_calculation(
+                row.producer_id, period_start, period_end,
+                row.total_orders, Decimal(row.gross_amount), commission_rate
+            )
+            for row in self.repository.get_payable_order_totals(period_start, period_end, producer_ids)
+        ]
+    
+    @staticmethod
+    def _payout_calculation(
+        producer_id: int,
+        period_start: datetime,
+        period_end: datetime,
+        total_orders: int,
+        gross_amount: Decimal,
+        commission_rate: Decimal
+    ) -> ProducerPayoutCalculation:
         # Calculer la commission et le montant net
         commission_amount = gross_amount * commission_rate
         net_amount = gross_amount - commission_amount
@@ -609,7 +601,7 @@ class PaymentService:
             producer_id=producer_id,
             period_start=period_start,
             period_end=period_end,
-            total_orders=len(orders),
+            total_orders=total_orders,
             gross_amount=gross_amount,
             commission_rate=commission_rate,
             commission_amount=commission_amount,
@@ -732,6 +724,9 @@ class PaymentService:
     def generate_monthly_payouts(self, year: int, month: int) -> List[ProducerPayoutResponse]:
         """
         Génère automatiquement tous les versements mensuels pour tous les producteurs.
+        
+        Délègue au traitement groupé (PayoutBatchService) : un agrégat pour
+        tous les producteurs, insertion par lots, reprise possible.
         """
         try:
             # 1. Définir la période avec timezone.utc
@@ -741,27 +736,13 @@ class PaymentService:
             else:
                 period_end = datetime(year, month + 1, 1, tzinfo=timezone.utc) - timedelta(seconds=1)
             
-            # 2. Correction : Utiliser ProducerProfile et le champ is_verified
-            producers = self.db.query(ProducerProfile).filter(ProducerProfile.is_verified).all()
-            
-            created_payouts = []
-            
-            for producer in producers:
-                # Vérifier si un versement existe déjà
-                if not self.repository.check_payout_exists_for_period(
-                    producer.id, period_start, period_end
-                ):
-                    try:
-                        payout = self.create_producer_payout(
-                            producer.id,
-                            period_start,
-                            period_end
-                        )
-                        created_payouts.append(payout)
-                    except HTTPException:
-                        continue
-            
-            return created_payouts
+            # 2. Versements manquants des producteurs vérifiés
+            payout_ids = PayoutBatchService(self.db).run(period_start, period_end)
+            
+            return [
+                ProducerPayoutResponse.model_validate(payout)
+                for payout in self.repository.get_payouts_by_ids(payout_ids)
+            ]
             
         except Exception as e:
             self.db.rollback()
@@ -0,0 +1,150 @@
+"""
+Versements de fin de mois par traitement groupé.
+
+`PayoutBatchService.run(period_start, period_end)` :
+1. verrouille le point de reprise de la période (table payout_runs) ;
+2. calcule en une requête groupée le brut de tous les producteurs vérifiés
+   restant à payer (après le point de reprise, sans versement existant) ;
+3. résout les commissions depuis les règles chargées une seule fois
+   (CommissionRuleSet) ; sans règle applicable, le taux par défaut s'applique ;
+4. insère les versements par lots de `chunk_size`, chaque lot avançant le
+   point de reprise dans sa propre transaction : verrous courts, et reprise
+   après un arrêt brutal là où le dernier lot validé s'est arrêté.
+
+Avec `workers > 1`, les lots sont écrits par un pool de processus (une
+session par processus). Le point de reprise avance alors dans l'ordre des
+lots ; un lot écrit mais pas encore marqué est écarté à la reprise par
+l'anti-jointure "versement existant".
+
+Un seul traitement par période à la fois : c'est un job planifié
+(scripts/generate_monthly_payouts.py). Relancé sur une période terminée, il
+comble les manques (producteurs devenus éligibles après coup).
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.commission_rules import CommissionRuleSet
+from app.core.database import SessionLocal, engine
+from app.models.payments import PayoutRunStatus
+from app.repositories.payment_repository import PaymentRepository
+
+PAYOUT_CHUNK_SIZE = 500
+DEFAULT_COMMISSION_RATE = Decimal("0.15")
+
+
+def _init_worker() -> None:
+    # Connexions héritées du processus parent : ne pas les partager
+    engine.dispose(close=False)
+
+
+def _insert_chunk(payouts: List[Dict]) -> List[int]:
+    """Écrit un lot depuis un processus du pool"""
+    db = SessionLocal()
+    try:
+        payout_ids = PaymentRepository(db).insert_producer_payouts(payouts)
+        db.commit()
+        return payout_ids
+    finally:
+        db.close()
+
+
+class PayoutBatchService:
+    """Génère les versements d'une période pour tous les producteurs"""
+
+    def __init__(
+        self,
+        db: Session,
+        chunk_size: int = PAYOUT_CHUNK_SIZE,
+        workers: int = 1,
+        default_commission_rate: Decimal = DEFAULT_COMMISSION_RATE
+    ):
+        self.db = db
+        self.repository = PaymentRepository(db)
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.default_commission_rate = default_commission_rate
+
+    def run(self, period_start: datetime, period_end: datetime) -> List[int]:
+        """
+        Crée les versements manquants de la période et retourne leurs IDs.
+
+        Relancer un traitement interrompu reprend après le dernier lot validé ;
+        relancer un traitement terminé repart du début et ne paie que les
+        producteurs sans versement sur la période.
+        """
+        run = self.repository.lock_payout_run(period_start, period_end)
+        if run.status == PayoutRunStatus.COMPLETED:
+            # Nouvelle passe sur une période terminée : producteurs devenus
+            # éligibles depuis (paiement validé en retard...). L'anti-jointure
+            # "versement existant" écarte ceux déjà payés.
+            run.status = PayoutRunStatus.RUNNING
+            run.last_producer_id = 0
+        rules = CommissionRuleSet.load(self.db)
+        candidates = self.repository.get_payout_candidates(period_start, period_end, run.last_producer_id)
+        self.db.commit()
+
+        payouts = [
+            payout for payout in (
+                self._build_payout(row, rules, period_start, period_end) for row in candidates
+            ) if payout is not None
+        ]
+        chunks = [payouts[index:index + self.chunk_size] for index in range(0, len(payouts), self.chunk_size)]
+
+        created: List[int] = []
+        if self.workers > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as pool:
+                # map() rend les résultats dans l'ordre des lots
+                for chunk, payout_ids in zip(chunks, pool.map(_insert_chunk, chunks)):
+                    self._advance(period_start, period_end, chunk[-1]["producer_id"], len(payout_ids))
+                    created.extend(payout_ids)
+        else:
+            for chunk in chunks:
+                run = self.repository.lock_payout_run(period_start, period_end)
+                pending = [payout for payout in chunk if payout["producer_id"] > run.last_producer_id]
+                payout_ids = self.repository.insert_producer_payouts(pending)
+                run.last_producer_id = max(run.last_producer_id, chunk[-1]["producer_id"])
+                run.payouts_created += len(payout_ids)
+                self.db.commit()
+                created.extend(payout_ids)
+
+        run = self.repository.lock_payout_run(period_start, period_end)
+        run.status = PayoutRunStatus.COMPLETED
+        run.completed_at = datetime.utcnow()
+        self.db.commit()
+        return created
+
+    def _advance(self, period_start: datetime, period_end: datetime,
+                 last_producer_id: int, created: int) -> None:
+        run = self.repository.lock_payout_run(period_start, period_end)
+        run.last_producer_id = max(run.last_producer_id, last_producer_id)
+        run.payouts_created += created
+        self.db.commit()
+
+    def _build_payout(self, row, rules: CommissionRuleSet,
+                      period_start: datetime, period_end: datetime) -> Optional[Dict]:
+        """
+        Versement d'un producteur : taux de la règle applicable et montant
+        fixe par commande. Les seuils min/max d'une règle portent sur une
+        transaction et ne s'appliquent pas au cumul mensuel.
+        """
+        gross_amount = Decimal(row.gross_amount or 0)
+        if gross_amount <= 0:
+            return None
+        rule = rules.resolve(row.user_id, on_date=period_end.date())
+        if rule is None:
+            commission = gross_amount * self.default_commission_rate
+        else:
+            commission = gross_amount * rule.rate + (rule.fixed_amount or Decimal("0")) * row.total_orders
+        commission = min(commission, gross_amount).quantize(Decimal("0.01"))
+        return {
+            "producer_id": row.producer_id,
+            "period_start": period_start,
+            "period_end": period_end,
+            "gross_amount": gross_amount,
+            "commission": commission,
+            "net_amount": gross_amount - commission,
+        }
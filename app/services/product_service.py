@@ -1,10 +1,9 @@
+import asyncio
 from sqlalchemy.orm import Session
-from typing import Optional, List
+from typing import Optional, List, Dict, Any, Union
 from fastapi import HTTPException, status, UploadFile
 from pathlib import Path
 from uuid import uuid4
-from datetime import datetime, timezone
-import shutil
 
 from app.repositories.product_repository import (
     CategoryRepository, TagRepository, UnitRepository, ProductRepository,
@@ -14,14 +13,20 @@ from app.repositories.product_repository import (
 from app.repositories.profile_repository import ProducerProfileRepository
 from app.models.auth import User
 from app.models.profiles import ProducerProfile
-from app.models.products import Product, Category, Tag, Unit, ProductImage, ProductVariant, StockAlert
+from app.models.products import (
+    Product, Category, Tag, Unit, ProductImage, ProductVariant, StockAlert, StockMovementType
+)
 from app.core.config import settings
+from app.core.image_pipeline import (
+    RENDITION_FORMATS, ImageTooLarge, InvalidImage,
+    generate_renditions, read_manifest, stream_to_file
+)
 from app.schemas.product_schema import (
     CategoryCreate, CategoryUpdate, TagCreate, TagUpdate,
     UnitCreate, UnitUpdate, ProductCreate, ProductUpdate,
-    ProductImageCreate,
+    ProductImageCreate, ProductImageResponse,
     ProductVariantCreate,
-    StockAlertCreate,
+    StockAlertCreate, StockAlertResponse, StockAdjustment,
     ProductSearchFilters
 )
 
@@ -71,8 +76,8 @@ class CategoryService:
         return self.category_repo.get_all(active_only)
     
     def get_category_tree(self, active_only: bool = False) -> List[Category]:
-        """Récupère l'arbre des catégories (racines avec sous-catégories)"""
-        return self.category_repo.get_root_categories(active_only)
+        """Récupère l'arbre des catégories (racines avec sous-catégories, une requête)"""
+        return self.category_repo.get_tree(active_only)
     
     def update_category(self, category_id: int, category_data: CategoryUpdate) -> Category:
         """Met à jour une catégorie"""
@@ -87,7 +92,21 @@ class CategoryService:
                     detail="Une catégorie avec ce slug existe déjà"
                 )
         
-        # Mettre à jour les champs
+        # Vérifier le nouveau parent : existant et hors du sous-arbre de la catégorie
+        if category_data.parent_id and category_data.parent_id != category.parent_id:
+            parent = self.category_repo.get_by_id(category_data.parent_id)
+            if not parent:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Catégorie parente non trouvée"
+                )
+            if self.category_repo.is_in_subtree(parent, category):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Une catégorie ne peut pas être déplacée sous elle-même ou sous une de ses sous-catégories"
+                )
+        
+        # Mettre à jour les champs (le chemin du sous-arbre est recalculé par trigger)
         update_data = category_data.model_dump(exclude_unset=True)
         for field, value in update_data.items():
             setattr(category, field, value)
@@ -249,9 +268,8 @@ class ProductService:
             is_verified=bool(settings.SKIP_EMAIL_VERIFICATION)
         )
     
-    def create_product(self, user_id: int, product_data: ProductCreate) -> Product:
-        """Crée un nouveau produit"""
-        # Vérifier que l'utilisateur est un producteur
+    def get_publishing_producer(self, user_id: int) -> ProducerProfile:
+        """Profil producteur autorisé à publier des produits (403 sinon)"""
         producer = self._ensure_producer_profile(user_id)
         if not producer:
             raise HTTPException(
@@ -263,10 +281,16 @@ class ProductService:
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Votre profil producteur doit être validé avant de créer des produits"
             )
+        return producer
+
+    def create_product(self, user_id: int, product_data: ProductCreate) -> Product:
+        """Crée un nouveau produit"""
+        # Vérifier que l'utilisateur est un producteur
+        producer = self.get_publishing_producer(user_id)
         
         # Vérifier que le slug est unique pour ce producteur
-        existing = self.product_repo.get_by_slug(product_data.slug)
-        if existing and existing.producer_id == producer.id:
+        existing = self.product_repo.get_by_slug(product_data.slug, producer.id)
+        if existing:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Vous avez déjà un produit avec ce slug"
@@ -324,9 +348,10 @@ class ProductService:
         skip: int = 0,
         limit: int = 100,
         active_only: bool = False,
-        category_id: Optional[int] = None
+        category_id: Optional[int] = None,
+        cursor: Optional[str] = None
     ) -> List[Product]:
-        """Récupère les produits d'un producteur"""
+        """Récupère les produits d'un producteur (offset ou curseur)"""
         producer = self._ensure_producer_profile(user_id)
         if not producer:
             raise HTTPException(
@@ -334,22 +359,49 @@ class ProductService:
                 detail="Seuls les producteurs peuvent voir leurs produits"
             )
         
-        return self.product_repo.get_producer_products(producer.id, skip, limit, active_only, category_id)
-    
-    def search_products(self, filters: ProductSearchFilters, skip: int = 0, limit: int = 100) -> List[Product]:
-        """Recherche de produits avec filtres"""
-        return self.product_repo.search_products(
-            category_id=filters.category_id,
-            producer_id=filters.producer_id,
-            tag_ids=filters.tag_ids,
-            min_price=float(filters.min_price) if filters.min_price else None,
-            max_price=float(filters.max_price) if filters.max_price else None,
-            is_featured=filters.is_featured,
-            in_stock=filters.in_stock,
-            search_term=filters.search_term,
-            skip=skip,
-            limit=limit
+        return self.product_repo.get_producer_products(
+            producer.id, skip, limit, active_only, category_id, cursor=cursor
         )
+    
+    def search_products(
+        self,
+        filters: ProductSearchFilters,
+        skip: int = 0,
+        limit: int = 100,
+        include_facets: bool = False,
+        cursor: Optional[str] = None
+    ) -> Union[List[Product], Dict[str, Any]]:
+        """
+        Recherche de produits avec filtres.
+
+        Avec include_facets=True, retourne {"products": [...], "facets": {...}}
+        où les facettes sont calculées sur l'ensemble filtré (hors pagination).
+        Avec un `cursor`, la pagination se fait par curseur (voir ProductRepository).
+        """
+        criteria = self._search_criteria(filters)
+        products = self.product_repo.search_products(**criteria, skip=skip, limit=limit, cursor=cursor)
+        if not include_facets:
+            return products
+        
+        return {
+            "products": products,
+            "facets": self.product_repo.get_search_facets(**criteria)
+        }
+
+    @staticmethod
+    def _search_criteria(filters: ProductSearchFilters) -> Dict[str, Any]:
+        """Convertit les filtres de recherche en arguments du repository"""
+        return {
+            "category_id": filters.category_id,
+            "producer_id": filters.producer_id,
+            "tag_ids": filters.tag_ids,
+            "min_price": float(filters.min_price) if filters.min_price else None,
+            "max_price": float(filters.max_price) if filters.max_price else None,
+            "is_featured": filters.is_featured,
+            "in_stock": filters.in_stock,
+            "search_term": filters.search_term,
+            "include_descendants": filters.include_descendants,
+        }
 
     def update_product(self, product_id: int, user_id: int, product_data: ProductUpdate) -> Product:
         # Récupérer le produit existant
@@ -380,6 +432,12 @@ class ProductService:
 
         # On convertit le schéma en dictionnaire en excluant les tags déjà gérés
         update_data = product_data.model_dump(exclude={"tag_ids"}, exclude_unset=True)
+        new_slug = update_data.get("slug")
+        if new_slug and new_slug != product.slug and self.product_repo.get_by_slug(new_slug, producer.id):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Vous avez déjà un produit avec ce slug"
+            )
     
         for key, value in update_data.items():
             setattr(product, key, value)
@@ -440,6 +498,110 @@ class ProductService:
         
         return product
     
+    def update_stock_batch(self, user_id: int, adjustments: List[StockAdjustment]) -> Dict[str, Any]:
+        """
+        Applique plusieurs mouvements de stock en une transaction (tout ou rien).
+
+        Mêmes règles que `update_stock` pour chaque mouvement, appliqués dans
+        l'ordre du lot. Nombre de requêtes constant quelle que soit la taille du
+        lot : propriété vérifiée en une requête par table, lignes verrouillées
+        (id croissants, comme le checkout), un UPDATE set-based par table, un
+        INSERT multi-lignes pour les mouvements, une requête pour les alertes.
+        """
+        producer = self.producer_repo.get_by_user_id(user_id)
+        if not producer:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Vous ne pouvez pas modifier ce produit"
+            )
+
+        variant_products = self.variant_repo.get_product_ids(
+            [item.variant_id for item in adjustments if item.variant_id]
+        )
+        product_owners = self.product_repo.get_producer_ids([item.product_id for item in adjustments])
+        for item in adjustments:
+            if item.product_id not in product_owners or (
+                item.variant_id and variant_products.get(item.variant_id) != item.product_id
+            ):
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Produit {item.product_id} ou variante {item.variant_id} non trouvé"
+                )
+            if product_owners[item.product_id] != producer.id:
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Vous ne pouvez pas modifier ce produit"
+                )
+
+        product_stock = self.product_repo.lock_stock(
+            [item.product_id for item in adjustments if not item.variant_id]
+        )
+        variant_stock = self.variant_repo.lock_stock(list(variant_products))
+        new_product_stock = dict(product_stock)
+        new_variant_stock = dict(variant_stock)
+        for item in adjustments:
+            if item.variant_id:
+                levels, key = new_variant_stock, item.variant_id
+            else:
+                levels, key = new_product_stock, item.product_id
+            if item.type == "in":
+                levels[key] += item.quantity
+            elif item.type == "out":
+                levels[key] -= item.quantity
+            else:  # adjustment
+                levels[key] = item.quantity
+            if levels[key] < 0:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Le stock ne peut pas être négatif (produit {item.product_id})"
+                )
+
+        # Lignes verrouillées : les UPDATE conditionnels ne peuvent plus échouer
+        product_deltas = {
+            product_id: stock - product_stock[product_id]
+            for product_id, stock in new_product_stock.items() if stock != product_stock[product_id]
+        }
+        variant_deltas = {
+            variant_id: stock - variant_stock[variant_id]
+            for variant_id, stock in new_variant_stock.items() if stock != variant_stock[variant_id]
+        }
+        if (
+            len(self.product_repo.adjust_stock(product_deltas)) != len(product_deltas)
+            or len(self.variant_repo.adjust_stock(variant_deltas)) != len(variant_deltas)
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Stock modifié pendant la mise à jour, veuillez réessayer"
+            )
+
+        movement_ids = self.stock_movement_repo.create_bulk([
+            {
+                "product_id": item.product_id,
+                "created_by": user_id,
+                "type": StockMovementType(item.type.value),
+                "quantity": item.quantity,
+                "reason": item.reason,
+                "reference": f"variant:{item.variant_id}" if item.variant_id else None,
+            }
+            for item in adjustments
+        ])
+        # Alertes des produits du lot : évaluées et marquées en une requête,
+        # converties avant le commit (pas de rechargement alerte par alerte)
+        triggered_alerts = [
+            StockAlertResponse.model_validate(alert)
+            for alert in self.stock_alert_repo.mark_triggered(list(new_product_stock))
+        ]
+        self.db.commit()
+
+        levels = [
+            {"product_id": product_id, "variant_id": None, "stock": stock}
+            for product_id, stock in sorted(new_product_stock.items())
+        ] + [
+            {"product_id": variant_products[variant_id], "variant_id": variant_id, "stock": stock}
+            for variant_id, stock in sorted(new_variant_stock.items())
+        ]
+        return {"levels": levels, "movements": len(movement_ids), "triggered_alerts": triggered_alerts}
+
     def delete_product(self, product_id: int, user_id: int) -> bool:
         """Supprime un produit"""
         product = self.get_product(product_id)
@@ -458,37 +620,54 @@ class ProductService:
     
     def add_image(self, product_id: int, user_id: int, image_data: ProductImageCreate) -> 'ProductImage':
         """Ajoute une image à un produit"""
-        product = self.get_product(product_id)
-        
-        # Vérifier la propriété
-        producer = self.producer_repo.get_by_user_id(user_id)
-        if not producer or product.producer_id != producer.id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Vous ne pouvez pas modifier ce produit"
-            )
+        self._check_image_owner(product_id, user_id)
+        return self._create_image(product_id, image_data.model_dump())
 
-        existing_images = self.image_repo.get_product_images(product_id)
-        image_payload = image_data.model_dump()
-        # Première image du produit => image principale automatique
-        image_payload["is_primary"] = bool(image_payload.get("is_primary")) or len(existing_images) == 0
-        created_image = self.image_repo.create(product_id, **image_payload)
+    def check_image_upload(self, product_id: int, user_id: int, image_file: UploadFile) -> None:
+        """Droits du producteur, extension et taille annoncée, vérifiés avant toute écriture disque"""
+        self._check_image_owner(product_id, user_id)
 
-        if created_image.is_primary:
-            return self.image_repo.set_as_primary(created_image)
-        return created_image
+        filename = image_file.filename or "product-image.bin"
+        extension = Path(filename).suffix.lower()
+        allowed_extensions = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
+        if extension and extension not in allowed_extensions:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Format d'image non supporté. Utilisez JPG, PNG, WEBP ou GIF."
+            )
+        if image_file.size is not None and image_file.size > settings.PRODUCT_IMAGE_MAX_BYTES:
+            raise _image_too_large()
 
-    def add_image_file(
+    def create_rendered_image(
         self,
         product_id: int,
-        user_id: int,
-        image_file: UploadFile,
+        digest: str,
+        manifest: Dict[str, Any],
         alt_text: Optional[str] = None,
         position: int = 0,
         is_primary: bool = False
     ) -> 'ProductImage':
-        """Upload un fichier image produit puis enregistre son URL en base."""
-        # Validation droits avant écriture disque
+        """Enregistre une image rangée sous `digest` ; `url` pointe vers la déclinaison "full" (JPEG)"""
+        base_url = f"/uploads/products/{product_id}/{digest}"
+        renditions = {
+            name: {
+                "width": rendition["width"],
+                "height": rendition["height"],
+                **{key: f"{base_url}/{rendition[key]}" for key in RENDITION_FORMATS},
+            }
+            for name, rendition in manifest["renditions"].items()
+        }
+        return self._create_image(product_id, {
+            "url": renditions["full"]["jpeg"],
+            "alt_text": alt_text,
+            "position": position,
+            "is_primary": is_primary,
+            "content_hash": digest,
+            "renditions": renditions,
+        })
+
+    def _check_image_owner(self, product_id: int, user_id: int) -> None:
+        """Vérifie que l'utilisateur est le producteur du produit"""
         product = self.get_product(product_id)
         producer = self.producer_repo.get_by_user_id(user_id)
         if not producer or product.producer_id != producer.id:
@@ -497,41 +676,15 @@ class ProductService:
                 detail="Vous ne pouvez pas modifier ce produit"
             )
 
-        filename = image_file.filename or "product-image.bin"
-        extension = Path(filename).suffix.lower()
-        allowed_extensions = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
-        if extension and extension not in allowed_extensions:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Format d'image non supporté. Utilisez JPG, PNG, WEBP ou GIF."
-            )
-
-        upload_dir = Path("uploads") / "products" / str(product_id)
-        upload_dir.mkdir(parents=True, exist_ok=True)
-
-        unique_name = f"{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}-{uuid4().hex}{extension or '.bin'}"
-        saved_path = upload_dir / unique_name
-
-        try:
-            with saved_path.open("wb") as buffer:
-                shutil.copyfileobj(image_file.file, buffer)
-        except Exception as exc:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Impossible d'enregistrer le fichier image: {exc}"
-            ) from exc
+    def _create_image(self, product_id: int, image_payload: Dict[str, Any]) -> 'ProductImage':
+        existing_images = self.image_repo.get_product_images(product_id)
+        # Première image du produit => image principale automatique
+        image_payload["is_primary"] = bool(image_payload.get("is_primary")) or len(existing_images) == 0
+        created_image = self.image_repo.create(product_id, **image_payload)
 
-        public_url = f"/uploads/products/{product_id}/{unique_name}"
-        return self.add_image(
-            product_id=product_id,
-            user_id=user_id,
-            image_data=ProductImageCreate(
-                url=public_url,
-                alt_text=alt_text,
-                position=position,
-                is_primary=is_primary
-            )
-        )
+        if created_image.is_primary:
+            return self.image_repo.set_as_primary(created_image)
+        return created_image
     
     def get_product_images(self, product_id: int) -> List['ProductImage']:
         """Récupère toutes les images d'un produit"""
@@ -582,3 +735,68 @@ class ProductService:
             )
         
         return self.stock_alert_repo.create(product_id, **alert_data.model_dump(exclude={'product_id'}))
+
+
+# ============= Product Image Upload =============
+
+def _image_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Image trop volumineuse (maximum {settings.PRODUCT_IMAGE_MAX_BYTES // (1024 * 1024)} Mo)"
+    )
+
+
+async def add_image_file(
+    db,
+    product_id: int,
+    user_id: int,
+    image_file: UploadFile,
+    alt_text: Optional[str] = None,
+    position: int = 0,
+    is_primary: bool = False
+) -> ProductImageResponse:
+    """
+    Upload un fichier image produit, génère ses déclinaisons puis l'enregistre en base.
+
+    `db` est une AsyncSession (accès base via `run_sync`). `image_file` a déjà
+    été reçu en entier par l'analyse multipart : la taille du corps HTTP est
+    bornée en amont, par la route (app.core.upload_limits). Ici, la copie par
+    blocs (dans un thread) vérifie la limite exacte du fichier, PRODUCT_IMAGE_MAX_BYTES,
+    et le range sous son SHA-256 : un contenu déjà reçu pour ce produit
+    réutilise les fichiers existants. Le rendu des déclinaisons est attendu
+    sans occuper de thread du serveur.
+    """
+    await db.run_sync(lambda session: ProductService(session).check_image_upload(product_id, user_id, image_file))
+
+    upload_dir = Path("uploads") / "products" / str(product_id)
+    try:
+        upload = await asyncio.to_thread(
+            stream_to_file, image_file.file, upload_dir / f".upload-{uuid4().hex}",
+            settings.PRODUCT_IMAGE_MAX_BYTES
+        )
+    except ImageTooLarge:
+        raise _image_too_large()
+    except OSError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Impossible d'enregistrer le fichier image: {exc}"
+        ) from exc
+
+    image_dir = upload_dir / upload.digest
+    try:
+        manifest = read_manifest(image_dir) or await generate_renditions(upload.path, image_dir)
+    except InvalidImage as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Fichier image invalide. Utilisez JPG, PNG, WEBP ou GIF."
+        ) from exc
+    finally:
+        upload.path.unlink(missing_ok=True)
+
+    def create(session: Session) -> ProductImageResponse:
+        image = ProductService(session).create_rendered_image(
+            product_id, upload.digest, manifest, alt_text, position, is_primary
+        )
+        return ProductImageResponse.model_validate(image)
+
+    return await db.run_sync(create)
@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 from fastapi import HTTPException, status
 
 from app.repositories.profile_repository import (
@@ -329,6 +330,10 @@ class ProducerProfileService:
             )
         return profile
     
+    def get_public_profile_version(self, profile_id: int) -> Optional[datetime]:
+        """Marqueur de version du profil public (ETag), None si le profil n'existe pas"""
+        return self.profile_repo.get_updated_at(profile_id)
+    
     def get_public_profile(self, profile_id: int) -> ProducerProfile:
         """Récupère les informations publiques d'un profil producteur"""
         profile = self.profile_repo.get_by_id(profile_id)
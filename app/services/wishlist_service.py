@@ -86,6 +86,11 @@ class WishlistService:
         """Récupère toutes les listes d'un utilisateur, triées par ordre personnalisé"""
         return WishlistRepository.get_user_wishlists(db, user_id)
     
+    @staticmethod
+    def get_user_wishlists_with_counts(db: Session, user_id: int) -> List[Tuple[Wishlist, int]]:
+        """Listes d'un utilisateur avec leur nombre d'items (une seule requête)"""
+        return WishlistRepository.get_user_wishlists_with_counts(db, user_id)
+    
     @staticmethod
     def update_wishlist(
         db: Session,
@@ -166,17 +171,17 @@ class WishlistService:
         Calcule des statistiques sur les listes de souhaits d'un utilisateur.
         Retourne le nombre total de listes, d'items, de listes publiques, etc.
         """
-        total_wishlists = WishlistRepository.count_user_wishlists(db, user_id)
-        total_items = WishlistItemRepository.count_total_items_for_user(db, user_id)
-        public_wishlists = WishlistRepository.count_public_wishlists(db, user_id)
+        # Une seule requête groupée : listes et nombre d'items de chacune
+        rows = WishlistRepository.get_user_wishlists_with_counts(db, user_id)
+        total_wishlists = len(rows)
+        total_items = sum(item_count for _, item_count in rows)
+        public_wishlists = sum(1 for wishlist, _ in rows if wishlist.is_public)
         
         # Trouver la liste la plus populaire (celle avec le plus d'items)
-        wishlists = WishlistRepository.get_user_wishlists(db, user_id)
         most_popular = None
         max_items = 0
         
-        for wishlist in wishlists:
-            item_count = WishlistItemRepository.count_items_in_wishlist(db, wishlist.id)
+        for wishlist, item_count in rows:
             if item_count > max_items:
                 max_items = item_count
                 most_popular = wishlist.name
@@ -0,0 +1,131 @@
+"""Benchmark des routes de lecture : session synchrone vs AsyncSession (asyncpg).
+Usage:
+  python scripts/bench_async_reads.py [clients_concurrents] [requêtes_totales] [latence_bd_ms]
+
+Le script démarre un serveur uvicorn (processus séparé, un worker) exposant la
+même lecture du catalogue de deux façons :
+- /sync  : handler `def` + get_db (threadpool Starlette + pool synchrone)
+- /async : handler `async def` + get_async_db + run_sync (asyncpg, sans threadpool)
+puis envoie les requêtes avec 500 clients concurrents par défaut et affiche le
+débit et les latences p50/p95/p99. `latence_bd_ms` ajoute un pg_sleep à chaque
+requête pour simuler l'aller-retour réseau vers une base distante.
+
+La base pointée par DATABASE_URL doit être à jour (alembic upgrade head) et
+contenir le catalogue initial (init_catalog).
+"""
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+# Ajouter le répertoire racine au path pour importer les modules
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+HOST = "127.0.0.1"
+PORT = 8765
+
+
+def build_app():
+    """Application minimale exposant la même lecture en sync et en async"""
+    from fastapi import Depends, FastAPI
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import Session
+
+    from app.core.database import get_async_db, get_db
+    from app.schemas.product_schema import CategoryResponse
+    from app.services.product_service import CategoryService
+
+    bench_app = FastAPI()
+    db_latency = float(os.getenv("BENCH_DB_LATENCY_MS", "0")) / 1000
+
+    def load(session: Session):
+        if db_latency:
+            session.execute(text("SELECT pg_sleep(:seconds)"), {"seconds": db_latency})
+        categories = CategoryService(session).get_all_categories(True)
+        return [CategoryResponse.model_validate(cat) for cat in categories]
+
+    @bench_app.get("/sync")
+    def read_sync(db: Session = Depends(get_db)):
+        return load(db)
+
+    @bench_app.get("/async")
+    async def read_async(db: AsyncSession = Depends(get_async_db)):
+        return await db.run_sync(load)
+
+    return bench_app
+
+
+def serve() -> None:
+    import uvicorn
+    uvicorn.run(build_app(), host=HOST, port=PORT, log_level="warning", access_log=False)
+
+
+async def wait_for_server(client: httpx.AsyncClient) -> None:
+    for _ in range(100):
+        try:
+            await client.get("/sync")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("Le serveur de benchmark n'a pas démarré")
+
+
+async def run_load(client: httpx.AsyncClient, path: str, concurrency: int, total: int) -> None:
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                response = await client.get(path)
+                if response.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"{path:<7} {total / elapsed:8.0f} req/s  "
+        f"p50={quantiles[49] * 1000:7.1f} ms  p95={quantiles[94] * 1000:7.1f} ms  "
+        f"p99={quantiles[98] * 1000:7.1f} ms  erreurs={errors}"
+    )
+
+
+async def main(concurrency: int, total: int, db_latency_ms: float) -> None:
+    env = dict(os.environ, BENCH_DB_LATENCY_MS=str(db_latency_ms))
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "serve"], cwd=ROOT_DIR, env=env)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://{HOST}:{PORT}", limits=limits, timeout=60) as client:
+            await wait_for_server(client)
+            print(f"{concurrency} clients concurrents, {total} requêtes par route, latence BD {db_latency_ms} ms")
+            for path in ("/sync", "/async"):
+                await run_load(client, path, concurrency, total // 10)  # Échauffement des pools
+                await run_load(client, path, concurrency, total)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        serve()
+    else:
+        clients = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+        requests_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+        latency_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 0
+        asyncio.run(main(clients, requests_count, latency_ms))
@@ -0,0 +1,186 @@
+"""Benchmark de concurrence du checkout : aucune survente sous contention.
+Usage:
+  python scripts/bench_checkout_concurrency.py [checkouts_paralleles] [stock_initial]
+
+Le script crée un producteur, un produit (stock_initial, 50 par défaut), un
+créneau de retrait et autant de clients que de checkouts (200 par défaut),
+chacun avec un panier d'une unité du même produit. Tous les checkouts sont
+lancés en parallèle (un thread et une session par client) via
+OrderService.create_order_from_cart, puis le script vérifie :
+- commandes créées == stock_initial - stock_final (aucune unité vendue deux fois)
+- stock_final >= 0 et places du créneau utilisées == commandes créées
+- numéros de commande (séquence annuelle) tous distincts
+
+À titre de comparaison, le mode historique (lecture du stock puis décrément
+en Python, sans verrou) est rejoué sur un second produit.
+
+Les données créées sont supprimées à la fin. La base pointée par
+DATABASE_URL doit être à jour (alembic upgrade head).
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time as day_time, timedelta
+from decimal import Decimal
+
+from fastapi import HTTPException
+from sqlalchemy import text
+
+# Ajouter le répertoire racine au path pour importer les modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.models  # noqa: F401  (enregistrement des modèles)
+from app.core.database import SessionLocal
+from app.models.auth import User
+from app.models.orders import Cart, CartItem
+from app.models.products import Product
+from app.models.profiles import DayOfWeek, PickupPoint, PickupSlot, ProducerProfile
+from app.schemas.order_schema import CheckoutRequest
+from app.services.order_service import OrderService
+
+EMAIL_PREFIX = "bench-checkout-"
+
+
+def seed(checkouts: int, initial_stock: int) -> dict:
+    db = SessionLocal()
+    try:
+        producer_user = User(email=f"{EMAIL_PREFIX}producer@marketplace.local", password_hash="x")
+        db.add(producer_user)
+        db.flush()
+        producer = ProducerProfile(user_id=producer_user.id, business_name="Benchmark checkout")
+        db.add(producer)
+        db.flush()
+        products = [
+            Product(producer_id=producer.id, name=f"Tomates {mode}", slug=f"bench-checkout-{mode}",
+                    price=Decimal("1000"), stock_quantity=initial_stock)
+            for mode in ("atomique", "historique")
+        ]
+        point = PickupPoint(producer_id=producer.id, name="Marché", address="Place du marché",
+                            city="Dakar", postal_code="10000")
+        db.add_all(products + [point])
+        db.flush()
+        slot = PickupSlot(pickup_point_id=point.id, day_of_week=DayOfWeek.MONDAY,
+                          start_time=day_time(8), end_time=day_time(12), max_orders=checkouts)
+        db.add(slot)
+
+        customers = [User(email=f"{EMAIL_PREFIX}{index}@marketplace.local", password_hash="x")
+                     for index in range(checkouts)]
+        db.add_all(customers)
+        db.flush()
+        for customer in customers:
+            cart = Cart(user_id=customer.id, expires_at=datetime.utcnow() + timedelta(days=1))
+            cart.items.append(CartItem(product_id=products[0].id, quantity=1,
+                                       unit_price=Decimal("1000"), subtotal=Decimal("1000")))
+            db.add(cart)
+        db.commit()
+        return {
+            "producer_id": producer.id,
+            "product_id": products[0].id,
+            "legacy_product_id": products[1].id,
+            "point_id": point.id,
+            "slot_id": slot.id,
+            "customer_ids": [customer.id for customer in customers],
+        }
+    finally:
+        db.close()
+
+
+def checkout(customer_id: int, data: dict, start: threading.Barrier) -> str:
+    db = SessionLocal()
+    try:
+        request = CheckoutRequest(delivery_type="pickup", pickup_point_id=data["point_id"],
+                                  pickup_slot_id=data["slot_id"], payment_method="cash")
+        start.wait()
+        OrderService(db).create_order_from_cart(customer_id, request)
+        return "commande"
+    except HTTPException as exc:
+        db.rollback()
+        return f"refus {exc.status_code}"
+    except Exception as exc:  # erreur inattendue : comptée à part
+        db.rollback()
+        return f"erreur {type(exc).__name__}"
+    finally:
+        db.close()
+
+
+def legacy_checkout(product_id: int, start: threading.Barrier) -> str:
+    """Ancien comportement : lecture du stock puis décrément en Python, sans verrou"""
+    db = SessionLocal()
+    try:
+        start.wait()
+        product = db.get(Product, product_id)
+        if product.stock_quantity < 1:
+            return "refus 400"
+        product.stock_quantity -= 1
+        db.commit()
+        return "commande"
+    finally:
+        db.close()
+
+
+def run(label: str, tasks: int, task) -> Counter:
+    start = threading.Barrier(tasks)
+    began = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=tasks) as pool:
+        outcomes = Counter(pool.map(lambda _: task(start), range(tasks)))
+    print(f"{label:<12} {time.perf_counter() - began:6.2f} s  {dict(outcomes)}")
+    return outcomes
+
+
+def cleanup(data: dict) -> None:
+    db = SessionLocal()
+    try:
+        db.execute(text("DELETE FROM orders WHERE producer_id = :producer_id"), {"producer_id": data["producer_id"]})
+        db.execute(text("DELETE FROM users WHERE email LIKE :prefix"), {"prefix": f"{EMAIL_PREFIX}%"})
+        db.commit()
+    finally:
+        db.close()
+
+
+def main(checkouts: int, initial_stock: int) -> None:
+    data = seed(checkouts, initial_stock)
+    try:
+        customers = iter(data["customer_ids"])
+        lock = threading.Lock()
+
+        def next_checkout(start):
+            with lock:
+                customer_id = next(customers)
+            return checkout(customer_id, data, start)
+
+        print(f"{checkouts} checkouts parallèles, stock initial {initial_stock}")
+        outcomes = run("atomique", checkouts, next_checkout)
+        legacy = run("historique", checkouts, lambda start: legacy_checkout(data["legacy_product_id"], start))
+
+        db = SessionLocal()
+        try:
+            final_stock = db.get(Product, data["product_id"]).stock_quantity
+            legacy_stock = db.get(Product, data["legacy_product_id"]).stock_quantity
+            slot_orders = db.get(PickupSlot, data["slot_id"]).current_orders
+            order_numbers = db.execute(
+                text("SELECT count(*), count(DISTINCT order_number) FROM orders WHERE producer_id = :producer_id"),
+                {"producer_id": data["producer_id"]}
+            ).one()
+        finally:
+            db.close()
+
+        sold = initial_stock - final_stock
+        print(f"atomique   : {outcomes['commande']} commandes, {sold} unités déstockées, "
+              f"stock final {final_stock}, créneau {slot_orders}")
+        print(f"historique : {legacy['commande']} ventes, {initial_stock - legacy_stock} unités déstockées "
+              f"(survente : {legacy['commande'] - (initial_stock - legacy_stock)})")
+        assert final_stock >= 0, "stock négatif"
+        assert outcomes["commande"] == sold == slot_orders, "survente détectée"
+        assert order_numbers[0] == order_numbers[1] == outcomes["commande"], "numéro de commande en double"
+        print("OK : aucune survente, numéros de commande distincts")
+    finally:
+        cleanup(data)
+
+
+if __name__ == "__main__":
+    parallel = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    stock = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    main(parallel, stock)
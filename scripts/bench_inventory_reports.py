@@ -0,0 +1,181 @@
+"""Benchmark des rapports d'inventaire : boucle par produit vs génération ensembliste.
+Usage:
+  python scripts/bench_inventory_reports.py [produits] [jours] [échantillon]
+
+Le script crée `produits` produits (défaut : 50000) répartis sur 100
+producteurs, puis `jours` jours (défaut : 30) de mouvements de stock
+(réceptions, ajustements) et de commandes terminées. Il mesure ensuite :
+- boucle      : l'ancienne génération par produit (6 requêtes et un commit
+                par produit) sur `échantillon` produits (défaut : 2000),
+                extrapolée au catalogue entier
+- ensembliste : InventoryReportService.generate_reports pour le dernier jour,
+                tous producteurs confondus
+- rattrapage  : la même génération sur toute la plage de `jours` jours
+
+Les données créées sont supprimées à la fin. La base pointée par
+DATABASE_URL doit être à jour (alembic upgrade head).
+"""
+import os
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func, insert, text
+
+# Ajouter le répertoire racine au path pour importer les modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.models  # noqa: F401  (enregistrement des modèles)
+from app.core.database import SessionLocal
+from app.models.analytics import InventoryReport
+from app.models.auth import User
+from app.models.orders import Order, OrderItem, OrderStatus
+from app.models.products import Product, StockMovement, StockMovementType
+from app.models.profiles import ProducerProfile
+from app.repositories.analytics_repository import InventoryReportRepository
+from app.services.analytics_service import InventoryReportService
+
+SLUG_PREFIX = "bench-inventory-"
+EMAIL_PREFIX = "bench-inventory-"
+ORDER_PREFIX = "BENCH-INV-"
+PRODUCERS = 100
+
+
+def seed(db, products: int, days: int, first_day: date) -> None:
+    users = [User(email=f"{EMAIL_PREFIX}{index}@marketplace.local", password_hash="x")
+             for index in range(PRODUCERS)]
+    db.add_all(users)
+    db.flush()
+    producers = [ProducerProfile(user_id=user.id, business_name=f"Benchmark inventaire {index}")
+                 for index, user in enumerate(users)]
+    db.add_all(producers)
+    db.flush()
+    db.execute(insert(Product), [
+        {"producer_id": producers[index % PRODUCERS].id, "name": f"Produit {index}",
+         "slug": f"{SLUG_PREFIX}{index}", "price": Decimal("1000")}
+        for index in range(products)
+    ])
+    db.commit()
+
+    params = {"prefix": f"{SLUG_PREFIX}%", "first_day": first_day, "days": days,
+              "movements": products * days // 5, "orders": products * days // 10,
+              "order_prefix": ORDER_PREFIX}
+    db.execute(text("""
+        INSERT INTO stock_movements (product_id, type, quantity, reason, created_at)
+        SELECT ids[1 + (random() * (array_length(ids, 1) - 1))::int],
+               CASE WHEN random() < 0.8 THEN 'IN' ELSE 'ADJUSTMENT' END::stockmovementtype,
+               1 + (random() * 20)::int, 'benchmark',
+               :first_day + random() * (:days * interval '1 day')
+        FROM (SELECT array_agg(id) AS ids FROM products WHERE slug LIKE :prefix) AS p,
+             generate_series(1, :movements)
+    """), params)
+    db.execute(text("""
+        INSERT INTO orders (order_number, status, payment_status, subtotal, tax_amount, delivery_fee,
+                            discount_amount, total_amount, delivery_type, created_at, updated_at)
+        SELECT :order_prefix || n, 'COMPLETED', 'COMPLETED', 1000, 0, 0, 0, 1000, 'PICKUP',
+               :first_day + random() * (:days * interval '1 day'), now()
+        FROM generate_series(1, :orders) AS n
+    """), params)
+    db.execute(text("""
+        INSERT INTO order_items (order_id, product_id, quantity, unit_price, subtotal, created_at)
+        SELECT o.id, ids[1 + (random() * (array_length(ids, 1) - 1))::int], 1, 1000, 1000, o.created_at
+        FROM orders AS o,
+             (SELECT array_agg(id) AS ids FROM products WHERE slug LIKE :prefix) AS p
+        WHERE o.order_number LIKE :order_prefix || '%'
+    """), params)
+    db.commit()
+    for table in ("products", "stock_movements", "orders", "order_items"):
+        db.execute(text(f"ANALYZE {table}"))
+    db.commit()
+
+
+def legacy_report(db, repository, product, report_date: date) -> None:
+    """Ancienne génération d'un rapport (une requête par valeur, un commit)"""
+    if repository.get_report_for_date(product.id, report_date):
+        return
+    previous = repository.get_report_for_date(product.id, report_date - timedelta(days=1))
+    stock_start = previous.stock_end if previous else 0
+    stock_sold = db.query(func.sum(OrderItem.quantity)).join(Order).filter(
+        OrderItem.product_id == product.id,
+        func.date(Order.created_at) == report_date,
+        Order.status.in_([OrderStatus.COMPLETED, OrderStatus.READY])
+    ).scalar() or 0
+    stock_received = db.query(func.sum(StockMovement.quantity)).filter(
+        StockMovement.product_id == product.id,
+        func.date(StockMovement.created_at) == report_date,
+        StockMovement.type == StockMovementType.IN
+    ).scalar() or 0
+    stock_adjusted = db.query(func.sum(StockMovement.quantity)).filter(
+        StockMovement.product_id == product.id,
+        func.date(StockMovement.created_at) == report_date,
+        StockMovement.type == StockMovementType.ADJUSTMENT
+    ).scalar() or 0
+    stock_end = stock_start + stock_received - stock_sold + stock_adjusted
+    price = db.query(Product).filter(Product.id == product.id).first().price
+    repository.create(product.producer_id, product.id, stock_start, stock_received, stock_sold,
+                      stock_adjusted, stock_end, report_date, stock_end * price)
+
+
+def delete_reports(db) -> None:
+    db.execute(text("""
+        DELETE FROM inventory_reports
+        WHERE product_id IN (SELECT id FROM products WHERE slug LIKE :prefix)
+    """), {"prefix": f"{SLUG_PREFIX}%"})
+    db.commit()
+
+
+def cleanup(db) -> None:
+    db.execute(text("DELETE FROM orders WHERE order_number LIKE :prefix"), {"prefix": f"{ORDER_PREFIX}%"})
+    db.execute(text("DELETE FROM products WHERE slug LIKE :prefix"), {"prefix": f"{SLUG_PREFIX}%"})
+    db.execute(text("DELETE FROM users WHERE email LIKE :prefix"), {"prefix": f"{EMAIL_PREFIX}%"})
+    db.commit()
+
+
+def main(products: int, days: int, sample: int) -> None:
+    db = SessionLocal()
+    last_day = date.today() - timedelta(days=1)
+    first_day = last_day - timedelta(days=days - 1)
+    try:
+        began = time.perf_counter()
+        seed(db, products, days, first_day)
+        print(f"{products:,} produits, {days} jours de mouvements générés en {time.perf_counter() - began:.1f} s")
+
+        repository = InventoryReportRepository(db)
+        catalog = db.query(Product).filter(Product.slug.like(f"{SLUG_PREFIX}%")).limit(sample).all()
+        began = time.perf_counter()
+        for product in catalog:
+            legacy_report(db, repository, product, last_day)
+        elapsed = time.perf_counter() - began
+        print(f"  boucle       {elapsed:8.2f} s pour {len(catalog):,} produits "
+              f"(~{elapsed / len(catalog) * products:,.0f} s extrapolé à {products:,})")
+        legacy = {(report.product_id, report.stock_end) for report in db.query(InventoryReport).filter(
+            InventoryReport.product_id.in_([product.id for product in catalog])
+        )}
+        delete_reports(db)
+
+        service = InventoryReportService(db)
+        began = time.perf_counter()
+        created = service.generate_reports(last_day)
+        print(f"  ensembliste  {time.perf_counter() - began:8.2f} s pour {created:,} rapports (1 jour)")
+        current = {(report.product_id, report.stock_end) for report in db.query(InventoryReport).filter(
+            InventoryReport.product_id.in_([product.id for product in catalog])
+        )}
+        assert current == legacy, "stocks divergents"
+        delete_reports(db)
+
+        began = time.perf_counter()
+        created = service.generate_reports(first_day, last_day)
+        print(f"  rattrapage   {time.perf_counter() - began:8.2f} s pour {created:,} rapports ({days} jours)")
+    finally:
+        db.rollback()
+        cleanup(db)
+        db.close()
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 50_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 30,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 2000,
+    )
@@ -0,0 +1,118 @@
+"""Benchmark des facettes de recherche produit.
+Usage:
+  python scripts/bench_product_facets.py [nombre_de_produits] [terme_de_recherche]
+
+Le script insère un catalogue synthétique (500 000 produits par défaut) dans une
+transaction annulée à la fin, puis compare :
+- le calcul des facettes en une seule requête (ProductRepository.get_search_facets)
+- l'approche historique du frontend : un appel search_products par valeur de facette
+
+La base pointée par DATABASE_URL doit être à jour (alembic upgrade head).
+"""
+import os
+import sys
+import time
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Ajouter le répertoire racine au path pour importer les modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import engine
+from app.models.products import Category, Tag
+from app.repositories.product_repository import ProductRepository, PRICE_FACET_BOUNDARIES
+
+
+def seed_catalog(db: Session, product_count: int) -> None:
+    """Insère les produits et leurs tags avec des INSERT ... SELECT ensemblistes"""
+    user_id = db.execute(text(
+        "INSERT INTO users (email, password_hash, is_active, is_verified) "
+        "VALUES ('bench-facets@marketplace.local', 'x', true, true) RETURNING id"
+    )).scalar()
+    producer_id = db.execute(text(
+        "INSERT INTO producer_profiles (user_id, business_name, is_verified) "
+        "VALUES (:user_id, 'Benchmark', true) RETURNING id"
+    ), {"user_id": user_id}).scalar()
+
+    category_ids = [row[0] for row in db.execute(text("SELECT id FROM categories ORDER BY id"))]
+    words = ["tomate", "banane", "plantain", "manioc", "mangue", "piment", "oignon", "avocat", "igname", "gombo"]
+
+    db.execute(text("""
+        INSERT INTO products (producer_id, category_id, name, slug, description, price,
+                              stock_quantity, min_order, is_active, is_featured)
+        SELECT :producer_id,
+               (:category_ids)[1 + g % cardinality(:category_ids)],
+               initcap((:words)[1 + g % 10]) || ' lot ' || g,
+               'bench-' || g,
+               'Produit de test ' || (:words)[1 + (g / 10) % 10],
+               (50 + (g * 37) % 15000)::numeric(10, 2),
+               CASE WHEN g % 7 = 0 THEN 0 ELSE g % 200 END,
+               1, true, g % 50 = 0
+        FROM generate_series(1, :product_count) AS g
+    """), {
+        "producer_id": producer_id,
+        "category_ids": category_ids,
+        "words": words,
+        "product_count": product_count,
+    })
+    db.execute(text("""
+        INSERT INTO product_tags (product_id, tag_id)
+        SELECT p.id, t.id
+        FROM products p
+        JOIN tags t ON (p.id + t.id) % 3 = 0
+        WHERE p.producer_id = :producer_id
+    """), {"producer_id": producer_id})
+    db.execute(text("ANALYZE products"))
+    db.execute(text("ANALYZE product_tags"))
+
+
+def per_facet_queries(repo: ProductRepository, db: Session, search_term: str) -> None:
+    """Reproduit l'ancien comportement : une recherche par valeur de facette"""
+    for category in db.query(Category).all():
+        len(repo.search_products(category_id=category.id, search_term=search_term, limit=100000))
+    for tag in db.query(Tag).all():
+        len(repo.search_products(tag_ids=[tag.id], search_term=search_term, limit=100000))
+    bounds = [0, *PRICE_FACET_BOUNDARIES, None]
+    for low, high in zip(bounds, bounds[1:]):
+        len(repo.search_products(min_price=low, max_price=high, search_term=search_term, limit=100000))
+    len(repo.search_products(in_stock=True, search_term=search_term, limit=100000))
+    len(repo.search_products(search_term=search_term, limit=100000))
+
+
+def timed(label: str, func, repeat: int = 3) -> None:
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    print(f"{label:<45} min={min(durations) * 1000:9.1f} ms  max={max(durations) * 1000:9.1f} ms")
+
+
+def main(product_count: int, search_term: str) -> None:
+    connection = engine.connect()
+    transaction = connection.begin()
+    db = Session(bind=connection)
+    try:
+        print(f"Insertion de {product_count} produits...")
+        start = time.perf_counter()
+        seed_catalog(db, product_count)
+        print(f"Catalogue prêt en {time.perf_counter() - start:.1f} s")
+
+        repo = ProductRepository(db)
+        facets = repo.get_search_facets(search_term=search_term)
+        print(f"Ensemble filtré pour '{search_term}' : {facets['total']} produits")
+
+        timed("Facettes en une requête (GROUPING SETS)", lambda: repo.get_search_facets(search_term=search_term))
+        timed("Facettes sans filtre texte", lambda: repo.get_search_facets())
+        timed("Une requête par facette (historique)", lambda: per_facet_queries(repo, db, search_term), repeat=1)
+    finally:
+        db.close()
+        transaction.rollback()
+        connection.close()
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    term = sys.argv[2] if len(sys.argv) > 2 else "tomate"
+    main(count, term)
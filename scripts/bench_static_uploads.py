@@ -0,0 +1,184 @@
+"""Benchmark du service de /uploads : StaticFiles par défaut vs ImmutableStaticFiles.
+Usage:
+  python scripts/bench_static_uploads.py [clients_concurrents] [requêtes_totales] [vues_de_page]
+
+Le script génère un répertoire temporaire d'images produit rangées comme le
+pipeline d'upload (products/<id>/<sha256>/{thumb,card,full}.jpg), démarre un
+serveur uvicorn (processus séparé, un worker) qui sert ce répertoire deux fois :
+- /legacy  : StaticFiles de Starlette (montage actuel de /uploads)
+- /uploads : ImmutableStaticFiles
+puis mesure pour chaque montage le débit, les latences p50/p95/p99 et le
+volume reçu :
+- complet     : GET sans en-tête conditionnel (200)
+- revalidation: GET avec If-None-Match (304 attendu)
+- plage       : GET avec Range: bytes=0-65535 (206 attendu)
+Enfin, `vues_de_page` affichages d'une page de 24 vignettes par un client qui
+respecte Cache-Control (comme un navigateur ou le reverse proxy) : nombre de
+requêtes réellement envoyées au serveur.
+"""
+import asyncio
+import hashlib
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+# Ajouter le répertoire racine au path pour importer les modules
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+HOST = "127.0.0.1"
+PORT = 8766
+PRODUCTS = 50
+RENDITION_SIZES = {"thumb": 8 * 1024, "card": 48 * 1024, "full": 320 * 1024}
+PAGE_SIZE = 24
+
+
+def seed(directory: str) -> list:
+    """Écrit les déclinaisons (contenu aléatoire, incompressible) et retourne leurs chemins"""
+    paths = []
+    generator = random.Random(42)
+    for product_id in range(1, PRODUCTS + 1):
+        content = generator.randbytes(1024)
+        digest = hashlib.sha256(content).hexdigest()
+        image_dir = os.path.join(directory, "products", str(product_id), digest)
+        os.makedirs(image_dir)
+        for name, size in RENDITION_SIZES.items():
+            with open(os.path.join(image_dir, f"{name}.jpg"), "wb") as output:
+                output.write(generator.randbytes(size))
+            paths.append(f"products/{product_id}/{digest}/{name}.jpg")
+    return paths
+
+
+def build_app(directory: str):
+    """Application servant le même répertoire avec les deux montages"""
+    from starlette.applications import Starlette
+    from starlette.routing import Mount
+    from starlette.staticfiles import StaticFiles
+
+    from app.core.static_files import ImmutableStaticFiles
+
+    return Starlette(routes=[
+        Mount("/legacy", StaticFiles(directory=directory)),
+        Mount("/uploads", ImmutableStaticFiles(directory=directory)),
+    ])
+
+
+def serve(directory: str) -> None:
+    import uvicorn
+    uvicorn.run(build_app(directory), host=HOST, port=PORT, log_level="warning", access_log=False)
+
+
+async def wait_for_server(client: httpx.AsyncClient, path: str) -> None:
+    for _ in range(100):
+        try:
+            await client.get(path)
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("Le serveur de benchmark n'a pas démarré")
+
+
+async def run_load(client: httpx.AsyncClient, label: str, requests: list, concurrency: int,
+                   expected_status: int) -> None:
+    """`requests` : liste de (chemin, en-têtes) envoyés dans l'ordre par `concurrency` clients"""
+    latencies = []
+    unexpected = 0
+    received = 0
+    remaining = iter(requests)
+
+    async def worker():
+        nonlocal unexpected, received
+        for path, headers in remaining:
+            start = time.perf_counter()
+            try:
+                response = await client.get(path, headers=headers)
+                received += len(response.content)
+                if response.status_code != expected_status:
+                    unexpected += 1
+            except httpx.HTTPError:
+                unexpected += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"  {label:<22} {len(requests) / elapsed:8.0f} req/s  "
+        f"p50={quantiles[49] * 1000:6.1f} ms  p95={quantiles[94] * 1000:6.1f} ms  "
+        f"p99={quantiles[98] * 1000:6.1f} ms  {received / 1024 / 1024:8.1f} Mo  "
+        f"statut≠{expected_status}: {unexpected}"
+    )
+
+
+async def browse(client: httpx.AsyncClient, prefix: str, paths: list, views: int) -> int:
+    """Affiche `views` fois une page de vignettes avec un cache client ; retourne les requêtes envoyées"""
+    cache = {}
+    sent = 0
+    page = [path for path in paths if path.endswith("thumb.jpg")][:PAGE_SIZE]
+    for _ in range(views):
+        for path in page:
+            entry = cache.get(path)
+            if entry is not None and entry["fresh_until"] > time.monotonic():
+                continue
+            headers = {"If-None-Match": entry["etag"]} if entry else {}
+            response = await client.get(f"{prefix}/{path}", headers=headers)
+            sent += 1
+            cache_control = response.headers.get("cache-control", "")
+            max_age = 0
+            for directive in cache_control.split(","):
+                name, _, value = directive.strip().partition("=")
+                if name == "max-age":
+                    max_age = int(value)
+            cache[path] = {"etag": response.headers.get("etag"), "fresh_until": time.monotonic() + max_age}
+    return sent
+
+
+async def main(concurrency: int, total: int, views: int) -> None:
+    directory = tempfile.mkdtemp(prefix="bench-uploads-")
+    paths = seed(directory)
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "serve", directory], cwd=ROOT_DIR
+    )
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://{HOST}:{PORT}", limits=limits, timeout=60) as client:
+            await wait_for_server(client, f"/uploads/{paths[0]}")
+            print(f"{len(paths)} fichiers, {concurrency} clients concurrents, {total} requêtes par scénario")
+            for prefix in ("/legacy", "/uploads"):
+                print(prefix)
+                urls = [f"{prefix}/{paths[index % len(paths)]}" for index in range(total)]
+                etags = {}
+                for path in paths:
+                    etags[path] = (await client.get(f"{prefix}/{path}")).headers["etag"]
+                await run_load(client, "complet", [(url, {}) for url in urls], concurrency, 200)
+                await run_load(client, "revalidation", [
+                    (url, {"If-None-Match": etags[url[len(prefix) + 1:]]}) for url in urls
+                ], concurrency, 304)
+                await run_load(client, "plage 64 Ko", [
+                    (url, {"Range": "bytes=0-65535"}) for url in urls
+                ], concurrency, 206)
+                sent = await browse(client, prefix, paths, views)
+                print(f"  {views} vues d'une page de {PAGE_SIZE} vignettes : {sent} requêtes envoyées")
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "serve":
+        serve(sys.argv[2])
+    else:
+        clients = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+        requests_count = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+        page_views = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+        asyncio.run(main(clients, requests_count, page_views))
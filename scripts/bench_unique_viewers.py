@@ -0,0 +1,124 @@
+"""Benchmark des visiteurs uniques : COUNT(DISTINCT) exact vs sketches HyperLogLog.
+Usage:
+  python scripts/bench_unique_viewers.py [vues] [produits] [produits_mesurés]
+
+Le script remplit product_views avec `vues` vues synthétiques (défaut :
+20 000 000) réparties sur 90 jours et `produits` produits (défaut : 200),
+chaque vue provenant d'un visiteur anonyme tiré parmi 5 000 000. Après
+compaction (cumuls et sketches journaliers), il compare sur 90 jours, pour
+`produits_mesurés` produits (défaut : 20) :
+- exact : get_unique_viewers(exact=True), COUNT(DISTINCT) sur la table brute
+- hll   : get_unique_viewers(), fusion des sketches journaliers
+et affiche les latences médianes ainsi que l'erreur relative médiane et
+maximale (borne documentée : erreur type 1,63 %).
+
+Les données créées sont supprimées à la fin. La base pointée par
+DATABASE_URL doit être à jour (alembic upgrade head).
+"""
+import os
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import text
+
+# Ajouter le répertoire racine au path pour importer les modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.models  # noqa: F401  (enregistrement des modèles)
+from app.core.database import SessionLocal
+from app.core.hyperloglog import HyperLogLog
+from app.models.auth import User
+from app.models.products import Product
+from app.models.profiles import ProducerProfile
+from app.repositories.analytics_repository import ProductViewRepository
+
+SLUG_PREFIX = "bench-unique-"
+BENCH_EMAIL = "bench-unique@marketplace.local"
+VISITOR_POOL = 5_000_000
+
+
+def seed(db, views: int, products: int) -> list:
+    user = User(email=BENCH_EMAIL, password_hash="x")
+    db.add(user)
+    db.flush()
+    producer = ProducerProfile(user_id=user.id, business_name="Benchmark visiteurs")
+    db.add(producer)
+    db.flush()
+    items = [Product(producer_id=producer.id, name=f"Produit {index}", slug=f"{SLUG_PREFIX}{index}",
+                     price=Decimal("1000")) for index in range(products)]
+    db.add_all(items)
+    db.commit()
+
+    # Insertion dans l'ordre chronologique, comme en production (id croissant avec le temps)
+    inserted = 0
+    while inserted < views:
+        batch = min(5_000_000, views - inserted)
+        db.execute(text("""
+            INSERT INTO product_views (product_id, session_id, viewed_at)
+            SELECT ids[1 + (random() * (array_length(ids, 1) - 1))::int],
+                   'session-' || (random() * :pool)::int,
+                   now() - interval '90 days' + (n::float / :views) * interval '89 days'
+            FROM (SELECT array_agg(id) AS ids FROM products WHERE slug LIKE :prefix) AS p,
+                 generate_series(:first, :last) AS n
+        """), {"prefix": f"{SLUG_PREFIX}%", "first": inserted + 1, "last": inserted + batch,
+               "views": views, "pool": VISITOR_POOL})
+        db.commit()
+        inserted += batch
+    db.execute(text("ANALYZE product_views"))
+    db.commit()
+    return [item.id for item in items]
+
+
+def measure(call):
+    began = time.perf_counter()
+    value = call()
+    return value, time.perf_counter() - began
+
+
+def cleanup(db) -> None:
+    db.execute(text("DELETE FROM products WHERE slug LIKE :prefix"), {"prefix": f"{SLUG_PREFIX}%"})
+    db.execute(text("DELETE FROM users WHERE email = :email"), {"email": BENCH_EMAIL})
+    db.execute(text("DELETE FROM analytics_watermarks WHERE name = :name"),
+               {"name": ProductViewRepository.WATERMARK_NAME})
+    db.commit()
+
+
+def main(views: int, products: int, measured: int) -> None:
+    db = SessionLocal()
+    try:
+        began = time.perf_counter()
+        product_ids = seed(db, views, products)
+        print(f"{views:,} vues sur {products} produits générées en {time.perf_counter() - began:.1f} s")
+        repository = ProductViewRepository(db)
+        began = time.perf_counter()
+        repository.compact_daily_views()
+        print(f"compaction (cumuls + sketches) : {time.perf_counter() - began:.1f} s")
+
+        end = date.today()
+        start = end - timedelta(days=90)
+        errors, exact_times, sketch_times = [], [], []
+        for product_id in product_ids[:measured]:
+            exact, exact_time = measure(lambda: repository.get_unique_viewers(product_id, start, end, exact=True))
+            estimate, sketch_time = measure(lambda: repository.get_unique_viewers(product_id, start, end))
+            errors.append(abs(estimate - exact) / exact)
+            exact_times.append(exact_time)
+            sketch_times.append(sketch_time)
+
+        print(f"exact : médiane {statistics.median(exact_times) * 1000:8.1f} ms")
+        print(f"hll   : médiane {statistics.median(sketch_times) * 1000:8.1f} ms")
+        print(f"erreur relative : médiane {statistics.median(errors):.2%}, max {max(errors):.2%} "
+              f"(erreur type {HyperLogLog().standard_error:.2%})")
+    finally:
+        db.rollback()
+        cleanup(db)
+        db.close()
+
+
+if __name__ == "__main__":
+    view_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000_000
+    product_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    measured_count = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+    main(view_count, product_count, measured_count)
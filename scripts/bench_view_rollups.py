@@ -0,0 +1,125 @@
+"""Benchmark du top produits sur 90 jours : table brute vs cumul journalier.
+Usage:
+  python scripts/bench_view_rollups.py [tailles_brutes] [produits]
+
+`tailles_brutes` est une liste de volumes séparés par des virgules
+(défaut : 10000000,100000000). Pour chaque volume, le script remplit
+product_views avec des vues synthétiques réparties sur 365 jours et
+`produits` produits (défaut : 2000), compacte le cumul, puis mesure
+get_top_viewed_products sur 90 jours :
+- historique : GROUP BY sur la table brute (ancienne requête)
+- cumul      : ProductViewRepository (cumul des jours clos + vues du jour)
+
+Le temps "cumul" doit rester stable quand le volume brut augmente.
+Les données créées sont supprimées à la fin. La base pointée par
+DATABASE_URL doit être à jour (alembic upgrade head).
+"""
+import os
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import desc, func, text
+
+# Ajouter le répertoire racine au path pour importer les modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.models  # noqa: F401  (enregistrement des modèles)
+from app.core.database import SessionLocal
+from app.models.analytics import ProductView
+from app.models.auth import User
+from app.models.products import Product
+from app.models.profiles import ProducerProfile
+from app.repositories.analytics_repository import ProductViewRepository
+
+SLUG_PREFIX = "bench-views-"
+BENCH_EMAIL = "bench-views@marketplace.local"
+RUNS = 5
+
+
+def seed_products(db, products: int) -> None:
+    user = User(email=BENCH_EMAIL, password_hash="x")
+    db.add(user)
+    db.flush()
+    producer = ProducerProfile(user_id=user.id, business_name="Benchmark vues")
+    db.add(producer)
+    db.flush()
+    db.add_all([
+        Product(producer_id=producer.id, name=f"Produit {index}", slug=f"{SLUG_PREFIX}{index}",
+                price=Decimal("1000"))
+        for index in range(products)
+    ])
+    db.commit()
+
+
+def grow_views(db, target: int) -> None:
+    """Complète product_views jusqu'à `target` vues synthétiques (par tranches)"""
+    current = db.execute(text("SELECT count(*) FROM product_views")).scalar()
+    while current < target:
+        batch = min(5_000_000, target - current)
+        db.execute(text("""
+            INSERT INTO product_views (product_id, session_id, viewed_at)
+            SELECT ids[1 + (random() * (array_length(ids, 1) - 1))::int],
+                   'session-' || (random() * 1000000)::int,
+                   now() - random() * interval '365 days'
+            FROM (SELECT array_agg(id) AS ids FROM products WHERE slug LIKE :prefix) AS p,
+                 generate_series(1, :batch)
+        """), {"prefix": f"{SLUG_PREFIX}%", "batch": batch})
+        db.commit()
+        current += batch
+    db.execute(text("ANALYZE product_views"))
+    db.commit()
+
+
+def timed(label: str, call) -> None:
+    durations = []
+    for _ in range(RUNS):
+        began = time.perf_counter()
+        call()
+        durations.append(time.perf_counter() - began)
+    print(f"  {label:<11} {min(durations) * 1000:9.1f} ms (meilleur de {RUNS})")
+
+
+def legacy_top(db, start: date, end: date):
+    return db.query(
+        ProductView.product_id, func.count(ProductView.id).label("view_count")
+    ).filter(
+        ProductView.viewed_at >= start, ProductView.viewed_at < end + timedelta(days=1)
+    ).group_by(ProductView.product_id).order_by(desc("view_count")).limit(10).all()
+
+
+def cleanup(db) -> None:
+    db.execute(text("DELETE FROM products WHERE slug LIKE :prefix"), {"prefix": f"{SLUG_PREFIX}%"})
+    db.execute(text("DELETE FROM users WHERE email = :email"), {"email": BENCH_EMAIL})
+    db.execute(text("DELETE FROM analytics_watermarks WHERE name = :name"),
+               {"name": ProductViewRepository.WATERMARK_NAME})
+    db.commit()
+
+
+def main(sizes, products: int) -> None:
+    db = SessionLocal()
+    try:
+        seed_products(db, products)
+        repository = ProductViewRepository(db)
+        end = date.today()
+        start = end - timedelta(days=90)
+        for size in sizes:
+            grow_views(db, size)
+            began = time.perf_counter()
+            folded = repository.compact_daily_views()
+            print(f"{size:,} vues brutes ({folded:,} repliées en {time.perf_counter() - began:.1f} s)")
+            assert [row.view_count for row in legacy_top(db, start, end)] == \
+                [count for _, count in repository.get_top_viewed_products(10, start, end)], "comptes divergents"
+            timed("historique", lambda: legacy_top(db, start, end))
+            timed("cumul", lambda: repository.get_top_viewed_products(10, start, end))
+    finally:
+        db.rollback()
+        cleanup(db)
+        db.close()
+
+
+if __name__ == "__main__":
+    volumes = [int(size) for size in (sys.argv[1] if len(sys.argv) > 1 else "10000000,100000000").split(",")]
+    product_count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    main(volumes, product_count)
@@ -0,0 +1,33 @@
+"""Compaction des vues produit dans le cumul journalier (product_view_daily).
+Usage:
+  python scripts/compact_product_views.py
+
+Replie les vues brutes au-delà du repère de compaction (analytics_watermarks)
+et affiche le nombre de vues repliées. À lancer par cron si le job périodique
+de l'application est désactivé (PRODUCT_VIEW_COMPACTION_INTERVAL=0), ou pour
+un rattrapage initial après la migration.
+"""
+import os
+import sys
+import time
+
+# Ajouter le répertoire racine au path pour importer les modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.models  # noqa: F401  (enregistrement des modèles)
+from app.core.database import SessionLocal
+from app.services.analytics_service import ProductViewService
+
+
+def main() -> None:
+    db = SessionLocal()
+    try:
+        began = time.perf_counter()
+        folded = ProductViewService(db).compact_views()
+        print(f"{folded} vues repliées en {time.perf_counter() - began:.2f} s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
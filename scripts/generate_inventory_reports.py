@@ -0,0 +1,39 @@
+"""Génération planifiée des rapports d'inventaire quotidiens.
+Usage:
+  python scripts/generate_inventory_reports.py [date_début] [date_fin]
+
+Génère les rapports de tous les produits actifs de tous les producteurs
+pour chaque jour de [date_début, date_fin] (AAAA-MM-JJ ; défaut : hier,
+date_fin = date_début). Les rapports existants sont conservés et servent de
+point de départ aux jours suivants. Pensé pour cron, par exemple :
+  5 0 * * * python scripts/generate_inventory_reports.py
+et pour le rattrapage d'une période :
+  python scripts/generate_inventory_reports.py 2026-01-01 2026-03-31
+"""
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+# Ajouter le répertoire racine au path pour importer les modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.models  # noqa: F401  (enregistrement des modèles)
+from app.core.database import SessionLocal
+from app.services.analytics_service import InventoryReportService
+
+
+def main(start_date: date, end_date: date) -> None:
+    db = SessionLocal()
+    try:
+        began = time.perf_counter()
+        created = InventoryReportService(db).generate_reports(start_date, end_date)
+        print(f"{start_date} → {end_date} : {created} rapports créés en {time.perf_counter() - began:.2f} s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    start = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else date.today() - timedelta(days=1)
+    end = date.fromisoformat(sys.argv[2]) if len(sys.argv) > 2 else start
+    main(start, end)
@@ -0,0 +1,45 @@
+"""Génération planifiée des versements mensuels des producteurs.
+Usage:
+  python scripts/generate_monthly_payouts.py [année] [mois] [processus]
+
+Crée les versements de tous les producteurs vérifiés pour le mois indiqué
+(défaut : le mois précédent), par lots écrits par `processus` processus
+(défaut : 1). Un traitement interrompu reprend au dernier lot validé quand
+on le relance. Pensé pour cron, par exemple le 1er de chaque mois :
+  30 1 1 * * python scripts/generate_monthly_payouts.py
+"""
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+# Ajouter le répertoire racine au path pour importer les modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.models  # noqa: F401  (enregistrement des modèles)
+from app.core.database import SessionLocal
+from app.services.payout_batch_service import PayoutBatchService
+
+
+def main(year: int, month: int, workers: int) -> None:
+    period_start = datetime(year, month, 1, tzinfo=timezone.utc)
+    if month == 12:
+        period_end = datetime(year + 1, 1, 1, tzinfo=timezone.utc) - timedelta(seconds=1)
+    else:
+        period_end = datetime(year, month + 1, 1, tzinfo=timezone.utc) - timedelta(seconds=1)
+    db = SessionLocal()
+    try:
+        began = time.perf_counter()
+        created = PayoutBatchService(db, workers=workers).run(period_start, period_end)
+        print(f"{year}-{month:02d} - {len(created)} versements créés en {time.perf_counter() - began:.2f} s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    previous_month = date.today().replace(day=1) - timedelta(days=1)
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else previous_month.year,
+        int(sys.argv[2]) if len(sys.argv) > 2 else previous_month.month,
+        int(sys.argv[3]) if len(sys.argv) > 3 else 1,
+    )
@@ -0,0 +1,38 @@
+"""Recalcul planifié des métriques de tableaux de bord.
+Usage:
+  python scripts/refresh_dashboard_metrics.py [date] [période]
+
+Recalcule vues, ventes, revenu et taux de conversion de tous les produits,
+producteurs et catégories pour `date` (AAAA-MM-JJ, défaut : hier) et
+`période` (day, week, month ou year ; défaut : day). Pensé pour cron, par
+exemple chaque nuit :
+  15 0 * * * python scripts/refresh_dashboard_metrics.py
+"""
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+# Ajouter le répertoire racine au path pour importer les modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.models  # noqa: F401  (enregistrement des modèles)
+from app.core.database import SessionLocal
+from app.models.analytics import MetricPeriod
+from app.services.analytics_service import DashboardMetricService
+
+
+def main(metric_date: date, period: MetricPeriod) -> None:
+    db = SessionLocal()
+    try:
+        began = time.perf_counter()
+        written = DashboardMetricService(db).refresh_metrics(metric_date, period)
+        summary = ", ".join(f"{entity_type} : {count}" for entity_type, count in written.items())
+        print(f"{metric_date} ({period.value}) - {summary} en {time.perf_counter() - began:.2f} s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    target = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else date.today() - timedelta(days=1)
+    main(target, MetricPeriod(sys.argv[2]) if len(sys.argv) > 2 else MetricPeriod.DAY)
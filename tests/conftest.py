@@ -1,7 +1,9 @@
 import os
 import pytest
 import logging
-from typing import Generator
+from contextlib import contextmanager
+from typing import Callable, Generator, Optional, Sequence
+from sqlalchemy import event
 from sqlalchemy.orm import sessionmaker, Session
 from fastapi.testclient import TestClient
 
@@ -16,9 +18,14 @@ logging.getLogger('sqlalchemy.dialects').setLevel(logging.ERROR)
 os.environ.setdefault("SECRET_KEY", "test_secret_key_for_testing_only")
 
 from app.main import app as application
-from app.core.database import get_db, Base, engine
+from app.core.database import get_db, get_read_db, get_async_db, get_async_read_db, Base, engine
 from app.core import deps
+from app.core.commission_rules import invalidate_rules
+from app.core.http_cache import get_response_cache
+from app.core.principal_cache import get_principal_cache
+from app.core.settings_cache import get_settings_cache
 import app.main as main_module
+import app.services.catalog_service as catalog_service
 
 from app.core.init_roles import init_roles
 from app.core.init_catalog import init_catalog
@@ -46,11 +53,113 @@ def test_db() -> Generator[Session, None, None]:
         
         yield session
     finally:
+        # Règles, paramètres et réponses chargés dans la transaction de test disparaissent au rollback
+        invalidate_rules()
+        get_settings_cache().clear()
+        get_response_cache().clear()
         session.close()
         trans.rollback()
         connection.close()
 
 
+class SyncSessionAsyncAdapter:
+    """
+    Expose la session de test aux routes asynchrones.
+
+    Les routes async n'utilisent que `await db.run_sync(fn)` : on exécute fn
+    sur test_db pour rester dans la même transaction annulée en fin de test.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return fn(self.session, *args, **kwargs)
+
+    # `async with AsyncReadSessionLocal() as db` (sessions ouvertes hors dépendance)
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class QueryCounter:
+    """Enregistre les requêtes SQL émises sur une connexion pendant un bloc `with`"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.statements = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self) -> "QueryCounter":
+        self.statements = []
+        event.listen(self.connection, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        event.remove(self.connection, "before_cursor_execute", self._on_execute)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def report(self) -> str:
+        return "\n".join(f"  {index}. {statement}" for index, statement in enumerate(self.statements, 1))
+
+
+class QueryBudgetClient(TestClient):
+    """
+    TestClient qui compte les requêtes SQL de chaque appel HTTP.
+
+    `last_queries` contient le QueryCounter du dernier appel. Si un budget est
+    actif (marqueur `@pytest.mark.query_budget(n)` ou bloc `with
+    client.max_queries(n)`), un appel qui le dépasse fait échouer le test.
+    """
+
+    query_connection = None
+    query_budget: Optional[int] = None
+    last_queries: Optional[QueryCounter] = None
+
+    def request(self, method, url, *args, **kwargs):
+        with QueryCounter(self.query_connection) as counter:
+            response = super().request(method, url, *args, **kwargs)
+        self.last_queries = counter
+        if self.query_budget is not None and counter.count > self.query_budget:
+            pytest.fail(
+                f"{method} {url} : {counter.count} requêtes SQL pour un budget de "
+                f"{self.query_budget}\n{counter.report()}",
+                pytrace=False
+            )
+        return response
+
+    @contextmanager
+    def max_queries(self, budget: int):
+        """Budget de requêtes SQL par appel HTTP dans le bloc"""
+        previous, self.query_budget = self.query_budget, budget
+        try:
+            yield self
+        finally:
+            self.query_budget = previous
+
+
+@pytest.fixture(scope="function")
+def query_counter(test_db: Session) -> QueryCounter:
+    """
+    QueryCounter sur la connexion de test_db, pour les appels de service
+    directs (hors client HTTP) : `with query_counter as queries: ...`
+    """
+    return QueryCounter(test_db.get_bind())
+
+
+@pytest.fixture(scope="function")
+def async_test_db(test_db: Session) -> SyncSessionAsyncAdapter:
+    """test_db vue comme une AsyncSession, pour appeler directement les services async"""
+    return SyncSessionAsyncAdapter(test_db)
+
+
 @pytest.fixture(scope="function")
 def client(test_db: Session) -> Generator[TestClient, None, None]:
     """
@@ -61,6 +170,8 @@ def client(test_db: Session) -> Generator[TestClient, None, None]:
     2. Crée un TestClient
     3. Nettoie les overrides après le test
     
+    Le client compte les requêtes SQL de chaque appel (voir QueryBudgetClient).
+    
     Args:
         test_db: Session de base de données de test
         
@@ -73,9 +184,18 @@ def client(test_db: Session) -> Generator[TestClient, None, None]:
         finally:
             pass
 
+    async def override_get_async_db():
+        yield SyncSessionAsyncAdapter(test_db)
+
     # Override des dépendances (application = instance FastAPI depuis app.main)
     application.dependency_overrides[get_db] = override_get_db
     application.dependency_overrides[deps.get_db] = override_get_db
+    application.dependency_overrides[get_async_db] = override_get_async_db
+    # Pas de réplica en test : les lectures partagent la transaction de test_db
+    application.dependency_overrides[get_read_db] = override_get_db
+    application.dependency_overrides[get_async_read_db] = override_get_async_db
+    # Les identifiants sont réutilisés d'un test à l'autre : repartir d'un cache vide
+    get_principal_cache().clear()
 
     # Le lifespan utilise SessionLocal() : on le fait pointer vers la même connexion
     # que test_db (même transaction PostgreSQL, rollback en fin de test)
@@ -87,11 +207,16 @@ def client(test_db: Session) -> Generator[TestClient, None, None]:
     )
     original_SessionLocal = main_module.SessionLocal
     main_module.SessionLocal = session_factory_for_lifespan
+    # L'export de catalogue ouvre ses propres sessions de lecture (une par page)
+    original_catalog_sessions = catalog_service.AsyncReadSessionLocal
+    catalog_service.AsyncReadSessionLocal = lambda: SyncSessionAsyncAdapter(test_db)
     try:
-        with TestClient(application) as test_client:
+        with QueryBudgetClient(application) as test_client:
+            test_client.query_connection = test_db.get_bind()
             yield test_client
     finally:
         main_module.SessionLocal = original_SessionLocal
+        catalog_service.AsyncReadSessionLocal = original_catalog_sessions
         application.dependency_overrides.clear()
 
 
@@ -278,6 +403,47 @@ def producer_with_profile(client: TestClient, producer_headers: dict) -> dict:
     return response.json()
 
 
+@pytest.fixture(scope="function")
+def assert_queries_constant(client: QueryBudgetClient) -> Callable:
+    """
+    Vérifie qu'un endpoint ne fait pas de N+1.
+
+    `assert_queries_constant(seed, call, sizes=(2, 6))` : après un appel
+    d'échauffement, pour chaque taille, `seed(n)` ajoute n lignes
+    supplémentaires puis `call()` envoie la requête ; le nombre de requêtes
+    SQL doit être identique pour toutes les tailles.
+    """
+    def check(seed: Callable[[int], None], call: Callable[[], object], sizes: Sequence[int] = (2, 6)) -> int:
+        call()  # Échauffement : caches applicatifs (principal, référentiels)
+        counts = []
+        seeded = 0
+        for size in sizes:
+            seed(size - seeded)
+            seeded = size
+            response = call()
+            assert response.status_code == 200, response.text
+            counts.append(client.last_queries.count)
+        if len(set(counts)) > 1:
+            pytest.fail(
+                f"Le nombre de requêtes SQL croît avec les données ({dict(zip(sizes, counts))})\n"
+                f"{client.last_queries.report()}",
+                pytrace=False
+            )
+        return counts[0]
+
+    return check
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    """Active le budget du marqueur query_budget pendant le corps du test (pas les fixtures)"""
+    marker = item.get_closest_marker("query_budget")
+    test_client = item.funcargs.get("client")
+    if marker and isinstance(test_client, QueryBudgetClient):
+        test_client.query_budget = marker.args[0]
+    yield
+
+
 # Marqueurs pytest personnalisés
 def pytest_configure(config):
     """Configuration des marqueurs pytest personnalisés."""
@@ -290,3 +456,6 @@ def pytest_configure(config):
     config.addinivalue_line(
         "markers", "unit: tests unitaires"
     )
+    config.addinivalue_line(
+        "markers", "query_budget(max_queries): nombre maximal de requêtes SQL par appel HTTP"
+    )
@@ -11,3 +11,194 @@ class TestAdminModule:
         """Vérification que l'API répond"""
         response = client.get("/")
         assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.fixture
+def commission_rules(test_db):
+    """Producteur, catégorie et règles de commission : (user_id, category_id)"""
+    from datetime import date, timedelta
+    from decimal import Decimal
+
+    from app.models.admin import Commission
+    from app.models.auth import User
+    from app.models.products import Category
+
+    user = User(email="commissions@example.com", password_hash="x")
+    category = Category(name="Légumes commission", slug="legumes-commission")
+    test_db.add_all([user, category])
+    test_db.flush()
+    today = date.today()
+    test_db.add_all([
+        Commission(percentage=Decimal("15"), valid_from=today - timedelta(days=30)),
+        Commission(category_id=category.id, percentage=Decimal("8"), valid_from=today - timedelta(days=30)),
+        Commission(producer_id=user.id, percentage=Decimal("5"), fixed_amount=Decimal("1"),
+                   valid_from=today - timedelta(days=30), valid_until=today + timedelta(days=9)),
+        Commission(producer_id=user.id, percentage=Decimal("6"), valid_from=today + timedelta(days=10)),
+    ])
+    test_db.commit()
+    return user.id, category.id
+
+
+class TestRuleIndex:
+    """Commissions et TVA résolues depuis l'index en mémoire"""
+
+    def test_priority_and_validity_intervals(self, test_db, commission_rules):
+        from datetime import date, timedelta
+        from decimal import Decimal
+
+        from app.services.admin_service import CommissionService
+
+        producer_id, category_id = commission_rules
+
+        amount, rule = CommissionService.calculate_commission(test_db, producer_id, category_id, Decimal("100"))
+        assert (amount, rule.percentage) == (Decimal("6.00"), Decimal("5"))
+        assert CommissionService.calculate_commission(test_db, producer_id + 1, category_id,
+                                                      Decimal("100"))[0] == Decimal("8.00")
+        assert CommissionService.calculate_commission(test_db, producer_id + 1, None,
+                                                      Decimal("100"))[0] == Decimal("15.00")
+
+        later = CommissionService.resolve_commissions(
+            test_db, [(producer_id, category_id)], on_date=date.today() + timedelta(days=10)
+        )
+        assert later[(producer_id, category_id)].percentage == Decimal("6")
+
+    def test_bulk_resolution_without_queries(self, test_db, query_counter, commission_rules):
+        from app.services.admin_service import CommissionService
+
+        producer_id, category_id = commission_rules
+        CommissionService.resolve_commissions(test_db, [(producer_id, None)])
+
+        with query_counter as queries:
+            pairs = [(producer_id + offset % 50, category_id if offset // 50 % 2 else None) for offset in range(5000)]
+            resolved = CommissionService.resolve_commissions(test_db, pairs)
+
+        assert queries.statements == []
+        assert len(resolved) == 100
+        assert all(rule is not None for rule in resolved.values())
+
+    def test_service_writes_invalidate_index(self, test_db, commission_rules):
+        from datetime import date
+        from decimal import Decimal
+
+        from app.models.products import Category
+        from app.schemas.admin import CommissionUpdate, TaxRateCreate, TaxRateUpdate
+        from app.services.admin_service import CommissionService, TaxRateService
+
+        producer_id, category_id = commission_rules
+        rule = CommissionService.resolve_commissions(test_db, [(producer_id, None)])[(producer_id, None)]
+
+        CommissionService.update_commission(test_db, rule.id, CommissionUpdate(percentage=Decimal("4")),
+                                            updated_by=producer_id)
+        assert CommissionService.calculate_commission(test_db, producer_id, None,
+                                                      Decimal("100"))[0] == Decimal("5.00")
+
+        assert TaxRateService.calculate_tax(test_db, "ZZ", category_id, Decimal("100")) == (Decimal("0"), None)
+        default = TaxRateService.create_tax_rate(
+            test_db, TaxRateCreate(country="zz", rate=Decimal("20"), valid_from=date(2020, 1, 1))
+        )
+        TaxRateService.create_tax_rate(
+            test_db, TaxRateCreate(country="ZZ", category_id=category_id, rate=Decimal("5.5"),
+                                   valid_from=date(2020, 1, 1))
+        )
+        other = test_db.query(Category).filter(Category.id != category_id).first()
+        assert TaxRateService.calculate_tax(test_db, "zz", category_id, Decimal("100"))[0] == Decimal("5.50")
+        assert TaxRateService.calculate_tax(test_db, "ZZ", other.id, Decimal("100"))[0] == Decimal("20.00")
+
+        TaxRateService.update_tax_rate(test_db, default.id, TaxRateUpdate(is_active=False))
+        assert TaxRateService.calculate_tax(test_db, "ZZ", None, Decimal("100")) == (Decimal("0"), None)
+
+    def test_resolve_endpoint(self, client, commission_rules):
+        from app.main import app
+        from app.routers.admin import require_admin
+
+        producer_id, category_id = commission_rules
+        app.dependency_overrides[require_admin] = lambda: None
+        try:
+            response = client.post(f"{ADMIN_PREFIX}/commissions/resolve", json={"pairs": [
+                {"producer_id": producer_id, "category_id": category_id},
+                {"producer_id": producer_id + 1, "category_id": category_id},
+                {"producer_id": None, "category_id": None},
+            ]})
+        finally:
+            app.dependency_overrides.pop(require_admin, None)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [float(item["percentage"]) for item in response.json()] == [5.0, 8.0, 15.0]
+
+
+class TestSettingsCache:
+    """Paramètres système servis depuis le cache du processus"""
+
+    @staticmethod
+    def create_setting(test_db, key, value, setting_type="string", is_public=False):
+        from app.schemas.admin import SystemSettingCreate
+        from app.services.admin_service import SystemSettingService
+
+        return SystemSettingService.create_setting(
+            test_db,
+            SystemSettingCreate(key=key, value=value, type=setting_type, is_public=is_public),
+            created_by=None
+        )
+
+    def test_typed_values_without_queries(self, test_db, query_counter):
+        from app.schemas.admin import SystemSettingUpdate
+        from app.services.admin_service import SystemSettingService
+
+        self.create_setting(test_db, "cache_featured", '["bio", "local"]', "json")
+        self.create_setting(test_db, "cache_enabled", "true", "boolean")
+        assert SystemSettingService.get_setting_value(test_db, "cache_featured") == ["bio", "local"]
+
+        with query_counter as queries:
+            featured = SystemSettingService.get_setting_value(test_db, "cache_featured")
+            featured.append("modifié")
+            assert SystemSettingService.get_setting_value(test_db, "cache_featured") == ["bio", "local"]
+            assert SystemSettingService.get_setting_value(test_db, "cache_enabled") is True
+            assert SystemSettingService.get_setting_value(test_db, "cache_absent", 3) == 3
+        assert queries.statements == []
+
+        SystemSettingService.update_setting(test_db, "cache_enabled", SystemSettingUpdate(value="false"),
+                                            updated_by=None)
+        assert SystemSettingService.get_setting_value(test_db, "cache_enabled") is False
+
+    def test_other_workers_follow_version_counter(self, test_db):
+        from app.core.settings_cache import SettingsCache
+        from app.schemas.admin import SystemSettingUpdate
+        from app.services.admin_service import SystemSettingService
+
+        self.create_setting(test_db, "cache_limit", "10", "integer")
+        polling, idle = SettingsCache(poll_interval=0), SettingsCache(poll_interval=3600)
+        assert polling.get_value(test_db, "cache_limit") == idle.get_value(test_db, "cache_limit") == 10
+
+        SystemSettingService.update_setting(test_db, "cache_limit", SystemSettingUpdate(value="25"),
+                                            updated_by=None)
+
+        assert polling.get_value(test_db, "cache_limit") == 25
+        # Pas encore revérifié : l'autre worker garde sa copie jusqu'à l'échéance
+        assert idle.get_value(test_db, "cache_limit") == 10
+        idle.invalidate()
+        assert idle.get_value(test_db, "cache_limit") == 25
+
+    def test_public_settings_etag(self, client, test_db):
+        from app.schemas.admin import SystemSettingUpdate
+        from app.services.admin_service import SystemSettingService
+
+        self.create_setting(test_db, "cache_site_name", "Marché", is_public=True)
+        self.create_setting(test_db, "cache_secret", "s3cret")
+
+        response = client.get(f"{ADMIN_PREFIX}/settings/public")
+        assert response.status_code == status.HTTP_200_OK
+        assert "cache_secret" not in {item["key"] for item in response.json()}
+        etag = response.headers["etag"]
+
+        cached = client.get(f"{ADMIN_PREFIX}/settings/public", headers={"If-None-Match": etag})
+        assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+        assert cached.content == b""
+
+        SystemSettingService.update_setting(test_db, "cache_site_name", SystemSettingUpdate(value="Marché bio"),
+                                            updated_by=None)
+        changed = client.get(f"{ADMIN_PREFIX}/settings/public", headers={"If-None-Match": etag})
+        assert changed.status_code == status.HTTP_200_OK
+        assert changed.headers["etag"] != etag
+        assert {"key": "cache_site_name", "value": "Marché bio"}.items() <= next(
+            item for item in changed.json() if item["key"] == "cache_site_name"
+        ).items()
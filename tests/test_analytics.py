@@ -13,5 +13,460 @@ class TestAnalyticsModule:
             f"{ANALYTICS_PREFIX}/views/track",
             json={"product_id": 1, "session_id": "test-session-123"}
         )
-        # Peut être 201 créé ou 404 si produit n'existe pas
-        assert response.status_code in [201, 404]
+        # Mise en file : 202 sans attendre la base
+        assert response.status_code == 202
+
+
+@pytest.fixture
+def view_buffer():
+    """Tampon de vues isolé (sans thread d'écriture) installé pour la durée du test"""
+    from app.core.view_buffer import ProductViewBuffer, set_product_view_buffer
+
+    buffer = ProductViewBuffer(max_size=5, batch_size=3, flush_interval=60)
+    set_product_view_buffer(buffer)
+    yield buffer
+    set_product_view_buffer(None)
+
+
+@pytest.fixture
+def viewed_product(test_db):
+    from decimal import Decimal
+
+    from app.models.auth import User
+    from app.models.products import Product
+    from app.models.profiles import ProducerProfile
+
+    user = User(email="vues-producteur@example.com", password_hash="x")
+    test_db.add(user)
+    test_db.flush()
+    producer = ProducerProfile(user_id=user.id, business_name="Ferme des vues")
+    test_db.add(producer)
+    test_db.flush()
+    product = Product(producer_id=producer.id, name="Mangues", slug="mangues-vues", price=Decimal("500"))
+    test_db.add(product)
+    test_db.flush()
+    return product
+
+
+class TestProductViewBuffer:
+    """Ingestion différée des vues produit"""
+
+    def test_track_returns_202_without_touching_database(self, client, view_buffer, viewed_product):
+        response = client.post(
+            f"{ANALYTICS_PREFIX}/views/track",
+            json={"product_id": viewed_product.id, "session_id": "s-1"}
+        )
+
+        assert response.status_code == 202
+        assert response.json() == {"product_id": viewed_product.id, "status": "accepted"}
+        assert client.last_queries.count == 0
+        assert len(view_buffer) == 1
+
+    def test_flush_writes_batch_and_skips_unknown_products(self, test_db, view_buffer, viewed_product):
+        from app.models.analytics import ProductView
+
+        view_buffer.submit(viewed_product.id, session_id="s-1")
+        view_buffer.submit(viewed_product.id, user_id=999999, session_id="s-2")
+        view_buffer.submit(999999, session_id="s-3")
+
+        written = view_buffer.flush(test_db)
+
+        views = test_db.query(ProductView).filter(ProductView.product_id == viewed_product.id).all()
+        assert written == 2
+        assert {view.session_id for view in views} == {"s-1", "s-2"}
+        assert all(view.user_id is None for view in views)
+        assert len(view_buffer) == 0
+
+    def test_full_buffer_applies_back_pressure(self, client, view_buffer, viewed_product):
+        from app.core.metrics import product_view_events_total
+
+        dropped_before = product_view_events_total.value("dropped")
+        for index in range(view_buffer.max_size):
+            assert view_buffer.submit(viewed_product.id, session_id=f"s-{index}")
+
+        response = client.post(
+            f"{ANALYTICS_PREFIX}/views/track",
+            json={"product_id": viewed_product.id, "session_id": "en-trop"}
+        )
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+        assert product_view_events_total.value("dropped") == dropped_before + 1
+
+    def test_drain_writes_everything_in_batches(self, test_db, view_buffer, viewed_product):
+        for index in range(view_buffer.max_size):
+            view_buffer.submit(viewed_product.id, session_id=f"s-{index}")
+
+        assert view_buffer.drain(test_db) == view_buffer.max_size
+        assert len(view_buffer) == 0
+
+    def test_background_thread_flushes_on_batch_size_and_stop(self, test_db, viewed_product):
+        import threading
+
+        from app.core.view_buffer import ProductViewBuffer
+        from app.models.analytics import ProductView
+
+        flushed = threading.Event()
+
+        class SharedSession:
+            """Session de test partagée : le thread d'écriture ne doit pas la fermer"""
+            def __getattr__(self, name):
+                return getattr(test_db, name)
+
+            def commit(self):
+                test_db.commit()
+                flushed.set()
+
+            def close(self):
+                pass
+
+        buffer = ProductViewBuffer(session_factory=SharedSession, max_size=10, batch_size=2, flush_interval=60)
+        buffer.start()
+        buffer.submit(viewed_product.id, session_id="a")
+        buffer.submit(viewed_product.id, session_id="b")
+        assert flushed.wait(5), "le seuil de lot n'a pas déclenché d'écriture"
+        buffer.submit(viewed_product.id, session_id="c")
+        buffer.stop()
+
+        count = test_db.query(ProductView).filter(ProductView.product_id == viewed_product.id).count()
+        assert count == 3
+
+
+class TestProductViewRollup:
+    """Cumul journalier des vues et compaction incrémentale"""
+
+    @staticmethod
+    def add_views(test_db, product, days_ago, count, session_prefix="s"):
+        from datetime import datetime, timedelta
+
+        from app.models.analytics import ProductView
+
+        viewed_at = datetime.combine(datetime.now().date() - timedelta(days=days_ago), datetime.min.time())
+        test_db.add_all([
+            ProductView(product_id=product.id, session_id=f"{session_prefix}-{index}",
+                        viewed_at=viewed_at + timedelta(hours=1, minutes=index))
+            for index in range(count)
+        ])
+        test_db.flush()
+
+    @staticmethod
+    def snapshot(repository, product):
+        from datetime import date, timedelta
+
+        start, end = date.today() - timedelta(days=10), date.today()
+        return (
+            repository.get_product_views_count(product.id, start, end),
+            repository.get_views_by_date(product.id, start, end),
+            dict(repository.get_top_viewed_products(50, start, end)).get(product.id),
+        )
+
+    def test_compaction_preserves_counts(self, test_db, viewed_product):
+        from app.repositories.analytics_repository import ProductViewRepository
+
+        repository = ProductViewRepository(test_db)
+        self.add_views(test_db, viewed_product, 3, 4)
+        self.add_views(test_db, viewed_product, 1, 2)
+        self.add_views(test_db, viewed_product, 0, 5)
+        before = self.snapshot(repository, viewed_product)
+
+        folded = repository.compact_daily_views()
+
+        assert folded >= 11
+        assert before[0] == 11 and before[2] == 11
+        assert [count for _, count in before[1]] == [4, 2, 5]
+        assert self.snapshot(repository, viewed_product) == before
+        assert repository.compact_daily_views() == 0
+
+    def test_views_after_watermark_are_counted_once(self, test_db, viewed_product):
+        from app.models.analytics import ProductViewDaily
+        from app.repositories.analytics_repository import ProductViewRepository
+
+        repository = ProductViewRepository(test_db)
+        self.add_views(test_db, viewed_product, 2, 3)
+        repository.compact_daily_views()
+        # Vues tardives d'un jour clos et vues du jour, pas encore compactées
+        self.add_views(test_db, viewed_product, 2, 2, session_prefix="late")
+        self.add_views(test_db, viewed_product, 0, 1)
+
+        assert self.snapshot(repository, viewed_product)[0] == 6
+
+        repository.compact_daily_views(chunk_size=1)
+
+        rollups = test_db.query(ProductViewDaily).filter(ProductViewDaily.product_id == viewed_product.id).all()
+        assert sorted(row.view_count for row in rollups) == [1, 5]
+        assert self.snapshot(repository, viewed_product)[0] == 6
+
+
+    def test_compaction_between_watermark_and_count_is_not_double_counted(self, test_db, viewed_product, monkeypatch):
+        from app.repositories.analytics_repository import ProductViewRepository
+
+        repository = ProductViewRepository(test_db)
+        self.add_views(test_db, viewed_product, 2, 3)
+        build_filters = ProductViewRepository._recent_view_filters
+
+        def filters_then_compact(self, *args, **kwargs):
+            filters = build_filters(self, *args, **kwargs)
+            # Tranche de compaction validée entre la lecture du repère et le comptage
+            ProductViewRepository(test_db).compact_daily_views()
+            return filters
+
+        monkeypatch.setattr(ProductViewRepository, "_recent_view_filters", filters_then_compact)
+
+        assert self.snapshot(repository, viewed_product)[0] == 3
+        assert repository.get_unique_viewers(viewed_product.id) == 3
+
+class TestHyperLogLog:
+    """Sketches HyperLogLog des visiteurs uniques"""
+
+    def test_estimate_within_error_bound(self):
+        from app.core.hyperloglog import HyperLogLog
+
+        sketch = HyperLogLog().update(f"visiteur-{index}" for index in range(50_000))
+
+        assert abs(sketch.cardinality() - 50_000) / 50_000 < 4 * sketch.standard_error
+
+    def test_merge_is_union_and_serialization_roundtrips(self):
+        from app.core.hyperloglog import HyperLogLog
+
+        monday = HyperLogLog().update(f"v-{index}" for index in range(0, 600))
+        tuesday = HyperLogLog().update(f"v-{index}" for index in range(400, 1000))
+
+        merged = HyperLogLog.from_bytes(monday.to_bytes()).merge(HyperLogLog.from_bytes(tuesday.to_bytes()))
+
+        assert abs(len(merged) - 1000) <= 20
+        assert HyperLogLog.from_bytes(merged.to_bytes()).registers == merged.registers
+
+    def test_unique_viewers_from_sketches_and_exact(self, client, test_db, viewed_product):
+        from app.repositories.analytics_repository import ProductViewRepository
+
+        # Mêmes 3 visiteurs sur deux jours clos, 1 nouveau aujourd'hui
+        TestProductViewRollup.add_views(test_db, viewed_product, 2, 3)
+        TestProductViewRollup.add_views(test_db, viewed_product, 1, 3)
+        repository = ProductViewRepository(test_db)
+        repository.compact_daily_views()
+        TestProductViewRollup.add_views(test_db, viewed_product, 0, 4)
+
+        assert repository.get_unique_viewers(viewed_product.id) == 4
+        assert repository.get_unique_viewers(viewed_product.id, exact=True) == 4
+
+        response = client.get(f"{ANALYTICS_PREFIX}/views/products/{viewed_product.id}", params={"exact": "true"})
+        assert response.status_code == 200
+        assert response.json()["unique_viewers"] == 4
+        assert response.json()["unique_viewers_exact"] is True
+
+
+class TestDashboardMetricRefresh:
+    """Calcul ensembliste des métriques de tableaux de bord"""
+
+    @staticmethod
+    def add_completed_order(test_db, product, quantity, unit_price, created_at=None):
+        from decimal import Decimal
+
+        from app.models.orders import DeliveryType, Order, OrderItem, OrderStatus
+
+        subtotal = Decimal(unit_price) * quantity
+        order = Order(
+            producer_id=product.producer_id, order_number=f"CMD-TEST-{product.id}-{quantity}",
+            status=OrderStatus.COMPLETED, subtotal=subtotal, total_amount=subtotal,
+            delivery_type=DeliveryType.PICKUP, created_at=created_at
+        )
+        test_db.add(order)
+        test_db.flush()
+        test_db.add(OrderItem(order_id=order.id, product_id=product.id, quantity=quantity,
+                              unit_price=Decimal(unit_price), subtotal=subtotal))
+        test_db.flush()
+
+    @staticmethod
+    def stored_metrics(test_db, entity_type, entity_id):
+        from app.models.analytics import DashboardMetric
+
+        rows = test_db.query(DashboardMetric).filter(
+            DashboardMetric.entity_type == entity_type, DashboardMetric.entity_id == entity_id
+        ).all()
+        return {row.metric_name.value: float(row.value) for row in rows}
+
+    def test_refresh_writes_all_entities_in_one_upsert_each(self, test_db, viewed_product):
+        from datetime import date
+
+        from app.models.analytics import EntityType
+        from app.models.products import Category
+        from app.services.analytics_service import DashboardMetricService
+
+        category = Category(name="Fruits tropicaux", slug="fruits-tropicaux-metriques")
+        test_db.add(category)
+        test_db.flush()
+        viewed_product.category_id = category.id
+        TestProductViewRollup.add_views(test_db, viewed_product, 0, 8)
+        self.add_completed_order(test_db, viewed_product, 2, "500")
+
+        service = DashboardMetricService(test_db)
+        written = service.refresh_metrics(date.today())
+
+        assert written[EntityType.PRODUCT.value] >= 4
+        expected = {"views": 8.0, "sales": 2.0, "revenue": 1000.0, "conversion_rate": 25.0}
+        assert self.stored_metrics(test_db, EntityType.PRODUCT, viewed_product.id) == expected
+        assert self.stored_metrics(test_db, EntityType.PRODUCER, viewed_product.producer_id) == expected
+        assert self.stored_metrics(test_db, EntityType.CATEGORY, category.id) == expected
+
+        # Second passage : mise à jour en place, sans doublon
+        self.add_completed_order(test_db, viewed_product, 6, "500")
+        service.refresh_metrics(date.today(), entity_types=[EntityType.PRODUCT])
+
+        metrics = self.stored_metrics(test_db, EntityType.PRODUCT, viewed_product.id)
+        assert metrics == {"views": 8.0, "sales": 8.0, "revenue": 4000.0, "conversion_rate": 100.0}
+
+    def test_calculate_product_metrics_endpoint(self, client, test_db, viewed_product):
+        from datetime import date
+
+        from app.core import deps
+        from app.main import app
+
+        TestProductViewRollup.add_views(test_db, viewed_product, 0, 4)
+        self.add_completed_order(test_db, viewed_product, 1, "500")
+        app.dependency_overrides[deps.require_admin] = lambda: None
+        try:
+            response = client.post(
+                f"{ANALYTICS_PREFIX}/metrics/calculate/product/{viewed_product.id}",
+                params={"metric_date": date.today().isoformat(), "period": "month"}
+            )
+        finally:
+            app.dependency_overrides.pop(deps.require_admin, None)
+
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["views"], body["sales"], body["revenue"]) == (4, 1, 500.0)
+
+    def test_calculate_product_metrics_evaluates_totals_once(self, test_db, viewed_product, query_counter):
+        from datetime import date
+
+        from app.models.analytics import EntityType, MetricPeriod
+        from app.services.analytics_service import DashboardMetricService
+
+        TestProductViewRollup.add_views(test_db, viewed_product, 0, 4)
+        self.add_completed_order(test_db, viewed_product, 1, "500")
+
+        service = DashboardMetricService(test_db)
+        with query_counter as queries:
+            result = service.calculate_product_metrics(viewed_product.id, date.today(), MetricPeriod.MONTH)
+
+        assert (result["views"], result["sales"], result["revenue"]) == (4, 1, 500.0)
+        assert sum("entity_totals" in statement for statement in queries.statements) == 1
+        assert self.stored_metrics(test_db, EntityType.PRODUCT, viewed_product.id)["sales"] == 1.0
+
+
+class TestInventoryReportGeneration:
+    """Génération ensembliste des rapports d'inventaire"""
+
+    @staticmethod
+    def add_movement(test_db, product, movement_type, quantity, created_at):
+        from app.models.products import StockMovement
+
+        test_db.add(StockMovement(product_id=product.id, type=movement_type, quantity=quantity,
+                                  created_at=created_at))
+        test_db.flush()
+
+    @staticmethod
+    def add_report(test_db, product, report_date, stock_end):
+        from app.models.analytics import InventoryReport
+
+        test_db.add(InventoryReport(
+            producer_id=product.producer_id, product_id=product.id, report_date=report_date,
+            stock_start=stock_end, stock_end=stock_end
+        ))
+        test_db.flush()
+
+    def test_daily_reports_use_half_open_day_and_previous_stock(self, test_db, viewed_product):
+        from datetime import date, datetime, timedelta
+        from decimal import Decimal
+
+        from app.models.products import StockMovementType
+        from app.services.analytics_service import InventoryReportService
+
+        day = date(2026, 3, 10)
+        midnight = datetime.combine(day, datetime.min.time())
+        self.add_report(test_db, viewed_product, day - timedelta(days=1), 10)
+        self.add_movement(test_db, viewed_product, StockMovementType.IN, 5, midnight)
+        self.add_movement(test_db, viewed_product, StockMovementType.ADJUSTMENT, -1, midnight + timedelta(hours=9))
+        TestDashboardMetricRefresh.add_completed_order(
+            test_db, viewed_product, 3, "500", created_at=midnight + timedelta(hours=23, minutes=59)
+        )
+        # Commande du lendemain à minuit : hors de la journée
+        TestDashboardMetricRefresh.add_completed_order(
+            test_db, viewed_product, 7, "500", created_at=midnight + timedelta(days=1)
+        )
+
+        service = InventoryReportService(test_db)
+        reports = service.generate_daily_reports(viewed_product.producer_id, day)
+
+        assert len(reports) == 1
+        report = reports[0]
+        assert (report.stock_start, report.stock_received, report.stock_sold,
+                report.stock_adjusted, report.stock_end) == (10, 5, 3, -1, 11)
+        assert report.stock_value == Decimal("5500.00")
+        assert service.generate_daily_reports(viewed_product.producer_id, day) == []
+
+    def test_backfill_chains_stock_from_existing_reports(self, test_db, viewed_product):
+        from datetime import date, datetime, timedelta
+        from decimal import Decimal
+
+        from app.models.products import Product, StockMovementType
+        from app.repositories.analytics_repository import InventoryReportRepository
+        from app.services.analytics_service import InventoryReportService
+
+        inactive = Product(producer_id=viewed_product.producer_id, name="Retiré", slug="retire-inventaire",
+                           price=Decimal("100"), is_active=False)
+        test_db.add(inactive)
+        test_db.flush()
+        first = date(2026, 3, 1)
+
+        def at(offset):
+            return datetime.combine(first + timedelta(days=offset), datetime.min.time()) + timedelta(hours=8)
+
+        for offset in range(4):
+            self.add_movement(test_db, viewed_product, StockMovementType.IN, 10, at(offset))
+        TestDashboardMetricRefresh.add_completed_order(test_db, viewed_product, 4, "500", created_at=at(1))
+        # Inventaire déjà établi le 3e jour : point de départ des jours suivants
+        self.add_report(test_db, viewed_product, first + timedelta(days=2), 100)
+
+        created = InventoryReportService(test_db).generate_reports(first, first + timedelta(days=3))
+
+        assert created == 3
+        history = InventoryReportRepository(test_db).get_product_reports(viewed_product.id)
+        assert [(report.stock_start, report.stock_end) for report in history] == [
+            (0, 10), (10, 16), (100, 100), (100, 110)
+        ]
+        assert InventoryReportRepository(test_db).get_product_reports(inactive.id) == []
+
+
+class TestSalesReportStats:
+    """Statistiques de vente agrégées en SQL"""
+
+    def test_stats_for_all_producers_match_single_producer(self, test_db, viewed_product):
+        from datetime import date, datetime
+        from decimal import Decimal
+
+        from app.services.analytics_service import SalesReportService
+
+        TestDashboardMetricRefresh.add_completed_order(
+            test_db, viewed_product, 2, "500", created_at=datetime(2026, 2, 3, 10, 0)
+        )
+        TestDashboardMetricRefresh.add_completed_order(
+            test_db, viewed_product, 4, "250", created_at=datetime(2026, 2, 28, 23, 0)
+        )
+        # Minuit le lendemain de la période : exclue
+        TestDashboardMetricRefresh.add_completed_order(
+            test_db, viewed_product, 9, "100", created_at=datetime(2026, 3, 1, 0, 0)
+        )
+
+        service = SalesReportService(test_db)
+        stats = service.calculate_all_sales_stats(date(2026, 2, 1), date(2026, 2, 28))[viewed_product.producer_id]
+
+        assert (stats["total_orders"], stats["total_revenue"], stats["total_products_sold"]) == (
+            2, Decimal("2000"), 6
+        )
+        assert stats["total_commission"] == Decimal("300")
+        assert stats["average_order_value"] == Decimal("1000")
+        assert service._calculate_sales_stats(viewed_product.producer_id, date(2026, 2, 1), date(2026, 2, 28)) == stats
+        assert service._calculate_sales_stats(viewed_product.producer_id, date(2026, 4, 1), date(2026, 4, 30))[
+            "total_orders"
+        ] == 0
@@ -449,3 +449,172 @@ class TestAuthenticationFlow:
             json={"refresh_token": tokens["refresh_token"]}
         )
         assert logout_response.status_code == status.HTTP_200_OK
+
+
+class FakeRedis:
+    """Client Redis minimal (sous-ensemble utilisé par RedisPrincipalCache)"""
+
+    def __init__(self):
+        self.values = {}
+        self.sets = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def pipeline(self):
+        return self
+
+    def setex(self, key, seconds, value):
+        self.values[key] = value.encode()
+
+    def sadd(self, key, member):
+        self.sets.setdefault(key, set()).add(member)
+
+    def expire(self, key, seconds):
+        pass
+
+    def execute(self):
+        pass
+
+    def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    def delete(self, *keys):
+        for key in keys:
+            self.values.pop(key, None)
+            self.sets.pop(key, None)
+
+    def scan_iter(self, pattern):
+        prefix = pattern.rstrip("*")
+        return [key for key in list(self.values) + list(self.sets) if key.startswith(prefix)]
+
+
+class TestPrincipalCache:
+    """Tests du cache des principaux utilisé par get_current_user"""
+
+    @pytest.fixture
+    def token_and_user(self, client, auth_headers, test_db, test_user_credentials):
+        from app.models.auth import User
+
+        token = auth_headers["Authorization"].split(" ", 1)[1]
+        user = test_db.query(User).filter(User.email == test_user_credentials["email"]).first()
+        return token, user
+
+    def test_cached_principal_skips_database(self, test_db, query_counter, token_and_user):
+        """Une fois résolu, le principal est servi sans requête SQL"""
+        from app.core.deps import resolve_principal
+
+        token, user = token_and_user
+        first = resolve_principal(token, test_db)
+        with query_counter as queries:
+            second = resolve_principal(token, test_db)
+
+        assert queries.statements == []
+        assert second == first
+        assert second.id == user.id
+        assert second.has_role("customer")
+
+    def test_role_change_invalidates_principal(self, test_db, token_and_user):
+        """Un rôle attribué est visible dès la requête suivante"""
+        from app.core.deps import resolve_principal
+        from app.repositories.auth_repository import RoleRepository
+
+        token, user = token_and_user
+        assert not resolve_principal(token, test_db).has_role("producer")
+
+        role_repo = RoleRepository(test_db)
+        role_repo.assign_role_to_user(user, role_repo.get_by_name("Producer"))
+
+        assert resolve_principal(token, test_db).has_role("producer")
+
+    def test_deactivation_invalidates_principal(self, client, test_db, token_and_user):
+        """Un compte désactivé est refusé malgré le cache"""
+        from app.repositories.auth_repository import UserRepository
+
+        token, user = token_and_user
+        headers = {"Authorization": f"Bearer {token}"}
+        assert client.get(f"{AUTH_PREFIX}/me", headers=headers).status_code == status.HTTP_200_OK
+
+        UserRepository(test_db).deactivate(user)
+
+        response = client.get(f"{AUTH_PREFIX}/me", headers=headers)
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_ban_invalidates_principal(self, test_db, token_and_user):
+        """Un bannissement actif invalide le principal et bloque l'accès"""
+        from fastapi import HTTPException
+        from app.core.deps import resolve_principal
+        from app.models.admin import BannedUser
+
+        token, user = token_and_user
+        resolve_principal(token, test_db)
+
+        test_db.add(BannedUser(user_id=user.id, reason="Fraude"))
+        test_db.commit()
+
+        with pytest.raises(HTTPException) as exc:
+            resolve_principal(token, test_db)
+        assert exc.value.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_expired_temporary_ban_does_not_block(self, test_db, token_and_user):
+        """Un bannissement temporaire échu ne bloque plus, même encore marqué actif"""
+        from app.core.deps import resolve_principal
+        from app.models.admin import BannedUser
+
+        token, user = token_and_user
+        test_db.add(BannedUser(user_id=user.id, reason="Spam", banned_until=datetime.now() - timedelta(days=1)))
+        test_db.commit()
+
+        assert resolve_principal(token, test_db).is_banned is False
+
+    def test_producer_id_comes_from_principal(self):
+        """Les dépendances producteur lisent le profil du principal, sans requête"""
+        from app.core.principal_cache import Principal
+        from app.routers import analytics, subscriptions
+
+        producer = Principal(id=1, is_active=True, role_names=("Producer",), producer_profile_id=7)
+
+        assert analytics.get_current_producer_id(producer) == 7
+        assert subscriptions.get_current_producer_id(Principal(id=2, is_active=True)) is None
+
+    def test_entries_expire(self, monkeypatch):
+        """Les entrées expirent après leur TTL"""
+        from app.core import principal_cache
+        from app.core.principal_cache import InMemoryPrincipalCache, Principal
+
+        now = [1000.0]
+        monkeypatch.setattr(principal_cache.time, "monotonic", lambda: now[0])
+        cache = InMemoryPrincipalCache()
+        cache.set(Principal(id=1, is_active=True), "empreinte", ttl=60)
+
+        assert cache.get(1, "empreinte") is not None
+        now[0] += 61
+        assert cache.get(1, "empreinte") is None
+
+    def test_lru_eviction(self):
+        """Le cache en mémoire reste borné"""
+        from app.core.principal_cache import InMemoryPrincipalCache, Principal
+
+        cache = InMemoryPrincipalCache(maxsize=2)
+        for user_id in (1, 2):
+            cache.set(Principal(id=user_id, is_active=True), "t", ttl=60)
+        cache.get(1, "t")
+        cache.set(Principal(id=3, is_active=True), "t", ttl=60)
+
+        assert cache.get(1, "t") is not None
+        assert cache.get(2, "t") is None
+        assert cache.get(3, "t") is not None
+
+    def test_redis_backend_round_trip_and_invalidation(self):
+        """Le backend partagé sérialise les principaux et invalide par utilisateur"""
+        from app.core.principal_cache import Principal, RedisPrincipalCache
+
+        cache = RedisPrincipalCache(client=FakeRedis())
+        principal = Principal(id=7, is_active=True, role_names=("Producer",), producer_profile_id=3)
+        cache.set(principal, "a", ttl=60)
+        cache.set(principal, "b", ttl=60)
+
+        assert cache.get(7, "a") == principal
+        cache.invalidate_user(7)
+        assert cache.get(7, "a") is None
+        assert cache.get(7, "b") is None
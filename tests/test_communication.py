@@ -1,6 +1,9 @@
 import pytest
 from fastapi import status
 
+from app.models.auth import User
+from app.models.communication import Notification, NotificationType
+
 COMMUNICATION_PREFIX = "/communication"
 
 
@@ -11,3 +14,29 @@ class TestCommunicationModule:
         """Vérification que l'API répond"""
         response = client.get("/")
         assert response.status_code == status.HTTP_200_OK
+
+
+class TestNotificationPagination:
+    """Tests de la pagination par curseur des notifications"""
+
+    def test_notifications_follow_next_cursor(self, client, test_db, auth_headers, test_user_credentials):
+        """next_cursor permet de parcourir toutes les notifications sans doublon"""
+        user = test_db.query(User).filter(User.email == test_user_credentials["email"]).one()
+        for i in range(3):
+            test_db.add(Notification(user_id=user.id, type=NotificationType.ORDER, title=f"Commande {i}", message="..."))
+        test_db.flush()
+
+        first = client.get(f"{COMMUNICATION_PREFIX}/notifications", params={"limit": 2, "cursor": ""}, headers=auth_headers)
+        assert first.status_code == status.HTTP_200_OK
+        first_data = first.json()
+        assert len(first_data["notifications"]) == 2
+        assert first_data["next_cursor"]
+
+        second = client.get(
+            f"{COMMUNICATION_PREFIX}/notifications",
+            params={"limit": 2, "cursor": first_data["next_cursor"]},
+            headers=auth_headers
+        ).json()
+        seen = [n["id"] for n in first_data["notifications"] + second["notifications"]]
+        assert len(set(seen)) == len(seen) == second["total"]
+        assert second["next_cursor"] is None
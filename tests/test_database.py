@@ -0,0 +1,119 @@
+import pytest
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.core.database import ReplicaPool, RoutingSession, get_async_database_url, parse_replica_urls
+from app.models.products import Category
+
+
+@pytest.fixture(scope="function")
+def sqlite_replica(tmp_path):
+    """Réplica de substitution : fichier SQLite contenant une table categories"""
+    replica_engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    Category.__table__.create(replica_engine)
+    with replica_engine.begin() as connection:
+        connection.execute(insert(Category.__table__).values(id=1, name="Depuis le réplica", slug="replica"))
+    yield replica_engine
+    replica_engine.dispose()
+
+
+@pytest.fixture(scope="function")
+def broken_replica(tmp_path):
+    """Réplica injoignable (répertoire inexistant)"""
+    replica_engine = create_engine(f"sqlite:///{tmp_path / 'absent' / 'replica.db'}")
+    yield replica_engine
+    replica_engine.dispose()
+
+
+def routing_session(test_db, *replica_engines) -> RoutingSession:
+    return RoutingSession(bind=test_db.get_bind(), replicas=ReplicaPool(list(replica_engines)))
+
+
+class TestReadReplicaRouting:
+    """Tests du routage des lectures vers les réplicas"""
+
+    def test_parse_replica_urls(self):
+        """DATABASE_REPLICA_URLS accepte une liste séparée par des virgules"""
+        assert parse_replica_urls(" postgresql://r1/db, ,postgresql://r2/db ") == [
+            "postgresql://r1/db", "postgresql://r2/db"
+        ]
+        assert parse_replica_urls("") == []
+
+    def test_select_is_served_by_replica(self, test_db, sqlite_replica):
+        """Les lectures ORM partent vers le réplica"""
+        session = routing_session(test_db, sqlite_replica)
+
+        names = session.scalars(select(Category.name)).all()
+
+        assert names == ["Depuis le réplica"]
+        session.close()
+
+    def test_reads_after_write_stay_on_primary(self, test_db, sqlite_replica):
+        """Après un flush, la transaction reste sur le primaire"""
+        session = routing_session(test_db, sqlite_replica)
+        session.add(Category(name="Écrite sur le primaire", slug="primaire"))
+        session.flush()
+
+        names = session.scalars(select(Category.name)).all()
+
+        assert "Écrite sur le primaire" in names
+        assert "Depuis le réplica" not in names
+        session.rollback()
+        assert session.get_bind(clause=select(Category)) is sqlite_replica
+        session.close()
+
+    def test_locking_reads_go_to_primary(self, test_db, sqlite_replica):
+        """SELECT ... FOR UPDATE ne doit jamais partir vers un réplica"""
+        session = routing_session(test_db, sqlite_replica)
+
+        assert session.get_bind(clause=select(Category).with_for_update()) is test_db.get_bind()
+        session.close()
+
+    def test_round_robin_between_replicas(self, test_db, sqlite_replica, tmp_path):
+        """Les transactions successives alternent entre réplicas"""
+        second_replica = create_engine(f"sqlite:///{tmp_path / 'second.db'}")
+        pool = ReplicaPool([sqlite_replica, second_replica])
+
+        assert [pool.next_engine() for _ in range(4)] == [
+            sqlite_replica, second_replica, sqlite_replica, second_replica
+        ]
+        second_replica.dispose()
+
+    def test_unhealthy_replica_falls_back_to_primary(self, test_db, broken_replica):
+        """Un réplica injoignable est écarté et la lecture se fait sur le primaire"""
+        session = routing_session(test_db, broken_replica)
+
+        names = session.scalars(select(Category.name)).all()
+
+        assert len(names) > 0
+        assert session.replicas.is_healthy(broken_replica) is False
+        session.close()
+
+    def test_unhealthy_replica_is_skipped(self, sqlite_replica, broken_replica):
+        """Le round-robin saute les réplicas en échec"""
+        pool = ReplicaPool([broken_replica, sqlite_replica])
+
+        assert {pool.next_engine() for _ in range(3)} == {sqlite_replica}
+
+    @pytest.mark.asyncio
+    async def test_unreachable_async_replica_falls_back_to_primary(self):
+        """asyncpg lève OSError (non enveloppée) : le réplica est écarté, le primaire répond"""
+        primary_url = get_async_database_url(settings.DATABASE_URL)
+        primary = create_async_engine(primary_url)
+        replica = create_async_engine(
+            make_url(primary_url).set(host="127.0.0.1", port=1).render_as_string(hide_password=False),
+            connect_args={"timeout": 2}
+        )
+        pool = ReplicaPool([replica.sync_engine])
+        session_factory = async_sessionmaker(
+            bind=primary, class_=AsyncSession, sync_session_class=RoutingSession, replicas=pool
+        )
+        try:
+            async with session_factory() as session:
+                assert (await session.execute(select(1))).scalar() == 1
+            assert pool.is_healthy(replica.sync_engine) is False
+        finally:
+            await replica.dispose()
+            await primary.dispose()
@@ -1,6 +1,11 @@
+from datetime import datetime, timedelta
+
 import pytest
 from fastapi import status
 
+from app.models.event import Event, EventType
+from app.repositories.event_repository import EventRepository
+
 EVENTS_PREFIX = "/events"
 
 
@@ -11,3 +16,52 @@ class TestEventModule:
         """Vérification que l'API répond"""
         response = client.get("/")
         assert response.status_code == status.HTTP_200_OK
+
+
+class TestEventCursorPagination:
+    """Le curseur s'applique aussi aux listes filtrées"""
+
+    @staticmethod
+    def _add_events(test_db, count: int, event_type: EventType):
+        base = datetime(2026, 1, 1, 12, 0, 0)
+        for index in range(count):
+            test_db.add(Event(
+                type=event_type,
+                payload={"index": index},
+                triggered_at=base + timedelta(minutes=index % 2),
+            ))
+        test_db.flush()
+
+    @staticmethod
+    def _walk(fetch) -> list:
+        ids, cursor = [], ""
+        while cursor is not None:
+            page = fetch(cursor)
+            ids.extend(event.id for event in page)
+            cursor = page.next_cursor
+        return ids
+
+    def test_pending_events_follow_cursor(self, test_db):
+        self._add_events(test_db, 5, EventType.ORDER_CREATED)
+
+        ids = self._walk(lambda cursor: EventRepository.get_pending(test_db, limit=2, cursor=cursor))
+
+        expected = [
+            event.id for event in test_db.query(Event).filter(~Event.processed)
+            .order_by(Event.triggered_at, Event.id)
+        ]
+        assert ids == expected
+
+    def test_events_by_type_follow_cursor(self, test_db):
+        self._add_events(test_db, 5, EventType.ORDER_CREATED)
+        self._add_events(test_db, 2, EventType.PAYMENT_SUCCESS)
+
+        ids = self._walk(lambda cursor: EventRepository.get_by_type(
+            test_db, EventType.ORDER_CREATED, limit=2, cursor=cursor
+        ))
+
+        expected = [
+            event.id for event in test_db.query(Event).filter(Event.type == EventType.ORDER_CREATED)
+            .order_by(Event.triggered_at.desc(), Event.id.desc())
+        ]
+        assert ids == expected
@@ -0,0 +1,81 @@
+import logging
+
+import pytest
+from sqlalchemy import select
+
+from app.core import metrics
+from app.core.config import settings
+from app.models.products import Category
+
+CATEGORIES_ROUTE = "/products-catalog/products/categories"
+
+
+def sample_value(body: str, prefix: str) -> float:
+    """Valeur de la première ligne d'exposition commençant par `prefix`"""
+    for line in body.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"Métrique absente : {prefix}")
+
+
+class TestMetrics:
+    """Tests de l'instrumentation HTTP/SQL et de /metrics"""
+
+    def test_histogram_exposition_format(self):
+        """Buckets cumulés, somme et nombre au format Prometheus"""
+        histogram = metrics.Histogram("demo_seconds", "Démo", ("route",), buckets=(0.1, 1.0))
+        histogram.observe(0.05, "/a")
+        histogram.observe(0.5, "/a")
+
+        lines = list(histogram.samples())
+
+        assert 'demo_seconds_bucket{route="/a",le="0.1"} 1.0' in lines
+        assert 'demo_seconds_bucket{route="/a",le="1.0"} 2.0' in lines
+        assert 'demo_seconds_bucket{route="/a",le="+Inf"} 2.0' in lines
+        assert 'demo_seconds_count{route="/a"} 2.0' in lines
+
+    def test_request_records_route_and_query_count(self, client):
+        """Chaque requête est rattachée au gabarit de sa route avec ses requêtes SQL"""
+        before = metrics.db_queries_per_request.count("GET", CATEGORIES_ROUTE)
+
+        response = client.get(CATEGORIES_ROUTE)
+
+        assert response.status_code == 200
+        assert metrics.db_queries_per_request.count("GET", CATEGORIES_ROUTE) == before + 1
+        assert metrics.db_queries_per_request.sum("GET", CATEGORIES_ROUTE) >= 1
+
+    def test_metrics_endpoint(self, client):
+        """/metrics expose les compteurs au format texte Prometheus"""
+        client.get(CATEGORIES_ROUTE)
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        body = response.text
+        assert "# TYPE http_request_duration_seconds histogram" in body
+        assert sample_value(
+            body, f'http_requests_total{{method="GET",route="{CATEGORIES_ROUTE}",status="200"}}'
+        ) >= 1
+        assert sample_value(body, f'db_queries_per_request_count{{method="GET",route="{CATEGORIES_ROUTE}"}}') >= 1
+
+    def test_slow_query_log_includes_plan(self, test_db, monkeypatch, caplog):
+        """Au-delà du seuil, la requête est journalisée avec son plan EXPLAIN"""
+        monkeypatch.setattr(settings, "SLOW_QUERY_THRESHOLD_MS", 0.0001)
+        slow_before = metrics.db_slow_queries_total.value()
+
+        with caplog.at_level(logging.WARNING, logger="app.slow_query"):
+            test_db.execute(select(Category.id).where(Category.slug == "legumes")).all()
+
+        assert metrics.db_slow_queries_total.value() > slow_before
+        messages = [record.getMessage() for record in caplog.records if record.name == "app.slow_query"]
+        assert any("FROM categories" in message and "Plan :" in message for message in messages)
+
+    def test_failed_explain_keeps_transaction_usable(self, test_db):
+        """Un EXPLAIN en échec est annulé par son savepoint, la transaction continue"""
+        connection = test_db.connection()
+
+        with pytest.raises(Exception):
+            metrics._explain(connection, "SELECT * FROM table_inexistante", {})
+
+        assert test_db.execute(select(1)).scalar() == 1
@@ -20,3 +20,204 @@ class TestOrdersModule:
         assert response.status_code == status.HTTP_200_OK
         assert "status" in response.json()
         assert response.json()["status"] == "online"
+
+
+@pytest.fixture
+def checkout_setup(test_db):
+    """Producteur, produit (stock 5) avec variante (stock 3), créneau (1 place) et client avec panier"""
+    from datetime import datetime, time, timedelta
+    from decimal import Decimal
+
+    from app.models.auth import User
+    from app.models.orders import Cart, CartItem
+    from app.models.products import Product, ProductVariant
+    from app.models.profiles import DayOfWeek, PickupPoint, PickupSlot, ProducerProfile
+
+    producer_user = User(email="stock-producteur@example.com", password_hash="x")
+    customer = User(email="stock-client@example.com", password_hash="x")
+    test_db.add_all([producer_user, customer])
+    test_db.flush()
+    producer = ProducerProfile(user_id=producer_user.id, business_name="Ferme du stock")
+    test_db.add(producer)
+    test_db.flush()
+    product = Product(producer_id=producer.id, name="Tomates", slug="tomates-stock",
+                      price=Decimal("1000"), stock_quantity=5)
+    test_db.add(product)
+    test_db.flush()
+    variant = ProductVariant(product_id=product.id, name="5kg", stock=3)
+    point = PickupPoint(producer_id=producer.id, name="Marché", address="Place", city="Dakar", postal_code="10000")
+    test_db.add_all([variant, point])
+    test_db.flush()
+    slot = PickupSlot(pickup_point_id=point.id, day_of_week=list(DayOfWeek)[0],
+                      start_time=time(8), end_time=time(10), max_orders=1)
+    test_db.add(slot)
+    test_db.flush()
+
+    def fill_cart(user, items):
+        cart = Cart(user_id=user.id, expires_at=datetime.utcnow() + timedelta(days=1))
+        test_db.add(cart)
+        test_db.flush()
+        for variant_id, quantity in items:
+            cart.items.append(CartItem(product_id=product.id, variant_id=variant_id, quantity=quantity,
+                                       unit_price=Decimal("1000"), subtotal=Decimal("1000") * quantity))
+        test_db.flush()
+
+    def new_user(email):
+        user = User(email=email, password_hash="x")
+        test_db.add(user)
+        test_db.flush()
+        return user
+
+    return {
+        "db": test_db, "customer": customer, "product": product, "variant": variant,
+        "point": point, "slot": slot, "fill_cart": fill_cart, "new_user": new_user
+    }
+
+
+def _pickup_checkout(setup):
+    from app.schemas.order_schema import CheckoutRequest
+
+    return CheckoutRequest(delivery_type="pickup", pickup_point_id=setup["point"].id,
+                           pickup_slot_id=setup["slot"].id, payment_method="cash")
+
+
+class TestStockReservation:
+    """Réservation atomique du stock et des créneaux au checkout"""
+
+    def test_checkout_reserves_product_variant_and_slot(self, checkout_setup):
+        """Produit, variante et créneau sont décrémentés par les UPDATE conditionnels"""
+        from app.services.order_service import OrderService
+
+        setup = checkout_setup
+        setup["fill_cart"](setup["customer"], [(None, 2), (setup["variant"].id, 1)])
+
+        order = OrderService(setup["db"]).create_order_from_cart(setup["customer"].id, _pickup_checkout(setup))
+
+        assert order.id is not None
+        assert setup["product"].stock_quantity == 3
+        assert setup["variant"].stock == 2
+        assert setup["slot"].current_orders == 1
+
+    def test_insufficient_stock_writes_nothing(self, checkout_setup):
+        """Stock insuffisant : 400 et aucun stock ni créneau modifié"""
+        from fastapi import HTTPException
+        from app.services.order_service import OrderService
+
+        setup = checkout_setup
+        setup["fill_cart"](setup["customer"], [(None, 2), (setup["variant"].id, 4)])
+
+        with pytest.raises(HTTPException) as exc:
+            OrderService(setup["db"]).create_order_from_cart(setup["customer"].id, _pickup_checkout(setup))
+
+        assert exc.value.status_code == status.HTTP_400_BAD_REQUEST
+        assert "Stock insuffisant" in exc.value.detail
+        assert setup["product"].stock_quantity == 5
+        assert setup["variant"].stock == 3
+        assert setup["slot"].current_orders == 0
+
+    def test_full_pickup_slot_is_refused(self, checkout_setup):
+        """La capacité du créneau est respectée"""
+        from fastapi import HTTPException
+        from app.services.order_service import OrderService
+
+        setup = checkout_setup
+        setup["fill_cart"](setup["customer"], [(None, 1)])
+        OrderService(setup["db"]).create_order_from_cart(setup["customer"].id, _pickup_checkout(setup))
+
+        other_customer = setup["new_user"]("stock-client-2@example.com")
+        setup["fill_cart"](other_customer, [(None, 1)])
+        with pytest.raises(HTTPException) as exc:
+            OrderService(setup["db"]).create_order_from_cart(other_customer.id, _pickup_checkout(setup))
+
+        assert exc.value.detail == "Créneau de retrait indisponible"
+        assert setup["product"].stock_quantity == 4
+
+    def test_cancel_restores_stock_and_slot(self, checkout_setup):
+        """L'annulation rend le stock et la place du créneau"""
+        from app.services.order_service import OrderService
+
+        setup = checkout_setup
+        setup["fill_cart"](setup["customer"], [(None, 2), (setup["variant"].id, 1)])
+        service = OrderService(setup["db"])
+        order = service.create_order_from_cart(setup["customer"].id, _pickup_checkout(setup))
+
+        service.cancel_order(order.id, setup["customer"].id, "Erreur de commande")
+
+        assert setup["product"].stock_quantity == 5
+        assert setup["variant"].stock == 3
+        assert setup["slot"].current_orders == 0
+
+
+class TestDocumentNumbering:
+    """Numérotation des commandes et factures par séquences annuelles"""
+
+    def test_order_numbers_keep_format_and_increase(self, test_db):
+        from app.repositories.order_repository import OrderRepository
+
+        repository = OrderRepository(test_db)
+        first, second = repository.generate_order_number(), repository.generate_order_number()
+
+        prefix, year, number = first.split("-")
+        assert prefix == "CMD" and len(year) == 4 and len(number) == 6
+        assert int(second.split("-")[-1]) == int(number) + 1
+
+    def test_invoice_numbers_keep_format(self, test_db):
+        from app.core.numbering import DocumentNumberGenerator
+
+        generator = DocumentNumberGenerator(test_db)
+
+        assert generator.next_invoice_number(year=2031) == "INV-2031-0001"
+        assert generator.next_invoice_number(year=2031) == "INV-2031-0002"
+        assert generator.next_order_number(year=2032) == "CMD-2032-000001"
+
+    def test_invalid_prefix_is_rejected(self, test_db):
+        from app.core.numbering import DocumentNumberGenerator
+
+        with pytest.raises(ValueError):
+            DocumentNumberGenerator(test_db).next_number("CMD'; DROP", 4, 2031)
+
+    def test_checkout_assigns_order_number(self, checkout_setup):
+        from app.services.order_service import OrderService
+
+        setup = checkout_setup
+        setup["fill_cart"](setup["customer"], [(None, 1)])
+
+        order = OrderService(setup["db"]).create_order_from_cart(setup["customer"].id, _pickup_checkout(setup))
+
+        assert order.order_number.startswith(f"CMD-{order.created_at.year}-")
+
+    def test_parallel_numbering_has_no_duplicates(self):
+        """Tirages concurrents sur des connexions distinctes : aucun doublon"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        from sqlalchemy import text
+
+        from app.core.database import SessionLocal, engine
+        from app.core.numbering import NEXT_DOCUMENT_NUMBER_DDL, DocumentNumberGenerator
+
+        workers, per_worker = 16, 50
+        with engine.begin() as connection:
+            existed = connection.execute(
+                text("SELECT to_regprocedure('next_document_number(text)') IS NOT NULL")
+            ).scalar()
+            connection.execute(text(NEXT_DOCUMENT_NUMBER_DDL))
+
+        def draw(_):
+            session = SessionLocal()
+            try:
+                numbers = [DocumentNumberGenerator(session).next_number("TST", 6, 2099) for _ in range(per_worker)]
+                session.commit()
+                return numbers
+            finally:
+                session.close()
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                numbers = [number for batch in pool.map(draw, range(workers)) for number in batch]
+        finally:
+            with engine.begin() as connection:
+                connection.execute(text("DROP SEQUENCE IF EXISTS document_number_tst_2099"))
+                if not existed:
+                    connection.execute(text("DROP FUNCTION IF EXISTS next_document_number(text)"))
+
+        assert len(numbers) == len(set(numbers)) == workers * per_worker
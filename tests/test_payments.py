@@ -17,3 +17,201 @@ class TestPaymentsModule:
             params={"start_date": start, "end_date": end}
         )
         assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.fixture
+def payable_orders(test_db):
+    """Deux producteurs et leurs commandes : (producteurs, commandes)"""
+    from decimal import Decimal
+
+    from app.models.auth import User
+    from app.models.orders import DeliveryType, Order, OrderStatus, PaymentStatus as OrderPaymentStatus
+    from app.models.profiles import ProducerProfile
+
+    producers = []
+    for index in range(2):
+        user = User(email=f"versements-{index}@example.com", password_hash="x")
+        test_db.add(user)
+        test_db.flush()
+        producer = ProducerProfile(user_id=user.id, business_name=f"Ferme versements {index}")
+        test_db.add(producer)
+        test_db.flush()
+        producers.append(producer)
+
+    created_at = datetime(2026, 2, 10, 12, 0)
+    specs = [
+        # (producteur, total, statut, statut de paiement)
+        (0, "1000", OrderStatus.COMPLETED, OrderPaymentStatus.COMPLETED),
+        (0, "2500", OrderStatus.COMPLETED, OrderPaymentStatus.COMPLETED),
+        (0, "9999", OrderStatus.COMPLETED, OrderPaymentStatus.PENDING),
+        (1, "400", OrderStatus.COMPLETED, OrderPaymentStatus.COMPLETED),
+        (1, "800", OrderStatus.CANCELLED, OrderPaymentStatus.COMPLETED),
+    ]
+    orders = []
+    for index, (producer, total, order_status, payment_status) in enumerate(specs):
+        order = Order(
+            producer_id=producers[producer].id, order_number=f"CMD-VERS-{index}", status=order_status,
+            payment_status=payment_status, subtotal=Decimal(total), total_amount=Decimal(total),
+            delivery_type=DeliveryType.PICKUP, created_at=created_at
+        )
+        test_db.add(order)
+        orders.append(order)
+    test_db.flush()
+    return producers, orders
+
+
+class TestPaymentAggregates:
+    """Statistiques et versements calculés en SQL"""
+
+    def test_payment_statistics_by_status(self, test_db, payable_orders):
+        from decimal import Decimal
+
+        from app.models.payments import Payment, PaymentMethodType, PaymentStatus
+        from app.services.payment_service import PaymentService
+
+        _, orders = payable_orders
+        for index, (amount, payment_status) in enumerate([
+            ("100", PaymentStatus.COMPLETED), ("250", PaymentStatus.COMPLETED),
+            ("40", PaymentStatus.PENDING), ("70", PaymentStatus.FAILED), ("30", PaymentStatus.REFUNDED),
+        ]):
+            test_db.add(Payment(order_id=orders[0].id, payment_method=PaymentMethodType.CASH,
+                                amount=Decimal(amount), status=payment_status,
+                                transaction_id=f"stats-{index}"))
+        test_db.flush()
+
+        stats = PaymentService(test_db).get_payment_statistics(
+            datetime.now() - timedelta(days=1), datetime.now() + timedelta(days=1)
+        )
+
+        assert stats.total_payments == 5
+        assert stats.total_amount == Decimal("490")
+        assert (stats.completed_amount, stats.pending_amount, stats.refunded_amount) == (
+            Decimal("350"), Decimal("40"), Decimal("30")
+        )
+        assert stats.failed_count == 1
+
+    def test_payouts_for_all_producers_in_one_query(self, test_db, payable_orders):
+        from decimal import Decimal
+
+        from app.services.payment_service import PaymentService
+
+        producers, _ = payable_orders
+        service = PaymentService(test_db)
+        start, end = datetime(2026, 2, 1), datetime(2026, 2, 28, 23, 59)
+
+        payouts = {payout.producer_id: payout for payout in service.calculate_producer_payouts(
+            start, end, producer_ids=[producer.id for producer in producers]
+        )}
+
+        assert (payouts[producers[0].id].total_orders, payouts[producers[0].id].gross_amount) == (2, Decimal("3500"))
+        assert payouts[producers[0].id].net_amount == Decimal("2975")
+        assert (payouts[producers[1].id].total_orders, payouts[producers[1].id].gross_amount) == (1, Decimal("400"))
+        assert service.calculate_producer_payout(producers[1].id, start, end) == payouts[producers[1].id]
+        empty = service.calculate_producer_payout(producers[1].id, datetime(2026, 3, 1), datetime(2026, 3, 31))
+        assert (empty.total_orders, empty.gross_amount, empty.net_amount) == (0, Decimal("0"), Decimal("0"))
+
+
+class TestPayoutBatch:
+    """Versements de fin de mois par lots avec point de reprise"""
+
+    period = (datetime(2026, 2, 1), datetime(2026, 2, 28, 23, 59, 59))
+
+    @pytest.fixture
+    def verified_producers(self, test_db, payable_orders):
+        producers, _ = payable_orders
+        for producer in producers:
+            producer.is_verified = True
+        test_db.flush()
+        return producers
+
+    def test_commission_rules_and_default_rate(self, test_db, verified_producers):
+        from datetime import date
+        from decimal import Decimal
+
+        from app.models.admin import Commission
+        from app.models.payments import PayoutRun, PayoutRunStatus, ProducerPayout
+        from app.services.payout_batch_service import PayoutBatchService
+
+        test_db.add(Commission(producer_id=verified_producers[0].user_id, percentage=Decimal("10"),
+                               fixed_amount=Decimal("5"), valid_from=date(2026, 1, 1)))
+        test_db.flush()
+
+        created = PayoutBatchService(test_db, chunk_size=1).run(*self.period)
+
+        payouts = {payout.producer_id: payout for payout in test_db.query(ProducerPayout).filter(
+            ProducerPayout.id.in_(created)
+        )}
+        first, second = (payouts[producer.id] for producer in verified_producers)
+        # 10 % de 3500 + 5 par commande (2 commandes)
+        assert (first.gross_amount, first.commission, first.net_amount) == (
+            Decimal("3500"), Decimal("360"), Decimal("3140")
+        )
+        # Aucune règle : taux par défaut de 15 %
+        assert (second.gross_amount, second.commission) == (Decimal("400"), Decimal("60"))
+        run = test_db.query(PayoutRun).filter(PayoutRun.period_start == self.period[0]).one()
+        assert (run.status, run.payouts_created) == (PayoutRunStatus.COMPLETED, 2)
+        assert PayoutBatchService(test_db).run(*self.period) == []
+
+    def test_rerun_of_completed_period_pays_late_producers(self, test_db, verified_producers):
+        from app.models.payments import PayoutRun, PayoutRunStatus, ProducerPayout
+        from app.services.payout_batch_service import PayoutBatchService
+
+        late, on_time = verified_producers
+        late.is_verified = False
+        test_db.flush()
+        first = PayoutBatchService(test_db).run(*self.period)
+
+        # Producteur vérifié après la clôture de la période
+        late.is_verified = True
+        test_db.flush()
+        second = PayoutBatchService(test_db).run(*self.period)
+
+        paid = test_db.query(ProducerPayout).filter(ProducerPayout.id.in_(first + second)).all()
+        assert [payout.producer_id for payout in paid if payout.id in first] == [on_time.id]
+        assert [payout.producer_id for payout in paid if payout.id in second] == [late.id]
+        assert PayoutBatchService(test_db).run(*self.period) == []
+        run = test_db.query(PayoutRun).filter(PayoutRun.period_start == self.period[0]).one()
+        assert (run.status, run.payouts_created) == (PayoutRunStatus.COMPLETED, 2)
+
+    def test_resume_after_interrupted_chunk(self, test_db, verified_producers, monkeypatch):
+        from app.models.payments import ProducerPayout
+        from app.repositories.payment_repository import PaymentRepository
+        from app.services.payout_batch_service import PayoutBatchService
+
+        insert_payouts = PaymentRepository.insert_producer_payouts
+        calls = []
+
+        def crash_on_second_chunk(repository, payouts):
+            calls.append(payouts)
+            if len(calls) == 2:
+                raise RuntimeError("arrêt brutal")
+            return insert_payouts(repository, payouts)
+
+        monkeypatch.setattr(PaymentRepository, "insert_producer_payouts", crash_on_second_chunk)
+        with pytest.raises(RuntimeError):
+            PayoutBatchService(test_db, chunk_size=1).run(*self.period)
+        monkeypatch.setattr(PaymentRepository, "insert_producer_payouts", insert_payouts)
+
+        resumed = PayoutBatchService(test_db, chunk_size=1).run(*self.period)
+
+        assert len(resumed) == 1
+        paid = [payout.producer_id for payout in test_db.query(ProducerPayout).filter(
+            ProducerPayout.period_start == self.period[0]
+        ).order_by(ProducerPayout.producer_id)]
+        assert paid == [producer.id for producer in verified_producers]
+
+    def test_rule_priority(self):
+        from decimal import Decimal
+
+        from app.core.commission_rules import CommissionRule, CommissionRuleSet
+
+        def rule(rule_id, producer_id, category_id):
+            return CommissionRule(rule_id, producer_id, category_id, Decimal("10"), None, None, None)
+
+        rules = CommissionRuleSet([rule(1, None, None), rule(2, None, 7), rule(3, 5, None), rule(4, 5, 7)])
+
+        assert rules.resolve(5, 7).id == 4
+        assert rules.resolve(5, 8).id == 3
+        assert rules.resolve(6, 7).id == 2
+        assert rules.resolve(6).id == 1
+        assert CommissionRuleSet([]).resolve(5, 7) is None
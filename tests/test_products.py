@@ -1,12 +1,55 @@
 import pytest
 import io
+import hashlib
 from fastapi import status
 from datetime import date, timedelta
+from decimal import Decimal
+
+from app.models.auth import User
+from app.models.profiles import ProducerProfile
+from app.models.products import Product, Category
+from app.repositories.product_repository import ProductRepository
 
 # Préfixe des routes produits
 PRODUCTS_PREFIX = "/products-catalog/products"
 
 
+@pytest.fixture(scope="function")
+def catalog_producer(test_db) -> ProducerProfile:
+    """Producteur vérifié créé directement en base (sans passer par l'API)"""
+    user = User(email="catalogue@marketplace.com", password_hash="not-a-real-hash")
+    test_db.add(user)
+    test_db.flush()
+    producer = ProducerProfile(user_id=user.id, business_name="Ferme du Catalogue", is_verified=True)
+    test_db.add(producer)
+    test_db.flush()
+    return producer
+
+
+def make_image_bytes(image_format: str = "PNG", size=(800, 600), color=(200, 120, 40)) -> bytes:
+    """Image réelle minimale pour les tests d'upload"""
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def make_product(test_db, producer: ProducerProfile, name: str, **kwargs) -> Product:
+    """Insère un produit actif pour les tests de recherche"""
+    values = {
+        "slug": name.lower().replace(" ", "-"),
+        "price": Decimal("1000"),
+        "stock_quantity": 10,
+        "is_active": True,
+    }
+    values.update(kwargs)
+    product = Product(producer_id=producer.id, name=name, **values)
+    test_db.add(product)
+    test_db.flush()
+    return product
+
+
 class TestCategories:
     """Tests de gestion des catégories de produits"""
 
@@ -556,7 +599,7 @@ class TestProductImages:
         assert product_response.status_code == status.HTTP_201_CREATED
         product_id = product_response.json()["id"]
 
-        image_bytes = io.BytesIO(b"fake-image-content")
+        image_bytes = io.BytesIO(make_image_bytes("JPEG", (64, 48)))
         upload_response = client.post(
             f"{PRODUCTS_PREFIX}/{product_id}/images/upload",
             headers=producer_headers,
@@ -676,6 +719,89 @@ class TestStockManagement:
                     status.HTTP_404_NOT_FOUND
                 ]
 
+    @pytest.fixture
+    def stock_batch(self, client, test_db, catalog_producer):
+        from app.main import app
+        from app.models.products import ProductVariant, StockAlert
+        from app.routers.auth_router import get_current_user
+
+        user = test_db.get(User, catalog_producer.user_id)
+        app.dependency_overrides[get_current_user] = lambda: user
+        products = [make_product(test_db, catalog_producer, f"Récolte {index}", stock_quantity=10)
+                    for index in range(3)]
+        variant = ProductVariant(product_id=products[0].id, name="Panier", sku="REC-PANIER", stock=5)
+        test_db.add_all([variant, StockAlert(product_id=products[1].id, threshold=4),
+                         StockAlert(product_id=products[2].id, threshold=4)])
+        test_db.flush()
+        return products, variant
+
+    def test_batch_stock_update(self, client, test_db, stock_batch):
+        from app.models.products import StockAlert, StockMovement
+
+        (harvest, sold, counted), variant = stock_batch
+        adjustments = [
+            {"product_id": harvest.id, "quantity": 30, "type": "in", "reason": "Récolte"},
+            {"product_id": harvest.id, "variant_id": variant.id, "quantity": 2, "type": "out"},
+            {"product_id": sold.id, "quantity": 7, "type": "out"},
+            {"product_id": counted.id, "quantity": 12, "type": "adjustment", "reason": "Inventaire"},
+            {"product_id": harvest.id, "quantity": 5, "type": "out"},
+        ]
+
+        with client.max_queries(15):
+            response = client.post(f"{PRODUCTS_PREFIX}/stock/batch", json={"adjustments": adjustments})
+
+        assert response.status_code == status.HTTP_200_OK
+        result = response.json()
+        assert [(level["product_id"], level["variant_id"], level["stock"]) for level in result["levels"]] == [
+            (harvest.id, None, 35), (sold.id, None, 3), (counted.id, None, 12), (harvest.id, variant.id, 3)
+        ]
+        assert result["movements"] == 5
+        assert [alert["product_id"] for alert in result["triggered_alerts"]] == [sold.id]
+
+        test_db.expire_all()
+        assert (harvest.stock_quantity, sold.stock_quantity, counted.stock_quantity, variant.stock) == (35, 3, 12, 3)
+        movements = test_db.query(StockMovement).filter(
+            StockMovement.product_id.in_([harvest.id, sold.id, counted.id])
+        ).order_by(StockMovement.id).all()
+        assert [(m.product_id, m.type.value, m.quantity, m.reference) for m in movements] == [
+            (harvest.id, "in", 30, None), (harvest.id, "out", 2, f"variant:{variant.id}"),
+            (sold.id, "out", 7, None), (counted.id, "adjustment", 12, None), (harvest.id, "out", 5, None),
+        ]
+        alerts = {alert.product_id: alert for alert in test_db.query(StockAlert)}
+        assert alerts[sold.id].notified_at is not None
+        assert alerts[counted.id].notified_at is None
+
+    def test_batch_stock_update_is_all_or_nothing(self, client, test_db, stock_batch):
+        from app.models.products import StockMovement
+
+        (harvest, sold, _), variant = stock_batch
+        neighbour = User(email="voisin@marketplace.com", password_hash="not-a-real-hash")
+        test_db.add(neighbour)
+        test_db.flush()
+        other_farm = ProducerProfile(user_id=neighbour.id, business_name="Ferme voisine", is_verified=True)
+        test_db.add(other_farm)
+        test_db.flush()
+        foreign = make_product(test_db, other_farm, "Récolte voisine")
+
+        not_owned = client.post(f"{PRODUCTS_PREFIX}/stock/batch", json={"adjustments": [
+            {"product_id": harvest.id, "quantity": 5, "type": "in"},
+            {"product_id": foreign.id, "quantity": 5, "type": "in"},
+        ]})
+        negative = client.post(f"{PRODUCTS_PREFIX}/stock/batch", json={"adjustments": [
+            {"product_id": harvest.id, "quantity": 5, "type": "in"},
+            {"product_id": sold.id, "quantity": 11, "type": "out"},
+        ]})
+        wrong_variant = client.post(f"{PRODUCTS_PREFIX}/stock/batch", json={"adjustments": [
+            {"product_id": sold.id, "variant_id": variant.id, "quantity": 1, "type": "out"},
+        ]})
+
+        assert not_owned.status_code == status.HTTP_403_FORBIDDEN
+        assert negative.status_code == status.HTTP_400_BAD_REQUEST
+        assert wrong_variant.status_code == status.HTTP_404_NOT_FOUND
+        test_db.expire_all()
+        assert (harvest.stock_quantity, sold.stock_quantity, foreign.stock_quantity) == (10, 10, 10)
+        assert test_db.query(StockMovement).filter(StockMovement.product_id == harvest.id).count() == 0
+
 
 @pytest.mark.integration
 class TestProductCatalogIntegration:
@@ -753,3 +879,679 @@ class TestProductCatalogIntegration:
             params={"in_stock": True}
         )
         assert filter_response.status_code == status.HTTP_200_OK
+
+
+
+class TestProductFullTextSearch:
+    """Tests de la recherche plein texte (tsvector + trigrammes)"""
+
+    def test_search_ignores_accents_and_plural(self, test_db, catalog_producer):
+        """'tomate' doit trouver 'Tômates fraîches' (accents et pluriel français)"""
+        tomato = make_product(test_db, catalog_producer, "Tômates fraîches")
+        make_product(test_db, catalog_producer, "Bananes plantain")
+
+        results = ProductRepository(test_db).search_products(search_term="tomate")
+
+        assert [p.id for p in results] == [tomato.id]
+
+    def test_search_matches_partial_word(self, test_db, catalog_producer):
+        """Un début de mot suffit ('plant' → 'Plantain')"""
+        plantain = make_product(test_db, catalog_producer, "Plantain mûr")
+
+        results = ProductRepository(test_db).search_products(search_term="plant")
+
+        assert plantain.id in [p.id for p in results]
+
+    def test_search_tolerates_misspelling(self, test_db, catalog_producer):
+        """La similarité trigramme rattrape une faute de frappe"""
+        moringa = make_product(test_db, catalog_producer, "Moringa en poudre")
+
+        results = ProductRepository(test_db).search_products(search_term="moringo")
+
+        assert moringa.id in [p.id for p in results]
+
+    def test_search_ranks_name_before_description(self, test_db, catalog_producer):
+        """Un produit dont le nom correspond passe avant une simple mention en description"""
+        in_description = make_product(
+            test_db, catalog_producer, "Panier du marché",
+            description="Carottes, poireaux et gingembre frais"
+        )
+        in_name = make_product(test_db, catalog_producer, "Gingembre frais")
+
+        results = ProductRepository(test_db).search_products(search_term="gingembre")
+
+        assert [p.id for p in results] == [in_name.id, in_description.id]
+
+    def test_search_composes_with_filters(self, test_db, catalog_producer):
+        """Les filtres existants (prix, stock, mise en avant) restent appliqués"""
+        cheap = make_product(test_db, catalog_producer, "Piment rouge", price=Decimal("500"))
+        make_product(test_db, catalog_producer, "Piment jaune", price=Decimal("5000"))
+        make_product(test_db, catalog_producer, "Piment vert", price=Decimal("400"), stock_quantity=0)
+
+        results = ProductRepository(test_db).search_products(
+            search_term="piment", max_price=1000, in_stock=True
+        )
+
+        assert [p.id for p in results] == [cheap.id]
+
+    def test_search_with_only_punctuation(self, test_db, catalog_producer):
+        """Une saisie sans mot exploitable ne provoque pas d'erreur SQL"""
+        results = ProductRepository(test_db).search_products(search_term="&|!()")
+
+        assert isinstance(results, list)
+
+
+class TestProductSearchFacets:
+    """Tests des facettes de recherche (catégories, tags, prix, stock)"""
+
+    def test_facets_count_filtered_set(self, test_db, catalog_producer):
+        """Les compteurs portent sur l'ensemble filtré, toutes facettes confondues"""
+        category = test_db.query(Category).first()
+        make_product(test_db, catalog_producer, "Mangue greffée", price=Decimal("300"), category_id=category.id)
+        make_product(test_db, catalog_producer, "Mangue sauvage", price=Decimal("800"), stock_quantity=0)
+        make_product(test_db, catalog_producer, "Ananas", price=Decimal("800"))
+
+        facets = ProductRepository(test_db).get_search_facets(search_term="mangue")
+
+        assert facets["total"] == 2
+        assert facets["in_stock"] == 1
+        assert facets["out_of_stock"] == 1
+        assert facets["categories"] == [{"value": category.id, "count": 1}]
+        counts_by_range = {r["min_price"]: r["count"] for r in facets["price_ranges"]}
+        assert counts_by_range[0] == 1
+        assert counts_by_range[500] == 1
+
+    def test_search_route_returns_facets(self, client, test_db, catalog_producer):
+        """include_facets=true renvoie les produits et leurs facettes"""
+        make_product(test_db, catalog_producer, "Avocat Hass")
+
+        response = client.get(
+            f"{PRODUCTS_PREFIX}/",
+            params={"search_term": "avocat", "include_facets": True}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert [p["name"] for p in data["products"]] == ["Avocat Hass"]
+        assert data["facets"]["total"] == 1
+        assert data["facets"]["in_stock"] == 1
+
+    def test_search_route_without_facets_keeps_list(self, client):
+        """Sans include_facets, la réponse reste une liste (compatibilité)"""
+        response = client.get(f"{PRODUCTS_PREFIX}/")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert isinstance(response.json(), list)
+
+
+class TestKeysetPagination:
+    """Tests de la pagination par curseur (created_at, id)"""
+
+    def _walk(self, fetch):
+        """Parcourt toutes les pages en suivant next_cursor"""
+        pages, cursor = [], ""
+        while cursor is not None:
+            page = fetch(cursor)
+            pages.append([p.id for p in page])
+            cursor = page.next_cursor
+        return pages
+
+    def test_producer_products_pages_follow_cursor(self, test_db, catalog_producer):
+        """Les pages se suivent sans doublon ni trou, même à created_at identique"""
+        products = [make_product(test_db, catalog_producer, f"Igname {i}") for i in range(5)]
+        repo = ProductRepository(test_db)
+
+        pages = self._walk(lambda cursor: repo.get_producer_products(catalog_producer.id, limit=2, cursor=cursor))
+
+        assert [len(page) for page in pages] == [2, 2, 1]
+        assert sum(pages, []) == sorted((p.id for p in products), reverse=True)
+
+    def test_cursor_is_stable_when_rows_are_inserted(self, test_db, catalog_producer):
+        """Un produit ajouté entre deux pages ne décale pas la page suivante"""
+        products = [make_product(test_db, catalog_producer, f"Gombo {i}") for i in range(4)]
+        repo = ProductRepository(test_db)
+
+        first_page = repo.get_producer_products(catalog_producer.id, limit=2, cursor="")
+        make_product(test_db, catalog_producer, "Gombo nouveau")
+        second_page = repo.get_producer_products(catalog_producer.id, limit=2, cursor=first_page.next_cursor)
+
+        assert [p.id for p in second_page] == [products[1].id, products[0].id]
+
+    def test_search_cursor_with_relevance(self, test_db, catalog_producer):
+        """La recherche textuelle se pagine sur (pertinence, created_at, id)"""
+        make_product(test_db, catalog_producer, "Banane plantain", description="banane mûre")
+        for i in range(3):
+            make_product(test_db, catalog_producer, f"Banane douce {i}")
+        repo = ProductRepository(test_db)
+
+        expected = [p.id for p in repo.search_products(search_term="banane")]
+        pages = self._walk(lambda cursor: repo.search_products(search_term="banane", limit=3, cursor=cursor))
+
+        assert sum(pages, []) == expected
+
+    def test_search_route_exposes_next_cursor_header(self, client, test_db, catalog_producer):
+        """La route publique renvoie le curseur suivant dans X-Next-Cursor"""
+        for i in range(3):
+            make_product(test_db, catalog_producer, f"Manioc {i}")
+
+        first = client.get(f"{PRODUCTS_PREFIX}/", params={"producer_id": catalog_producer.id, "limit": 2, "cursor": ""})
+        assert first.status_code == status.HTTP_200_OK
+        assert len(first.json()) == 2
+
+        second = client.get(
+            f"{PRODUCTS_PREFIX}/",
+            params={"producer_id": catalog_producer.id, "limit": 2, "cursor": first.headers["X-Next-Cursor"]}
+        )
+        assert [p["name"] for p in second.json()] == ["Manioc 0"]
+        assert "X-Next-Cursor" not in second.headers
+
+    def test_invalid_cursor_is_rejected(self, client):
+        """Un curseur illisible renvoie une erreur 400"""
+        response = client.get(f"{PRODUCTS_PREFIX}/", params={"cursor": "pas-un-curseur"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestCatalogHttpCache:
+    """ETag, 304 et cache de réponses des routes publiques du catalogue"""
+
+    def test_conditional_get_on_categories(self, client, test_db):
+        first = client.get(f"{PRODUCTS_PREFIX}/categories")
+        assert first.status_code == status.HTTP_200_OK
+        assert "stale-while-revalidate" in first.headers["cache-control"]
+        etag = first.headers["etag"]
+
+        cached = client.get(f"{PRODUCTS_PREFIX}/categories", headers={"If-None-Match": etag})
+        assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+        statements = client.last_queries.statements
+        assert [statement for statement in statements if "cache_versions" not in statement] == []
+
+        # Autre paramètre de requête : autre représentation, autre ETag
+        active = client.get(f"{PRODUCTS_PREFIX}/categories", params={"active_only": True})
+        assert active.headers["etag"] != etag
+
+        test_db.add(Category(name="Épices cache", slug="epices-cache"))
+        test_db.flush()
+        changed = client.get(f"{PRODUCTS_PREFIX}/categories", headers={"If-None-Match": etag})
+        assert changed.status_code == status.HTTP_200_OK
+        assert changed.headers["etag"] != etag
+        assert "Épices cache" in {category["name"] for category in changed.json()}
+
+    def test_repeated_get_served_from_response_cache(self, client):
+        first = client.get(f"{PRODUCTS_PREFIX}/units")
+
+        second = client.get(f"{PRODUCTS_PREFIX}/units")
+
+        assert second.json() == first.json()
+        assert second.headers["etag"] == first.headers["etag"]
+        statements = client.last_queries.statements
+        assert [statement for statement in statements if "cache_versions" not in statement] == []
+
+    def test_public_producer_profile_follows_updates(self, client, test_db, catalog_producer):
+        from datetime import datetime
+
+        url = f"/producer-profiles/producers/{catalog_producer.id}"
+        etag = client.get(url).headers["etag"]
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == status.HTTP_304_NOT_MODIFIED
+
+        catalog_producer.business_name = "Ferme du Catalogue renommée"
+        # now() est figé dans la transaction de test : on avance la date à la main
+        catalog_producer.updated_at = datetime(2031, 1, 1)
+        test_db.flush()
+
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["business_name"] == "Ferme du Catalogue renommée"
+        assert client.get(f"/producer-profiles/producers/{catalog_producer.id + 1000}").status_code == 404
+
+    def test_response_cache_evicts_least_recently_used(self):
+        from app.core.http_cache import ResponseCache
+
+        cache = ResponseCache(max_bytes=10)
+        cache.set('"a"', b"1234")
+        cache.set('"b"', b"1234")
+        cache.get('"a"')
+        cache.set('"c"', b"1234")
+        cache.set('"big"', b"x" * 11)
+
+        assert (cache.get('"a"'), cache.get('"b"'), cache.get('"c"'), cache.get('"big"')) == (
+            b"1234", None, b"1234", None
+        )
+
+
+class TestCategoryHierarchy:
+    """Chemin matérialisé des catégories : arbre, déplacements, recherche par sous-arbre"""
+
+    @pytest.fixture
+    def hierarchy(self, test_db):
+        """Fruits > Agrumes > Citrons, et Légumes à la racine"""
+        fruits = Category(name="Fruits arbre", slug="fruits-arbre")
+        test_db.add(fruits)
+        test_db.flush()
+        citrus = Category(name="Agrumes arbre", slug="agrumes-arbre", parent_id=fruits.id)
+        test_db.add(citrus)
+        test_db.flush()
+        lemons = Category(name="Citrons arbre", slug="citrons-arbre", parent_id=citrus.id)
+        vegetables = Category(name="Légumes arbre", slug="legumes-arbre")
+        test_db.add_all([lemons, vegetables])
+        test_db.flush()
+        for category in (fruits, citrus, lemons, vegetables):
+            test_db.refresh(category)
+        return fruits, citrus, lemons, vegetables
+
+    def test_path_is_set_on_insert(self, hierarchy):
+        fruits, citrus, lemons, _ = hierarchy
+
+        assert fruits.path == f"/{fruits.id}/"
+        assert lemons.path == f"/{fruits.id}/{citrus.id}/{lemons.id}/"
+
+    def test_tree_is_built_from_a_single_query(self, test_db, query_counter, hierarchy):
+        from app.schemas.product_schema import CategoryTree
+        from app.services.product_service import CategoryService
+
+        fruits, citrus, lemons, _ = hierarchy
+        test_db.expire_all()
+
+        with query_counter as queries:
+            tree = [CategoryTree.model_validate(root) for root in CategoryService(test_db).get_category_tree()]
+
+        assert queries.count == 1
+        node = next(root for root in tree if root.id == fruits.id)
+        assert [child.id for child in node.subcategories] == [citrus.id]
+        assert [child.id for child in node.subcategories[0].subcategories] == [lemons.id]
+
+    def test_inactive_category_hides_its_subtree(self, test_db, hierarchy):
+        from app.services.product_service import CategoryService
+
+        fruits, citrus, lemons, _ = hierarchy
+        citrus.is_active = False
+        test_db.flush()
+
+        tree = CategoryService(test_db).get_category_tree(active_only=True)
+
+        node = next(root for root in tree if root.id == fruits.id)
+        assert node.subcategories == []
+
+    def test_move_rewrites_subtree_paths(self, test_db, hierarchy):
+        from app.schemas.product_schema import CategoryUpdate
+        from app.services.product_service import CategoryService
+
+        fruits, citrus, lemons, vegetables = hierarchy
+
+        CategoryService(test_db).update_category(citrus.id, CategoryUpdate(parent_id=vegetables.id))
+
+        test_db.refresh(lemons)
+        assert citrus.path == f"/{vegetables.id}/{citrus.id}/"
+        assert lemons.path == f"/{vegetables.id}/{citrus.id}/{lemons.id}/"
+
+    def test_move_under_own_subtree_is_rejected(self, test_db, hierarchy):
+        from fastapi import HTTPException
+        from app.schemas.product_schema import CategoryUpdate
+        from app.services.product_service import CategoryService
+
+        fruits, _, lemons, _ = hierarchy
+
+        with pytest.raises(HTTPException) as error:
+            CategoryService(test_db).update_category(fruits.id, CategoryUpdate(parent_id=lemons.id))
+        assert error.value.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_search_includes_descendants(self, client, test_db, catalog_producer, hierarchy):
+        fruits, citrus, lemons, vegetables = hierarchy
+        make_product(test_db, catalog_producer, "Panier de fruits", category_id=fruits.id)
+        make_product(test_db, catalog_producer, "Citron vert", category_id=lemons.id)
+        make_product(test_db, catalog_producer, "Carotte", category_id=vegetables.id)
+
+        direct = client.get(f"{PRODUCTS_PREFIX}/", params={"category_id": fruits.id})
+        subtree = client.get(
+            f"{PRODUCTS_PREFIX}/", params={"category_id": fruits.id, "include_descendants": True}
+        )
+        facets = ProductRepository(test_db).get_search_facets(category_id=citrus.id, include_descendants=True)
+
+        assert [product["name"] for product in direct.json()] == ["Panier de fruits"]
+        assert {product["name"] for product in subtree.json()} == {"Panier de fruits", "Citron vert"}
+        assert facets["categories"] == [{"value": lemons.id, "count": 1}]
+
+
+class TestImagePipeline:
+    """Upload d'images : écriture bornée, adressage par contenu, déclinaisons"""
+
+    @pytest.fixture
+    def upload(self, test_db, async_test_db, catalog_producer, tmp_path, monkeypatch):
+        from fastapi import UploadFile
+        from app.services.product_service import add_image_file
+
+        monkeypatch.chdir(tmp_path)
+        product = make_product(test_db, catalog_producer, "Mangue photo")
+
+        async def send(content: bytes, filename: str = "photo.png"):
+            return await add_image_file(
+                async_test_db, product.id, catalog_producer.user_id,
+                UploadFile(file=io.BytesIO(content), filename=filename, size=len(content))
+            )
+
+        return product, send
+
+    def test_stream_to_file_enforces_limit(self, tmp_path):
+        from app.core.image_pipeline import ImageTooLarge, stream_to_file
+
+        stored = stream_to_file(io.BytesIO(b"x" * 10), tmp_path / "ok", max_bytes=10, chunk_size=4)
+        assert stored.size == 10
+        assert stored.path.read_bytes() == b"x" * 10
+
+        with pytest.raises(ImageTooLarge):
+            stream_to_file(io.BytesIO(b"x" * 11), tmp_path / "too-big", max_bytes=10, chunk_size=4)
+        assert not (tmp_path / "too-big").exists()
+
+    @pytest.mark.asyncio
+    async def test_upload_generates_renditions(self, upload, tmp_path):
+        product, send = upload
+
+        content = make_image_bytes("PNG", (2000, 1000))
+        digest = hashlib.sha256(content).hexdigest()
+
+        image = await send(content)
+
+        assert image.is_primary is True
+        assert image.renditions["thumb"].width == 200
+        assert image.renditions["card"].height == 300
+        assert image.renditions["full"].width == 1600
+        assert image.url == image.renditions["full"].jpeg
+        assert image.thumbnail_url == f"/uploads/products/{product.id}/{digest}/thumb.webp"
+        for rendition in image.renditions.values():
+            for url in (rendition.webp, rendition.jpeg):
+                assert (tmp_path / url.lstrip("/")).is_file()
+
+    @pytest.mark.asyncio
+    async def test_same_content_is_stored_once(self, upload, tmp_path):
+        product, send = upload
+        content = make_image_bytes("JPEG", (300, 300))
+        digest = hashlib.sha256(content).hexdigest()
+
+        first = await send(content)
+        manifest = tmp_path / "uploads" / "products" / str(product.id) / digest / "manifest.json"
+        written_at = manifest.stat().st_mtime_ns
+        second = await send(content, filename="copie.jpg")
+
+        assert second.id != first.id
+        assert second.renditions == first.renditions
+        assert manifest.stat().st_mtime_ns == written_at
+        assert [path.name for path in manifest.parent.parent.iterdir()] == [digest]
+
+    @pytest.mark.asyncio
+    async def test_invalid_or_oversized_upload_is_rejected(self, upload, monkeypatch, tmp_path):
+        from fastapi import HTTPException
+        from app.core.config import settings
+
+        product, send = upload
+
+        with pytest.raises(HTTPException) as invalid:
+            await send(b"pas une image", filename="photo.jpg")
+        monkeypatch.setattr(settings, "PRODUCT_IMAGE_MAX_BYTES", 100)
+        with pytest.raises(HTTPException) as too_large:
+            await send(make_image_bytes("PNG"))
+
+        assert invalid.value.status_code == status.HTTP_400_BAD_REQUEST
+        assert too_large.value.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        product_dir = tmp_path / "uploads" / "products" / str(product.id)
+        assert list(product_dir.iterdir()) == []
+
+
+    def test_oversized_body_is_rejected_before_parsing(self, client, monkeypatch):
+        from app.core.config import settings
+        from app.core.upload_limits import MULTIPART_OVERHEAD_BYTES
+
+        monkeypatch.setattr(settings, "PRODUCT_IMAGE_MAX_BYTES", 1024)
+        oversized = b"x" * (1024 + MULTIPART_OVERHEAD_BYTES + 1)
+        boundary = "limite"
+        body = (
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"photo.png\"\r\n"
+            f"Content-Type: image/png\r\n\r\n"
+        ).encode() + oversized + f"\r\n--{boundary}--\r\n".encode()
+        headers = {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+        url = f"{PRODUCTS_PREFIX}/1/images/upload"
+
+        announced = client.post(url, content=body, headers=headers)
+        # Corps chunked, sans Content-Length : coupé pendant la lecture
+        streamed = client.post(url, content=iter([body[:4096], body[4096:]]), headers=headers)
+
+        assert announced.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        assert streamed.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+
+class TestUploadsStaticFiles:
+    """Service de /uploads : cache immuable, ETag fort, plages, variantes précompressées"""
+
+    @pytest.fixture
+    def uploads(self, tmp_path):
+        from starlette.applications import Starlette
+        from starlette.routing import Mount
+        from starlette.testclient import TestClient
+        from app.core.static_files import ImmutableStaticFiles
+
+        (tmp_path / "photo.jpg").write_bytes(bytes(range(256)) * 4)
+        (tmp_path / "logo.svg").write_text("<svg></svg>")
+        (tmp_path / "logo.svg.br").write_bytes(b"brotli")
+        static_app = Starlette(routes=[Mount("/uploads", ImmutableStaticFiles(directory=str(tmp_path)))])
+        return TestClient(static_app)
+
+    def test_immutable_headers_and_conditional_get(self, uploads):
+        response = uploads.get("/uploads/photo.jpg")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.content == bytes(range(256)) * 4
+        etag = response.headers["etag"]
+        assert not etag.startswith("W/")
+
+        revalidated = uploads.get("/uploads/photo.jpg", headers={"If-None-Match": etag})
+        assert revalidated.status_code == status.HTTP_304_NOT_MODIFIED
+        assert revalidated.headers["etag"] == etag
+        assert revalidated.content == b""
+
+    def test_only_product_images_are_publicly_cacheable(self, tmp_path):
+        from starlette.applications import Starlette
+        from starlette.routing import Mount
+        from starlette.testclient import TestClient
+        from app.core.static_files import ImmutableStaticFiles
+
+        (tmp_path / "products" / "1").mkdir(parents=True)
+        (tmp_path / "products" / "1" / "thumb.webp").write_bytes(b"webp")
+        (tmp_path / "producers" / "7").mkdir(parents=True)
+        (tmp_path / "producers" / "7" / "kbis.pdf").write_bytes(b"%PDF")
+        static_app = Starlette(routes=[Mount("/uploads", ImmutableStaticFiles(
+            directory=str(tmp_path), immutable_prefixes=("products/",)
+        ))])
+        uploads = TestClient(static_app)
+
+        image = uploads.get("/uploads/products/1/thumb.webp")
+        document = uploads.get("/uploads/producers/7/kbis.pdf")
+
+        assert image.headers["cache-control"] == "public, max-age=31536000, immutable"
+        assert document.status_code == status.HTTP_200_OK
+        assert document.headers["cache-control"] == "private, no-store"
+
+    def test_range_requests(self, uploads):
+        etag = uploads.get("/uploads/photo.jpg").headers["etag"]
+
+        partial = uploads.get("/uploads/photo.jpg", headers={"Range": "bytes=10-19"})
+        suffix = uploads.get("/uploads/photo.jpg", headers={"Range": "bytes=-4"})
+        stale = uploads.get("/uploads/photo.jpg", headers={"Range": "bytes=0-9", "If-Range": '"autre"'})
+        outside = uploads.get("/uploads/photo.jpg", headers={"Range": "bytes=5000-"})
+        matching = uploads.get("/uploads/photo.jpg", headers={"Range": "bytes=0-0", "If-Range": etag})
+
+        assert partial.status_code == status.HTTP_206_PARTIAL_CONTENT
+        assert partial.headers["content-range"] == "bytes 10-19/1024"
+        assert partial.content == bytes(range(10, 20))
+        assert suffix.content == bytes(range(252, 256))
+        assert stale.status_code == status.HTTP_200_OK
+        assert len(stale.content) == 1024
+        assert outside.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        assert outside.headers["content-range"] == "bytes */1024"
+        assert matching.content == b"\x00"
+
+    def test_precompressed_variant(self, uploads):
+        compressed = uploads.get("/uploads/logo.svg", headers={"Accept-Encoding": "gzip, br"})
+        identity = uploads.get("/uploads/logo.svg", headers={"Accept-Encoding": "identity"})
+
+        assert compressed.headers["content-encoding"] == "br"
+        assert compressed.headers["content-type"].startswith("image/svg+xml")
+        assert compressed.headers["vary"] == "Accept-Encoding"
+        assert "content-encoding" not in identity.headers
+        assert identity.headers["vary"] == "Accept-Encoding"
+        assert identity.text == "<svg></svg>"
+        assert compressed.headers["etag"] != identity.headers["etag"]
+
+
+class TestCatalogImportExport:
+    """Import de catalogue en flux (upserts par lots, erreurs par ligne) et export paginé"""
+
+    @pytest.fixture
+    def catalog(self, client, test_db, catalog_producer):
+        from app.main import app
+        from app.core.deps import require_producer
+        from app.models.products import Tag, Unit
+
+        category = Category(name="Tubercules import", slug="tubercules-import")
+        unit = Unit(name="Sac import", abbreviation="sac-imp", type="piece")
+        tags = [Tag(name="Bio import", slug="bio-import", type="bio"),
+                Tag(name="Local import", slug="local-import", type="local")]
+        test_db.add_all([category, unit, *tags])
+        test_db.flush()
+        user = test_db.get(User, catalog_producer.user_id)
+        app.dependency_overrides[require_producer] = lambda: user
+        return category, unit, tags
+
+    @staticmethod
+    def products_by_slug(test_db, producer):
+        test_db.expire_all()
+        return {
+            product.slug: product
+            for product in test_db.query(Product).filter(Product.producer_id == producer.id)
+        }
+
+    def test_csv_import_reports_row_errors(self, client, test_db, catalog_producer, catalog, monkeypatch):
+        from app.core.config import settings
+        from app.models.products import StockMovement
+
+        category, unit, _ = catalog
+        monkeypatch.setattr(settings, "CATALOG_IMPORT_CHUNK_SIZE", 2)
+        body = (
+            "slug,name,price,stock_quantity,category_id,unit_id,description,tags,variant_sku,variant_name,variant_stock\n"
+            f"igname-jaune,Igname jaune,1500,40,{category.id},{unit.id},\"Récoltée à la main,\nlavée\",bio-import|local-import,IGN-5,Sac 5 kg,4\n"
+            f"igname-jaune,Igname jaune,1500,40,{category.id},{unit.id},,bio-import|local-import,IGN-10,Sac 10 kg,2\n"
+            "macabo,Macabo,0,5,,,,,,,\n"
+            "taro,Taro,900,0,,,,inconnu,,,\n"
+            f"patate-douce,Patate douce,700,12,{category.id},,,,,,\n"
+            "manioc,Manioc,400,8,,,\n"
+        ).encode()
+
+        # Corps envoyé en petits blocs : enregistrements coupés au milieu d'une ligne
+        response = client.post(
+            f"{PRODUCTS_PREFIX}/catalog/import",
+            content=(body[index:index + 16] for index in range(0, len(body), 16))
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        report = response.json()
+        assert (report["processed"], report["created"], report["updated"], report["failed"]) == (5, 2, 0, 3)
+        assert report["variants"] == 2
+        assert {error["line"]: error["slug"] for error in report["errors"]} == {5: "macabo", 6: "taro", 8: None}
+        assert any("price" in message for message in report["errors"][0]["errors"])
+
+        products = self.products_by_slug(test_db, catalog_producer)
+        assert set(products) == {"igname-jaune", "patate-douce"}
+        yam = products["igname-jaune"]
+        assert yam.description == "Récoltée à la main,\nlavée"
+        assert sorted(tag.slug for tag in yam.tags) == ["bio-import", "local-import"]
+        assert sorted((variant.sku, variant.stock) for variant in yam.variants) == [("IGN-10", 2), ("IGN-5", 4)]
+        movements = test_db.query(StockMovement).filter(StockMovement.product_id == yam.id).all()
+        assert [(movement.quantity, movement.reason) for movement in movements] == [(40, "Stock initial")]
+
+    def test_ndjson_import_upserts_in_constant_queries(self, client, test_db, catalog_producer, catalog):
+        import json
+        from app.models.products import ProductVariant, StockMovement
+
+        _, _, (bio, _) = catalog
+        existing = make_product(test_db, catalog_producer, "Gombo frais", stock_quantity=10)
+        other_producer = make_product(test_db, catalog_producer, "Autre produit", slug="autre-produit")
+        test_db.add(ProductVariant(product_id=other_producer.id, name="Pris", sku="PRIS-1"))
+        test_db.flush()
+
+        def payload(count):
+            lines = [{"slug": "gombo-frais", "name": "Gombo frais", "price": "1200.50", "stock_quantity": 25,
+                      "tags": ["bio-import"], "variants": [{"sku": "GOM-1", "name": "Botte"}]},
+                     {"slug": "piment", "name": "Piment", "price": 300, "variants": [{"sku": "PRIS-1", "name": "Pot"}]}]
+            lines += [{"slug": f"lot-{index}", "name": f"Lot {index}", "price": 100} for index in range(count)]
+            return "\n".join(json.dumps(line) for line in lines).encode()
+
+        with client.max_queries(30):
+            small = client.post(f"{PRODUCTS_PREFIX}/catalog/import?format=ndjson", content=payload(3))
+            large = client.post(f"{PRODUCTS_PREFIX}/catalog/import?format=ndjson", content=payload(60))
+
+        assert small.json()["created"] == 3 and small.json()["updated"] == 1
+        assert large.json()["created"] == 57 and large.json()["updated"] == 4
+        assert [error["slug"] for error in large.json()["errors"]] == ["piment"]
+        assert client.last_queries.count <= 30
+
+        products = self.products_by_slug(test_db, catalog_producer)
+        gombo = products["gombo-frais"]
+        assert gombo.id == existing.id
+        assert (gombo.price, gombo.stock_quantity) == (Decimal("1200.50"), 25)
+        assert [tag.id for tag in gombo.tags] == [bio.id]
+        assert [variant.sku for variant in gombo.variants] == ["GOM-1"]
+        assert "piment" not in products
+        movements = test_db.query(StockMovement).filter(StockMovement.product_id == gombo.id).all()
+        assert [(movement.type.value, movement.quantity) for movement in movements] == [("adjustment", 25)]
+
+    def test_partial_reimport_keeps_omitted_fields(self, client, test_db, catalog_producer, catalog):
+        import json
+        from app.models.products import ProductVariant, StockMovement
+
+        existing = make_product(test_db, catalog_producer, "Gombo sec", stock_quantity=10, min_order=2,
+                                is_active=False)
+        test_db.add(ProductVariant(product_id=existing.id, name="Botte", sku="GOS-1", stock=7))
+        test_db.flush()
+        body = "\n".join(json.dumps(line) for line in [
+            {"slug": "gombo-sec", "name": "Gombo sec", "price": 1300, "variants": [{"sku": "GOS-1", "name": "Botte"}]},
+            {"slug": "fonio", "name": "Fonio", "price": 800},
+        ]).encode()
+
+        report = client.post(f"{PRODUCTS_PREFIX}/catalog/import?format=ndjson", content=body).json()
+
+        assert (report["created"], report["updated"], report["failed"]) == (1, 1, 0)
+        products = self.products_by_slug(test_db, catalog_producer)
+        gombo = products["gombo-sec"]
+        assert (gombo.price, gombo.stock_quantity, gombo.min_order, gombo.is_active) == (Decimal("1300"), 10, 2, False)
+        assert [(variant.sku, variant.stock) for variant in gombo.variants] == [("GOS-1", 7)]
+        assert test_db.query(StockMovement).filter(StockMovement.product_id == gombo.id).count() == 0
+        assert (products["fonio"].stock_quantity, products["fonio"].is_active) == (0, True)
+
+    def test_export_round_trip(self, client, test_db, catalog_producer, catalog, monkeypatch):
+        import json
+        import app.services.catalog_service as catalog_service
+
+        monkeypatch.setattr(catalog_service, "EXPORT_PAGE_SIZE", 2)
+        body = "\n".join(json.dumps(line) for line in [
+            {"slug": "plantain", "name": "Plantain", "price": 250, "stock_quantity": 3, "tags": ["local-import"],
+             "description": "Mûr, \"doux\"", "variants": [{"sku": "PLA-R", "name": "Régime", "stock": 2},
+                                                          {"sku": "PLA-M", "name": "Main", "price_modifier": "-50"}]},
+            {"slug": "avocat", "name": "Avocat", "price": 150, "harvest_date": "2026-09-30", "is_featured": True},
+            {"slug": "safou", "name": "Safou", "price": 500, "is_active": False},
+        ]).encode()
+        assert client.post(f"{PRODUCTS_PREFIX}/catalog/import?format=ndjson", content=body).json()["created"] == 3
+
+        exported_csv = client.get(f"{PRODUCTS_PREFIX}/catalog/export")
+        exported_ndjson = client.get(f"{PRODUCTS_PREFIX}/catalog/export?format=ndjson")
+
+        assert exported_csv.headers["content-type"].startswith("text/csv")
+        assert len(exported_csv.text.splitlines()) == 1 + 2 + 1 + 1
+        records = [json.loads(line) for line in exported_ndjson.text.splitlines()]
+        assert [record["slug"] for record in records] == ["plantain", "avocat", "safou"]
+        assert records[0]["tags"] == ["local-import"]
+        assert [variant["sku"] for variant in records[0]["variants"]] == ["PLA-R", "PLA-M"]
+
+        for exported, fmt in ((exported_csv, "csv"), (exported_ndjson, "ndjson")):
+            report = client.post(f"{PRODUCTS_PREFIX}/catalog/import?format={fmt}", content=exported.content).json()
+            assert (report["created"], report["updated"], report["variants"], report["failed"]) == (0, 3, 2, 0)
+        assert [json.loads(line) for line in client.get(
+            f"{PRODUCTS_PREFIX}/catalog/export?format=ndjson").text.splitlines()] == records
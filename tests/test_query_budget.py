@@ -0,0 +1,96 @@
+"""
+Budgets de requêtes SQL des endpoints clés.
+
+Chaque test déclare le nombre maximal de requêtes SQL par appel HTTP
+(`@pytest.mark.query_budget(n)`) et vérifie avec `assert_queries_constant`
+que ce nombre ne croît pas avec le nombre de lignes renvoyées (N+1).
+"""
+import pytest
+
+from app.models.auth import User
+from app.models.communication import Conversation, Message, Notification, NotificationType
+from app.models.wishlist import Wishlist
+
+
+@pytest.fixture
+def current_user(test_db, auth_headers, test_user_credentials) -> User:
+    return test_db.query(User).filter(User.email == test_user_credentials["email"]).first()
+
+
+class TestQueryBudgets:
+    """Budgets de requêtes SQL par endpoint"""
+
+    @pytest.mark.query_budget(5)
+    def test_conversations(self, client, test_db, auth_headers, current_user, assert_queries_constant):
+        """Liste des conversations : dernier message et non lus sans N+1"""
+        other_user = User(email="interlocuteur@marketplace.com", password_hash="x")
+        test_db.add(other_user)
+        test_db.flush()
+
+        def seed(count):
+            for index in range(count):
+                conversation = Conversation(participants=[current_user.id, other_user.id], subject=f"Sujet {index}")
+                test_db.add(conversation)
+                test_db.flush()
+                test_db.add_all([
+                    Message(conversation_id=conversation.id, sender_id=current_user.id, content="Bonjour"),
+                    Message(conversation_id=conversation.id, sender_id=other_user.id, content="Réponse"),
+                ])
+            test_db.flush()
+
+        assert_queries_constant(seed, lambda: client.get("/communication/conversations", headers=auth_headers))
+
+        conversations = client.get("/communication/conversations", headers=auth_headers).json()
+        assert len(conversations) == 6
+        assert all(conv["unread_count"] == 1 for conv in conversations)
+        assert all(conv["last_message"] == "Réponse" for conv in conversations)
+
+    @pytest.mark.query_budget(4)
+    def test_wishlist_stats(self, client, test_db, auth_headers, current_user, assert_queries_constant):
+        """Statistiques des listes : une requête groupée quel que soit le nombre de listes"""
+        def seed(count):
+            test_db.add_all([
+                Wishlist(user_id=current_user.id, name=f"Liste {index}", is_public=index % 2 == 0)
+                for index in range(count)
+            ])
+            test_db.flush()
+
+        assert_queries_constant(seed, lambda: client.get("/wishlist/wishlists/stats/my", headers=auth_headers))
+
+        stats = client.get("/wishlist/wishlists/stats/my", headers=auth_headers).json()
+        assert stats["total_wishlists"] == 6
+
+    @pytest.mark.query_budget(4)
+    def test_my_wishlists(self, client, test_db, auth_headers, current_user, assert_queries_constant):
+        """Listes de l'utilisateur avec leur nombre d'items"""
+        def seed(count):
+            test_db.add_all([Wishlist(user_id=current_user.id, name=f"Liste {index}") for index in range(count)])
+            test_db.flush()
+
+        assert_queries_constant(seed, lambda: client.get("/wishlist/wishlists/my", headers=auth_headers))
+
+    @pytest.mark.query_budget(5)
+    def test_notifications(self, client, test_db, auth_headers, current_user, assert_queries_constant):
+        """Notifications paginées"""
+        def seed(count):
+            test_db.add_all([
+                Notification(
+                    user_id=current_user.id,
+                    type=NotificationType.SYSTEM,
+                    title=f"Notification {index}",
+                    message="Contenu"
+                )
+                for index in range(count)
+            ])
+            test_db.flush()
+
+        assert_queries_constant(seed, lambda: client.get("/communication/notifications", headers=auth_headers))
+
+    def test_budget_exceeded_fails(self, client, auth_headers):
+        """Un appel au-delà du budget fait échouer le test avec la liste des requêtes"""
+        with pytest.raises(pytest.fail.Exception) as exc:
+            with client.max_queries(0):
+                client.get("/communication/conversations", headers=auth_headers)
+
+        assert "pour un budget de 0" in str(exc.value)
+        assert "SELECT" in str(exc.value)